@@ -1,37 +1,81 @@
 import os
 import sys
 from logging.config import fileConfig
-from sqlalchemy import engine_from_config, pool
+from sqlalchemy import engine_from_config, pool, text
 from alembic import context
 
 sys.path.append(os.getcwd())
 config = context.config
-fileConfig(config.config_file_name)
+# Callers running migrations in-process (the tests) keep their own logging
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
 
-DATABASE_URL = os.getenv("DATABASE_URL")
-print("DATABASE_URL ::", DATABASE_URL)
-if not DATABASE_URL:
-    raise RuntimeError("DATABASE_URL environment variable is not set")
+# Same source as the app: the environment, then .env
+from app.config import settings
+config.set_main_option("sqlalchemy.url", settings.DATABASE_URL.replace("%", "%%"))
 
-config.set_main_option("sqlalchemy.url", DATABASE_URL)
-
-from app.db import Base
+from app.database import Base
+import app.models  # noqa: F401  (registers tables on Base.metadata)
+from app.services.partitions import PARTITION_NAME
 target_metadata = Base.metadata
 
+# Held while migrating so that replicas starting together upgrade one at a time
+MIGRATION_LOCK_KEY = 0x6D6967726174696F
+
+# Full-text search objects come from raw DDL (app.models.REVIEW_SEARCH_DDL),
+# so autogenerate must not see them as missing from the models
+SEARCH_OBJECTS = {"search_vector", "ix_reviews_search_vector"}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if name in SEARCH_OBJECTS or (type_ == "table" and name.startswith("reviews_fts")):
+        return False
+    # On PostgreSQL reviews is partitioned (revision 0005): its partitions are
+    # not models, processed_at is NOT NULL as the partition key, and foreign
+    # keys cannot reference reviews.id alone
+    if context.get_context().dialect.name == "postgresql":
+        if type_ == "table" and PARTITION_NAME.match(name):
+            return False
+        if type_ == "column" and name == "processed_at" and object.table.name == "reviews":
+            return False
+        if type_ == "foreign_key_constraint" and object.referred_table.name == "reviews":
+            return False
+    return True
+
+
 def run_migrations_offline():
     url = config.get_main_option("sqlalchemy.url")
-    context.configure(url=url, target_metadata=target_metadata, literal_binds=True)
+    context.configure(url=url, target_metadata=target_metadata, literal_binds=True, include_object=include_object)
     with context.begin_transaction():
         context.run_migrations()
 
+
 def run_migrations_online():
     connectable = engine_from_config(config.get_section(config.config_ini_section),
                                      prefix='sqlalchemy.',
                                      poolclass=pool.NullPool)
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
-        with context.begin_transaction():
-            context.run_migrations()
+        postgresql = connection.dialect.name == "postgresql"
+        if postgresql:
+            connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            connection.commit()
+        try:
+            context.configure(
+                connection=connection,
+                target_metadata=target_metadata,
+                include_object=include_object,
+                # Revisions using app.migrations commit part way through
+                transaction_per_migration=True,
+                # SQLite can only alter tables by copying them
+                render_as_batch=connection.dialect.name == "sqlite"
+            )
+            with context.begin_transaction():
+                context.run_migrations()
+        finally:
+            if postgresql:
+                connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+                connection.commit()
+
 
 if context.is_offline_mode():
     run_migrations_offline()
@@ -0,0 +1,78 @@
+"""baseline
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 00:49:57.320251
+
+The users and reviews tables the app used to create with
+``Base.metadata.create_all`` at startup. Tables that already exist are left
+as they are, so databases created that way upgrade from here without a
+manual ``alembic stamp``.
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Offline (--sql) scripts cannot look, and are for new databases
+    existing = set() if context.is_offline_mode() else set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'users' not in existing:
+        _create_users()
+    if 'reviews' not in existing:
+        _create_reviews()
+
+
+def _create_users():
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(length=50), nullable=False),
+    sa.Column('email', sa.String(length=100), nullable=False),
+    sa.Column('hashed_password', sa.String(length=255), nullable=False),
+    sa.Column('role', sa.Enum('STAFF', 'MANAGER', name='userrole'), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+    op.create_index('ix_users_id', 'users', ['id'], unique=False)
+    op.create_index('ix_users_username', 'users', ['username'], unique=True)
+
+
+def _create_reviews():
+    op.create_table('reviews',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('hotel_id', sa.String(length=100), nullable=False),
+    sa.Column('review_text', sa.Text(), nullable=False),
+    sa.Column('author', sa.String(length=100), nullable=True),
+    sa.Column('rating', sa.Float(), nullable=True),
+    sa.Column('review_date', sa.DateTime(), nullable=True),
+    sa.Column('sentiment', sa.Enum('POSITIVE', 'NEGATIVE', 'NEUTRAL', name='sentimenttype'), nullable=True),
+    sa.Column('topics', sa.Text(), nullable=True),
+    sa.Column('urgency', sa.Enum('CRITICAL', 'STANDARD', name='urgencytype'), nullable=True),
+    sa.Column('processed_at', sa.DateTime(), nullable=True),
+    sa.Column('processed_by', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['processed_by'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_reviews_hotel_id', 'reviews', ['hotel_id'], unique=False)
+    op.create_index('ix_reviews_id', 'reviews', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('reviews')
+    op.drop_table('users')
+    if op.get_bind().dialect.name == "postgresql":
+        for enum in ('urgencytype', 'sentimenttype', 'userrole'):
+            op.execute(f"DROP TYPE IF EXISTS {enum}")
@@ -0,0 +1,174 @@
+"""review analysis columns and job tables
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 00:52:08.914377
+
+The columns reviews gained for model/prompt tracking, token usage and
+near-duplicate detection, and the tables of the background jobs. The new
+columns are nullable or have a constant default, so PostgreSQL adds them
+without rewriting reviews; the foreign key is validated and the indexes are
+built without blocking writes.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.migrations import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    postgresql = op.get_context().dialect.name == 'postgresql'
+    with op.batch_alter_table('reviews') as batch_op:
+        batch_op.add_column(sa.Column('analysis_model', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('prompt_version', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('needs_reanalysis', sa.Boolean(), nullable=False, server_default=sa.false()))
+        batch_op.add_column(sa.Column('prompt_tokens', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('completion_tokens', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('minhash', sa.LargeBinary(), nullable=True))
+        batch_op.add_column(sa.Column('canonical_review_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('embedding', sa.LargeBinary(), nullable=True))
+        if not postgresql:
+            batch_op.create_foreign_key('reviews_canonical_review_id_fkey', 'reviews', ['canonical_review_id'], ['id'])
+    if postgresql:
+        with op.get_context().autocommit_block():
+            op.execute(
+                'ALTER TABLE reviews ADD CONSTRAINT reviews_canonical_review_id_fkey '
+                'FOREIGN KEY (canonical_review_id) REFERENCES reviews (id) NOT VALID'
+            )
+            # Scans the table, but without blocking writes
+            op.execute('ALTER TABLE reviews VALIDATE CONSTRAINT reviews_canonical_review_id_fkey')
+    create_index_concurrently('ix_reviews_canonical_review_id', 'reviews', ['canonical_review_id'])
+    create_index_concurrently('ix_reviews_needs_reanalysis', 'reviews', ['needs_reanalysis'])
+
+    op.create_table('review_lsh_buckets',
+    sa.Column('review_id', sa.Integer(), nullable=False),
+    sa.Column('band', sa.SmallInteger(), nullable=False),
+    sa.Column('hotel_id', sa.String(length=100), nullable=False),
+    sa.Column('bucket', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['review_id'], ['reviews.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('review_id', 'band')
+    )
+    op.create_index('ix_review_lsh_buckets_lookup', 'review_lsh_buckets', ['hotel_id', 'bucket'], unique=False)
+
+    op.create_table('job_checkpoints',
+    sa.Column('job_name', sa.String(length=100), nullable=False),
+    sa.Column('key', sa.String(length=100), nullable=False),
+    sa.Column('last_review_id', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('job_name', 'key')
+    )
+
+    op.create_table('topic_clusters',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('hotel_id', sa.String(length=100), nullable=False),
+    sa.Column('cluster_index', sa.SmallInteger(), nullable=False),
+    sa.Column('centroid', sa.LargeBinary(), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('term_counts', sa.Text(), nullable=False),
+    sa.Column('top_terms', sa.Text(), nullable=True),
+    sa.Column('example_review_ids', sa.Text(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('hotel_id', 'cluster_index', name='uq_topic_clusters_hotel_cluster')
+    )
+    op.create_index('ix_topic_clusters_id', 'topic_clusters', ['id'], unique=False)
+
+    op.create_table('hotel_ingest_state',
+    sa.Column('hotel_id', sa.String(length=100), nullable=False),
+    sa.Column('slot', sa.SmallInteger(), nullable=False),
+    sa.Column('enabled', sa.Boolean(), nullable=False),
+    sa.Column('last_review_date', sa.DateTime(), nullable=True),
+    sa.Column('last_review_id', sa.Integer(), nullable=True),
+    sa.Column('last_run_at', sa.DateTime(), nullable=True),
+    sa.Column('last_success_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('deferred_reviews', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('hotel_id')
+    )
+    op.create_index('ix_hotel_ingest_state_slot', 'hotel_ingest_state', ['slot'], unique=False)
+
+    op.create_table('hotel_daily_stats',
+    sa.Column('hotel_id', sa.String(length=100), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('negative', sa.Integer(), nullable=False),
+    sa.Column('critical', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('hotel_id', 'day')
+    )
+
+    op.create_table('hotel_anomaly_state',
+    sa.Column('hotel_id', sa.String(length=100), nullable=False),
+    sa.Column('metric', sa.String(length=20), nullable=False),
+    sa.Column('last_day', sa.Date(), nullable=False),
+    sa.Column('mean', sa.Float(), nullable=False),
+    sa.Column('variance', sa.Float(), nullable=False),
+    sa.Column('days_observed', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('hotel_id', 'metric')
+    )
+
+    op.create_table('escalation_alerts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('hotel_id', sa.String(length=100), nullable=False),
+    sa.Column('metric', sa.String(length=20), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.Column('expected', sa.Float(), nullable=False),
+    sa.Column('z_score', sa.Float(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('hotel_id', 'metric', 'day', name='uq_escalation_alerts_hotel_metric_day')
+    )
+    op.create_index('ix_escalation_alerts_created_at', 'escalation_alerts', ['created_at'], unique=False)
+    op.create_index('ix_escalation_alerts_hotel_id', 'escalation_alerts', ['hotel_id'], unique=False)
+    op.create_index('ix_escalation_alerts_id', 'escalation_alerts', ['id'], unique=False)
+
+    op.create_table('dead_letter_reviews',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('hotel_id', sa.String(length=100), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('analysis', sa.Text(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('processed_by', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('last_attempt_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['processed_by'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_dead_letter_reviews_hotel_id', 'dead_letter_reviews', ['hotel_id'], unique=False)
+    op.create_index('ix_dead_letter_reviews_id', 'dead_letter_reviews', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('dead_letter_reviews')
+    op.drop_table('escalation_alerts')
+    op.drop_table('hotel_anomaly_state')
+    op.drop_table('hotel_daily_stats')
+    op.drop_table('hotel_ingest_state')
+    op.drop_table('topic_clusters')
+    op.drop_table('job_checkpoints')
+    op.drop_table('review_lsh_buckets')
+
+    drop_index_concurrently('ix_reviews_needs_reanalysis', 'reviews')
+    drop_index_concurrently('ix_reviews_canonical_review_id', 'reviews')
+    with op.batch_alter_table('reviews') as batch_op:
+        batch_op.drop_constraint('reviews_canonical_review_id_fkey', type_='foreignkey')
+        batch_op.drop_column('embedding')
+        batch_op.drop_column('canonical_review_id')
+        batch_op.drop_column('minhash')
+        batch_op.drop_column('completion_tokens')
+        batch_op.drop_column('prompt_tokens')
+        batch_op.drop_column('needs_reanalysis')
+        batch_op.drop_column('prompt_version')
+        batch_op.drop_column('analysis_model')
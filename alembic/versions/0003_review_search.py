@@ -0,0 +1,68 @@
+"""review full-text search
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 00:55:31.207846
+
+Full-text search over review_text, as in app.models.REVIEW_SEARCH_DDL. On
+PostgreSQL adding the generated tsvector column rewrites reviews, blocking
+writes until it is done; run this revision in a quiet period. The GIN index
+is then built concurrently. On SQLite the FTS5 index is filled with the
+reviews already stored.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Full-text search over review_text, as in app.models.REVIEW_SEARCH_DDL
+SEARCH_DDL = {
+    "postgresql": [
+        "ALTER TABLE reviews ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('english', coalesce(review_text, ''))) STORED",
+        "CREATE INDEX IF NOT EXISTS ix_reviews_search_vector ON reviews USING GIN (search_vector)",
+    ],
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS reviews_fts USING fts5("
+        "review_text, content='reviews', content_rowid='id', tokenize='porter unicode61')",
+        "CREATE TRIGGER IF NOT EXISTS reviews_fts_insert AFTER INSERT ON reviews BEGIN "
+        "INSERT INTO reviews_fts(rowid, review_text) VALUES (new.id, new.review_text); END",
+        "CREATE TRIGGER IF NOT EXISTS reviews_fts_delete AFTER DELETE ON reviews BEGIN "
+        "INSERT INTO reviews_fts(reviews_fts, rowid, review_text) VALUES ('delete', old.id, old.review_text); END",
+        "CREATE TRIGGER IF NOT EXISTS reviews_fts_update AFTER UPDATE OF review_text ON reviews BEGIN "
+        "INSERT INTO reviews_fts(reviews_fts, rowid, review_text) VALUES ('delete', old.id, old.review_text); "
+        "INSERT INTO reviews_fts(rowid, review_text) VALUES (new.id, new.review_text); END",
+    ],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_context().dialect.name
+    if dialect == 'postgresql':
+        column, index = SEARCH_DDL['postgresql']
+        op.execute(column)
+        with op.get_context().autocommit_block():
+            op.execute(index.replace('CREATE INDEX', 'CREATE INDEX CONCURRENTLY'))
+    elif dialect == 'sqlite':
+        for statement in SEARCH_DDL['sqlite']:
+            op.execute(statement)
+        op.execute("INSERT INTO reviews_fts(reviews_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_context().dialect.name
+    if dialect == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_reviews_search_vector')
+        op.execute('ALTER TABLE reviews DROP COLUMN IF EXISTS search_vector')
+    elif dialect == 'sqlite':
+        for trigger in ('reviews_fts_update', 'reviews_fts_delete', 'reviews_fts_insert'):
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        op.execute('DROP TABLE IF EXISTS reviews_fts')
@@ -0,0 +1,33 @@
+"""review query indexes
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 01:20:11.482913
+
+Built with CREATE INDEX CONCURRENTLY on PostgreSQL so that ingestion keeps
+writing to reviews while they build.
+"""
+from typing import Sequence, Union
+
+from app.migrations import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    create_index_concurrently('ix_reviews_urgency_processed_at', 'reviews', ['urgency', 'processed_at'])
+    create_index_concurrently('ix_reviews_hotel_id_id', 'reviews', ['hotel_id', 'id'])
+    create_index_concurrently('ix_reviews_processed_at', 'reviews', ['processed_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_concurrently('ix_reviews_processed_at', 'reviews')
+    drop_index_concurrently('ix_reviews_hotel_id_id', 'reviews')
+    drop_index_concurrently('ix_reviews_urgency_processed_at', 'reviews')
@@ -0,0 +1,150 @@
+"""monthly partitions of reviews
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 02:41:37.106225
+
+On PostgreSQL ``reviews`` becomes a table range-partitioned by month of
+``processed_at``. The existing table is not rewritten: it is attached as the
+first partition, ``reviews_legacy``, covering everything up to the end of
+the current month, after a validated CHECK constraint has proven its rows
+fit (so attaching does not scan it). Writes are blocked only for the final
+swap, a handful of catalog changes. Monthly partitions after that are
+created here for three months and then kept ahead by the
+``review_partitions`` job.
+
+A primary key or unique constraint on a partitioned table must include the
+partition key, so the key becomes ``(id, processed_at)`` (``id`` stays
+sequence-generated and unique in practice) and the foreign keys into
+``reviews.id`` are dropped; the archive job deletes LSH buckets itself.
+
+Other databases (SQLite in tests and development) only get the
+``archived_review_stats`` table. Downgrading copies all rows into a plain
+table, blocking writes for the duration; archived reviews are not restored.
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+from app.migrations import backfill, create_index_concurrently
+from app.services.partitions import add_months, month_start, partition_name
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('archived_review_stats',
+    sa.Column('hotel_id', sa.String(length=100), nullable=False),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('duplicate', sa.Boolean(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('positive', sa.Integer(), nullable=False),
+    sa.Column('negative', sa.Integer(), nullable=False),
+    sa.Column('neutral', sa.Integer(), nullable=False),
+    sa.Column('critical', sa.Integer(), nullable=False),
+    sa.Column('topic_counts', sa.Text(), nullable=False),
+    sa.PrimaryKeyConstraint('hotel_id', 'month', 'duplicate')
+    )
+    if op.get_context().dialect.name != 'postgresql':
+        return
+    if op.get_context().as_sql:
+        raise RuntimeError('Revision 0005 sizes the first partition from the data; run it online, not with --sql')
+
+    # The partition key cannot be NULL
+    backfill('reviews', "processed_at = coalesce(review_date, timezone('utc', now()))", 'processed_at IS NULL')
+
+    bind = op.get_bind()
+    latest = bind.execute(text('SELECT max(processed_at) FROM reviews')).scalar()
+    bound = add_months(month_start(max(latest or datetime.min, datetime.utcnow())), 1)
+
+    create_index_concurrently('reviews_id_processed_at_key', 'reviews', ['id', 'processed_at'], unique=True)
+    with op.get_context().autocommit_block():
+        op.execute('ALTER TABLE reviews DROP CONSTRAINT IF EXISTS reviews_processed_at_bound')
+        op.execute(
+            'ALTER TABLE reviews ADD CONSTRAINT reviews_processed_at_bound '
+            f"CHECK (processed_at IS NOT NULL AND processed_at < '{bound:%Y-%m-%d}') NOT VALID"
+        )
+        # Scans the table, but without blocking writes
+        op.execute('ALTER TABLE reviews VALIDATE CONSTRAINT reviews_processed_at_bound')
+
+    indexes = bind.execute(text(
+        "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = 'reviews' "
+        "AND indexname NOT IN ('reviews_pkey', 'reviews_id_processed_at_key')"
+    )).all()
+
+    op.drop_constraint('review_lsh_buckets_review_id_fkey', 'review_lsh_buckets', type_='foreignkey')
+    op.drop_constraint('reviews_canonical_review_id_fkey', 'reviews', type_='foreignkey')
+    # Both use the validated CHECK constraint instead of scanning the table
+    op.execute('ALTER TABLE reviews ALTER COLUMN processed_at SET NOT NULL')
+    op.execute('ALTER TABLE reviews DROP CONSTRAINT reviews_pkey')
+    op.execute('ALTER TABLE reviews ADD CONSTRAINT reviews_legacy_pkey PRIMARY KEY USING INDEX reviews_id_processed_at_key')
+    op.rename_table('reviews', 'reviews_legacy')
+    for name, _ in indexes:
+        op.execute(f'ALTER INDEX {name} RENAME TO {name}_legacy')
+
+    op.execute(
+        'CREATE TABLE reviews (LIKE reviews_legacy INCLUDING DEFAULTS INCLUDING GENERATED) '
+        'PARTITION BY RANGE (processed_at)'
+    )
+    op.execute('ALTER TABLE reviews ADD CONSTRAINT reviews_pkey PRIMARY KEY (id, processed_at)')
+    op.create_foreign_key('reviews_processed_by_fkey', 'reviews', 'users', ['processed_by'], ['id'])
+    for _, definition in indexes:
+        op.execute(definition)
+    op.execute('ALTER SEQUENCE reviews_id_seq OWNED BY reviews.id')
+
+    # Matching indexes and the foreign key of reviews_legacy are attached, not rebuilt
+    op.execute(f"ALTER TABLE reviews ATTACH PARTITION reviews_legacy FOR VALUES FROM (MINVALUE) TO ('{bound:%Y-%m-%d}')")
+    op.execute('ALTER TABLE reviews_legacy DROP CONSTRAINT reviews_processed_at_bound')
+
+    for offset in range(MONTHS_AHEAD):
+        start = add_months(bound, offset)
+        op.execute(
+            f'CREATE TABLE {partition_name(start)} PARTITION OF reviews '
+            f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{add_months(start, 1):%Y-%m-%d}')"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_context().dialect.name == 'postgresql':
+        bind = op.get_bind()
+        indexes = bind.execute(text(
+            "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = 'reviews' AND indexname <> 'reviews_pkey'"
+        )).all()
+        columns = ', '.join(bind.execute(text(
+            "SELECT column_name FROM information_schema.columns WHERE table_name = 'reviews' "
+            "AND is_generated = 'NEVER' ORDER BY ordinal_position"
+        )).scalars())
+
+        op.execute('ALTER SEQUENCE reviews_id_seq OWNED BY NONE')
+        op.rename_table('reviews', 'reviews_partitioned')
+        op.execute('CREATE TABLE reviews (LIKE reviews_partitioned INCLUDING DEFAULTS INCLUDING GENERATED)')
+        op.execute(f'INSERT INTO reviews ({columns}) SELECT {columns} FROM reviews_partitioned')
+        op.execute('DROP TABLE reviews_partitioned')
+
+        op.execute('ALTER TABLE reviews ALTER COLUMN processed_at DROP NOT NULL')
+        op.create_primary_key('reviews_pkey', 'reviews', ['id'])
+        for _, definition in indexes:
+            op.execute(definition)
+        op.execute('ALTER SEQUENCE reviews_id_seq OWNED BY reviews.id')
+
+        # References to archived reviews have nothing left to point at
+        op.execute('UPDATE reviews SET canonical_review_id = NULL WHERE canonical_review_id NOT IN (SELECT id FROM reviews)')
+        op.execute('DELETE FROM review_lsh_buckets WHERE review_id NOT IN (SELECT id FROM reviews)')
+        op.create_foreign_key('reviews_canonical_review_id_fkey', 'reviews', 'reviews', ['canonical_review_id'], ['id'])
+        op.create_foreign_key('reviews_processed_by_fkey', 'reviews', 'users', ['processed_by'], ['id'])
+        op.create_foreign_key('review_lsh_buckets_review_id_fkey', 'review_lsh_buckets', 'reviews',
+                              ['review_id'], ['id'], ondelete='CASCADE')
+
+    op.drop_table('archived_review_stats')
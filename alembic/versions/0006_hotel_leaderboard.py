@@ -0,0 +1,48 @@
+"""hotel leaderboard
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 04:12:53.317604
+
+Per-hotel summary table behind the /portfolio endpoints, filled by the
+``hotel_leaderboard`` job. It is new and empty, so plain index builds are fine.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('hotel_leaderboard',
+    sa.Column('hotel_id', sa.String(length=100), nullable=False),
+    sa.Column('total_reviews', sa.Integer(), nullable=False),
+    sa.Column('negative_reviews', sa.Integer(), nullable=False),
+    sa.Column('critical_reviews', sa.Integer(), nullable=False),
+    sa.Column('negative_percent', sa.Float(), nullable=False),
+    sa.Column('escalation_rate', sa.Float(), nullable=False),
+    sa.Column('negative_rank', sa.Integer(), nullable=True),
+    sa.Column('escalation_rank', sa.Integer(), nullable=True),
+    sa.Column('negative_percentile', sa.Float(), nullable=True),
+    sa.Column('escalation_percentile', sa.Float(), nullable=True),
+    sa.Column('top_negative_topic', sa.Text(), nullable=True),
+    sa.Column('refreshed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('hotel_id')
+    )
+    op.create_index('ix_hotel_leaderboard_escalation_rank', 'hotel_leaderboard', ['escalation_rank'], unique=False)
+    op.create_index('ix_hotel_leaderboard_negative_rank', 'hotel_leaderboard', ['negative_rank'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_hotel_leaderboard_negative_rank', table_name='hotel_leaderboard')
+    op.drop_index('ix_hotel_leaderboard_escalation_rank', table_name='hotel_leaderboard')
+    op.drop_table('hotel_leaderboard')
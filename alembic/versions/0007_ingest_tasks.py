@@ -0,0 +1,52 @@
+"""ingest tasks
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 02:04:40.844303
+
+State of POST /ingest-reviews tasks, moved out of worker memory so that
+every gunicorn worker sees the same tasks and admission limits. It is new and
+empty, so plain index builds are fine.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, Sequence[str], None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('ingest_tasks',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('hotel_id', sa.String(length=100), nullable=False),
+    sa.Column('active_hotel_id', sa.String(length=100), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('message', sa.Text(), nullable=True),
+    sa.Column('cancel_requested', sa.Boolean(), nullable=False),
+    sa.Column('reviews_count', sa.Integer(), nullable=True),
+    sa.Column('failed_reviews', sa.Integer(), nullable=True),
+    sa.Column('prompt_tokens', sa.Integer(), nullable=True),
+    sa.Column('completion_tokens', sa.Integer(), nullable=True),
+    sa.Column('deadline_exceeded', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('active_hotel_id')
+    )
+    op.create_index('ix_ingest_tasks_created_at', 'ingest_tasks', ['created_at'], unique=False)
+    op.create_index('ix_ingest_tasks_hotel_id', 'ingest_tasks', ['hotel_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_ingest_tasks_hotel_id', table_name='ingest_tasks')
+    op.drop_index('ix_ingest_tasks_created_at', table_name='ingest_tasks')
+    op.drop_table('ingest_tasks')
@@ -0,0 +1,35 @@
+"""snapshot relabels
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 05:31:12.650418
+
+Hotel/months of the Parquet snapshot to rewrite because re-analysis changed
+labels in them. It is new and empty.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, Sequence[str], None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('snapshot_relabels',
+    sa.Column('hotel_id', sa.String(length=100), nullable=False),
+    sa.Column('month', sa.String(length=7), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('hotel_id', 'month')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('snapshot_relabels')
@@ -0,0 +1,36 @@
+"""hotel topic stats
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 06:02:47.193520
+
+Negative topic mentions per hotel, counted from a checkpoint by the
+``hotel_leaderboard`` job for its topic hotspots. It is new and empty; the
+job fills it on its first run.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, Sequence[str], None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('hotel_topic_stats',
+    sa.Column('hotel_id', sa.String(length=100), nullable=False),
+    sa.Column('topic', sa.String(length=100), nullable=False),
+    sa.Column('negative', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('hotel_id', 'topic')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('hotel_topic_stats')
@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 
 
 class Settings(BaseSettings):
@@ -10,8 +11,139 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     OPENAI_API_KEY: str
     OPENAI_MODEL: str = "gpt-3.5-turbo"
+    OPENAI_BASE_URL: Optional[str] = None
+    # Optional JSON list of OpenAI-compatible backends to route between, e.g.
+    # [{"name": "openai", "model": "gpt-3.5-turbo"},
+    #  {"name": "local", "base_url": "http://vllm:8000/v1", "api_key": "none", "model": "llama-3-8b"}]
+    LLM_PROVIDERS: Optional[str] = None
+    LLM_PROVIDER_RECOVERY_SECONDS: float = 60.0
+    # Tail latency: each attempt is cut off after LLM_CALL_TIMEOUT_SECONDS, a whole
+    # analysis (failover and hedges included) after LLM_ANALYSIS_DEADLINE_SECONDS
+    LLM_CALL_TIMEOUT_SECONDS: float = 20.0
+    LLM_ANALYSIS_DEADLINE_SECONDS: float = 30.0
+    LLM_HEDGING_ENABLED: bool = True
+    LLM_MAX_CONCURRENT_CALLS: int = 32
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    LLM_CIRCUIT_RESET_SECONDS: float = 30.0
+    # Prompt size: long reviews are cut to LLM_MAX_REVIEW_TOKENS (beginning and end kept).
+    # The compact prompt has its own prompt version: enabling it marks every stored label for re-analysis
+    LLM_COMPACT_PROMPT: bool = False
+    LLM_MAX_REVIEW_TOKENS: int = 1000
+    LLM_MAX_COMPLETION_TOKENS: int = 200
+    INGEST_TASK_DEADLINE_SECONDS: float = 300.0
+    # Admission control for POST /ingest-reviews: at most this many ingests
+    # queued or running (one per hotel); beyond it clients get 429
+    INGEST_MAX_IN_FLIGHT: int = 8
+    INGEST_RETRY_AFTER_SECONDS: int = 30
+    # Ingest tasks are kept in the database (shared by all workers). The worker
+    # running one checks for cancellation every INGEST_TASK_POLL_SECONDS and
+    # heartbeats every INGEST_TASK_HEARTBEAT_SECONDS; a task without a heartbeat
+    # for INGEST_TASK_STALE_SECONDS lost its worker and is failed. Finished
+    # tasks are deleted after INGEST_TASK_RETENTION_HOURS
+    INGEST_TASK_POLL_SECONDS: float = 1.0
+    INGEST_TASK_HEARTBEAT_SECONDS: int = 15
+    INGEST_TASK_STALE_SECONDS: int = 120
+    INGEST_TASK_RETENTION_HOURS: int = 24
     APP_NAME: str = "Hotel Review Engine"
     DEBUG: bool = False
+    METRICS_ENABLED: bool = True
+    
+    # Near-duplicate detection (MinHash + LSH)
+    NEAR_DUPLICATE_DETECTION_ENABLED: bool = True
+    NEAR_DUPLICATE_THRESHOLD: float = 0.8
+    MINHASH_PERMUTATIONS: int = 128
+    LSH_BANDS: int = 16
+    
+    # Review embeddings and similarity search
+    EMBEDDINGS_ENABLED: bool = True
+    EMBEDDING_BACKEND: str = "hashing"  # or "sentence-transformers"
+    EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
+    EMBEDDING_DIM: int = 256
+    EMBEDDING_STORAGE_DTYPE: str = "int8"  # or "float16"
+    ANN_IVF_THRESHOLD: int = 20000
+    ANN_NPROBE: int = 8
+    ANN_MAX_CACHED_HOTELS: int = 64
+    # Cached indexes are rebuilt after this long, dropping deleted reviews
+    ANN_CACHE_MAX_AGE_SECONDS: int = 3600
+    
+    # Profiling and slow query log
+    PROFILING_ENABLED: bool = False
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_HEADER: str = "X-Profile"
+    PROFILING_DIR: Optional[str] = None
+    PROFILING_MAX_STORED: int = 50
+    SLOW_QUERY_THRESHOLD_MS: float = 200.0
+    SLOW_QUERY_MAX_STORED: int = 200
+    
+    # Periodic jobs. With several workers or replicas only the one holding the
+    # scheduler leader lock runs them (a PostgreSQL advisory lock, elsewhere a
+    # lock on SCHEDULER_LOCK_FILE); the others retry every SCHEDULER_LEADER_POLL_SECONDS
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_LEADER_POLL_SECONDS: int = 30
+    SCHEDULER_LOCK_FILE: str = "scheduler.lock"
+    # Jobs reading new reviews past an id checkpoint leave the most recent ones
+    # for their next run, so reviews from transactions still committing are not skipped
+    CHECKPOINT_SAFETY_LAG_SECONDS: int = 60
+    TOPIC_CLUSTERING_INTERVAL_SECONDS: int = 3600
+    TOPIC_CLUSTERS_PER_HOTEL: int = 8
+    TOPIC_CLUSTERING_BATCH_SIZE: int = 2000
+    ANOMALY_DETECTION_INTERVAL_SECONDS: int = 900
+    ANOMALY_EWMA_ALPHA: float = 0.1
+    ANOMALY_Z_THRESHOLD: float = 3.0
+    ANOMALY_MIN_COUNT: int = 3
+    ANOMALY_WARMUP_DAYS: int = 7
+    
+    # Scheduled incremental ingestion; each tracked hotel is refreshed once per
+    # interval, in one of INGEST_SCHEDULE_SLOTS evenly spaced time slots
+    INGEST_SCHEDULE_ENABLED: bool = False
+    INGEST_SCHEDULE_INTERVAL_SECONDS: int = 3600
+    INGEST_SCHEDULE_SLOTS: int = 60
+    INGEST_SCHEDULE_BATCH_LIMIT: int = 50
+    INGEST_MAX_CONCURRENCY: int = 4
+    LLM_CALLS_PER_HOUR: int = 2000
+    
+    # Re-analysis of stored reviews after a model or prompt change
+    REANALYSIS_CHUNK_SIZE: int = 200
+    REANALYSIS_CONCURRENCY: int = 4
+    REANALYSIS_MAX_CALLS_PER_SECOND: float = 5.0
+    # A run that has not finished a chunk for this long lost its worker and can be started again
+    REANALYSIS_STALE_SECONDS: int = 600
+    # Re-scores reviews that got fallback labels while the LLM was unavailable
+    FALLBACK_RECOVERY_INTERVAL_SECONDS: int = 600
+    
+    # Reviews that failed to store during ingestion
+    DEAD_LETTER_RETRY_INTERVAL_SECONDS: int = 900
+    DEAD_LETTER_RETRY_BATCH_SIZE: int = 100
+    DEAD_LETTER_MAX_ATTEMPTS: int = 5
+    
+    # Production server (gunicorn.conf.py). On shutdown, open requests and
+    # ingests get SHUTDOWN_GRACE_SECONDS to finish; ingests still running are
+    # then stopped after their current review, within SHUTDOWN_DRAIN_SECONDS
+    SHUTDOWN_GRACE_SECONDS: int = 30
+    SHUTDOWN_DRAIN_SECONDS: int = 20
+    
+    # Monthly partitions of reviews (PostgreSQL), created this many months ahead
+    PARTITION_MONTHS_AHEAD: int = 3
+    PARTITION_MAINTENANCE_INTERVAL_SECONDS: int = 86400
+    # Reviews processed more than ARCHIVE_RETENTION_MONTHS full months ago move
+    # to Parquet files under ARCHIVE_DIR; their counts stay on the dashboard.
+    # 0 keeps everything in the database
+    ARCHIVE_RETENTION_MONTHS: int = 0
+    ARCHIVE_DIR: str = "archive"
+    ARCHIVE_BATCH_SIZE: int = 5000
+    ARCHIVE_INTERVAL_SECONDS: int = 86400
+    
+    # Parquet snapshot of reviews for analytics (app.services.snapshots),
+    # brought up to date every SNAPSHOT_INTERVAL_SECONDS
+    SNAPSHOT_ENABLED: bool = False
+    SNAPSHOT_DIR: str = "snapshots"
+    SNAPSHOT_BATCH_SIZE: int = 50000
+    SNAPSHOT_INTERVAL_SECONDS: int = 3600
+    
+    # Portfolio leaderboard (hotel_leaderboard), recomputed every
+    # LEADERBOARD_INTERVAL_SECONDS; hotels with fewer reviews are not ranked
+    LEADERBOARD_INTERVAL_SECONDS: int = 900
+    LEADERBOARD_MIN_REVIEWS: int = 20
     
     class Config:
         env_file = ".env"
@@ -1,20 +1,42 @@
+import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from app.database import init_db
-from app.routers import auth, reviews, dashboard
+from app.metrics import MetricsMiddleware, metrics_response
+from app.profiling import ProfilingMiddleware, install_slow_query_log
+from app.routers import auth, reviews, dashboard, admin, insights, portfolio
+from app.services.scheduler import scheduler
+from app.services.topic_clustering import topic_clustering_job
+from app.services.anomaly_detection import escalation_anomaly_job
+from app.services.incremental_ingestion import incremental_ingestion_job
+from app.services.reanalysis import reanalysis_job, fallback_recovery_job
+from app.services.dead_letters import dead_letter_retry_job
+from app.services.partitions import review_partition_job
+from app.services.archive import review_archive_job
+from app.services.snapshots import review_snapshot_job
+from app.services.leaderboard import hotel_leaderboard_job
+from app.services.background_tasks import background_task_manager
 from app.config import settings
 
+logging.basicConfig(level=logging.DEBUG if settings.DEBUG else logging.INFO)
+logger = logging.getLogger(__name__)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Initialize database
-    print("Initializing database...")
-    init_db()
-    print("Database initialized successfully!")
+    # The schema is managed by Alembic (alembic upgrade head), not at startup
+    if settings.SCHEDULER_ENABLED:
+        scheduler.start()
     yield
     # Shutdown: cleanup if needed
-    print("Shutting down...")
+    logger.info("Shutting down...")
+    # Ingests still running after the server's grace period stop after their current review
+    if background_task_manager.cancel_all():
+        if not await background_task_manager.drain(settings.SHUTDOWN_DRAIN_SECONDS):
+            logger.warning(
+                "Shutting down with %d ingests still running", background_task_manager.in_flight_count()
+            )
+    await scheduler.stop()
 
 
 app = FastAPI(
@@ -24,6 +46,50 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Periodic jobs
+scheduler.register(
+    topic_clustering_job.name,
+    settings.TOPIC_CLUSTERING_INTERVAL_SECONDS,
+    topic_clustering_job.run
+)
+scheduler.register(
+    escalation_anomaly_job.name,
+    settings.ANOMALY_DETECTION_INTERVAL_SECONDS,
+    escalation_anomaly_job.run
+)
+# Started on demand from /admin/reanalysis, never periodically
+scheduler.register(reanalysis_job.name, 0, reanalysis_job.run)
+scheduler.register(
+    fallback_recovery_job.name,
+    settings.FALLBACK_RECOVERY_INTERVAL_SECONDS,
+    fallback_recovery_job.run
+)
+scheduler.register(
+    dead_letter_retry_job.name,
+    settings.DEAD_LETTER_RETRY_INTERVAL_SECONDS,
+    dead_letter_retry_job.run
+)
+scheduler.register(
+    review_partition_job.name,
+    settings.PARTITION_MAINTENANCE_INTERVAL_SECONDS,
+    review_partition_job.run
+)
+scheduler.register(
+    hotel_leaderboard_job.name,
+    settings.LEADERBOARD_INTERVAL_SECONDS,
+    hotel_leaderboard_job.run
+)
+if settings.SNAPSHOT_ENABLED:
+    scheduler.register(review_snapshot_job.name, settings.SNAPSHOT_INTERVAL_SECONDS, review_snapshot_job.run)
+if settings.ARCHIVE_RETENTION_MONTHS > 0:
+    scheduler.register(review_archive_job.name, settings.ARCHIVE_INTERVAL_SECONDS, review_archive_job.run)
+if settings.INGEST_SCHEDULE_ENABLED:
+    scheduler.register(
+        incremental_ingestion_job.name,
+        incremental_ingestion_job.tick_seconds,
+        incremental_ingestion_job.run
+    )
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -33,10 +99,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Profiling / slow query log and metrics
+app.add_middleware(ProfilingMiddleware)
+install_slow_query_log()
+
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(reviews.router)
 app.include_router(dashboard.router)
+app.include_router(admin.router)
+app.include_router(insights.router)
+app.include_router(portfolio.router)
 
 
 @app.get("/", tags=["Health"])
@@ -54,4 +130,10 @@ def health_check():
         "status": "healthy",
         "database": "connected",
         "api": "running"
-    }
\ No newline at end of file
+    }
+
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", tags=["Health"], include_in_schema=False)
+    def metrics():
+        return metrics_response()
@@ -0,0 +1,317 @@
+import os
+import time
+from typing import Any, Optional
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config import settings
+
+# All recording helpers become no-ops when metrics are switched off
+enabled = settings.METRICS_ENABLED
+
+# Under gunicorn (gunicorn.conf.py sets the directory before this module is
+# imported) every worker writes its samples to files there and /metrics adds
+# up all workers, whichever one answers the scrape. Gauges say how to combine
+# the workers' values; "live" modes drop workers that exited.
+multiprocess_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"]
+)
+
+LLM_CALL_LATENCY = Histogram(
+    "llm_call_duration_seconds",
+    "Latency of LLM completion calls",
+    ["model", "outcome"],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+)
+
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "Tokens consumed by LLM calls",
+    ["model", "kind"]
+)
+
+LLM_ANALYSES = Counter(
+    "llm_analyses_total",
+    "Reviews analyzed, labelled by whether the LLM or the keyword fallback produced the result",
+    ["source"]
+)
+
+LLM_PROVIDER_HEALTH = Gauge(
+    "llm_provider_success_rate",
+    "Smoothed success rate of each LLM provider, as used for routing",
+    ["provider"],
+    multiprocess_mode="livemin"
+)
+
+LLM_CIRCUIT_STATE = Gauge(
+    "llm_circuit_state",
+    "Circuit breaker state per LLM provider (0 closed, 1 half-open, 2 open)",
+    ["provider"],
+    multiprocess_mode="livemax"
+)
+
+LLM_HEDGES = Counter(
+    "llm_hedged_requests_total",
+    "Hedge attempts fired after the p95 latency, and how many of them answered first",
+    ["outcome"]
+)
+
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total",
+    "Lookups in in-process caches (re-analysis results, per-hotel similarity indexes)",
+    ["cache", "result"]
+)
+
+NEAR_DUPLICATES = Counter(
+    "reviews_near_duplicate_total",
+    "Ingested reviews linked to an existing canonical review instead of being analyzed"
+)
+
+DEAD_LETTERS = Counter(
+    "ingest_dead_letter_reviews_total",
+    "Reviews that could not be stored and were set aside for retry"
+)
+
+REVIEWS_INGESTED = Counter(
+    "reviews_ingested_total",
+    "Reviews stored by ingestion tasks"
+)
+
+INGEST_TASK_DURATION = Histogram(
+    "ingest_task_duration_seconds",
+    "Wall time of background ingestion tasks",
+    ["status"],
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+)
+
+HOTEL_INGEST_LAST_SUCCESS = Gauge(
+    "hotel_ingest_last_success_timestamp_seconds",
+    "Unix time of the last successful scheduled ingestion per hotel",
+    ["hotel_id"],
+    multiprocess_mode="max"
+)
+
+HOTEL_INGEST_REVIEW_LAG = Gauge(
+    "hotel_ingest_review_lag_seconds",
+    "Age of the oldest new review when the last scheduled ingestion picked it up",
+    ["hotel_id"],
+    multiprocess_mode="mostrecent"
+)
+
+HOTEL_INGEST_DEFERRED = Gauge(
+    "hotel_ingest_deferred_reviews",
+    "New reviews left for a later run because the LLM budget was exhausted",
+    ["hotel_id"],
+    multiprocess_mode="mostrecent"
+)
+
+DB_CONNECTION_HOLD = Histogram(
+    "db_pool_connection_hold_seconds",
+    "Time a pooled connection stays checked out",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0)
+)
+
+BACKGROUND_QUEUE_DEPTH = Gauge(
+    "background_tasks_in_flight",
+    "Background ingestion tasks currently processing",
+    multiprocess_mode="livesum"
+)
+
+# Multiprocess mode only (see instrument_engine); not in the default registry,
+# where _PoolCollector reports the same series
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Connections in the SQLAlchemy pool by state",
+    ["state"],
+    multiprocess_mode="livesum",
+    registry=None
+)
+
+
+def observe_llm_call(model: str, outcome: str, duration: float, usage: Any = None):
+    if not enabled:
+        return
+    LLM_CALL_LATENCY.labels(model, outcome).observe(duration)
+
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    completion_tokens = getattr(usage, "completion_tokens", None)
+    if isinstance(prompt_tokens, int):
+        LLM_TOKENS.labels(model, "prompt").inc(prompt_tokens)
+    if isinstance(completion_tokens, int):
+        LLM_TOKENS.labels(model, "completion").inc(completion_tokens)
+
+
+def record_provider_health(provider: str, success_rate: float):
+    if enabled:
+        LLM_PROVIDER_HEALTH.labels(provider).set(success_rate)
+
+
+_CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def record_circuit_state(provider: str, state: str):
+    if enabled:
+        LLM_CIRCUIT_STATE.labels(provider).set(_CIRCUIT_STATES[state])
+
+
+def record_hedge(outcome: str):
+    if enabled:
+        LLM_HEDGES.labels(outcome).inc()
+
+
+def record_analysis(source: str):
+    if enabled:
+        LLM_ANALYSES.labels(source).inc()
+
+
+def record_cache_lookups(cache: str, hits: int, misses: int):
+    if not enabled:
+        return
+    if hits:
+        CACHE_LOOKUPS.labels(cache, "hit").inc(hits)
+    if misses:
+        CACHE_LOOKUPS.labels(cache, "miss").inc(misses)
+
+
+def record_near_duplicate():
+    if enabled:
+        NEAR_DUPLICATES.inc()
+
+
+def record_dead_letters(count: int):
+    if enabled:
+        DEAD_LETTERS.inc(count)
+
+
+def record_ingest(status: str, duration: float, reviews_count: int = 0):
+    if not enabled:
+        return
+    INGEST_TASK_DURATION.labels(status).observe(duration)
+    if reviews_count:
+        REVIEWS_INGESTED.inc(reviews_count)
+
+
+def record_hotel_sync(hotel_id: str, succeeded_at: Optional[float], review_lag: Optional[float], deferred: int):
+    if not enabled:
+        return
+    if succeeded_at is not None:
+        HOTEL_INGEST_LAST_SUCCESS.labels(hotel_id).set(succeeded_at)
+    if review_lag is not None:
+        HOTEL_INGEST_REVIEW_LAG.labels(hotel_id).set(review_lag)
+    HOTEL_INGEST_DEFERRED.labels(hotel_id).set(deferred)
+
+
+def record_queue_depth(depth: int):
+    # Set on every change rather than read at scrape time: a callback would
+    # only ever see the worker answering the scrape
+    if enabled:
+        BACKGROUND_QUEUE_DEPTH.set(depth)
+
+
+POOL_STATES = ("size", "checkedin", "checkedout", "overflow")
+
+
+def _pool_states(pool):
+    for state in POOL_STATES:
+        reader = getattr(pool, state, None)
+        if callable(reader):
+            yield state, reader()
+
+
+class _PoolCollector:
+    """Reads pool occupancy lazily at scrape time instead of on every checkout."""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+
+    def collect(self):
+        family = GaugeMetricFamily(
+            "db_pool_connections",
+            "Connections in the SQLAlchemy pool by state",
+            labels=["state"]
+        )
+        for state, value in _pool_states(self.engine.pool):
+            family.add_metric([state], value)
+        yield family
+
+
+def instrument_engine(engine: Engine):
+    if not enabled:
+        return
+
+    def record_pool():
+        # A collector would only report the worker answering the scrape
+        if multiprocess_dir:
+            for state, value in _pool_states(engine.pool):
+                DB_POOL_CONNECTIONS.labels(state).set(value)
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checkout_started"] = time.perf_counter()
+        record_pool()
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        started = connection_record.info.pop("checkout_started", None)
+        if started is not None:
+            DB_CONNECTION_HOLD.observe(time.perf_counter() - started)
+        record_pool()
+
+    if not multiprocess_dir:
+        REGISTRY.register(_PoolCollector(engine))
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording request latency per route template."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router stores the matched route on the scope; use its template
+            # so that path parameters do not explode label cardinality
+            route = scope.get("route")
+            route_path: Optional[str] = getattr(route, "path", None)
+            REQUEST_LATENCY.labels(
+                scope["method"], route_path or "unmatched", str(status_code)
+            ).observe(time.perf_counter() - started)
+
+
+def metrics_response() -> Response:
+    registry = REGISTRY
+    if multiprocess_dir:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
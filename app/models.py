@@ -1,4 +1,7 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Float, Boolean, ForeignKey, Enum as SQLEnum
+from sqlalchemy import (
+    Column, Integer, BigInteger, SmallInteger, String, Date, DateTime, Text, Float, Boolean, LargeBinary,
+    ForeignKey, Index, UniqueConstraint, DDL, event, Enum as SQLEnum
+)
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -50,10 +53,286 @@ class Review(Base):
     sentiment = Column(SQLEnum(SentimentType), nullable=True)
     topics = Column(Text, nullable=True)  # Stored as comma-separated values
     urgency = Column(SQLEnum(UrgencyType), nullable=True)
+    analysis_model = Column(String(100), nullable=True)
+    prompt_version = Column(Integer, nullable=True)
+    # Labels came from the keyword fallback while the LLM was unavailable
+    needs_reanalysis = Column(Boolean, default=False, nullable=False, index=True)
+    # Tokens spent on the LLM call that produced the labels (none for copies and fallbacks)
+    prompt_tokens = Column(Integer, nullable=True)
+    completion_tokens = Column(Integer, nullable=True)
     
-    # Metadata
-    processed_at = Column(DateTime, default=datetime.utcnow)
+    # Near-duplicate detection
+    minhash = Column(LargeBinary, nullable=True)
+    canonical_review_id = Column(Integer, ForeignKey("reviews.id"), nullable=True, index=True)
+    
+    # Compact text embedding (see app.services.embeddings) for similarity search
+    embedding = Column(LargeBinary, nullable=True)
+    
+    # Metadata. On PostgreSQL processed_at is also the monthly partition key
+    # (alembic revision 0005, app.services.partitions)
+    processed_at = Column(DateTime, default=datetime.utcnow, index=True)
     processed_by = Column(Integer, ForeignKey("users.id"), nullable=True)
     
     # Relationship
-    processed_by_user = relationship("User", back_populates="reviews")
\ No newline at end of file
+    processed_by_user = relationship("User", back_populates="reviews")
+    
+    # Built concurrently on existing databases (alembic revision 0004)
+    __table_args__ = (
+        # Critical-review feed and escalation counts, newest first
+        Index("ix_reviews_urgency_processed_at", "urgency", "processed_at"),
+        # Per-hotel incremental reads in id order (similarity index refresh)
+        Index("ix_reviews_hotel_id_id", "hotel_id", "id"),
+    )
+
+
+class ReviewLSHBucket(Base):
+    """One row per (review, LSH band): the band's hash bucket for MinHash lookups."""
+    __tablename__ = "review_lsh_buckets"
+    
+    review_id = Column(Integer, ForeignKey("reviews.id", ondelete="CASCADE"), primary_key=True)
+    band = Column(SmallInteger, primary_key=True)
+    hotel_id = Column(String(100), nullable=False)
+    bucket = Column(BigInteger, nullable=False)
+    
+    __table_args__ = (
+        Index("ix_review_lsh_buckets_lookup", "hotel_id", "bucket"),
+    )
+
+
+class JobCheckpoint(Base):
+    """High-water mark of a periodic job, optionally per key (e.g. per hotel)."""
+    __tablename__ = "job_checkpoints"
+    
+    job_name = Column(String(100), primary_key=True)
+    key = Column(String(100), primary_key=True, default="")
+    last_review_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class TopicCluster(Base):
+    __tablename__ = "topic_clusters"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    hotel_id = Column(String(100), nullable=False)
+    cluster_index = Column(SmallInteger, nullable=False)
+    centroid = Column(LargeBinary, nullable=False)  # float32 running mean
+    size = Column(Integer, nullable=False, default=0)
+    term_counts = Column(Text, nullable=False, default="{}")  # JSON, pruned to the top terms
+    top_terms = Column(Text, nullable=True)  # Stored as comma-separated values
+    example_review_ids = Column(Text, nullable=True)  # Stored as comma-separated values
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint("hotel_id", "cluster_index", name="uq_topic_clusters_hotel_cluster"),
+    )
+
+
+class HotelIngestState(Base):
+    """Per-hotel high-water mark and schedule slot for incremental re-ingestion."""
+    __tablename__ = "hotel_ingest_state"
+    
+    hotel_id = Column(String(100), primary_key=True)
+    slot = Column(SmallInteger, nullable=False, index=True)
+    enabled = Column(Boolean, nullable=False, default=True)
+    last_review_date = Column(DateTime, nullable=True)
+    last_review_id = Column(Integer, nullable=True)
+    last_run_at = Column(DateTime, nullable=True)
+    last_success_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    deferred_reviews = Column(Integer, nullable=False, default=0)
+
+
+class IngestTask(Base):
+    """A POST /ingest-reviews run, shared by all workers: any of them can report or cancel it.
+    
+    ``active_hotel_id`` is set while the task is queued or running and cleared
+    when it ends; its unique constraint allows one ingest in flight per hotel.
+    The worker running the task refreshes ``heartbeat_at``, so tasks of a
+    worker that died can be expired.
+    """
+    __tablename__ = "ingest_tasks"
+    
+    id = Column(String(36), primary_key=True)
+    hotel_id = Column(String(100), nullable=False, index=True)
+    active_hotel_id = Column(String(100), nullable=True, unique=True)
+    status = Column(String(20), nullable=False, default="queued")
+    message = Column(Text, nullable=True)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    reviews_count = Column(Integer, nullable=True)
+    failed_reviews = Column(Integer, nullable=True)
+    prompt_tokens = Column(Integer, nullable=True)
+    completion_tokens = Column(Integer, nullable=True)
+    deadline_exceeded = Column(Boolean, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    heartbeat_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class ReanalysisRun(Base):
+    """Latest run of a re-analysis job, shared by all workers: any of them can report or cancel it.
+    
+    The worker running it refreshes ``heartbeat_at`` after every chunk, so a
+    run whose worker died can be claimed again.
+    """
+    __tablename__ = "reanalysis_runs"
+    
+    job_name = Column(String(100), primary_key=True)
+    state = Column(String(20), nullable=False, default="idle")
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    model = Column(String(100), nullable=True)
+    prompt_version = Column(Integer, nullable=True)
+    cursor = Column(Integer, nullable=True)
+    remaining = Column(Integer, nullable=True)
+    processed = Column(Integer, nullable=False, default=0)
+    updated = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, default=datetime.utcnow)
+
+
+class HotelDailyStats(Base):
+    """Per-hotel review counts by processing day, rolled up incrementally."""
+    __tablename__ = "hotel_daily_stats"
+    
+    hotel_id = Column(String(100), primary_key=True)
+    day = Column(Date, primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    negative = Column(Integer, nullable=False, default=0)
+    critical = Column(Integer, nullable=False, default=0)
+
+
+class ArchivedReviewStats(Base):
+    """Counts of reviews moved out of the database to the Parquet archive, by processing month."""
+    __tablename__ = "archived_review_stats"
+    
+    hotel_id = Column(String(100), primary_key=True)
+    month = Column(Date, primary_key=True)
+    # Near-duplicates are counted apart so the dashboard can still exclude them
+    duplicate = Column(Boolean, primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    positive = Column(Integer, nullable=False, default=0)
+    negative = Column(Integer, nullable=False, default=0)
+    neutral = Column(Integer, nullable=False, default=0)
+    critical = Column(Integer, nullable=False, default=0)
+    topic_counts = Column(Text, nullable=False, default="{}")  # JSON, topic -> reviews
+
+
+class SnapshotRelabel(Base):
+    """A hotel/month of the Parquet snapshot whose reviews were relabelled since it was written.
+    
+    ``version`` goes up with every relabel, so the snapshot job only clears
+    the mark if nothing changed while it rewrote the files.
+    """
+    __tablename__ = "snapshot_relabels"
+    
+    hotel_id = Column(String(100), primary_key=True)
+    month = Column(String(7), primary_key=True)  # YYYY-MM, as in the snapshot's partitions
+    version = Column(Integer, nullable=False, default=1)
+
+
+class HotelLeaderboard(Base):
+    """Per-hotel rates with their portfolio ranks, recomputed by the leaderboard job.
+    
+    Rank 1 is the highest rate; hotels with too few reviews have no rank or
+    percentile. The rank indexes serve top-K reads without touching reviews.
+    """
+    __tablename__ = "hotel_leaderboard"
+    
+    hotel_id = Column(String(100), primary_key=True)
+    total_reviews = Column(Integer, nullable=False, default=0)
+    negative_reviews = Column(Integer, nullable=False, default=0)
+    critical_reviews = Column(Integer, nullable=False, default=0)
+    negative_percent = Column(Float, nullable=False, default=0.0)
+    escalation_rate = Column(Float, nullable=False, default=0.0)
+    negative_rank = Column(Integer, nullable=True, index=True)
+    escalation_rank = Column(Integer, nullable=True, index=True)
+    negative_percentile = Column(Float, nullable=True)
+    escalation_percentile = Column(Float, nullable=True)
+    top_negative_topic = Column(Text, nullable=True)  # Most mentioned in negative reviews
+    refreshed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class HotelTopicStats(Base):
+    """Mentions of one topic in one hotel's negative reviews, counted incrementally by the leaderboard job."""
+    __tablename__ = "hotel_topic_stats"
+    
+    hotel_id = Column(String(100), primary_key=True)
+    topic = Column(String(100), primary_key=True)
+    negative = Column(Integer, nullable=False, default=0)
+
+
+class HotelAnomalyState(Base):
+    """Running EWMA mean/variance of one daily metric for one hotel."""
+    __tablename__ = "hotel_anomaly_state"
+    
+    hotel_id = Column(String(100), primary_key=True)
+    metric = Column(String(20), primary_key=True)
+    last_day = Column(Date, nullable=False)
+    mean = Column(Float, nullable=False, default=0.0)
+    variance = Column(Float, nullable=False, default=0.0)
+    days_observed = Column(Integer, nullable=False, default=0)
+
+
+class EscalationAlert(Base):
+    __tablename__ = "escalation_alerts"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    hotel_id = Column(String(100), nullable=False, index=True)
+    metric = Column(String(20), nullable=False)
+    day = Column(Date, nullable=False)
+    value = Column(Integer, nullable=False)
+    expected = Column(Float, nullable=False)
+    z_score = Column(Float, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    
+    __table_args__ = (
+        UniqueConstraint("hotel_id", "metric", "day", name="uq_escalation_alerts_hotel_metric_day"),
+    )
+
+
+class DeadLetterReview(Base):
+    """A fetched review that could not be stored, kept for retry."""
+    __tablename__ = "dead_letter_reviews"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    hotel_id = Column(String(100), nullable=False, index=True)
+    payload = Column(Text, nullable=False)  # JSON, the review as fetched
+    analysis = Column(Text, nullable=True)  # JSON, LLM labels already paid for
+    error = Column(Text, nullable=False)
+    attempts = Column(Integer, nullable=False, default=1)
+    processed_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_attempt_at = Column(DateTime, default=datetime.utcnow)
+
+
+# Full-text search over review_text. PostgreSQL keeps a generated tsvector
+# column with a GIN index; SQLite (tests) keeps an FTS5 index in sync by triggers.
+REVIEW_SEARCH_DDL = {
+    "postgresql": [
+        "ALTER TABLE reviews ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('english', coalesce(review_text, ''))) STORED",
+        "CREATE INDEX IF NOT EXISTS ix_reviews_search_vector ON reviews USING GIN (search_vector)",
+    ],
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS reviews_fts USING fts5("
+        "review_text, content='reviews', content_rowid='id', tokenize='porter unicode61')",
+        "CREATE TRIGGER IF NOT EXISTS reviews_fts_insert AFTER INSERT ON reviews BEGIN "
+        "INSERT INTO reviews_fts(rowid, review_text) VALUES (new.id, new.review_text); END",
+        "CREATE TRIGGER IF NOT EXISTS reviews_fts_delete AFTER DELETE ON reviews BEGIN "
+        "INSERT INTO reviews_fts(reviews_fts, rowid, review_text) VALUES ('delete', old.id, old.review_text); END",
+        "CREATE TRIGGER IF NOT EXISTS reviews_fts_update AFTER UPDATE OF review_text ON reviews BEGIN "
+        "INSERT INTO reviews_fts(reviews_fts, rowid, review_text) VALUES ('delete', old.id, old.review_text); "
+        "INSERT INTO reviews_fts(rowid, review_text) VALUES (new.id, new.review_text); END",
+    ],
+}
+
+for _dialect, _statements in REVIEW_SEARCH_DDL.items():
+    for _statement in _statements:
+        event.listen(Review.__table__, "after_create", DDL(_statement).execute_if(dialect=_dialect))
+
+event.listen(
+    Review.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS reviews_fts").execute_if(dialect="sqlite")
+)
@@ -0,0 +1,195 @@
+import asyncio
+import cProfile
+import functools
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_active_profile: ContextVar[Optional[cProfile.Profile]] = ContextVar("active_profile", default=None)
+current_route: ContextVar[Optional[str]] = ContextVar("current_route", default=None)
+
+# Only one cProfile profiler can hook the interpreter at a time
+_profiler_lock = threading.Lock()
+
+recent_profiles: Deque[Dict[str, Any]] = deque(maxlen=settings.PROFILING_MAX_STORED)
+slow_queries: Deque[Dict[str, Any]] = deque(maxlen=settings.SLOW_QUERY_MAX_STORED)
+
+
+def _profiled(endpoint: Callable) -> Callable:
+    """Wrap an endpoint so it runs under the request's profiler, if one is active.
+
+    Sync endpoints execute in the threadpool, so the profiler has to be enabled
+    inside the call itself rather than in the middleware.
+    """
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            profile = _active_profile.get()
+            if profile is None:
+                return await endpoint(*args, **kwargs)
+            profile.enable()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                profile.disable()
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def sync_wrapper(*args, **kwargs):
+        profile = _active_profile.get()
+        if profile is None:
+            return endpoint(*args, **kwargs)
+        return profile.runcall(endpoint, *args, **kwargs)
+    return sync_wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """Route class whose endpoint can be profiled by ProfilingMiddleware."""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _profiled(endpoint), **kwargs)
+
+
+def _should_profile(scope: Scope) -> bool:
+    if not settings.PROFILING_ENABLED:
+        return False
+    if Headers(scope=scope).get(settings.PROFILING_HEADER):
+        return True
+    return random.random() < settings.PROFILING_SAMPLE_RATE
+
+
+def _stats_text(profile: cProfile.Profile, limit: int = 40) -> str:
+    stream = io.StringIO()
+    stats = pstats.Stats(profile, stream=stream)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+    return stream.getvalue()
+
+
+def _store_profile(profile: cProfile.Profile, record: Dict[str, Any]):
+    record["stats"] = _stats_text(profile)
+    recent_profiles.append(record)
+
+    if settings.PROFILING_DIR:
+        os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+        profile.dump_stats(os.path.join(settings.PROFILING_DIR, f"{record['id']}.prof"))
+
+
+class ProfilingMiddleware:
+    """Tags each request with its route for the slow query log and profiles
+    a sample of requests (or those sent with the profiling header)."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route_token = current_route.set(f"{scope['method']} {scope['path']}")
+        try:
+            if _should_profile(scope) and _profiler_lock.acquire(blocking=False):
+                try:
+                    await self._profile_request(scope, receive, send)
+                finally:
+                    _profiler_lock.release()
+            else:
+                await self.app(scope, receive, send)
+        finally:
+            current_route.reset(route_token)
+
+    async def _profile_request(self, scope: Scope, receive: Receive, send: Send):
+        profile = cProfile.Profile()
+        profile_id = uuid.uuid4().hex
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        started_at = datetime.utcnow()
+        started = time.perf_counter()
+        profile_token = _active_profile.set(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _active_profile.reset(profile_token)
+            _store_profile(profile, {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "status_code": status_code,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+                "started_at": started_at
+            })
+
+
+def _record_slow_query(statement: str, parameters: Any, duration_ms: float):
+    record = {
+        "statement": statement,
+        "parameters": repr(parameters)[:500],
+        "duration_ms": round(duration_ms, 3),
+        "route": current_route.get(),
+        "recorded_at": datetime.utcnow()
+    }
+    slow_queries.append(record)
+    logger.warning(
+        "Slow query (%.1f ms) from %s: %s | params=%s",
+        duration_ms, record["route"] or "background", statement, record["parameters"]
+    )
+
+    if settings.PROFILING_DIR:
+        os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+        with open(os.path.join(settings.PROFILING_DIR, "slow_queries.jsonl"), "a") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+
+
+def install_slow_query_log():
+    """Time every statement on every engine and keep the ones over the threshold."""
+    if settings.SLOW_QUERY_THRESHOLD_MS <= 0 or event.contains(Engine, "before_cursor_execute", _before_execute):
+        return
+    event.listen(Engine, "before_cursor_execute", _before_execute)
+    event.listen(Engine, "after_cursor_execute", _after_execute)
+    event.listen(Engine, "handle_error", _on_error)
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    stack: List[float] = conn.info.get("query_started")
+    if not stack:
+        return
+    duration_ms = (time.perf_counter() - stack.pop()) * 1000
+    if duration_ms >= settings.SLOW_QUERY_THRESHOLD_MS:
+        _record_slow_query(statement, parameters, duration_ms)
+
+
+def _on_error(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started"):
+        connection.info["query_started"].pop()
@@ -0,0 +1,26 @@
+from typing import Any, Iterable, List, Optional, Sequence, Type
+from fastapi import HTTPException, status
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+
+def resolve_fields(fields: Optional[str], schema: Type[BaseModel]) -> List[str]:
+    """Turn a ``?fields=a,b`` projection into an ordered list of schema fields."""
+    allowed = list(schema.model_fields)
+    if not fields:
+        return allowed
+
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = sorted(requested.difference(allowed))
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}"
+        )
+
+    return [f for f in allowed if f in requested]
+
+
+def rows_response(rows: Iterable[Sequence[Any]], fields: List[str]) -> ORJSONResponse:
+    """Serialize column tuples straight to JSON, skipping per-row model validation."""
+    return ORJSONResponse([dict(zip(fields, row)) for row in rows])
@@ -0,0 +1,161 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import datetime
+from app.database import SessionLocal, get_db
+from app.models import User, HotelIngestState, Review, DeadLetterReview
+from app.schemas import (
+    ProfileSummary, ProfileDetail, SlowQueryRecord, HotelIngestStateResponse, ReanalysisStatus,
+    LLMProviderHealth, TokenUsageResponse, DeadLetterResponse
+)
+from app.dependencies import get_manager_user
+from app.profiling import ProfiledRoute, recent_profiles, slow_queries
+from app.services.dead_letters import dead_letter_retry_job, decode_payload
+from app.services.llm_analyzer import llm_analyzer
+from app.services.reanalysis import reanalysis_job
+from app.services.scheduler import scheduler
+
+router = APIRouter(prefix="/admin", tags=["Admin"], route_class=ProfiledRoute)
+
+
+@router.get("/profiles", response_model=List[ProfileSummary])
+def list_profiles(current_user: User = Depends(get_manager_user)):
+    return list(reversed(recent_profiles))
+
+
+@router.get("/profiles/{profile_id}", response_model=ProfileDetail)
+def get_profile(profile_id: str, current_user: User = Depends(get_manager_user)):
+    for record in recent_profiles:
+        if record["id"] == profile_id:
+            return record
+
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Profile not found"
+    )
+
+
+@router.get("/slow-queries", response_model=List[SlowQueryRecord])
+def list_slow_queries(current_user: User = Depends(get_manager_user)):
+    return list(reversed(slow_queries))
+
+
+@router.get("/ingest-state", response_model=List[HotelIngestStateResponse])
+def list_ingest_state(current_user: User = Depends(get_manager_user), db: Session = Depends(get_db)):
+    now = datetime.utcnow()
+    states = db.query(HotelIngestState).all()
+
+    # Most stale first; never-synced hotels lead
+    rows = [
+        HotelIngestStateResponse(
+            hotel_id=state.hotel_id,
+            slot=state.slot,
+            enabled=state.enabled,
+            last_review_date=state.last_review_date,
+            last_run_at=state.last_run_at,
+            last_success_at=state.last_success_at,
+            lag_seconds=(now - state.last_success_at).total_seconds() if state.last_success_at else None,
+            deferred_reviews=state.deferred_reviews,
+            last_error=state.last_error
+        )
+        for state in states
+    ]
+    return sorted(rows, key=lambda row: -row.lag_seconds if row.lag_seconds is not None else float("-inf"))
+
+
+@router.get("/reanalysis", response_model=ReanalysisStatus)
+def get_reanalysis_status(current_user: User = Depends(get_manager_user), db: Session = Depends(get_db)):
+    return reanalysis_job.status(db)
+
+
+def _run_reanalysis():
+    if scheduler.run_job(reanalysis_job.name):
+        return
+    # Another worker still holds the job's lock; free the claim so a later request can start it
+    db = SessionLocal()
+    try:
+        reanalysis_job.unschedule(db)
+    finally:
+        db.close()
+
+
+@router.post("/reanalysis", response_model=ReanalysisStatus, status_code=status.HTTP_202_ACCEPTED)
+def start_reanalysis(
+    background_tasks: BackgroundTasks,
+    restart: bool = False,
+    current_user: User = Depends(get_manager_user),
+    db: Session = Depends(get_db)
+):
+    # Checked and claimed in one step, so two requests cannot both start a run
+    if not reanalysis_job.start(db, restart=restart):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Re-analysis is already running"
+        )
+
+    background_tasks.add_task(_run_reanalysis)
+    return reanalysis_job.status(db)
+
+
+@router.delete("/reanalysis", response_model=ReanalysisStatus)
+def cancel_reanalysis(current_user: User = Depends(get_manager_user), db: Session = Depends(get_db)):
+    reanalysis_job.cancel(db)
+    return reanalysis_job.status(db)
+
+
+@router.get("/llm-providers", response_model=List[LLMProviderHealth])
+def list_llm_providers(current_user: User = Depends(get_manager_user)):
+    # In the order the next analysis would try them
+    return [provider.health() for provider in llm_analyzer.providers.ordered()]
+
+
+@router.get("/token-usage", response_model=List[TokenUsageResponse])
+def get_token_usage(
+    since: Optional[datetime] = None,
+    current_user: User = Depends(get_manager_user),
+    db: Session = Depends(get_db)
+):
+    # Heaviest spenders first
+    query = db.query(
+        Review.hotel_id,
+        func.count(Review.id).label("reviews_analyzed"),
+        func.sum(Review.prompt_tokens).label("prompt_tokens"),
+        func.sum(Review.completion_tokens).label("completion_tokens")
+    ).filter(Review.prompt_tokens.isnot(None))
+    if since is not None:
+        query = query.filter(Review.processed_at >= since)
+    rows = query.group_by(Review.hotel_id).order_by(func.sum(Review.prompt_tokens).desc()).all()
+    return [TokenUsageResponse.model_validate(row, from_attributes=True) for row in rows]
+
+
+@router.get("/dead-letters", response_model=List[DeadLetterResponse])
+def list_dead_letters(
+    hotel_id: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    current_user: User = Depends(get_manager_user),
+    db: Session = Depends(get_db)
+):
+    query = db.query(DeadLetterReview)
+    if hotel_id:
+        query = query.filter(DeadLetterReview.hotel_id == hotel_id)
+    letters = query.order_by(DeadLetterReview.id.desc()).limit(limit).all()
+    return [
+        DeadLetterResponse(
+            id=letter.id,
+            hotel_id=letter.hotel_id,
+            payload=decode_payload(letter.payload),
+            error=letter.error,
+            attempts=letter.attempts,
+            has_analysis=letter.analysis is not None,
+            created_at=letter.created_at,
+            last_attempt_at=letter.last_attempt_at
+        )
+        for letter in letters
+    ]
+
+
+@router.post("/dead-letters/retry", status_code=status.HTTP_202_ACCEPTED)
+def retry_dead_letters(background_tasks: BackgroundTasks, current_user: User = Depends(get_manager_user)):
+    background_tasks.add_task(scheduler.run_job, dead_letter_retry_job.name)
+    return {"status": "scheduled", "job": dead_letter_retry_job.name}
@@ -1,22 +1,38 @@
+import json
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from collections import Counter
 from app.database import get_db
-from app.models import User, Review, SentimentType, UrgencyType
+from app.models import User, Review, SentimentType, UrgencyType, ArchivedReviewStats
 from app.schemas import DashboardMetrics, SentimentDistribution, TopicBreakdown
 from app.dependencies import get_authenticated_user
+from app.profiling import ProfiledRoute
+from app.services.analytics import count_topics
 
-router = APIRouter(tags=["Dashboard"])
+router = APIRouter(tags=["Dashboard"], route_class=ProfiledRoute)
 
 
 @router.get("/dashboard-metrics", response_model=DashboardMetrics)
 def get_dashboard_metrics(
+    exclude_duplicates: bool = False,
     current_user: User = Depends(get_authenticated_user),
     db: Session = Depends(get_db)
 ):
+    # Near-duplicates point at a canonical review; optionally count only the canonical copy
+    filters = [Review.canonical_review_id.is_(None)] if exclude_duplicates else []
+    archived_filters = [ArchivedReviewStats.duplicate.is_(False)] if exclude_duplicates else []
+    
+    # Reviews moved to the Parquet archive only remain as counts
+    archived = db.query(
+        func.coalesce(func.sum(ArchivedReviewStats.total), 0).label("total"),
+        func.coalesce(func.sum(ArchivedReviewStats.positive), 0).label("positive"),
+        func.coalesce(func.sum(ArchivedReviewStats.negative), 0).label("negative"),
+        func.coalesce(func.sum(ArchivedReviewStats.neutral), 0).label("neutral"),
+        func.coalesce(func.sum(ArchivedReviewStats.critical), 0).label("critical")
+    ).filter(*archived_filters).one()
    
-    total_reviews = db.query(Review).count()
+    total_reviews = db.query(Review).filter(*filters).count() + archived.total
     
     if total_reviews == 0:
         return DashboardMetrics(
@@ -36,17 +52,17 @@ def get_dashboard_metrics(
     sentiment_counts = db.query(
         Review.sentiment,
         func.count(Review.id).label('count')
-    ).group_by(Review.sentiment).all()
+    ).filter(*filters).group_by(Review.sentiment).all()
     
     sentiment_dict = {
-        SentimentType.POSITIVE: 0,
-        SentimentType.NEGATIVE: 0,
-        SentimentType.NEUTRAL: 0
+        SentimentType.POSITIVE: archived.positive,
+        SentimentType.NEGATIVE: archived.negative,
+        SentimentType.NEUTRAL: archived.neutral
     }
     
     for sentiment, count in sentiment_counts:
         if sentiment:
-            sentiment_dict[sentiment] = count
+            sentiment_dict[sentiment] += count
     
     sentiment_distribution = SentimentDistribution(
         positive_percent=round((sentiment_dict[SentimentType.POSITIVE] / total_reviews) * 100, 2),
@@ -55,13 +71,13 @@ def get_dashboard_metrics(
         total_reviews=total_reviews
     )
     
-    all_reviews = db.query(Review.topics).filter(Review.topics.isnot(None)).all()
-    topic_counter = Counter()
+    # Each distinct topics string is split once and weighted by its count (app.services.analytics)
+    all_reviews = db.query(Review.topics).filter(Review.topics.isnot(None), *filters).all()
+    topic_counter = Counter(count_topics(topics_str for (topics_str,) in all_reviews))
     
-    for (topics_str,) in all_reviews:
-        if topics_str:
-            topics = [t.strip() for t in topics_str.split(',')]
-            topic_counter.update(topics)
+    if archived.total:
+        for (topic_counts,) in db.query(ArchivedReviewStats.topic_counts).filter(*archived_filters):
+            topic_counter.update(json.loads(topic_counts))
     
     topic_breakdown = []
     for topic, count in topic_counter.most_common():
@@ -74,8 +90,9 @@ def get_dashboard_metrics(
         )
     
     critical_count = db.query(Review).filter(
-        Review.urgency == UrgencyType.CRITICAL
-    ).count()
+        Review.urgency == UrgencyType.CRITICAL,
+        *filters
+    ).count() + archived.critical
     
     escalation_rate = round((critical_count / total_reviews) * 100, 2) if total_reviews > 0 else 0.0
     
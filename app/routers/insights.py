@@ -0,0 +1,63 @@
+from fastapi import APIRouter, Depends, BackgroundTasks, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import date
+from app.database import get_db
+from app.models import User, TopicCluster, EscalationAlert
+from app.schemas import TopicClusterResponse, EscalationAlertResponse
+from app.dependencies import get_authenticated_user, get_manager_user
+from app.profiling import ProfiledRoute
+from app.services.scheduler import scheduler
+from app.services.topic_clustering import topic_clustering_job
+
+router = APIRouter(tags=["Insights"], route_class=ProfiledRoute)
+
+
+@router.get("/hotels/{hotel_id}/topic-clusters", response_model=List[TopicClusterResponse])
+def get_topic_clusters(
+    hotel_id: str,
+    current_user: User = Depends(get_authenticated_user),
+    db: Session = Depends(get_db)
+):
+    clusters = db.query(TopicCluster).filter(
+        TopicCluster.hotel_id == hotel_id,
+        TopicCluster.size > 0
+    ).order_by(TopicCluster.size.desc()).all()
+
+    return [
+        TopicClusterResponse(
+            hotel_id=cluster.hotel_id,
+            cluster_index=cluster.cluster_index,
+            size=cluster.size,
+            top_terms=cluster.top_terms.split(",") if cluster.top_terms else [],
+            example_review_ids=[int(i) for i in cluster.example_review_ids.split(",")] if cluster.example_review_ids else [],
+            updated_at=cluster.updated_at
+        )
+        for cluster in clusters
+    ]
+
+
+@router.post("/topic-clusters/refresh", status_code=202)
+def refresh_topic_clusters(
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_manager_user)
+):
+    background_tasks.add_task(scheduler.run_job, topic_clustering_job.name)
+    return {"status": "scheduled", "job": topic_clustering_job.name}
+
+
+@router.get("/alerts", response_model=List[EscalationAlertResponse])
+def get_alerts(
+    hotel_id: Optional[str] = None,
+    since: Optional[date] = None,
+    limit: int = Query(50, ge=1, le=500),
+    current_user: User = Depends(get_authenticated_user),
+    db: Session = Depends(get_db)
+):
+    query = db.query(EscalationAlert)
+    if hotel_id:
+        query = query.filter(EscalationAlert.hotel_id == hotel_id)
+    if since:
+        query = query.filter(EscalationAlert.day >= since)
+
+    return query.order_by(EscalationAlert.day.desc(), EscalationAlert.z_score.desc()).limit(limit).all()
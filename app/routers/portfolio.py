@@ -0,0 +1,59 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from typing import List, Literal, Optional
+from app.database import get_db
+from app.models import User, HotelLeaderboard
+from app.schemas import HotelLeaderboardEntry
+from app.dependencies import get_authenticated_user, get_manager_user
+from app.profiling import ProfiledRoute
+from app.services.scheduler import scheduler
+from app.services.leaderboard import hotel_leaderboard_job
+
+router = APIRouter(prefix="/portfolio", tags=["Portfolio"], route_class=ProfiledRoute)
+
+# metric -> (rank, percentile) columns of hotel_leaderboard
+METRICS = {
+    "negative": (HotelLeaderboard.negative_rank, HotelLeaderboard.negative_percentile),
+    "escalation": (HotelLeaderboard.escalation_rank, HotelLeaderboard.escalation_percentile),
+}
+
+
+@router.get("/leaderboard", response_model=List[HotelLeaderboardEntry])
+def get_leaderboard(
+    metric: Literal["negative", "escalation"] = "negative",
+    limit: int = Query(10, ge=1, le=500),
+    min_percentile: Optional[float] = Query(None, ge=0, le=100),
+    current_user: User = Depends(get_authenticated_user),
+    db: Session = Depends(get_db)
+):
+    # Worst first. Served from the rank index: the cost depends on limit, not on the number of reviews
+    rank, percentile = METRICS[metric]
+    query = db.query(HotelLeaderboard).filter(rank.isnot(None))
+    if min_percentile is not None:
+        query = query.filter(percentile >= min_percentile)
+
+    return query.order_by(rank, HotelLeaderboard.hotel_id).limit(limit).all()
+
+
+@router.get("/hotels/{hotel_id}", response_model=HotelLeaderboardEntry)
+def get_hotel_standing(
+    hotel_id: str,
+    current_user: User = Depends(get_authenticated_user),
+    db: Session = Depends(get_db)
+):
+    entry = db.get(HotelLeaderboard, hotel_id)
+    if entry is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Hotel not on the leaderboard"
+        )
+    return entry
+
+
+@router.post("/refresh", status_code=202)
+def refresh_leaderboard(
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_manager_user)
+):
+    background_tasks.add_task(scheduler.run_job, hotel_leaderboard_job.name)
+    return {"status": "scheduled", "job": hotel_leaderboard_job.name}
@@ -1,17 +1,26 @@
-from fastapi import APIRouter, Depends, BackgroundTasks
+from fastapi import APIRouter, Depends, BackgroundTasks, HTTPException, Query, status
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
-from typing import List
+from datetime import datetime
+from typing import List, Optional
 from app.database import get_db
-from app.models import User, Review, UrgencyType
+from app.models import User, Review, SentimentType, UrgencyType
 from app.schemas import (
     IngestReviewsRequest,
     IngestReviewsResponse,
-    CriticalReviewResponse
+    CriticalReviewResponse,
+    ReviewSearchResult,
+    SimilarReviewResult
 )
 from app.dependencies import get_manager_user, get_authenticated_user
-from app.services.background_tasks import background_task_manager
+from app.responses import resolve_fields, rows_response
+from app.config import settings
+from app.services.background_tasks import background_task_manager, IngestQueueFull
+from app.services.review_search import review_search_service
+from app.services.vector_index import find_similar
+from app.profiling import ProfiledRoute
 
-router = APIRouter(tags=["Reviews"])
+router = APIRouter(tags=["Reviews"], route_class=ProfiledRoute)
 
 
 @router.post("/ingest-reviews", response_model=IngestReviewsResponse)
@@ -21,7 +30,22 @@ async def ingest_reviews(
     current_user: User = Depends(get_manager_user),
     db: Session = Depends(get_db)
 ):
-    task_id = background_task_manager.create_task_id()
+    try:
+        task_id, created = background_task_manager.admit(request.hotel_id)
+    except IngestQueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many ingestions in progress, try again later",
+            headers={"Retry-After": str(settings.INGEST_RETRY_AFTER_SECONDS)}
+        )
+    
+    if not created:
+        return IngestReviewsResponse(
+            status=background_task_manager.get_task_status(task_id)["status"],
+            message=f"Review ingestion already in progress for hotel {request.hotel_id}",
+            task_id=task_id,
+            hotel_id=request.hotel_id
+        )
     
     background_tasks.add_task(
         background_task_manager.ingest_reviews_task,
@@ -39,16 +63,98 @@ async def ingest_reviews(
     )
 
 
-@router.get("/critical-reviews", response_model=List[CriticalReviewResponse])
+@router.get(
+    "/critical-reviews",
+    response_model=List[CriticalReviewResponse],
+    response_class=ORJSONResponse
+)
 def get_critical_reviews(
+    fields: Optional[str] = Query(None, description="Comma-separated list of fields to return"),
     current_user: User = Depends(get_authenticated_user),
     db: Session = Depends(get_db)
 ):
-    critical_reviews = db.query(Review).filter(
+    selected = resolve_fields(fields, CriticalReviewResponse)
+    
+    # Select only the projected columns; rows come back as plain tuples
+    rows = db.query(*[getattr(Review, f) for f in selected]).filter(
         Review.urgency == UrgencyType.CRITICAL
     ).order_by(Review.processed_at.desc()).all()
     
-    return critical_reviews
+    return rows_response(rows, selected)
+
+
+@router.get(
+    "/reviews/search",
+    response_model=List[ReviewSearchResult],
+    response_class=ORJSONResponse
+)
+def search_reviews(
+    q: str = Query(..., min_length=2, max_length=200, description="Search terms"),
+    hotel_id: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    sentiment: Optional[SentimentType] = None,
+    urgency: Optional[UrgencyType] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    fields: Optional[str] = Query(None, description="Comma-separated list of fields to return"),
+    current_user: User = Depends(get_authenticated_user),
+    db: Session = Depends(get_db)
+):
+    if not q.strip():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Search query cannot be blank"
+        )
+    
+    selected = resolve_fields(fields, ReviewSearchResult)
+    rows = review_search_service.search(
+        db,
+        query=q,
+        fields=selected,
+        hotel_id=hotel_id,
+        date_from=date_from,
+        date_to=date_to,
+        sentiment=sentiment,
+        urgency=urgency,
+        limit=limit,
+        offset=offset
+    )
+    
+    return rows_response(rows, selected)
+
+
+@router.get(
+    "/reviews/{review_id}/similar",
+    response_model=List[SimilarReviewResult],
+    response_class=ORJSONResponse
+)
+def get_similar_reviews(
+    review_id: int,
+    k: int = Query(10, ge=1, le=100),
+    fields: Optional[str] = Query(None, description="Comma-separated list of fields to return"),
+    current_user: User = Depends(get_authenticated_user),
+    db: Session = Depends(get_db)
+):
+    review = db.get(Review, review_id)
+    if review is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Review not found"
+        )
+    
+    hits = dict(find_similar(db, review, k))
+    selected = resolve_fields(fields, SimilarReviewResult)
+    columns = [f for f in selected if f != "similarity"]
+    
+    rows = db.query(Review.id, *[getattr(Review, f) for f in columns]).filter(
+        Review.id.in_(hits)
+    ).all()
+    by_id = {row[0]: tuple(row[1:]) for row in rows}
+    
+    # Keep the index's ranking; rows are fetched in arbitrary order
+    ordered = [by_id[hit_id] + (score,) for hit_id, score in hits.items() if hit_id in by_id]
+    return rows_response(ordered, columns + ["similarity"])
 
 
 @router.get("/task-status/{task_id}")
@@ -56,4 +162,18 @@ def get_task_status(
     task_id: str,
     current_user: User = Depends(get_authenticated_user)
 ):
-    return background_task_manager.get_task_status(task_id)
\ No newline at end of file
+    return background_task_manager.get_task_status(task_id)
+
+
+@router.delete("/task/{task_id}")
+def cancel_task(
+    task_id: str,
+    current_user: User = Depends(get_manager_user)
+):
+    task = background_task_manager.cancel(task_id)
+    if task is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No queued or running task with this id"
+        )
+    return task
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr, Field, field_validator
-from typing import Optional, List
-from datetime import datetime
+from typing import Any, Optional, List
+from datetime import date, datetime
 from app.models import UserRole, SentimentType, UrgencyType
 
 
@@ -59,6 +59,8 @@ class ReviewResponse(ReviewBase):
     sentiment: Optional[SentimentType]
     topics: Optional[str]
     urgency: Optional[UrgencyType]
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
     processed_at: datetime
     
     class Config:
@@ -75,12 +77,45 @@ class CriticalReviewResponse(BaseModel):
     sentiment: Optional[SentimentType]
     topics: Optional[str]
     urgency: UrgencyType
+    canonical_review_id: Optional[int] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
     processed_at: datetime
     
     class Config:
         from_attributes = True
 
 
+class ReviewSearchResult(BaseModel):
+    id: int
+    hotel_id: str
+    review_text: str
+    author: Optional[str]
+    rating: Optional[float]
+    review_date: Optional[datetime]
+    sentiment: Optional[SentimentType]
+    topics: Optional[str]
+    urgency: Optional[UrgencyType]
+    canonical_review_id: Optional[int] = None
+    processed_at: datetime
+    rank: float
+
+
+class SimilarReviewResult(BaseModel):
+    id: int
+    hotel_id: str
+    review_text: str
+    author: Optional[str]
+    rating: Optional[float]
+    review_date: Optional[datetime]
+    sentiment: Optional[SentimentType]
+    topics: Optional[str]
+    urgency: Optional[UrgencyType]
+    canonical_review_id: Optional[int] = None
+    processed_at: datetime
+    similarity: float
+
+
 # Ingestion Request
 class IngestReviewsRequest(BaseModel):
     hotel_id: str = Field(..., description="Google Place ID or hotel identifier")
@@ -116,9 +151,128 @@ class DashboardMetrics(BaseModel):
     critical_reviews_count: int
 
 
+class TopicClusterResponse(BaseModel):
+    hotel_id: str
+    cluster_index: int
+    size: int
+    top_terms: List[str]
+    example_review_ids: List[int]
+    updated_at: Optional[datetime]
+
+
+class EscalationAlertResponse(BaseModel):
+    id: int
+    hotel_id: str
+    metric: str
+    day: date
+    value: int
+    expected: float
+    z_score: float
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class HotelLeaderboardEntry(BaseModel):
+    hotel_id: str
+    total_reviews: int
+    negative_reviews: int
+    critical_reviews: int
+    negative_percent: float
+    escalation_rate: float
+    negative_rank: Optional[int]
+    escalation_rank: Optional[int]
+    negative_percentile: Optional[float]
+    escalation_percentile: Optional[float]
+    top_negative_topic: Optional[str]
+    refreshed_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class HotelIngestStateResponse(BaseModel):
+    hotel_id: str
+    slot: int
+    enabled: bool
+    last_review_date: Optional[datetime]
+    last_run_at: Optional[datetime]
+    last_success_at: Optional[datetime]
+    lag_seconds: Optional[float]
+    deferred_reviews: int
+    last_error: Optional[str]
+
+
+class TokenUsageResponse(BaseModel):
+    hotel_id: str
+    reviews_analyzed: int
+    prompt_tokens: int
+    completion_tokens: int
+
+
+class DeadLetterResponse(BaseModel):
+    id: int
+    hotel_id: str
+    payload: Any
+    error: str
+    attempts: int
+    has_analysis: bool
+    created_at: datetime
+    last_attempt_at: datetime
+
+
+class ReanalysisStatus(BaseModel):
+    state: str
+    model: Optional[str] = None
+    prompt_version: Optional[int] = None
+    cursor: Optional[int] = None
+    remaining: Optional[int] = None
+    processed: int = 0
+    updated: int = 0
+    failed: int = 0
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class LLMProviderHealth(BaseModel):
+    name: str
+    model: str
+    latency_ms: Optional[float]
+    p95_ms: Optional[float]
+    success_rate: float
+    healthy: bool
+    circuit: str
+    cost_ms: float
+
+
 # LLM Analysis Result
 class LLMAnalysisResult(BaseModel):
     sentiment: SentimentType
     topics: List[str]
     urgency: UrgencyType
-    reasoning: Optional[str] = None
\ No newline at end of file
+    reasoning: Optional[str] = None
+    model: Optional[str] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+
+
+class ProfileSummary(BaseModel):
+    id: str
+    method: str
+    path: str
+    status_code: int
+    duration_ms: float
+    started_at: datetime
+
+
+class ProfileDetail(ProfileSummary):
+    stats: str
+
+
+class SlowQueryRecord(BaseModel):
+    statement: str
+    parameters: str
+    duration_ms: float
+    route: Optional[str]
+    recorded_at: datetime
@@ -0,0 +1,17 @@
+from uvicorn.workers import UvicornWorker
+from app.config import settings
+
+
+class AppWorker(UvicornWorker):
+    """Gunicorn worker (see gunicorn.conf.py) with a bounded graceful shutdown.
+
+    Ingests run as background tasks of the request that started them, so by
+    default uvicorn would wait for every one of them to finish before exiting.
+    After ``SHUTDOWN_GRACE_SECONDS`` the remaining ones are cancelled, which
+    stops them after their current review (see BackgroundTaskManager).
+    """
+
+    CONFIG_KWARGS = {
+        **UvicornWorker.CONFIG_KWARGS,
+        "timeout_graceful_shutdown": settings.SHUTDOWN_GRACE_SECONDS
+    }
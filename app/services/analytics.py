@@ -0,0 +1,330 @@
+"""Vectorized review statistics over column batches.
+
+Reviews are loaded once as parallel NumPy arrays of small integer codes
+(hotel, sentiment, urgency, processing day) plus their topics in CSR layout
+(``topic_offsets[i]:topic_offsets[i + 1]`` indexes row ``i``'s codes in
+``topic_codes``). Every statistic is then a few ``bincount``/``cumsum``
+passes over those arrays instead of a Python loop per row. Columns come from
+the database in id-ordered batches (:func:`load_review_columns`) or, with no
+database involved, from the Parquet snapshot (:meth:`ReviewColumns.from_arrow`).
+
+Topic codes are assigned in order of first appearance, so ties in
+:func:`topic_counts` come out in the same order as ``Counter.most_common``.
+"""
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.models import Review, SentimentType, UrgencyType
+from app.services.columnar import split_topics
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+# Sentiment codes index SENTIMENTS; -1 is a review without labels
+SENTIMENTS = list(SentimentType)
+NEGATIVE = SENTIMENTS.index(SentimentType.NEGATIVE)
+# Days are counted from this date (the epoch, like Arrow's date32)
+EPOCH = date(1970, 1, 1)
+NO_DAY = np.iinfo(np.int32).min
+
+
+@dataclass
+class ReviewColumns:
+    hotel_ids: List[str]  # hotel code -> hotel id
+    hotel: np.ndarray  # int32 hotel codes
+    sentiment: np.ndarray  # int8 indexes into SENTIMENTS, -1 if unlabelled
+    critical: np.ndarray  # bool
+    day: np.ndarray  # int32 days since EPOCH of processed_at, NO_DAY if unknown
+    topics: List[str]  # topic code -> topic
+    topic_offsets: np.ndarray  # int64, one more than there are rows
+    topic_codes: np.ndarray  # int32
+
+    def __len__(self) -> int:
+        return len(self.hotel)
+
+    @property
+    def topic_rows(self) -> np.ndarray:
+        """The row of every entry in ``topic_codes``."""
+        return np.repeat(np.arange(len(self), dtype=np.int64), np.diff(self.topic_offsets))
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Sequence]) -> "ReviewColumns":
+        """``(hotel_id, sentiment, urgency, topics, processed_at)`` rows, as read from ``reviews``."""
+        builder = ReviewColumnsBuilder()
+        builder.add_rows(rows)
+        return builder.build()
+
+    @classmethod
+    def from_arrow(cls, table: "pa.Table") -> "ReviewColumns":
+        """A table in ``app.services.columnar.snapshot_schema``, e.g. read from the snapshot.
+
+        The dictionary-encoded columns are used as they are, without
+        touching individual rows in Python.
+        """
+        import pyarrow.compute as pc
+
+        # One chunk per column, with its dictionaries unified across chunks
+        table = table.combine_chunks()
+        topics = _single(table.column("topics"))
+        topic_values = topics.flatten()
+        lengths = pc.fill_null(pc.list_value_length(topics), 0).to_numpy(zero_copy_only=False)
+        hotel = _single(pc.dictionary_encode(table.column("hotel_id")))
+        urgency = _recode(table.column("urgency"), [UrgencyType.CRITICAL.value])
+        day = pc.cast(pc.cast(table.column("processed_at"), "date32"), "int32")
+        return cls(
+            hotel_ids=hotel.dictionary.to_pylist(),
+            hotel=hotel.indices.to_numpy(zero_copy_only=False).astype(np.int32),
+            sentiment=_recode(table.column("sentiment"), [s.value for s in SENTIMENTS]).astype(np.int8),
+            critical=urgency == 0,
+            day=pc.fill_null(day, NO_DAY).to_numpy().astype(np.int32),
+            topics=topic_values.dictionary.to_pylist(),
+            topic_offsets=np.concatenate(([0], np.cumsum(lengths))).astype(np.int64),
+            topic_codes=topic_values.indices.to_numpy(zero_copy_only=False).astype(np.int32)
+        )
+
+
+def _single(column: "pa.ChunkedArray") -> "pa.Array":
+    import pyarrow as pa
+
+    return column.chunk(0) if column.num_chunks else pa.array([], type=column.type)
+
+
+def _recode(column: "pa.ChunkedArray", values: List[str]) -> np.ndarray:
+    """Dictionary column -> index of each row's value in ``values`` (-1 for nulls and other values)."""
+    import pyarrow.compute as pc
+
+    array = _single(column)
+    lookup = np.array([values.index(v) if v in values else -1 for v in array.dictionary.to_pylist()] + [-1])
+    return lookup[pc.fill_null(array.indices, len(lookup) - 1).to_numpy(zero_copy_only=False)]
+
+
+class ReviewColumnsBuilder:
+    """Encodes row batches into one :class:`ReviewColumns` with shared code spaces.
+
+    Rows are touched once, to look up codes; topic strings are split once
+    per distinct string, not per row.
+    """
+
+    def __init__(self):
+        self._hotels: Dict[str, int] = {}
+        self._topics: Dict[str, int] = {}
+        # Stored topics string -> its topic codes
+        self._topic_sets: Dict[Optional[str], List[int]] = {None: []}
+        self._chunks: List[Tuple[np.ndarray, ...]] = []
+
+    @property
+    def topics(self) -> List[str]:
+        """Topic names seen so far, indexed by code."""
+        return list(self._topics)
+
+    def topic_codes(self, value: Optional[str]) -> List[int]:
+        """Codes of the topics in a stored topics string, assigning codes to new topics."""
+        codes = self._topic_sets.get(value)
+        if codes is None:
+            codes = [self._topics.setdefault(topic, len(self._topics)) for topic in split_topics(value) or ()]
+            self._topic_sets[value] = codes
+        return codes
+
+    def add_rows(self, rows: Iterable[Sequence]):
+        hotels, sentiments, critical, days, topic_sets = [], [], [], [], []
+        sentiment_codes = {sentiment: index for index, sentiment in enumerate(SENTIMENTS)}
+        for hotel_id, sentiment, urgency, topics, processed_at in rows:
+            hotels.append(self._hotels.setdefault(hotel_id, len(self._hotels)))
+            sentiments.append(sentiment_codes.get(sentiment, -1))
+            critical.append(urgency == UrgencyType.CRITICAL)
+            days.append((processed_at.date() - EPOCH).days if processed_at else NO_DAY)
+            topic_sets.append(self.topic_codes(topics))
+
+        lengths = np.fromiter((len(codes) for codes in topic_sets), dtype=np.int64, count=len(topic_sets))
+        codes = np.fromiter((code for codes in topic_sets for code in codes), dtype=np.int32, count=int(lengths.sum()))
+        self._chunks.append((
+            np.array(hotels, dtype=np.int32), np.array(sentiments, dtype=np.int8),
+            np.array(critical, dtype=bool), np.array(days, dtype=np.int32), lengths, codes
+        ))
+
+    def build(self) -> ReviewColumns:
+        chunks = list(zip(*self._chunks)) or [[np.zeros(0, dtype=dtype)] for dtype in
+                                               (np.int32, np.int8, bool, np.int32, np.int64, np.int32)]
+        hotel, sentiment, critical, day, lengths, codes = (np.concatenate(parts) for parts in chunks)
+        return ReviewColumns(
+            hotel_ids=list(self._hotels),
+            hotel=hotel,
+            sentiment=sentiment,
+            critical=critical,
+            day=day,
+            topics=list(self._topics),
+            topic_offsets=np.concatenate(([0], np.cumsum(lengths))).astype(np.int64),
+            topic_codes=codes
+        )
+
+
+def load_review_columns(db: Session, filters: Sequence = (), batch_size: int = 50000) -> ReviewColumns:
+    """Read the columns of every review matching ``filters``, in id-ordered batches."""
+    builder = ReviewColumnsBuilder()
+    cursor = 0
+    while True:
+        rows = db.execute(
+            select(Review.id, Review.hotel_id, Review.sentiment, Review.urgency, Review.topics, Review.processed_at)
+            .where(Review.id > cursor, *filters).order_by(Review.id).limit(batch_size)
+        ).all()
+        if not rows:
+            return builder.build()
+        cursor = rows[-1].id
+        builder.add_rows(row[1:] for row in rows)
+
+
+def sentiment_counts(columns: ReviewColumns) -> Dict[SentimentType, int]:
+    counts = np.bincount(columns.sentiment.astype(np.int64) + 1, minlength=len(SENTIMENTS) + 1)[1:]
+    return dict(zip(SENTIMENTS, counts.tolist()))
+
+
+def topic_counts(columns: ReviewColumns) -> Dict[str, int]:
+    """Mentions per topic, most mentioned first (ties in order of first appearance)."""
+    counts = np.bincount(columns.topic_codes, minlength=len(columns.topics))
+    order = np.argsort(-counts, kind="stable")
+    return {columns.topics[code]: int(counts[code]) for code in order if counts[code]}
+
+
+def count_topics(values: Iterable[Optional[str]]) -> Dict[str, int]:
+    """Mentions per topic over stored topics strings, most mentioned first.
+
+    For callers that only need topic counts: rows are only hashed, each
+    distinct string is split once and weighted by how often it occurs.
+    """
+    distinct = Counter(values)
+    builder = ReviewColumnsBuilder()
+    codes = [builder.topic_codes(value) for value in distinct]
+    topics = builder.topics
+    weights = np.repeat(np.fromiter(distinct.values(), dtype=np.int64, count=len(distinct)), [len(c) for c in codes])
+    counts = np.bincount(
+        np.fromiter((code for c in codes for code in c), dtype=np.int64, count=len(weights)),
+        weights=weights, minlength=len(topics)
+    ).astype(np.int64)
+    return {topics[code]: int(counts[code]) for code in np.argsort(-counts, kind="stable") if counts[code]}
+
+
+def percentages(counts: np.ndarray, total: int) -> np.ndarray:
+    return np.round(np.asarray(counts, dtype=np.float64) * 100 / total, 2) if total else np.zeros(len(counts))
+
+
+def topic_sentiment_crosstab(columns: ReviewColumns) -> Tuple[List[str], np.ndarray]:
+    """``(topics, counts)`` where ``counts[t, s]`` counts mentions of topic ``t`` in reviews of SENTIMENTS[s]."""
+    sentiment = columns.sentiment[columns.topic_rows].astype(np.int64)
+    labelled = sentiment >= 0
+    cells = columns.topic_codes[labelled].astype(np.int64) * len(SENTIMENTS) + sentiment[labelled]
+    counts = np.bincount(cells, minlength=len(columns.topics) * len(SENTIMENTS))
+    return columns.topics, counts.reshape(len(columns.topics), len(SENTIMENTS))
+
+
+@dataclass
+class HotelStats:
+    hotel_ids: List[str]
+    total: np.ndarray
+    negative: np.ndarray
+    critical: np.ndarray
+    negative_share: np.ndarray  # of all reviews, 0..1
+    escalation_rate: np.ndarray  # critical share of all reviews, 0..1
+    top_topic: List[Optional[str]]  # most mentioned topic among the hotel's negative reviews
+
+
+def hotel_stats(columns: ReviewColumns) -> HotelStats:
+    """Per-hotel counts and rates, indexed by hotel code."""
+    hotels = len(columns.hotel_ids)
+    total = np.bincount(columns.hotel, minlength=hotels)
+    negative = np.bincount(columns.hotel, weights=columns.sentiment == NEGATIVE, minlength=hotels).astype(np.int64)
+    critical = np.bincount(columns.hotel, weights=columns.critical, minlength=hotels).astype(np.int64)
+    denominator = np.maximum(total, 1)
+
+    # Topic hotspots: (hotel, topic) pairs over negative reviews only
+    rows = columns.topic_rows
+    negative_mentions = columns.sentiment[rows] == NEGATIVE
+    pairs = np.bincount(
+        columns.hotel[rows][negative_mentions].astype(np.int64) * max(len(columns.topics), 1)
+        + columns.topic_codes[negative_mentions],
+        minlength=hotels * max(len(columns.topics), 1)
+    ).reshape(hotels, max(len(columns.topics), 1))
+    top = pairs.argmax(axis=1)
+    top_topic = [columns.topics[code] if pairs[hotel, code] else None for hotel, code in enumerate(top)]
+
+    return HotelStats(
+        hotel_ids=columns.hotel_ids,
+        total=total,
+        negative=negative,
+        critical=critical,
+        negative_share=negative / denominator,
+        escalation_rate=critical / denominator,
+        top_topic=top_topic
+    )
+
+
+def rank_hotels(values: np.ndarray, eligible: Optional[np.ndarray] = None) -> np.ndarray:
+    """1-based rank of every hotel by ``values``, highest first; 0 where not ``eligible``.
+
+    Ties share the best rank (competition ranking: 1, 2, 2, 4).
+    """
+    eligible = np.ones(len(values), dtype=bool) if eligible is None else eligible
+    ranks = np.zeros(len(values), dtype=np.int64)
+    candidates = np.flatnonzero(eligible)
+    ordered = -np.asarray(values, dtype=np.float64)[candidates]
+    # Rank = 1 + number of eligible hotels with a strictly higher value
+    ranks[candidates] = np.searchsorted(np.sort(ordered), ordered, side="left") + 1
+    return ranks
+
+
+def percentile_ranks(values: np.ndarray, eligible: Optional[np.ndarray] = None) -> np.ndarray:
+    """Share (0..100) of eligible hotels with a value at or below each hotel's; 0 where not eligible."""
+    eligible = np.ones(len(values), dtype=bool) if eligible is None else eligible
+    percentiles = np.zeros(len(values), dtype=np.float64)
+    candidates = np.flatnonzero(eligible)
+    if len(candidates):
+        selected = np.asarray(values, dtype=np.float64)[candidates]
+        at_or_below = np.searchsorted(np.sort(selected), selected, side="right")
+        percentiles[candidates] = np.round(at_or_below * 100 / len(candidates), 2)
+    return percentiles
+
+
+@dataclass
+class DailyTrend:
+    days: List[date]
+    total: np.ndarray
+    negative: np.ndarray
+    critical: np.ndarray
+    rolling_negative_share: np.ndarray  # over the trailing ``window`` days, 0..1
+    rolling_escalation_rate: np.ndarray
+
+
+def daily_trend(columns: ReviewColumns, window: int = 7, hotel_id: Optional[str] = None) -> DailyTrend:
+    """Reviews per processing day (empty days included) with trailing-window rates."""
+    selected = columns.day != NO_DAY
+    if hotel_id is not None:
+        code = columns.hotel_ids.index(hotel_id) if hotel_id in columns.hotel_ids else -1
+        selected &= columns.hotel == code
+    day = columns.day[selected]
+    if not len(day):
+        empty = np.zeros(0)
+        return DailyTrend([], empty, empty, empty, empty, empty)
+
+    first = int(day.min())
+    index = day - first
+    length = int(index.max()) + 1
+    total = np.bincount(index, minlength=length)
+    negative = np.bincount(index, weights=columns.sentiment[selected] == NEGATIVE, minlength=length)
+    critical = np.bincount(index, weights=columns.critical[selected], minlength=length)
+
+    def trailing(values: np.ndarray) -> np.ndarray:
+        sums = np.cumsum(np.concatenate(([0], values)))
+        return sums[1:] - sums[np.maximum(np.arange(1, length + 1) - window, 0)]
+
+    window_total = np.maximum(trailing(total), 1)
+    return DailyTrend(
+        days=[EPOCH + timedelta(days=first + offset) for offset in range(length)],
+        total=total,
+        negative=negative.astype(np.int64),
+        critical=critical.astype(np.int64),
+        rolling_negative_share=trailing(negative) / window_total,
+        rolling_escalation_rate=trailing(critical) / window_total
+    )
@@ -0,0 +1,168 @@
+import logging
+import math
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import (
+    Review, SentimentType, UrgencyType, HotelDailyStats, HotelAnomalyState, EscalationAlert
+)
+from app.services.checkpoints import get_checkpoint, settled, settled_before
+
+logger = logging.getLogger(__name__)
+
+METRICS = ("critical", "negative")
+
+
+def ewma_update(mean: float, variance: float, value: float, alpha: float) -> Tuple[float, float]:
+    """One O(1) step of an exponentially weighted mean and variance (Finch, 2009)."""
+    diff = value - mean
+    increment = alpha * diff
+    return mean + increment, (1 - alpha) * (variance + diff * increment)
+
+
+class EscalationAnomalyJob:
+    """Flags days where a hotel's critical or negative review count spikes.
+
+    New reviews are rolled up into ``hotel_daily_stats`` from an id checkpoint,
+    then every completed day not yet seen updates a per-hotel EWMA baseline.
+    Each run touches only new reviews and new days, never the history. A day
+    is consumed only once it ended before the roll-up's safety lag
+    (app.services.checkpoints.settled), so no review of it can still arrive.
+    """
+
+    name = "escalation_anomalies"
+
+    def __init__(self, alpha: float, z_threshold: float, min_count: int, warmup_days: int,
+                 batch_size: int = 5000, max_gap_days: int = 60):
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.min_count = min_count
+        self.warmup_days = warmup_days
+        self.batch_size = batch_size
+        # Past this many empty days the baseline has decayed to ~0 anyway
+        self.max_gap_days = max_gap_days
+
+    def run(self, db: Session, today: Optional[date] = None) -> List[EscalationAlert]:
+        cutoff = settled_before()
+        self.roll_up(db, cutoff)
+        # Only days entirely before the roll-up's high-water mark are complete
+        return self.detect(db, min(today or datetime.utcnow().date(), cutoff.date()))
+
+    def roll_up(self, db: Session, cutoff: Optional[datetime] = None) -> int:
+        checkpoint = get_checkpoint(db, self.name)
+        cutoff = cutoff or settled_before()
+        processed = 0
+
+        while True:
+            rows = db.query(
+                Review.id, Review.hotel_id, Review.processed_at, Review.sentiment,
+                Review.urgency, Review.canonical_review_id
+            ).filter(
+                Review.id > checkpoint.last_review_id
+            ).order_by(Review.id).limit(self.batch_size).all()
+            rows = settled(rows, cutoff)
+            if not rows:
+                break
+
+            counts: Dict[Tuple[str, date], List[int]] = defaultdict(lambda: [0, 0, 0])
+            for row in rows:
+                # Reposts of the same complaint should not look like a spike
+                if row.canonical_review_id is not None:
+                    continue
+                day_counts = counts[(row.hotel_id, (row.processed_at or datetime.utcnow()).date())]
+                day_counts[0] += 1
+                day_counts[1] += row.sentiment == SentimentType.NEGATIVE
+                day_counts[2] += row.urgency == UrgencyType.CRITICAL
+
+            for (hotel_id, day), (total, negative, critical) in counts.items():
+                stats = db.get(HotelDailyStats, (hotel_id, day))
+                if stats is None:
+                    stats = HotelDailyStats(hotel_id=hotel_id, day=day, total=0, negative=0, critical=0)
+                    db.add(stats)
+                stats.total += total
+                stats.negative += negative
+                stats.critical += critical
+
+            checkpoint.last_review_id = rows[-1].id
+            db.commit()
+            processed += len(rows)
+
+        return processed
+
+    def detect(self, db: Session, today: date) -> List[EscalationAlert]:
+        # Completed days newer than the hotel's baseline; the "critical" state row
+        # marks how far each hotel has been processed (both metrics move together)
+        days = db.query(HotelDailyStats).outerjoin(
+            HotelAnomalyState,
+            and_(
+                HotelAnomalyState.hotel_id == HotelDailyStats.hotel_id,
+                HotelAnomalyState.metric == METRICS[0]
+            )
+        ).filter(
+            HotelDailyStats.day < today,
+            or_(HotelAnomalyState.last_day.is_(None), HotelDailyStats.day > HotelAnomalyState.last_day)
+        ).order_by(HotelDailyStats.hotel_id, HotelDailyStats.day).all()
+
+        by_hotel: Dict[str, List[HotelDailyStats]] = defaultdict(list)
+        for stats in days:
+            by_hotel[stats.hotel_id].append(stats)
+
+        alerts = []
+        for hotel_id, hotel_days in by_hotel.items():
+            for metric in METRICS:
+                state = db.get(HotelAnomalyState, (hotel_id, metric))
+                for stats in hotel_days:
+                    value = getattr(stats, metric)
+                    if state is None:
+                        state = HotelAnomalyState(
+                            hotel_id=hotel_id, metric=metric, last_day=stats.day,
+                            mean=float(value), variance=0.0, days_observed=1
+                        )
+                        db.add(state)
+                        continue
+
+                    alert = self._observe(state, stats.day, value)
+                    if alert is not None:
+                        db.add(alert)
+                        alerts.append(alert)
+
+        db.commit()
+        for alert in alerts:
+            logger.warning(
+                "Escalation spike at %s: %d %s reviews on %s (expected %.1f, z=%.1f)",
+                alert.hotel_id, alert.value, alert.metric, alert.day, alert.expected, alert.z_score
+            )
+        return alerts
+
+    def _observe(self, state: HotelAnomalyState, day: date, value: int) -> Optional[EscalationAlert]:
+        # Days without reviews are zero counts
+        gap = min((day - state.last_day).days - 1, self.max_gap_days)
+        for _ in range(max(0, gap)):
+            state.mean, state.variance = ewma_update(state.mean, state.variance, 0.0, self.alpha)
+        state.days_observed += max(0, gap)
+
+        alert = None
+        # A standard deviation below one review would flag every 0 -> 2 wobble
+        z_score = (value - state.mean) / max(math.sqrt(state.variance), 1.0)
+        if (state.days_observed >= self.warmup_days and value >= self.min_count
+                and z_score >= self.z_threshold):
+            alert = EscalationAlert(
+                hotel_id=state.hotel_id, metric=state.metric, day=day, value=value,
+                expected=round(state.mean, 2), z_score=round(z_score, 2)
+            )
+
+        state.mean, state.variance = ewma_update(state.mean, state.variance, float(value), self.alpha)
+        state.days_observed += 1
+        state.last_day = day
+        return alert
+
+
+escalation_anomaly_job = EscalationAnomalyJob(
+    alpha=settings.ANOMALY_EWMA_ALPHA,
+    z_threshold=settings.ANOMALY_Z_THRESHOLD,
+    min_count=settings.ANOMALY_MIN_COUNT,
+    warmup_days=settings.ANOMALY_WARMUP_DAYS
+)
@@ -0,0 +1,218 @@
+import json
+import logging
+import os
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Optional, Sequence, Tuple
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import ArchivedReviewStats, Review, ReviewLSHBucket, SentimentType, SnapshotRelabel, UrgencyType
+from app.services.anomaly_detection import escalation_anomaly_job
+from app.services.checkpoints import get_checkpoint
+from app.services.leaderboard import hotel_leaderboard_job
+from app.services.columnar import (
+    PARQUET_COMPRESSION, REVIEW_COLUMNS, review_schema, reviews_to_table, split_topics
+)
+from app.services.partitions import add_months, list_partitions, month_start, partition_name
+from app.services.snapshots import review_snapshot_job
+
+logger = logging.getLogger(__name__)
+
+# (hotel_id, duplicate) -> ([total, positive, negative, neutral, critical], topic counts)
+MonthStats = Dict[Tuple[str, bool], Tuple[list, Counter]]
+
+_SENTIMENT_INDEX = {SentimentType.POSITIVE: 1, SentimentType.NEGATIVE: 2, SentimentType.NEUTRAL: 3}
+
+
+class ReviewArchiveJob:
+    """Moves reviews older than ``retention_months`` full months to Parquet files.
+
+    Months are archived oldest first to ``<archive_dir>/reviews/month=YYYY-MM/
+    part-<first id>.parquet`` (zstd), and their per-hotel counts are added to
+    ``archived_review_stats`` so the dashboard totals do not change. A month
+    that has its own partition is written to one file and the partition is
+    then dropped, which leaves nothing behind to vacuum; otherwise (the
+    legacy partition, a plain table, SQLite) rows are deleted batch by batch,
+    each batch committed with its file and counts. A month is only archived
+    once every job in ``upstream_jobs`` (by default the escalation anomaly
+    roll-up into ``hotel_daily_stats`` and the leaderboard's topic counts)
+    has checkpointed past it, and, with the snapshot job among them, no
+    relabel of it is left to rewrite. Files are written under a temporary
+    name and renamed, so a re-run after a crash rewrites them instead of
+    duplicating.
+    """
+
+    name = "review_archive"
+
+    def __init__(self, retention_months: int, archive_dir: str, batch_size: int,
+                 upstream_jobs: Sequence[str] = (escalation_anomaly_job.name, hotel_leaderboard_job.name)):
+        self.retention_months = retention_months
+        self.archive_dir = archive_dir
+        self.batch_size = batch_size
+        self.upstream_jobs = upstream_jobs
+
+    def run(self, db: Session, now: Optional[datetime] = None) -> int:
+        """Archive every month past the retention period; returns how many reviews were moved."""
+        if self.retention_months <= 0:
+            return 0
+
+        cutoff = add_months(month_start(now or datetime.utcnow()), -self.retention_months)
+        consumed = min(get_checkpoint(db, name).last_review_id for name in self.upstream_jobs)
+        db.commit()
+
+        partitions = {partition.name: partition for partition in list_partitions(db)}
+        oldest = [
+            partition.start for partition in partitions.values()
+            if partition.start is not None and partition.start < cutoff
+        ]
+        oldest_review = db.query(func.min(Review.processed_at)).filter(Review.processed_at < cutoff).scalar()
+        if oldest_review is not None:
+            oldest.append(month_start(oldest_review))
+        if not oldest:
+            return 0
+
+        archived = 0
+        month = min(oldest)
+        while month < cutoff:
+            end = add_months(month, 1)
+            last_id = db.query(func.max(Review.id)).filter(
+                Review.processed_at >= month, Review.processed_at < end
+            ).scalar()
+            if last_id is not None and last_id > consumed:
+                logger.info("Archiving stops at %s until %s catch up", f"{month:%Y-%m}", ", ".join(self.upstream_jobs))
+                break
+            # Relabelled reviews must reach the snapshot too
+            if review_snapshot_job.name in self.upstream_jobs and db.query(SnapshotRelabel.hotel_id).filter(
+                SnapshotRelabel.month == f"{month:%Y-%m}"
+            ).first() is not None:
+                logger.info("Archiving stops at %s until %s rewrites it", f"{month:%Y-%m}", review_snapshot_job.name)
+                break
+
+            partition = partitions.get(partition_name(month))
+            if partition is not None and (partition.start, partition.end) == (month, end):
+                archived += self._archive_partition(db, partition.name, month)
+            elif last_id is not None:
+                archived += self._archive_rows(db, month, end)
+            month = end
+
+        if archived:
+            logger.info("Archived %d reviews processed before %s", archived, f"{cutoff:%Y-%m}")
+        return archived
+
+    def _batches(self, db: Session, start: datetime, end: datetime, cursor: int = 0):
+        columns = [Review.__table__.c[name] for name in REVIEW_COLUMNS]
+        while True:
+            rows = db.execute(
+                select(*columns).where(
+                    Review.processed_at >= start, Review.processed_at < end, Review.id > cursor
+                ).order_by(Review.id).limit(self.batch_size)
+            ).all()
+            if not rows:
+                return
+            cursor = rows[-1].id
+            yield rows
+
+    def _archive_partition(self, db: Session, name: str, month: datetime) -> int:
+        """Write the whole partition to one file, then drop it."""
+        stats: MonthStats = {}
+        path, writer, archived = None, None, 0
+        try:
+            for rows in self._batches(db, month, add_months(month, 1)):
+                if writer is None:
+                    path, writer = self._open(month, rows[0].id)
+                writer.write_table(reviews_to_table(rows))
+                self._count(rows, stats)
+                archived += len(rows)
+        finally:
+            if writer is not None:
+                writer.close()
+        if path is not None:
+            os.replace(f"{path}.tmp", path)
+
+        # The ON DELETE CASCADE from review_lsh_buckets cannot reference a partitioned table
+        db.execute(text(f"DELETE FROM review_lsh_buckets WHERE review_id IN (SELECT id FROM {name})"))
+        self._save(db, month, stats)
+        # Last, so the exclusive lock on reviews is only held for the commit
+        db.execute(text(f"DROP TABLE {name}"))
+        db.commit()
+        logger.info("Archived and dropped partition %s (%d reviews)", name, archived)
+        return archived
+
+    def _archive_rows(self, db: Session, start: datetime, end: datetime) -> int:
+        """Write and delete the month's reviews one batch at a time."""
+        archived = 0
+        while True:
+            # Rows of a batch are deleted before the next one is read
+            rows = next(self._batches(db, start, end), None)
+            if rows is None:
+                return archived
+
+            path, writer = self._open(start, rows[0].id)
+            try:
+                writer.write_table(reviews_to_table(rows))
+            finally:
+                writer.close()
+            os.replace(f"{path}.tmp", path)
+
+            stats: MonthStats = {}
+            self._count(rows, stats)
+            ids = [row.id for row in rows]
+            db.execute(delete(ReviewLSHBucket).where(ReviewLSHBucket.review_id.in_(ids)))
+            db.execute(delete(Review).where(
+                Review.id.in_(ids), Review.processed_at >= start, Review.processed_at < end
+            ))
+            self._save(db, start, stats)
+            db.commit()
+            archived += len(rows)
+
+    def _open(self, month: datetime, first_id: int):
+        import pyarrow.parquet as pq
+
+        directory = os.path.join(self.archive_dir, "reviews", f"month={month:%Y-%m}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"part-{first_id}.parquet")
+        return path, pq.ParquetWriter(f"{path}.tmp", review_schema(), compression=PARQUET_COMPRESSION)
+
+    @staticmethod
+    def _count(rows, stats: MonthStats):
+        for row in rows:
+            key = (row.hotel_id, row.canonical_review_id is not None)
+            if key not in stats:
+                stats[key] = ([0, 0, 0, 0, 0], Counter())
+            counts, topics = stats[key]
+            counts[0] += 1
+            if row.sentiment in _SENTIMENT_INDEX:
+                counts[_SENTIMENT_INDEX[row.sentiment]] += 1
+            counts[4] += row.urgency == UrgencyType.CRITICAL
+            topics.update(split_topics(row.topics) or ())
+
+    @staticmethod
+    def _save(db: Session, month: datetime, stats: MonthStats):
+        for (hotel_id, duplicate), (counts, topics) in stats.items():
+            row = db.get(ArchivedReviewStats, (hotel_id, month.date(), duplicate))
+            if row is None:
+                row = ArchivedReviewStats(
+                    hotel_id=hotel_id, month=month.date(), duplicate=duplicate,
+                    total=0, positive=0, negative=0, neutral=0, critical=0, topic_counts="{}"
+                )
+                db.add(row)
+            row.total += counts[0]
+            row.positive += counts[1]
+            row.negative += counts[2]
+            row.neutral += counts[3]
+            row.critical += counts[4]
+            merged = Counter(json.loads(row.topic_counts))
+            merged.update(topics)
+            row.topic_counts = json.dumps(merged)
+
+
+review_archive_job = ReviewArchiveJob(
+    retention_months=settings.ARCHIVE_RETENTION_MONTHS,
+    archive_dir=settings.ARCHIVE_DIR,
+    batch_size=settings.ARCHIVE_BATCH_SIZE,
+    # Reviews must reach the analytics snapshot before they leave the database
+    upstream_jobs=(escalation_anomaly_job.name, hotel_leaderboard_job.name) + (
+        (review_snapshot_job.name,) if settings.SNAPSHOT_ENABLED else ()
+    )
+)
@@ -1,63 +1,322 @@
 import asyncio
+import logging
+import threading
+import time
 import uuid
-from typing import Dict
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+from sqlalchemy import func, text
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from app import metrics
+from app.config import settings
+from app.models import IngestTask
 from app.services.review_ingestion import review_ingestion_service
+from app.services.incremental_ingestion import incremental_ingestion_job
 from app.database import SessionLocal
 
+logger = logging.getLogger(__name__)
+
+# Serializes admission across workers on PostgreSQL (transaction-level advisory lock)
+ADMISSION_LOCK_KEY = zlib.crc32(b"ingest:admission")
+
+USAGE_FIELDS = ("reviews_count", "failed_reviews", "prompt_tokens", "completion_tokens", "deadline_exceeded")
+
+
+class IngestQueueFull(Exception):
+    pass
+
 
 class BackgroundTaskManager:
+    """Admission, status and cancellation of POST /ingest-reviews tasks.
+    
+    Tasks are rows of ``ingest_tasks``, so any worker can report or cancel
+    them, and the one-per-hotel and ``max_in_flight`` limits hold across
+    workers. An ingest runs in the worker that admitted it; that worker polls
+    its row for a cancel made elsewhere and refreshes its heartbeat. Tasks
+    whose heartbeat is older than ``stale_seconds`` lost their worker and are
+    failed at the next admission.
+    """
     
-    def __init__(self):
-        self.tasks: Dict[str, dict] = {}
+    def __init__(self, max_in_flight: int = settings.INGEST_MAX_IN_FLIGHT, session_factory=SessionLocal,
+                 poll_seconds: float = settings.INGEST_TASK_POLL_SECONDS,
+                 heartbeat_seconds: float = settings.INGEST_TASK_HEARTBEAT_SECONDS,
+                 stale_seconds: float = settings.INGEST_TASK_STALE_SECONDS,
+                 retention_hours: float = settings.INGEST_TASK_RETENTION_HOURS):
+        self.max_in_flight = max_in_flight
+        self.session_factory = session_factory
+        self.poll_seconds = poll_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.stale_seconds = stale_seconds
+        self.retention_hours = retention_hours
+        # task_id -> cancel event, for the ingests admitted by this process
+        self._cancel_events: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
     
     def create_task_id(self) -> str:
         return str(uuid.uuid4())
     
+    def admit(self, hotel_id: str) -> Tuple[str, bool]:
+        """Reserve an ingest for ``hotel_id``.
+        
+        Returns ``(task_id, created)``: a hotel with an ingest already queued or
+        running gets that task back instead of a second one. Raises
+        IngestQueueFull when ``max_in_flight`` ingests are already admitted.
+        """
+        with self._lock:
+            db = self.session_factory()
+            try:
+                if db.get_bind().dialect.name == "postgresql":
+                    db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": ADMISSION_LOCK_KEY})
+                self._expire(db)
+                
+                existing = self._active_task_id(db, hotel_id)
+                in_flight = db.query(func.count(IngestTask.id)).filter(IngestTask.active_hotel_id.isnot(None)).scalar()
+                if existing is None and in_flight < self.max_in_flight:
+                    task_id = self.create_task_id()
+                    db.add(IngestTask(
+                        id=task_id, hotel_id=hotel_id, active_hotel_id=hotel_id,
+                        status="queued", message="Waiting to start"
+                    ))
+                try:
+                    db.commit()
+                except IntegrityError:
+                    # Another worker admitted this hotel first (no admission lock outside PostgreSQL)
+                    db.rollback()
+                    existing = self._active_task_id(db, hotel_id)
+                    if existing is None:
+                        raise
+            finally:
+                db.close()
+            
+            if existing is not None:
+                return existing, False
+            if in_flight >= self.max_in_flight:
+                raise IngestQueueFull(f"{in_flight} ingests already in flight")
+            self._cancel_events[task_id] = threading.Event()
+            metrics.record_queue_depth(len(self._cancel_events))
+            return task_id, True
+    
+    def _active_task_id(self, db: Session, hotel_id: str) -> Optional[str]:
+        return db.query(IngestTask.id).filter(IngestTask.active_hotel_id == hotel_id).scalar()
+    
+    def _expire(self, db: Session):
+        """Fail tasks whose worker stopped heartbeating, and delete old finished ones."""
+        now = datetime.utcnow()
+        db.query(IngestTask).filter(
+            IngestTask.active_hotel_id.isnot(None),
+            IngestTask.heartbeat_at < now - timedelta(seconds=self.stale_seconds)
+        ).update({
+            "status": "failed",
+            "message": "The worker running this ingest stopped",
+            "active_hotel_id": None,
+            "finished_at": now
+        }, synchronize_session=False)
+        db.query(IngestTask).filter(
+            IngestTask.active_hotel_id.is_(None),
+            IngestTask.created_at < now - timedelta(hours=self.retention_hours)
+        ).delete(synchronize_session=False)
+    
+    def cancel(self, task_id: str) -> Optional[dict]:
+        """Ask a queued or running ingest to stop; reviews already stored are kept."""
+        db = self.session_factory()
+        try:
+            requested = db.query(IngestTask).filter(
+                IngestTask.id == task_id,
+                IngestTask.active_hotel_id.isnot(None)
+            ).update({
+                "cancel_requested": True,
+                "status": "cancelling",
+                "message": "Stopping after the current review"
+            }, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        if not requested:
+            return None
+        
+        # Running here: stop now rather than at the next poll
+        event = self._cancel_events.get(task_id)
+        if event is not None:
+            event.set()
+        return self.get_task_status(task_id)
+    
+    def cancel_all(self) -> int:
+        """Ask every ingest admitted by this process to stop; returns how many were asked."""
+        with self._lock:
+            task_ids = list(self._cancel_events)
+        return sum(self.cancel(task_id) is not None for task_id in task_ids)
+    
+    async def drain(self, timeout: float, interval: float = 0.1) -> bool:
+        """Wait until no ingest of this process is queued or running; returns False on timeout."""
+        deadline = time.monotonic() + timeout
+        while self._cancel_events:
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(interval)
+        return True
+    
+    def _update(self, task_id: str, **values):
+        db = self.session_factory()
+        try:
+            db.query(IngestTask).filter(IngestTask.id == task_id).update(values, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+    
+    def _finish(self, task_id: str, status: str, message: str, **usage):
+        """Record the outcome and free the hotel for its next ingest."""
+        self._update(
+            task_id, status=status, message=message, active_hotel_id=None, finished_at=datetime.utcnow(),
+            **{field: usage[field] for field in USAGE_FIELDS if field in usage}
+        )
+    
+    def _poll(self, task_id: str, heartbeat: bool) -> bool:
+        """Whether a cancel was requested, refreshing the heartbeat if ``heartbeat``."""
+        db = self.session_factory()
+        try:
+            if heartbeat:
+                db.query(IngestTask).filter(IngestTask.id == task_id).update(
+                    {"heartbeat_at": datetime.utcnow()}, synchronize_session=False
+                )
+            requested = db.query(IngestTask.cancel_requested).filter(IngestTask.id == task_id).scalar()
+            db.commit()
+            return bool(requested)
+        finally:
+            db.close()
+    
+    async def _watch(self, task_id: str, cancelled: threading.Event):
+        """Relay a cancel made through any worker to the running ingest."""
+        last_heartbeat = time.monotonic()
+        while not cancelled.is_set():
+            await asyncio.sleep(self.poll_seconds)
+            heartbeat = time.monotonic() - last_heartbeat >= self.heartbeat_seconds
+            if heartbeat:
+                last_heartbeat = time.monotonic()
+            try:
+                if await asyncio.to_thread(self._poll, task_id, heartbeat):
+                    cancelled.set()
+            except Exception:
+                logger.warning("Could not poll ingest task %s", task_id, exc_info=True)
+    
+    def _release(self, task_id: str):
+        with self._lock:
+            self._cancel_events.pop(task_id, None)
+            metrics.record_queue_depth(len(self._cancel_events))
+    
     async def ingest_reviews_task(self, task_id: str, hotel_id: str, limit: int, user_id: int):
-        self.tasks[task_id] = {
-            "status": "processing",
-            "hotel_id": hotel_id,
-            "message": "Fetching and analyzing reviews..."
-        }
+        try:
+            await self._run_ingest(task_id, hotel_id, limit, user_id)
+        finally:
+            self._release(task_id)
+    
+    async def _run_ingest(self, task_id: str, hotel_id: str, limit: int, user_id: int):
+        cancelled = self._cancel_events.get(task_id) or threading.Event()
+        started = time.perf_counter()
         
         try:
-            # Create a new database session for this background task
-            db = SessionLocal()
+            if cancelled.is_set() or await asyncio.to_thread(self._poll, task_id, True):
+                await asyncio.to_thread(self._finish, task_id, "cancelled", "Cancelled before it started", reviews_count=0)
+                return
             
+            await asyncio.to_thread(self._update, task_id, status="processing", message="Fetching and analyzing reviews...")
+            # Past the deadline the remaining reviews get fallback labels (re-analyzed later)
+            deadline = time.monotonic() + settings.INGEST_TASK_DEADLINE_SECONDS
+            
+            # The ingestion itself is blocking; keep it off the event loop
+            work = asyncio.ensure_future(
+                asyncio.to_thread(self._ingest, hotel_id, limit, user_id, deadline, cancelled)
+            )
+            watcher = asyncio.create_task(self._watch(task_id, cancelled))
             try:
-                # Fetch reviews
-                reviews_data = review_ingestion_service.fetch_google_reviews(hotel_id, limit)
-                
-                # Process reviews through LLM
-                processed_reviews = review_ingestion_service.process_reviews(
-                    hotel_id=hotel_id,
-                    reviews_data=reviews_data,
-                    db=db,
-                    user_id=user_id
-                )
-                
-                # Update task status
-                self.tasks[task_id] = {
-                    "status": "completed",
-                    "hotel_id": hotel_id,
-                    "message": f"Successfully processed {len(processed_reviews)} reviews",
-                    "reviews_count": len(processed_reviews)
-                }
-                
+                usage = await asyncio.shield(work)
+            except asyncio.CancelledError:
+                # The server is shutting down. The thread cannot be interrupted,
+                # so stop it after the current review and record how far it got
+                cancelled.set()
+                usage = await work
             finally:
-                db.close()
-                
+                watcher.cancel()
+            processed_count = usage["reviews_count"]
+            outcome = "cancelled" if cancelled.is_set() else "completed"
+            
+            # Update task status
+            await asyncio.to_thread(
+                self._finish, task_id, outcome,
+                f"Cancelled after processing {processed_count} reviews" if cancelled.is_set()
+                else f"Successfully processed {processed_count} reviews",
+                **usage,
+                deadline_exceeded=time.monotonic() > deadline
+            )
+            metrics.record_ingest(outcome, time.perf_counter() - started, processed_count)
+        
         except Exception as e:
-            self.tasks[task_id] = {
-                "status": "failed",
-                "hotel_id": hotel_id,
-                "message": f"Error processing reviews: {str(e)}"
+            await asyncio.to_thread(self._finish, task_id, "failed", f"Error processing reviews: {str(e)}")
+            metrics.record_ingest("failed", time.perf_counter() - started)
+    
+    def _ingest(self, hotel_id: str, limit: int, user_id: int, deadline: float,
+                cancelled: threading.Event) -> Dict[str, int]:
+        # Create a new database session for this background task
+        db = self.session_factory()
+        
+        try:
+            # Fetch reviews
+            reviews_data = review_ingestion_service.fetch_google_reviews(hotel_id, limit)
+            reviews_data = review_ingestion_service.drop_known(db, hotel_id, reviews_data)
+            if cancelled.is_set():
+                reviews_data = []
+            
+            # Process reviews through LLM
+            dead_letters = []
+            processed_reviews = review_ingestion_service.process_reviews(
+                hotel_id=hotel_id,
+                reviews_data=reviews_data,
+                db=db,
+                user_id=user_id,
+                deadline=deadline,
+                cancelled=cancelled,
+                dead_letters=dead_letters
+            )
+            
+            # From now on the scheduler keeps this hotel up to date incrementally. A
+            # cancelled ingest skipped some reviews, possibly older than those it
+            # stored, so the mark stays put; the next sync skips the stored ones
+            state = incremental_ingestion_job.track(db, hotel_id)
+            if not cancelled.is_set():
+                incremental_ingestion_job.advance(state, processed_reviews)
+            usage = {
+                "reviews_count": len(processed_reviews),
+                "failed_reviews": len(dead_letters),
+                "prompt_tokens": sum(review.prompt_tokens or 0 for review in processed_reviews),
+                "completion_tokens": sum(review.completion_tokens or 0 for review in processed_reviews)
             }
+            db.commit()
+            return usage
+        
+        finally:
+            db.close()
+    
+    def in_flight_count(self) -> int:
+        """Ingests queued or running in this process."""
+        return len(self._cancel_events)
     
     def get_task_status(self, task_id: str) -> dict:
-        return self.tasks.get(task_id, {"status": "not_found", "message": "Task not found"})
+        db = self.session_factory()
+        try:
+            task = db.get(IngestTask, task_id)
+        finally:
+            db.close()
+        if task is None:
+            return {"status": "not_found", "message": "Task not found"}
+        
+        status = {"status": task.status, "hotel_id": task.hotel_id, "message": task.message}
+        for field in USAGE_FIELDS:
+            value = getattr(task, field)
+            if value is not None:
+                status[field] = value
+        return status
 
 
 # Singleton instance
-background_task_manager = BackgroundTaskManager()
\ No newline at end of file
+background_task_manager = BackgroundTaskManager()
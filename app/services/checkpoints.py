@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta
+from typing import Optional, Sequence
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import JobCheckpoint
+
+
+def get_checkpoint(db: Session, job_name: str, key: str = "") -> JobCheckpoint:
+    """Load a job's high-water mark, creating it at zero on first use."""
+    checkpoint = db.get(JobCheckpoint, (job_name, key))
+    if checkpoint is None:
+        checkpoint = JobCheckpoint(job_name=job_name, key=key, last_review_id=0)
+        db.add(checkpoint)
+        db.flush()
+    return checkpoint
+
+
+def settled_before(now: Optional[datetime] = None) -> datetime:
+    """Reviews processed before this time are assumed committed (see :func:`settled`)."""
+    return (now or datetime.utcnow()) - timedelta(seconds=settings.CHECKPOINT_SAFETY_LAG_SECONDS)
+
+
+def settled(rows: Sequence, cutoff: datetime) -> Sequence:
+    """The leading rows (in id order) processed before ``cutoff``.
+
+    Ids are allocated at insert but become visible at commit, so a review
+    can appear after a higher id was already read past; a checkpoint moved
+    to that higher id would skip it for good. Stopping at the first recent
+    row leaves the last CHECKPOINT_SAFETY_LAG_SECONDS of inserts, and any
+    gaps among them, for the next run.
+    """
+    for index, row in enumerate(rows):
+        if row.processed_at is not None and row.processed_at >= cutoff:
+            return rows[:index]
+    return rows
@@ -0,0 +1,92 @@
+"""Arrow/Parquet representation of ``Review`` rows, for files kept outside the database.
+
+pyarrow is imported on first use: the API never needs it, and it would
+otherwise add to every worker's start-up time.
+"""
+import enum
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence
+from app.models import Review
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+# Every column of the table, in table order
+REVIEW_COLUMNS = [column.name for column in Review.__table__.columns]
+# What analysts query: everything but the near-duplicate and similarity search signatures
+SNAPSHOT_COLUMNS = [name for name in REVIEW_COLUMNS if name not in ("minhash", "embedding")]
+
+PARQUET_COMPRESSION = "zstd"
+
+
+def review_schema() -> "pa.Schema":
+    import pyarrow as pa
+
+    types = {
+        "id": pa.int64(),
+        "hotel_id": pa.string(),
+        "review_text": pa.string(),
+        "author": pa.string(),
+        "rating": pa.float64(),
+        "review_date": pa.timestamp("us"),
+        # A handful of distinct values: stored once, rows keep small integer codes
+        "sentiment": pa.dictionary(pa.int8(), pa.string()),
+        "topics": pa.string(),
+        "urgency": pa.dictionary(pa.int8(), pa.string()),
+        "analysis_model": pa.dictionary(pa.int32(), pa.string()),
+        "prompt_version": pa.int32(),
+        "needs_reanalysis": pa.bool_(),
+        "prompt_tokens": pa.int32(),
+        "completion_tokens": pa.int32(),
+        "minhash": pa.binary(),
+        "canonical_review_id": pa.int64(),
+        "embedding": pa.binary(),
+        "processed_at": pa.timestamp("us"),
+        "processed_by": pa.int64(),
+    }
+    return pa.schema([(name, types[name]) for name in REVIEW_COLUMNS])
+
+
+def snapshot_schema() -> "pa.Schema":
+    """``SNAPSHOT_COLUMNS`` with topics as a list of dictionary codes, plus the processing month."""
+    import pyarrow as pa
+
+    schema = review_schema()
+    fields = [schema.field(name) for name in SNAPSHOT_COLUMNS]
+    fields[SNAPSHOT_COLUMNS.index("topics")] = pa.field("topics", pa.list_(pa.dictionary(pa.int32(), pa.string())))
+    return pa.schema(fields + [pa.field("month", pa.string())])
+
+
+def _plain(value: Any) -> Any:
+    return value.value if isinstance(value, enum.Enum) else value
+
+
+def split_topics(value: Optional[str]) -> Optional[List[str]]:
+    """The stored comma-separated topics as a list, split the way the dashboard splits them."""
+    return [t.strip() for t in value.split(',')] if value else None
+
+
+def _columns(rows: Sequence[Sequence[Any]], names: List[str]) -> Dict[str, List[Any]]:
+    columns: Dict[str, List[Any]] = {name: [] for name in names}
+    for row in rows:
+        for name, value in zip(names, row):
+            columns[name].append(_plain(value))
+    return columns
+
+
+def _table(columns: Dict[str, List[Any]], schema: "pa.Schema") -> "pa.Table":
+    import pyarrow as pa
+
+    return pa.Table.from_arrays([pa.array(columns[field.name], type=field.type) for field in schema], schema=schema)
+
+
+def reviews_to_table(rows: Sequence[Sequence[Any]]) -> "pa.Table":
+    """Rows selected as ``REVIEW_COLUMNS`` (in that order) as an Arrow table."""
+    return _table(_columns(rows, REVIEW_COLUMNS), review_schema())
+
+
+def reviews_to_snapshot(rows: Sequence[Sequence[Any]]) -> "pa.Table":
+    """Rows selected as ``SNAPSHOT_COLUMNS`` (in that order) as an Arrow table in ``snapshot_schema``."""
+    columns = _columns(rows, SNAPSHOT_COLUMNS)
+    columns["topics"] = [split_topics(value) for value in columns["topics"]]
+    columns["month"] = [f"{value:%Y-%m}" if value else None for value in columns["processed_at"]]
+    return _table(columns, snapshot_schema())
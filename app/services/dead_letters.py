@@ -0,0 +1,112 @@
+import json
+import logging
+from datetime import datetime
+from typing import Any, Optional
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import DeadLetterReview
+from app.schemas import LLMAnalysisResult
+from app.services.embeddings import embed_texts
+from app.services.llm_analyzer import FALLBACK_MODEL
+from app.services.review_ingestion import review_ingestion_service
+
+logger = logging.getLogger(__name__)
+
+
+def decode_payload(payload: str) -> Any:
+    review_data = json.loads(payload)
+    # Dates were stored with str(); everything else round-trips through JSON
+    if isinstance(review_data, dict) and isinstance(review_data.get("date"), str):
+        try:
+            review_data["date"] = datetime.fromisoformat(review_data["date"])
+        except ValueError:
+            pass
+    return review_data
+
+
+class DeadLetterRetryJob:
+    """Re-processes reviews that failed to store during ingestion.
+
+    Dead letters are walked in id order in batches and, as during ingestion,
+    each review is committed on its own. A stored review deletes its dead
+    letter; a failing one has its attempt count and error updated and is given
+    up on after ``max_attempts``. Labels the LLM already produced are reused.
+    """
+
+    name = "dead_letter_retry"
+
+    def __init__(self, batch_size: int, max_attempts: int):
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+
+    def run(self, db: Session, hotel_id: Optional[str] = None) -> int:
+        """Retry every eligible dead letter once; returns how many were stored."""
+        cursor = 0
+        recovered = 0
+
+        while True:
+            query = db.query(DeadLetterReview).filter(
+                DeadLetterReview.id > cursor,
+                DeadLetterReview.attempts < self.max_attempts
+            )
+            if hotel_id is not None:
+                query = query.filter(DeadLetterReview.hotel_id == hotel_id)
+            letters = query.order_by(DeadLetterReview.id).limit(self.batch_size).all()
+            if not letters:
+                break
+
+            cursor = letters[-1].id
+            recovered += self._retry_batch(db, letters)
+
+        if recovered:
+            logger.info("Recovered %d dead-letter reviews", recovered)
+        return recovered
+
+    def _retry_batch(self, db: Session, letters: list) -> int:
+        payloads = []
+        for letter in letters:
+            try:
+                review_data = decode_payload(letter.payload)
+            except ValueError as e:
+                review_data = None
+                error = f"unreadable payload: {e}"
+            else:
+                error = review_ingestion_service.payload_error(review_data)
+            payloads.append((letter, review_data, error))
+
+        embeddings = iter(embed_texts([review_data["text"] for _, review_data, error in payloads if error is None]))
+
+        recovered = 0
+        now = datetime.utcnow()
+        for letter, review_data, error in payloads:
+            if error is None:
+                embedding = next(embeddings)
+                analysis = None
+                try:
+                    if letter.analysis:
+                        analysis = LLMAnalysisResult.model_validate_json(letter.analysis)
+                    review, signature, analysis = review_ingestion_service.prepare_review(
+                        db, letter.hotel_id, review_data, embedding, letter.processed_by, analysis=analysis
+                    )
+                    review_ingestion_service.add_review(db, review, signature)
+                    db.delete(letter)
+                    db.commit()
+                    recovered += 1
+                    continue
+                except Exception as e:
+                    db.rollback()
+                    error = str(e)
+                if letter.analysis is None and analysis is not None and analysis.model != FALLBACK_MODEL:
+                    letter.analysis = analysis.model_dump_json()
+
+            letter.attempts += 1
+            letter.error = error
+            letter.last_attempt_at = now
+            db.commit()
+        return recovered
+
+
+dead_letter_retry_job = DeadLetterRetryJob(
+    batch_size=settings.DEAD_LETTER_RETRY_BATCH_SIZE,
+    max_attempts=settings.DEAD_LETTER_MAX_ATTEMPTS
+)
@@ -0,0 +1,99 @@
+import re
+import zlib
+from typing import List, Optional
+import numpy as np
+from app.config import settings
+
+_WORD_RE = re.compile(r"\w+")
+
+# One-byte tag in front of every stored vector so the encoding can change
+# without invalidating rows written earlier
+_INT8, _FLOAT16 = 1, 2
+
+
+class HashingEmbedder:
+    """Dependency-free embedder: signed feature hashing of word unigrams and
+    bigrams with sublinear term frequency, L2-normalized."""
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        words = _WORD_RE.findall(text.lower())
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            hashes = np.fromiter(
+                (zlib.crc32(f.encode()) for f in self._features(text)), dtype=np.uint32
+            )
+            if not len(hashes):
+                continue
+            signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+            np.add.at(vectors[row], hashes % self.dim, signs)
+
+        vectors = np.sign(vectors) * np.log1p(np.abs(vectors))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+class SentenceTransformerEmbedder:
+    """Local CPU transformer model; needs the optional sentence-transformers package."""
+
+    def __init__(self, model_name: str):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise RuntimeError(
+                "EMBEDDING_BACKEND=sentence-transformers requires `pip install sentence-transformers`"
+            ) from e
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(
+            texts, batch_size=64, normalize_embeddings=True, convert_to_numpy=True
+        ).astype(np.float32)
+
+
+def encode_vector(vector: np.ndarray, dtype: str = "int8") -> bytes:
+    """Compact storage for a unit vector: int8 (dim bytes) or float16 (2*dim bytes)."""
+    if dtype == "float16":
+        return bytes([_FLOAT16]) + vector.astype(np.float16).tobytes()
+    quantized = np.clip(np.rint(vector * 127), -127, 127).astype(np.int8)
+    return bytes([_INT8]) + quantized.tobytes()
+
+
+def decode_vector(blob: bytes) -> np.ndarray:
+    if blob[0] == _FLOAT16:
+        return np.frombuffer(blob, dtype=np.float16, offset=1).astype(np.float32)
+    return np.frombuffer(blob, dtype=np.int8, offset=1).astype(np.float32) / 127
+
+
+def decode_int8(blob: bytes) -> np.ndarray:
+    """Stored vector as int8 scaled by 127, the in-memory format of the ANN index."""
+    if blob[0] == _FLOAT16:
+        return np.clip(np.rint(decode_vector(blob) * 127), -127, 127).astype(np.int8)
+    return np.frombuffer(blob, dtype=np.int8, offset=1)
+
+
+_embedder = None
+
+
+def get_embedder():
+    """Build the configured embedder on first use."""
+    global _embedder
+    if _embedder is None:
+        if settings.EMBEDDING_BACKEND == "sentence-transformers":
+            _embedder = SentenceTransformerEmbedder(settings.EMBEDDING_MODEL)
+        else:
+            _embedder = HashingEmbedder(settings.EMBEDDING_DIM)
+    return _embedder
+
+
+def embed_texts(texts: List[str]) -> List[Optional[bytes]]:
+    if not settings.EMBEDDINGS_ENABLED or not texts:
+        return [None] * len(texts)
+    vectors = get_embedder().embed(texts)
+    return [encode_vector(v, settings.EMBEDDING_STORAGE_DTYPE) for v in vectors]
@@ -0,0 +1,171 @@
+import logging
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable, List
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from app import metrics
+from app.config import settings
+from app.database import SessionLocal
+from app.models import HotelIngestState, Review
+from app.services.review_ingestion import review_ingestion_service
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Thread-safe token bucket; ``take`` grants as many tokens as are available."""
+
+    def __init__(self, rate_per_second: float, capacity: float):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, wanted: int) -> int:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            granted = min(wanted, int(self.tokens))
+            self.tokens -= granted
+            return granted
+
+
+class IncrementalIngestionJob:
+    """Periodically fetches only new reviews for every tracked hotel.
+
+    Hotels are hashed into ``slots`` evenly spaced ticks per ``interval_seconds``
+    so that load is spread out instead of every hotel syncing at once. A tick
+    syncs its hotels on a bounded thread pool, and each sync is capped by a
+    shared LLM budget; reviews over budget stay above the high-water mark and
+    are picked up on a later run.
+    """
+
+    name = "incremental_ingestion"
+
+    def __init__(self, interval_seconds: float, slots: int, batch_limit: int, max_concurrency: int,
+                 llm_calls_per_hour: int, session_factory: Callable[[], Session] = SessionLocal):
+        self.interval_seconds = interval_seconds
+        self.slots = slots
+        self.batch_limit = batch_limit
+        self.max_concurrency = max_concurrency
+        self.session_factory = session_factory
+        self.budget = TokenBucket(llm_calls_per_hour / 3600, capacity=llm_calls_per_hour)
+
+    @property
+    def tick_seconds(self) -> float:
+        return self.interval_seconds / self.slots
+
+    def slot_for(self, hotel_id: str) -> int:
+        return zlib.crc32(hotel_id.encode()) % self.slots
+
+    def current_slot(self, now: datetime) -> int:
+        return int(now.timestamp() // self.tick_seconds) % self.slots
+
+    def track(self, db: Session, hotel_id: str) -> HotelIngestState:
+        state = db.get(HotelIngestState, hotel_id)
+        if state is None:
+            state = HotelIngestState(hotel_id=hotel_id, slot=self.slot_for(hotel_id), enabled=True, deferred_reviews=0)
+            db.add(state)
+            db.flush()
+        return state
+
+    def advance(self, state: HotelIngestState, reviews: List[Review], seen: Iterable[datetime] = ()):
+        """Move the high-water mark past ``reviews`` and the review dates in ``seen`` (reviews already stored)."""
+        dates = [review.review_date for review in reviews if review.review_date is not None] + list(seen)
+        if dates and (state.last_review_date is None or max(dates) > state.last_review_date):
+            state.last_review_date = max(dates)
+        if reviews:
+            state.last_review_id = max(review.id for review in reviews)
+
+    def due_hotels(self, db: Session, now: datetime) -> List[str]:
+        # Never synced, in this tick's slot, or overdue because slots were missed (e.g. a restart)
+        rows = db.query(HotelIngestState.hotel_id).filter(
+            HotelIngestState.enabled.is_(True),
+            or_(
+                HotelIngestState.last_run_at.is_(None),
+                (HotelIngestState.slot == self.current_slot(now))
+                & (HotelIngestState.last_run_at < now - timedelta(seconds=self.interval_seconds / 2)),
+                HotelIngestState.last_run_at < now - timedelta(seconds=self.interval_seconds * 2)
+            )
+        ).order_by(HotelIngestState.last_run_at).all()
+        return [row.hotel_id for row in rows]
+
+    def run(self, db: Session, now: datetime = None) -> int:
+        hotel_ids = self.due_hotels(db, now or datetime.utcnow())
+        if not hotel_ids:
+            return 0
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="ingest") as pool:
+            return sum(pool.map(self.sync_hotel, hotel_ids))
+
+    def sync_hotel(self, hotel_id: str) -> int:
+        """Fetch, analyze and store one hotel's new reviews; returns how many were stored."""
+        db = self.session_factory()
+        started = datetime.utcnow()
+        stored = 0
+        deferred = 0
+        review_lag = None
+        try:
+            state = db.get(HotelIngestState, hotel_id)
+            try:
+                fetched = review_ingestion_service.fetch_google_reviews(
+                    hotel_id, self.batch_limit, since=state.last_review_date
+                )
+                # Oldest first, so a partial batch leaves the high-water mark before the rest
+                fetched.sort(key=lambda review: review.get("date") or datetime.min)
+                # The fetch includes the mark's own date, so reviews stored last time come back
+                new = review_ingestion_service.drop_known(db, hotel_id, fetched)
+                granted = self.budget.take(len(new))
+                deferred = len(new) - granted
+
+                # Known reviews move the mark too, unless they are past the first deferred one
+                horizon = new[granted].get("date") or datetime.min if deferred else None
+                new_ids = {id(review) for review in new}
+                seen = [
+                    review["date"] for review in fetched
+                    if id(review) not in new_ids and review.get("date") and (horizon is None or review["date"] < horizon)
+                ]
+                reviews = []
+                if granted:
+                    reviews = review_ingestion_service.process_reviews(hotel_id, new[:granted], db)
+                    stored = len(reviews)
+                    dates = [review["date"] for review in new[:granted] if review.get("date")]
+                    review_lag = (datetime.utcnow() - min(dates)).total_seconds() if dates else None
+                self.advance(state, reviews, seen)
+                state.last_success_at = started
+                state.last_error = None
+            except Exception as e:
+                db.rollback()
+                state = db.get(HotelIngestState, hotel_id)
+                state.last_error = str(e)
+                logger.exception("Scheduled ingestion failed for hotel %s", hotel_id)
+
+            state.last_run_at = started
+            state.deferred_reviews = deferred
+            succeeded = state.last_error is None
+            db.commit()
+
+            metrics.record_hotel_sync(
+                hotel_id,
+                succeeded_at=started.replace(tzinfo=timezone.utc).timestamp() if succeeded else None,
+                review_lag=review_lag,
+                deferred=deferred
+            )
+            return stored
+        finally:
+            db.close()
+
+
+incremental_ingestion_job = IncrementalIngestionJob(
+    interval_seconds=settings.INGEST_SCHEDULE_INTERVAL_SECONDS,
+    slots=settings.INGEST_SCHEDULE_SLOTS,
+    batch_limit=settings.INGEST_SCHEDULE_BATCH_LIMIT,
+    max_concurrency=settings.INGEST_MAX_CONCURRENCY,
+    llm_calls_per_hour=settings.LLM_CALLS_PER_HOUR
+)
@@ -0,0 +1,146 @@
+import logging
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import HotelDailyStats, HotelLeaderboard, HotelTopicStats, Review, SentimentType
+from app.services.analytics import percentile_ranks, rank_hotels
+from app.services.checkpoints import get_checkpoint, settled, settled_before
+from app.services.columnar import split_topics
+
+logger = logging.getLogger(__name__)
+
+
+def add_topic_mentions(db: Session, mentions: Dict[Tuple[str, str], int]):
+    """Add ``(hotel_id, topic) -> mentions`` (negative to remove) to ``hotel_topic_stats``."""
+    for (hotel_id, topic), count in mentions.items():
+        if not count:
+            continue
+        stats = db.get(HotelTopicStats, (hotel_id, topic))
+        if stats is None:
+            stats = HotelTopicStats(hotel_id=hotel_id, topic=topic, negative=0)
+            db.add(stats)
+        stats.negative += count
+
+
+def negative_mentions(hotel_id: str, sentiment: Optional[SentimentType], topics: Optional[str]) -> Counter:
+    """Topic mentions a review adds to its hotel's hotspots: those of negative reviews only."""
+    if sentiment != SentimentType.NEGATIVE:
+        return Counter()
+    return Counter((hotel_id, topic) for topic in split_topics(topics) or ())
+
+
+class HotelLeaderboardJob:
+    """Recomputes ``hotel_leaderboard``: every hotel's negative share and escalation rate, ranked.
+
+    Counts are summed from ``hotel_daily_stats``, the escalation roll-up,
+    which keeps counting reviews after they are archived and is corrected
+    when re-analysis changes labels; near-duplicates are left out there, so
+    reposts of one complaint do not move a hotel up the board. The board
+    therefore trails new reviews by the roll-up's schedule. Negative topic
+    mentions for the hotspots are added to ``hotel_topic_stats`` from a
+    checkpoint, in batches of ``batch_size`` new reviews; the archive job
+    waits for that checkpoint too. Neither step reads reviews already
+    counted. Only hotels with at least ``min_reviews`` reviews get a rank and
+    percentile. The table is replaced in one transaction, so readers see
+    either the old board or the new one.
+    """
+
+    name = "hotel_leaderboard"
+
+    def __init__(self, min_reviews: int, batch_size: int = 50000):
+        self.min_reviews = min_reviews
+        self.batch_size = batch_size
+
+    def count_topics(self, db: Session, cutoff: Optional[datetime] = None) -> int:
+        """Add negative topic mentions of reviews past the checkpoint; returns how many reviews were read."""
+        checkpoint = get_checkpoint(db, self.name)
+        cutoff = cutoff or settled_before()
+        processed = 0
+
+        while True:
+            rows = db.query(
+                Review.id, Review.hotel_id, Review.sentiment, Review.topics,
+                Review.canonical_review_id, Review.processed_at
+            ).filter(
+                Review.id > checkpoint.last_review_id
+            ).order_by(Review.id).limit(self.batch_size).all()
+            rows = settled(rows, cutoff)
+            if not rows:
+                break
+
+            mentions = Counter()
+            for row in rows:
+                if row.canonical_review_id is None:
+                    mentions.update(negative_mentions(row.hotel_id, row.sentiment, row.topics))
+            add_topic_mentions(db, mentions)
+
+            checkpoint.last_review_id = rows[-1].id
+            db.commit()
+            processed += len(rows)
+
+        db.commit()
+        return processed
+
+    def _top_topics(self, db: Session) -> Dict[str, str]:
+        """Each hotel's most mentioned negative topic (ties broken by name)."""
+        top: Dict[str, str] = {}
+        for hotel_id, topic in db.query(HotelTopicStats.hotel_id, HotelTopicStats.topic).filter(
+            HotelTopicStats.negative > 0
+        ).order_by(HotelTopicStats.hotel_id, HotelTopicStats.negative.desc(), HotelTopicStats.topic):
+            top.setdefault(hotel_id, topic)
+        return top
+
+    def run(self, db: Session, now: Optional[datetime] = None) -> int:
+        """Rebuild the leaderboard; returns how many hotels it lists."""
+        self.count_topics(db, settled_before(now))
+        top_topics = self._top_topics(db)
+
+        rows = db.query(
+            HotelDailyStats.hotel_id,
+            func.sum(HotelDailyStats.total),
+            func.sum(HotelDailyStats.negative),
+            func.sum(HotelDailyStats.critical)
+        ).group_by(HotelDailyStats.hotel_id).all()
+        hotel_ids = [hotel_id for hotel_id, *_ in rows]
+        counts = np.array([counts for _, *counts in rows], dtype=np.int64).reshape(-1, 3)
+
+        total, negative, critical = counts.T
+        # Ranked on the rounded values served, so hotels showing the same rate share a rank
+        negative_percent = np.round(negative * 100 / np.maximum(total, 1), 2)
+        escalation_rate = np.round(critical * 100 / np.maximum(total, 1), 2)
+        eligible = total >= max(self.min_reviews, 1)
+        negative_rank = rank_hotels(negative_percent, eligible)
+        escalation_rank = rank_hotels(escalation_rate, eligible)
+        negative_percentile = percentile_ranks(negative_percent, eligible)
+        escalation_percentile = percentile_ranks(escalation_rate, eligible)
+
+        refreshed_at = now or datetime.utcnow()
+        db.query(HotelLeaderboard).delete(synchronize_session=False)
+        db.add_all([
+            HotelLeaderboard(
+                hotel_id=hotel_id,
+                total_reviews=int(total[i]),
+                negative_reviews=int(negative[i]),
+                critical_reviews=int(critical[i]),
+                negative_percent=float(negative_percent[i]),
+                escalation_rate=float(escalation_rate[i]),
+                negative_rank=int(negative_rank[i]) if eligible[i] else None,
+                escalation_rank=int(escalation_rank[i]) if eligible[i] else None,
+                negative_percentile=float(negative_percentile[i]) if eligible[i] else None,
+                escalation_percentile=float(escalation_percentile[i]) if eligible[i] else None,
+                top_negative_topic=top_topics.get(hotel_id),
+                refreshed_at=refreshed_at
+            )
+            for i, hotel_id in enumerate(hotel_ids)
+        ])
+        db.commit()
+
+        logger.info("Leaderboard refreshed: %d hotels, %d ranked", len(hotel_ids), int(eligible.sum()))
+        return len(hotel_ids)
+
+
+hotel_leaderboard_job = HotelLeaderboardJob(min_reviews=settings.LEADERBOARD_MIN_REVIEWS)
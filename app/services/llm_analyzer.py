@@ -1,45 +1,214 @@
 import json
-from typing import Dict, Any
-from openai import OpenAI
+import logging
+import math
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, Any, List, Optional
+from app import metrics
 from app.config import settings
 from app.schemas import LLMAnalysisResult
 from app.models import SentimentType, UrgencyType
+from app.services.llm_providers import CircuitOpenError, LLMProvider, ProviderPool, build_providers
+from app.services.tokens import TokenCounter
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever a prompt changes so stored labels can be re-scored
+PROMPT_VERSION = 1
+COMPACT_PROMPT_VERSION = 2
+FALLBACK_MODEL = "fallback"
+
+# Built once: parsing runs for every review
+_SENTIMENTS = {sentiment.value: sentiment for sentiment in SentimentType}
+_URGENCIES = {urgency.value: urgency for urgency in UrgencyType}
+_TOPICS = frozenset(["Cleanliness", "Service", "Amenities", "Location", "Value"])
+
+# Shared by all analyses so that hedged and failover attempts cannot pile up unboundedly
+_call_pool = ThreadPoolExecutor(max_workers=settings.LLM_MAX_CONCURRENT_CALLS, thread_name_prefix="llm")
 
 
 class LLMAnalyzer:
     
-    def __init__(self):
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        self.model = settings.OPENAI_MODEL
+    def __init__(self, providers: ProviderPool = None):
+        # Without explicit providers the clients are built on first use, so that
+        # importing the app (and starting a worker) does not pay for them
+        self._providers = providers
+        self._tokens: Optional[TokenCounter] = None
+        self._build_lock = threading.Lock()
+        self.compact = settings.LLM_COMPACT_PROMPT
+        self.prompt_version = COMPACT_PROMPT_VERSION if self.compact else PROMPT_VERSION
+    
+    @property
+    def providers(self) -> ProviderPool:
+        if self._providers is None:
+            with self._build_lock:
+                if self._providers is None:
+                    self._providers = build_providers()
+        return self._providers
     
-    def analyze_review(self, review_text: str) -> LLMAnalysisResult:
+    # The primary provider defines the model that analyses are versioned against
+    @property
+    def client(self):
+        return self.providers.primary.client
+    
+    @property
+    def model(self) -> str:
+        return self.providers.primary.model
+    
+    # Any configured provider may have answered; none of their labels is stale
+    @property
+    def models(self) -> List[str]:
+        return [provider.model for provider in self.providers.providers]
+    
+    @property
+    def tokens(self) -> TokenCounter:
+        if self._tokens is None:
+            self._tokens = TokenCounter(self.model)
+        return self._tokens
+    
+    def analyze_review(self, review_text: str, deadline: Optional[float] = None) -> LLMAnalysisResult:
+        """Analyze one review, never waiting past ``deadline`` (a ``time.monotonic()`` value)."""
         
-        prompt = self._create_analysis_prompt(review_text)
+        # Very long reviews cost more and answer slower without classifying any better
+        text = self.tokens.truncate(review_text, settings.LLM_MAX_REVIEW_TOKENS)
+        if self.compact:
+            system = "You classify hotel reviews and reply with JSON only."
+            prompt = self._create_compact_prompt(text)
+        else:
+            system = "You are an expert hotel review analyzer. Analyze reviews and return structured JSON data."
+            prompt = self._create_analysis_prompt(text)
+        messages = [
+            {
+                "role": "system",
+                "content": system
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+        analysis_deadline = time.monotonic() + settings.LLM_ANALYSIS_DEADLINE_SECONDS
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert hotel review analyzer. Analyze reviews and return structured JSON data."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
+            parsed = self._first_success(messages, min(deadline or analysis_deadline, analysis_deadline))
+        except Exception as e:
+            # Fallback to basic analysis if every provider failed or time ran out
+            metrics.record_analysis("fallback")
+            logger.warning("LLM analysis failed, using fallback: %s", e)
+            return self._fallback_analysis(review_text)
+        
+        metrics.record_analysis("llm")
+        return parsed
+    
+    def _first_success(self, messages: List[Dict[str, str]], deadline: float) -> LLMAnalysisResult:
+        """Race attempts until one succeeds.
+        
+        The healthiest provider is tried first. A failure fails over to the next
+        provider straight away; an attempt still running after the provider's p95
+        latency is hedged with a second one. Whichever answers first wins; attempts
+        that have not started are cancelled and running ones are abandoned (their
+        per-call timeout ends them by the deadline at the latest). Providers with
+        an open circuit are skipped, so during an outage this fails immediately.
+        """
+        if time.monotonic() >= deadline:
+            raise TimeoutError("LLM analysis deadline exceeded")
+        
+        providers = self.providers.ordered()
+        if not providers:
+            raise CircuitOpenError("every LLM provider circuit is open")
+        failover = providers[1:]
+        pending: Dict[Future, LLMProvider] = {}
+        hedge = None
+        error: Optional[Exception] = None
+        
+        def launch(provider: LLMProvider) -> Optional[Future]:
+            timeout = min(settings.LLM_CALL_TIMEOUT_SECONDS, deadline - time.monotonic())
+            if timeout <= 0:
+                return None
+            future = _call_pool.submit(self._attempt, provider, messages, timeout)
+            pending[future] = provider
+            return future
+        
+        launch(providers[0])
+        hedge_delay = providers[0].latency_quantile(0.95) if settings.LLM_HEDGING_ENABLED else None
+        hedge_at = time.monotonic() + hedge_delay if hedge_delay is not None else math.inf
+        
+        try:
+            while pending:
+                now = time.monotonic()
+                if now >= deadline:
+                    break
+                done, _ = wait(pending, timeout=min(hedge_at, deadline) - now, return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        error = e
+                        if failover:
+                            launch(failover.pop(0))
+                        continue
+                    if future is hedge:
+                        metrics.record_hedge("won")
+                    return result
+                
+                if hedge is None and pending and time.monotonic() >= hedge_at:
+                    # Prefer a different backend for the hedge; with one provider, ask it twice
+                    hedge = launch(failover.pop(0) if failover else providers[0])
+                    hedge_at = math.inf
+                    metrics.record_hedge("fired")
+        finally:
+            for future in pending:
+                future.cancel()
+        
+        raise error or TimeoutError("LLM analysis deadline exceeded")
+    
+    def _attempt(self, provider: LLMProvider, messages: List[Dict[str, str]], timeout: float) -> LLMAnalysisResult:
+        # Another caller may have taken the half-open probe since ordered() was called
+        if not provider.breaker.acquire():
+            raise CircuitOpenError(f"LLM provider {provider.name} circuit is open")
+        
+        started = time.perf_counter()
+        response = None
+        
+        try:
+            response = provider.client.chat.completions.create(
+                model=provider.model,
+                messages=messages,
                 temperature=0.3,
-                response_format={"type": "json_object"}
+                response_format={"type": "json_object"},
+                max_tokens=settings.LLM_MAX_COMPLETION_TOKENS,
+                timeout=timeout
             )
-            
-            result = json.loads(response.choices[0].message.content)
-            return self._parse_llm_response(result)
-            
+            content = response.choices[0].message.content
+            result = json.loads(content)
+            parsed = self._parse_llm_response(result)
         except Exception as e:
-            # Fallback to basic analysis if LLM fails
-            print(f"LLM analysis failed: {e}")
-            return self._fallback_analysis(review_text)
+            elapsed = time.perf_counter() - started
+            provider.record_failure(elapsed)
+            if response is None:
+                metrics.observe_llm_call(provider.model, "error", elapsed)
+            logger.warning("LLM provider %s failed: %s", provider.name, e)
+            raise
+        
+        elapsed = time.perf_counter() - started
+        provider.record_success(elapsed)
+        metrics.observe_llm_call(provider.model, "success", elapsed, getattr(response, "usage", None))
+        parsed.model = provider.model
+        
+        # Billed counts when the backend reports them, local counts otherwise
+        usage = getattr(response, "usage", None)
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        parsed.prompt_tokens = prompt_tokens if isinstance(prompt_tokens, int) else self.tokens.count_messages(messages)
+        parsed.completion_tokens = completion_tokens if isinstance(completion_tokens, int) else self.tokens.count(content)
+        return parsed
+    
+    def available(self) -> bool:
+        """Whether any provider would currently be called (rather than falling back)."""
+        return bool(self.providers.ordered())
     
     def _create_analysis_prompt(self, review_text: str) -> str:
         return f"""Analyze the following hotel review and provide a JSON response with these fields:
@@ -61,30 +230,31 @@ Return ONLY valid JSON in this exact format:
     "reasoning": "explanation"
 }}"""
     
+    def _create_compact_prompt(self, review_text: str) -> str:
+        # Same fields and rules as _create_analysis_prompt in about 40% fewer tokens; the
+        # JSON template stays, or models answer e.g. "topics": "Service, Location"
+        return f"""Classify the hotel review. Return ONLY JSON in this format:
+{{"sentiment": "Positive|Negative|Neutral", "topics": ["topic1", "topic2"], "urgency": "Critical|Standard", "reasoning": "one short sentence"}}
+topics: a list of any of Cleanliness, Service, Amenities, Location, Value
+urgency: Critical if safety, health (food poisoning, bed bugs), severe dirt, theft, discrimination or violence; else Standard
+Review: "{review_text}\""""
+    
     def _parse_llm_response(self, result: Dict[str, Any]) -> LLMAnalysisResult:
-        sentiment = result.get("sentiment", "Neutral")
-        topics = result.get("topics", [])
-        urgency = result.get("urgency", "Standard")
-        reasoning = result.get("reasoning", "")
-        
-        try:
-            sentiment_enum = SentimentType(sentiment)
-        except ValueError:
-            sentiment_enum = SentimentType.NEUTRAL
-        
-        try:
-            urgency_enum = UrgencyType(urgency)
-        except ValueError:
-            urgency_enum = UrgencyType.STANDARD
-        
-        valid_topics = ["Cleanliness", "Service", "Amenities", "Location", "Value"]
-        filtered_topics = [t for t in topics if t in valid_topics]
-        
+        """Map a model's JSON answer onto the closed label sets, defaulting anything unknown."""
+        topics = result.get("topics")
+        if isinstance(topics, str):
+            topics = [topic.strip() for topic in topics.split(",")]
+        elif not isinstance(topics, list):
+            topics = ()
+        # Only strings are looked up: a list or object is unhashable and would raise,
+        # which would count as a provider failure rather than an off-label answer
+        sentiment = result.get("sentiment")
+        urgency = result.get("urgency")
         return LLMAnalysisResult(
-            sentiment=sentiment_enum,
-            topics=filtered_topics if filtered_topics else ["Service"],
-            urgency=urgency_enum,
-            reasoning=reasoning
+            sentiment=isinstance(sentiment, str) and _SENTIMENTS.get(sentiment) or SentimentType.NEUTRAL,
+            topics=[t for t in topics if isinstance(t, str) and t in _TOPICS] or ["Service"],
+            urgency=isinstance(urgency, str) and _URGENCIES.get(urgency) or UrgencyType.STANDARD,
+            reasoning=str(result.get("reasoning") or "")
         )
     
     def _fallback_analysis(self, review_text: str) -> LLMAnalysisResult:
@@ -122,7 +292,8 @@ Return ONLY valid JSON in this exact format:
             sentiment=sentiment,
             topics=topics,
             urgency=urgency,
-            reasoning="Fallback analysis due to LLM error"
+            reasoning="Fallback analysis due to LLM error",
+            model=FALLBACK_MODEL
         )
 
 
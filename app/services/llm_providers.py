@@ -0,0 +1,213 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from app import metrics
+from app.config import settings
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Closed/open/half-open circuit breaker.
+
+    ``failure_threshold`` consecutive failures open the circuit; after
+    ``reset_seconds`` it lets a single probe call through (half-open), which
+    closes it on success or re-opens it on failure.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at >= self.reset_seconds:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def available(self) -> bool:
+        state = self.state
+        return state == self.CLOSED or (state == self.HALF_OPEN and not self._probing)
+
+    def acquire(self) -> bool:
+        """Claim permission for one call; in half-open state only one caller gets it."""
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> bool:
+        """Returns True if this closed the circuit."""
+        with self._lock:
+            was_open = self._opened_at is not None
+            self.failures = 0
+            self._opened_at = None
+            self._probing = False
+            return was_open
+
+    def record_failure(self) -> bool:
+        """Returns True if this opened (or re-opened) the circuit."""
+        with self._lock:
+            self.failures += 1
+            if self._probing or (self._opened_at is None and self.failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self._probing = False
+                return True
+            return False
+
+
+class LLMProvider:
+    """One OpenAI-compatible backend (OpenAI itself, Azure, vLLM, llama.cpp, ...)
+    with a running health estimate.
+
+    Health is an EWMA of latency and success rate. Failures are forgiven over
+    time (half-life ``recovery_seconds``) so that a provider that was demoted
+    during an incident gets traffic again once it has had time to recover.
+    """
+
+    def __init__(self, name: str, client: "OpenAI", model: str, alpha: float = 0.2, recovery_seconds: float = 60.0,
+                 min_samples: int = 20, breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self.client = client
+        self.model = model
+        self.breaker = breaker or CircuitBreaker(
+            settings.LLM_CIRCUIT_FAILURE_THRESHOLD, settings.LLM_CIRCUIT_RESET_SECONDS
+        )
+        self.alpha = alpha
+        self.recovery_seconds = recovery_seconds
+        self.latency: Optional[float] = None
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=200)
+        self._success_rate = 1.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def success_rate(self) -> float:
+        elapsed = time.monotonic() - self._updated
+        return 1 - (1 - self._success_rate) * 0.5 ** (elapsed / self.recovery_seconds)
+
+    def cost(self) -> float:
+        """Expected seconds to a good answer; untried providers go first."""
+        if self.latency is None:
+            return 0.0
+        return self.latency / max(self.success_rate, 0.01)
+
+    def _record(self, ok: bool, latency: Optional[float]):
+        with self._lock:
+            self._success_rate = (1 - self.alpha) * self.success_rate + self.alpha * ok
+            self._updated = time.monotonic()
+            if latency is not None:
+                self.latency = latency if self.latency is None else (1 - self.alpha) * self.latency + self.alpha * latency
+        metrics.record_provider_health(self.name, self._success_rate)
+
+    def record_success(self, latency: float):
+        self._samples.append(latency)
+        self._record(True, latency)
+        if self.breaker.record_success():
+            logger.info("LLM provider %s recovered, circuit closed", self.name)
+        metrics.record_circuit_state(self.name, self.breaker.state)
+
+    def latency_quantile(self, q: float) -> Optional[float]:
+        """Quantile of recent successful call latencies, once there are enough of them."""
+        samples = sorted(self._samples)
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def record_failure(self, latency: float):
+        self._record(False, latency)
+        if self.breaker.record_failure():
+            logger.warning("LLM provider %s circuit opened for %.0fs", self.name, self.breaker.reset_seconds)
+        metrics.record_circuit_state(self.name, self.breaker.state)
+
+    @property
+    def healthy(self) -> bool:
+        return self.success_rate >= 0.5
+
+    def health(self) -> Dict[str, Any]:
+        p95 = self.latency_quantile(0.95)
+        return {
+            "name": self.name,
+            "model": self.model,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "success_rate": round(self.success_rate, 3),
+            "healthy": self.healthy,
+            "circuit": self.breaker.state,
+            "cost_ms": round(self.cost() * 1000, 1)
+        }
+
+
+class ProviderPool:
+    """Latency-aware routing with failover: providers are tried cheapest first."""
+
+    def __init__(self, providers: List[LLMProvider]):
+        if not providers:
+            raise ValueError("At least one LLM provider is required")
+        self.providers = providers
+
+    @property
+    def primary(self) -> LLMProvider:
+        return self.providers[0]
+
+    def ordered(self) -> List[LLMProvider]:
+        """Providers whose circuit lets a call through, best first (possibly none)."""
+        # Mostly-failing providers go last however fast they fail; the stable
+        # sort keeps configuration order among equally good providers
+        available = [provider for provider in self.providers if provider.breaker.available()]
+        return sorted(available, key=lambda provider: (not provider.healthy, provider.cost()))
+
+
+def build_providers() -> ProviderPool:
+    """Providers from ``LLM_PROVIDERS`` (JSON list), else the single OpenAI settings.
+
+    Each entry takes ``name``, ``model``, and optionally ``base_url``, ``api_key``,
+    ``timeout`` and ``max_retries``; missing values default to the OPENAI_* settings.
+    """
+    # Importing openai takes about as long as the rest of the app together
+    from openai import OpenAI
+
+    specs = json.loads(settings.LLM_PROVIDERS) if settings.LLM_PROVIDERS else [{"name": "openai"}]
+
+    providers = []
+    for spec in specs:
+        client_options = {
+            "api_key": spec.get("api_key", settings.OPENAI_API_KEY),
+            "base_url": spec.get("base_url", settings.OPENAI_BASE_URL),
+            # With somewhere to fail over to, failing over beats retrying the same backend
+            "max_retries": spec.get("max_retries", 0 if len(specs) > 1 else 2)
+        }
+        if "timeout" in spec:
+            client_options["timeout"] = spec["timeout"]
+        providers.append(LLMProvider(
+            name=spec["name"],
+            client=OpenAI(**client_options),
+            model=spec.get("model", settings.OPENAI_MODEL),
+            recovery_seconds=settings.LLM_PROVIDER_RECOVERY_SECONDS
+        ))
+    return ProviderPool(providers)
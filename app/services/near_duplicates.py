@@ -0,0 +1,107 @@
+import hashlib
+import re
+import zlib
+from typing import List, Optional
+import numpy as np
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import Review, ReviewLSHBucket
+
+_WORD_RE = re.compile(r"\w+")
+
+# Universal hashing modulo the largest 32-bit prime keeps every product in uint64
+_PRIME = np.uint64(4294967291)
+
+
+class MinHasher:
+    """MinHash signatures over word shingles, vectorized across permutations."""
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 3, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.a = rng.randint(1, int(_PRIME), size=num_perm).astype(np.uint64)
+        self.b = rng.randint(0, int(_PRIME), size=num_perm).astype(np.uint64)
+
+    def shingles(self, text: str) -> np.ndarray:
+        words = _WORD_RE.findall(text.lower())
+        k = self.shingle_size
+        grams = [" ".join(words[i:i + k]) for i in range(max(1, len(words) - k + 1))]
+        return np.fromiter({zlib.crc32(g.encode()) for g in grams}, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        hashed = (self.shingles(text)[:, None] * self.a + self.b) % _PRIME
+        return hashed.min(axis=0).astype(np.uint32)
+
+    @staticmethod
+    def similarity(left: np.ndarray, right: np.ndarray) -> float:
+        """Estimated Jaccard similarity of the underlying shingle sets."""
+        return float(np.count_nonzero(left == right)) / len(left)
+
+
+class NearDuplicateDetector:
+    """Links near-duplicate reviews of the same hotel to a canonical review.
+
+    Signatures are split into bands and each band is hashed to a bucket stored
+    in ``review_lsh_buckets``. A lookup only touches reviews sharing at least
+    one bucket, so its cost depends on the number of candidates rather than on
+    the size of the hotel's corpus.
+    """
+
+    def __init__(self, num_perm: int, bands: int, threshold: float):
+        if num_perm % bands:
+            raise ValueError("MINHASH_PERMUTATIONS must be divisible by LSH_BANDS")
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+
+    def signature(self, text: str) -> np.ndarray:
+        return self.hasher.signature(text)
+
+    def buckets(self, signature: np.ndarray) -> List[int]:
+        buckets = []
+        for band in range(self.bands):
+            chunk = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            digest = hashlib.blake2b(band.to_bytes(2, "big") + chunk, digest_size=8).digest()
+            buckets.append(int.from_bytes(digest, "big", signed=True))
+        return buckets
+
+    def find_canonical(self, db: Session, hotel_id: str, signature: np.ndarray) -> Optional[Review]:
+        """Return the canonical review this signature duplicates, if any."""
+        candidate_ids = db.query(ReviewLSHBucket.review_id).filter(
+            ReviewLSHBucket.hotel_id == hotel_id,
+            ReviewLSHBucket.bucket.in_(self.buckets(signature))
+        ).distinct().all()
+        if not candidate_ids:
+            return None
+
+        candidates = db.query(Review.id, Review.minhash, Review.canonical_review_id).filter(
+            Review.id.in_([review_id for (review_id,) in candidate_ids])
+        ).all()
+
+        best_id, best_score = None, self.threshold
+        for review_id, minhash, canonical_review_id in candidates:
+            score = self.hasher.similarity(signature, np.frombuffer(minhash, dtype=np.uint32))
+            if score >= best_score:
+                best_id, best_score = canonical_review_id or review_id, score
+
+        return db.get(Review, best_id) if best_id is not None else None
+
+    def index(self, db: Session, review: Review, signature: np.ndarray):
+        """Add a flushed review's bands to the LSH index.
+
+        Flushed immediately so that later reviews in the same batch can match it.
+        """
+        db.add_all([
+            ReviewLSHBucket(review_id=review.id, band=band, hotel_id=review.hotel_id, bucket=bucket)
+            for band, bucket in enumerate(self.buckets(signature))
+        ])
+        db.flush()
+
+
+near_duplicate_detector = NearDuplicateDetector(
+    num_perm=settings.MINHASH_PERMUTATIONS,
+    bands=settings.LSH_BANDS,
+    threshold=settings.NEAR_DUPLICATE_THRESHOLD
+)
@@ -0,0 +1,117 @@
+import logging
+import re
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# On PostgreSQL ``reviews`` is range-partitioned by month of ``processed_at``
+# (alembic revision 0005): one ``reviews_pYYYYMM`` table per month, plus
+# ``reviews_legacy`` holding everything from before the switch.
+PARTITIONED_TABLE = "reviews"
+LEGACY_PARTITION = "reviews_legacy"
+PARTITION_NAME = re.compile(r"^reviews_(p\d{6}|legacy)$")
+
+_BOUND = re.compile(r"FROM \((.+)\) TO \((.+)\)")
+
+
+class Partition(NamedTuple):
+    name: str
+    start: Optional[datetime]  # None for MINVALUE
+    end: Optional[datetime]  # None for MAXVALUE
+
+
+def month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{PARTITIONED_TABLE}_p{month:%Y%m}"
+
+
+def _parse_bound(value: str) -> Optional[datetime]:
+    if value in ("MINVALUE", "MAXVALUE"):
+        return None
+    return datetime.fromisoformat(value.strip("'"))
+
+
+def is_partitioned(db: Session) -> bool:
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    return db.execute(
+        text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:table)"),
+        {"table": PARTITIONED_TABLE}
+    ).scalar() or False
+
+
+def list_partitions(db: Session) -> List[Partition]:
+    """The partitions of ``reviews`` in range order; empty when it is a plain table."""
+    if not is_partitioned(db):
+        return []
+    rows = db.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(:table)"
+    ), {"table": PARTITIONED_TABLE}).all()
+
+    partitions = []
+    for name, bound in rows:
+        match = _BOUND.search(bound)
+        if match:
+            partitions.append(Partition(name, _parse_bound(match.group(1)), _parse_bound(match.group(2))))
+    return sorted(partitions, key=lambda partition: partition.start or datetime.min)
+
+
+def _overlaps(partition: Partition, start: datetime, end: datetime) -> bool:
+    return (partition.start is None or partition.start < end) and (partition.end is None or start < partition.end)
+
+
+def create_month_partition(db: Session, month: datetime) -> bool:
+    """Create the partition for ``month`` unless a partition already covers part of it."""
+    start, end = month_start(month), add_months(month, 1)
+    if any(_overlaps(partition, start, end) for partition in list_partitions(db)):
+        return False
+    db.execute(text(
+        f"CREATE TABLE {partition_name(start)} PARTITION OF {PARTITIONED_TABLE} "
+        f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+    ))
+    return True
+
+
+class ReviewPartitionJob:
+    """Keeps monthly ``reviews`` partitions created ``months_ahead`` in advance.
+
+    An insert whose ``processed_at`` falls in a month without a partition
+    fails, so the current month and the next ones must always exist. Does
+    nothing while the table is not partitioned (always on SQLite).
+    """
+
+    name = "review_partitions"
+
+    def __init__(self, months_ahead: int):
+        self.months_ahead = months_ahead
+
+    def run(self, db: Session, now: Optional[datetime] = None) -> List[str]:
+        if not is_partitioned(db):
+            return []
+
+        current = month_start(now or datetime.utcnow())
+        created = []
+        for offset in range(self.months_ahead + 1):
+            month = add_months(current, offset)
+            if create_month_partition(db, month):
+                created.append(partition_name(month))
+        db.commit()
+        if created:
+            logger.info("Created review partitions %s", ", ".join(created))
+        return created
+
+
+review_partition_job = ReviewPartitionJob(months_ahead=settings.PARTITION_MONTHS_AHEAD)
@@ -0,0 +1,368 @@
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+from sqlalchemy import func, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app import metrics
+from app.config import settings
+from app.models import Review, SentimentType, UrgencyType, HotelDailyStats, JobCheckpoint, ReanalysisRun
+from app.schemas import LLMAnalysisResult
+from app.services.anomaly_detection import escalation_anomaly_job
+from app.services.checkpoints import get_checkpoint
+from app.services.leaderboard import add_topic_mentions, hotel_leaderboard_job, negative_mentions
+from app.services.llm_analyzer import llm_analyzer, FALLBACK_MODEL
+from app.services.snapshots import mark_relabelled
+
+logger = logging.getLogger(__name__)
+
+STATUS_FIELDS = (
+    "state", "model", "prompt_version", "cursor", "remaining",
+    "processed", "updated", "failed", "started_at", "finished_at"
+)
+
+
+class ReanalysisJob:
+    """Re-scores reviews whose labels came from another model or prompt version.
+
+    Labels from any configured provider's model count as current, so reviews
+    answered by a failover provider are not re-billed on every run.
+
+    Rows are walked in primary-key order in fixed-size chunks; the cursor is
+    committed after every chunk under a checkpoint keyed by the target
+    model/prompt, so a cancelled or crashed run resumes where it stopped. Run
+    state and the cancel flag live in ``reanalysis_runs``, so any worker can
+    report or cancel a run. The run pauses while no LLM provider is reachable,
+    and reviews whose call still failed are flagged for fallback recovery
+    rather than left behind the cursor. Within a chunk, distinct texts are analyzed concurrently (and remembered
+    across chunks), near-duplicates copy their canonical review, and labels
+    are written with one bulk UPDATE. LLM calls are throttled to
+    ``max_calls_per_second``.
+
+    With ``flagged_only`` it instead re-scores the reviews that got keyword
+    fallback labels during an LLM outage, from the start on every run, and
+    skips runs while no provider is reachable.
+    """
+
+    name = "reanalysis"
+
+    def __init__(self, chunk_size: int, concurrency: int, max_calls_per_second: float,
+                 analyzer=llm_analyzer, cache_size: int = 10000, flagged_only: bool = False,
+                 stale_seconds: int = 600):
+        if flagged_only:
+            self.name = "fallback_recovery"
+        self.flagged_only = flagged_only
+        self.chunk_size = chunk_size
+        self.concurrency = concurrency
+        self.max_calls_per_second = max_calls_per_second
+        self.analyzer = analyzer
+        self.cache_size = cache_size
+        self.stale_seconds = stale_seconds
+        self._cache: "OrderedDict[str, LLMAnalysisResult]" = OrderedDict()
+        # Cuts the throttle short for a cancel sent to this worker; cancels sent
+        # to other workers are seen at the next chunk
+        self._cancel = threading.Event()
+
+    @property
+    def checkpoint_key(self) -> str:
+        return f"{self.analyzer.model}:{self.analyzer.prompt_version}"
+
+    def _stale(self):
+        if self.flagged_only:
+            return Review.needs_reanalysis.is_(True)
+        return or_(
+            Review.analysis_model.is_(None),
+            Review.analysis_model.notin_(self.analyzer.models),
+            Review.prompt_version.is_(None),
+            Review.prompt_version != self.analyzer.prompt_version
+        )
+
+    def _run_row(self, db: Session) -> ReanalysisRun:
+        run = db.get(ReanalysisRun, self.name)
+        if run is None:
+            run = ReanalysisRun(job_name=self.name)
+            db.add(run)
+            try:
+                db.commit()
+            except IntegrityError:
+                # Another worker created it first
+                db.rollback()
+                run = db.get(ReanalysisRun, self.name)
+        return run
+
+    def status(self, db: Session) -> Dict:
+        run = db.get(ReanalysisRun, self.name)
+        if run is None:
+            return {"state": "idle"}
+        return {field: getattr(run, field) for field in STATUS_FIELDS}
+
+    def start(self, db: Session, restart: bool = False) -> bool:
+        """Claim the next run; False if one is already scheduled or running.
+
+        A cancel() from now on stops that run, even before it has started.
+        Runs whose worker stopped heartbeating can be claimed again.
+        """
+        self._run_row(db)
+        now = datetime.utcnow()
+        claimed = db.query(ReanalysisRun).filter(
+            ReanalysisRun.job_name == self.name,
+            or_(
+                ReanalysisRun.state.notin_(("scheduled", "running")),
+                ReanalysisRun.heartbeat_at < now - timedelta(seconds=self.stale_seconds)
+            )
+        ).update({
+            "state": "scheduled",
+            "cancel_requested": False,
+            "heartbeat_at": now
+        }, synchronize_session=False)
+        if not claimed:
+            db.rollback()
+            return False
+        if restart:
+            self.reset(db)
+        db.commit()
+        return True
+
+    def unschedule(self, db: Session):
+        """Release a claim whose run never started, e.g. while another worker held the job's lock."""
+        db.query(ReanalysisRun).filter(
+            ReanalysisRun.job_name == self.name,
+            ReanalysisRun.state == "scheduled"
+        ).update({"state": "idle", "cancel_requested": False}, synchronize_session=False)
+        db.commit()
+
+    def cancel(self, db: Session):
+        """Ask a scheduled or running run, in any worker, to stop after its current chunk."""
+        requested = db.query(ReanalysisRun).filter(
+            ReanalysisRun.job_name == self.name,
+            ReanalysisRun.state.in_(("scheduled", "running"))
+        ).update({"cancel_requested": True}, synchronize_session=False)
+        db.commit()
+        if requested:
+            self._cancel.set()
+
+    def reset(self, db: Session):
+        """Start the next run from the first review again."""
+        get_checkpoint(db, self.name, self.checkpoint_key).last_review_id = 0
+        db.commit()
+
+    def run(self, db: Session) -> int:
+        if self.flagged_only and not self.analyzer.available():
+            logger.info("Skipping %s: every LLM provider circuit is open", self.name)
+            return 0
+
+        self._cancel.clear()
+        run = self._run_row(db)
+        state = "failed"
+        try:
+            checkpoint = get_checkpoint(db, self.name, self.checkpoint_key)
+            if self.flagged_only:
+                # Reviews that failed again stay flagged behind the cursor; retry them next run
+                checkpoint.last_review_id = 0
+
+            now = datetime.utcnow()
+            run.state = "running"
+            run.model = self.analyzer.model
+            run.prompt_version = self.analyzer.prompt_version
+            run.cursor = checkpoint.last_review_id
+            run.remaining = db.query(func.count(Review.id)).filter(
+                Review.id > checkpoint.last_review_id, self._stale()
+            ).scalar()
+            run.processed = run.updated = run.failed = 0
+            run.started_at = run.heartbeat_at = now
+            run.finished_at = None
+            db.commit()
+
+            state = self._run_chunks(db, run, checkpoint)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            run.state = state
+            run.finished_at = datetime.utcnow()
+            # The cancel, if any, was for this run
+            run.cancel_requested = False
+            db.commit()
+
+        logger.info(
+            "Re-analysis to %s %s: %d reviews processed, %d updated",
+            self.checkpoint_key, state, run.processed, run.updated
+        )
+        return run.updated
+
+    def _run_chunks(self, db: Session, run: ReanalysisRun, checkpoint: JobCheckpoint) -> str:
+        while True:
+            # Attributes expire on commit, so this re-reads a cancel sent to another worker
+            if self._cancel.is_set() or run.cancel_requested:
+                return "cancelled"
+            if not self.analyzer.available():
+                # Every label would be a fallback; a later start resumes from the checkpoint
+                logger.warning("Pausing %s: every LLM provider circuit is open", self.name)
+                return "paused"
+
+            started = time.monotonic()
+            rows = db.query(
+                Review.id, Review.hotel_id, Review.review_text, Review.canonical_review_id,
+                Review.sentiment, Review.urgency, Review.topics, Review.processed_at
+            ).filter(
+                Review.id > checkpoint.last_review_id,
+                self._stale()
+            ).order_by(Review.id).limit(self.chunk_size).all()
+            if not rows:
+                return "completed"
+
+            calls, updated = self._reanalyze_chunk(db, rows)
+            checkpoint.last_review_id = rows[-1].id
+            run.cursor = checkpoint.last_review_id
+            run.processed += len(rows)
+            run.updated += updated
+            run.failed += len(rows) - updated
+            run.remaining = max(0, run.remaining - len(rows))
+            run.heartbeat_at = datetime.utcnow()
+            db.commit()
+
+            self._throttle(calls, time.monotonic() - started)
+
+    def _throttle(self, calls: int, elapsed: float):
+        if self.max_calls_per_second > 0:
+            # Interruptible sleep, so a cancel does not wait out the throttle
+            self._cancel.wait(max(0.0, calls / self.max_calls_per_second - elapsed))
+
+    def _analyze(self, texts: List[str]) -> int:
+        """Fill the cache for ``texts``; returns the number of LLM calls made."""
+        missing = [text for text in texts if text not in self._cache]
+        metrics.record_cache_lookups("reanalysis", len(texts) - len(missing), len(missing))
+        pending = list(dict.fromkeys(missing))
+        if not pending:
+            return 0
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="reanalysis") as pool:
+            results = list(pool.map(self.analyzer.analyze_review, pending))
+
+        for text, result in zip(pending, results):
+            # Keyword fallbacks are not worth remembering or writing over an LLM label
+            if result.model != FALLBACK_MODEL:
+                self._cache[text] = result
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return len(pending)
+
+    def _reanalyze_chunk(self, db: Session, rows: list) -> Tuple[int, int]:
+        originals = [row for row in rows if row.canonical_review_id is None]
+        duplicates = [row for row in rows if row.canonical_review_id is not None]
+        calls = self._analyze([row.review_text for row in originals])
+
+        labels = {}
+        for row in originals:
+            result = self._cache.get(row.review_text)
+            if result is not None:
+                self._cache.move_to_end(row.review_text)
+                labels[row.id] = {
+                    "sentiment": result.sentiment,
+                    "topics": ",".join(result.topics),
+                    "urgency": result.urgency,
+                    "analysis_model": result.model or self.analyzer.model,
+                    "prompt_version": self.analyzer.prompt_version,
+                    "needs_reanalysis": False,
+                    "prompt_tokens": result.prompt_tokens,
+                    "completion_tokens": result.completion_tokens
+                }
+
+        if labels:
+            db.execute(update(Review), [{"id": review_id, **values} for review_id, values in labels.items()])
+        # The cursor moves past them; fallback_recovery_job retries them instead
+        failed = [{"id": row.id, "needs_reanalysis": True} for row in originals if row.id not in labels]
+        if failed:
+            db.execute(update(Review), failed)
+
+        # Canonical reviews always have lower ids, so they are already re-scored
+        copies = []
+        if duplicates:
+            canonicals = {
+                row.id: row for row in db.query(
+                    Review.id, Review.sentiment, Review.topics, Review.urgency,
+                    Review.analysis_model, Review.prompt_version, Review.needs_reanalysis
+                ).filter(Review.id.in_({row.canonical_review_id for row in duplicates}))
+            }
+            for row in duplicates:
+                canonical = canonicals.get(row.canonical_review_id)
+                if canonical is not None:
+                    copies.append({
+                        "id": row.id,
+                        "sentiment": canonical.sentiment,
+                        "topics": canonical.topics,
+                        "urgency": canonical.urgency,
+                        "analysis_model": canonical.analysis_model,
+                        "prompt_version": canonical.prompt_version,
+                        "needs_reanalysis": canonical.needs_reanalysis
+                    })
+        if copies:
+            db.execute(update(Review), copies)
+
+        self._adjust_daily_stats(db, [row for row in originals if row.id in labels], labels)
+        self._adjust_topic_stats(db, [row for row in originals if row.id in labels], labels)
+        copied = {copy["id"] for copy in copies}
+        mark_relabelled(db, [row for row in rows if row.id in labels or row.id in copied])
+        return calls, len(labels) + len(copies)
+
+    def _adjust_daily_stats(self, db: Session, rows: list, labels: Dict[int, dict]):
+        """Apply label changes to the escalation roll-up for rows it already counted."""
+        rolled_up = db.get(JobCheckpoint, (escalation_anomaly_job.name, ""))
+        if rolled_up is None:
+            return
+
+        deltas: Dict[Tuple[str, object], List[int]] = defaultdict(lambda: [0, 0])
+        for row in rows:
+            if row.id > rolled_up.last_review_id or row.processed_at is None:
+                continue
+            new = labels[row.id]
+            key = (row.hotel_id, row.processed_at.date())
+            deltas[key][0] += (new["sentiment"] == SentimentType.NEGATIVE) - (row.sentiment == SentimentType.NEGATIVE)
+            deltas[key][1] += (new["urgency"] == UrgencyType.CRITICAL) - (row.urgency == UrgencyType.CRITICAL)
+
+        for (hotel_id, day), (negative, critical) in deltas.items():
+            if negative or critical:
+                db.execute(
+                    update(HotelDailyStats).where(
+                        HotelDailyStats.hotel_id == hotel_id,
+                        HotelDailyStats.day == day
+                    ).values(
+                        negative=HotelDailyStats.negative + negative,
+                        critical=HotelDailyStats.critical + critical
+                    )
+                )
+
+    def _adjust_topic_stats(self, db: Session, rows: list, labels: Dict[int, dict]):
+        """Apply label changes to the leaderboard's topic hotspots for rows it already counted."""
+        counted = db.get(JobCheckpoint, (hotel_leaderboard_job.name, ""))
+        if counted is None:
+            return
+
+        mentions = Counter()
+        for row in rows:
+            if row.id > counted.last_review_id:
+                continue
+            new = labels[row.id]
+            mentions.update(negative_mentions(row.hotel_id, new["sentiment"], new["topics"]))
+            mentions.subtract(negative_mentions(row.hotel_id, row.sentiment, row.topics))
+        add_topic_mentions(db, mentions)
+
+
+reanalysis_job = ReanalysisJob(
+    chunk_size=settings.REANALYSIS_CHUNK_SIZE,
+    concurrency=settings.REANALYSIS_CONCURRENCY,
+    max_calls_per_second=settings.REANALYSIS_MAX_CALLS_PER_SECOND,
+    stale_seconds=settings.REANALYSIS_STALE_SECONDS
+)
+
+fallback_recovery_job = ReanalysisJob(
+    chunk_size=settings.REANALYSIS_CHUNK_SIZE,
+    concurrency=settings.REANALYSIS_CONCURRENCY,
+    max_calls_per_second=settings.REANALYSIS_MAX_CALLS_PER_SECOND,
+    flagged_only=True,
+    stale_seconds=settings.REANALYSIS_STALE_SECONDS
+)
@@ -1,105 +1,242 @@
 from datetime import datetime, timedelta
-import random
-from typing import List, Dict, Any
+import json
+import logging
+import threading
+from typing import List, Dict, Any, Optional, Tuple
 from sqlalchemy.orm import Session
-from app.models import Review, UrgencyType
-from app.services.llm_analyzer import llm_analyzer
+from app import metrics
+from app.config import settings
+from app.models import Review, UrgencyType, DeadLetterReview
+from app.schemas import LLMAnalysisResult
+from app.services.embeddings import embed_texts
+from app.services.llm_analyzer import llm_analyzer, FALLBACK_MODEL
+from app.services.near_duplicates import near_duplicate_detector
+
+logger = logging.getLogger(__name__)
+
+# Sample reviews are dated relative to this fixed time, so refetching returns the same reviews
+SAMPLE_REVIEWS_AS_OF = datetime(2024, 6, 1)
 
 
 class ReviewIngestionService:
     
-    def fetch_google_reviews(self, hotel_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+    def fetch_google_reviews(self, hotel_id: str, limit: int = 10, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
         
         sample_reviews = [
             {
                 "text": "Amazing stay! The room was spotlessly clean and the staff were incredibly helpful. The location is perfect for exploring the city. Highly recommend!",
                 "author": "Sarah Johnson",
                 "rating": 5.0,
-                "date": datetime.now() - timedelta(days=2)
+                "date": SAMPLE_REVIEWS_AS_OF - timedelta(days=2)
             },
             {
                 "text": "Found bed bugs in the room on the second night. Absolutely disgusting and unacceptable for a hotel of this price. Management was unhelpful. DO NOT STAY HERE!",
                 "author": "Michael Chen",
                 "rating": 1.0,
-                "date": datetime.now() - timedelta(days=1)
+                "date": SAMPLE_REVIEWS_AS_OF - timedelta(days=1)
             },
             {
                 "text": "The hotel was okay. Room was clean but quite small. Breakfast was decent. Location is convenient but parking was expensive.",
                 "author": "Emily Rodriguez",
                 "rating": 3.0,
-                "date": datetime.now() - timedelta(days=3)
+                "date": SAMPLE_REVIEWS_AS_OF - timedelta(days=3)
             },
             {
                 "text": "Terrible experience. Got food poisoning from the hotel restaurant. When I complained, the staff was rude and dismissive. This is a serious health hazard!",
                 "author": "David Thompson",
                 "rating": 1.0,
-                "date": datetime.now() - timedelta(days=5)
+                "date": SAMPLE_REVIEWS_AS_OF - timedelta(days=5)
             },
             {
                 "text": "Lovely hotel with excellent service. The concierge helped us plan our entire itinerary. Rooms are beautifully decorated and very comfortable. Will definitely return!",
                 "author": "Jennifer Lee",
                 "rating": 5.0,
-                "date": datetime.now() - timedelta(days=7)
+                "date": SAMPLE_REVIEWS_AS_OF - timedelta(days=7)
             },
             {
                 "text": "Good value for money. The amenities were basic but functional. Staff was friendly. Could use some renovation but overall a pleasant stay.",
                 "author": "Robert Martinez",
                 "rating": 4.0,
-                "date": datetime.now() - timedelta(days=4)
+                "date": SAMPLE_REVIEWS_AS_OF - timedelta(days=4)
             },
             {
                 "text": "Someone broke into our room and stole valuables while we were at breakfast. Hotel security is non-existent. Police were called but hotel denied responsibility. Avoid at all costs!",
                 "author": "Amanda Wilson",
                 "rating": 1.0,
-                "date": datetime.now() - timedelta(days=6)
+                "date": SAMPLE_REVIEWS_AS_OF - timedelta(days=6)
             },
             {
                 "text": "The location is fantastic, right in the heart of downtown. Easy walking distance to all major attractions. Room was clean and comfortable. Staff was professional.",
                 "author": "Christopher Brown",
                 "rating": 4.5,
-                "date": datetime.now() - timedelta(days=8)
+                "date": SAMPLE_REVIEWS_AS_OF - timedelta(days=8)
             },
             {
                 "text": "Average hotel. Nothing special but nothing terrible either. The room was clean, bed was comfortable. Breakfast options were limited.",
                 "author": "Lisa Anderson",
                 "rating": 3.5,
-                "date": datetime.now() - timedelta(days=9)
+                "date": SAMPLE_REVIEWS_AS_OF - timedelta(days=9)
             },
             {
                 "text": "Exceptional service from start to finish. The staff went above and beyond to make our anniversary special. Beautiful views and amazing amenities. Worth every penny!",
                 "author": "James Taylor",
                 "rating": 5.0,
-                "date": datetime.now() - timedelta(days=10)
+                "date": SAMPLE_REVIEWS_AS_OF - timedelta(days=10)
             }
         ]
         
-        reviews_to_return = random.sample(sample_reviews, min(limit, len(sample_reviews)))
-        return reviews_to_return
+        # The newest ``limit`` reviews; incremental fetches instead page forward
+        # from the high-water mark, oldest first, so advancing it skips nothing.
+        # The mark itself is included: reviews sharing its date may not all be stored yet
+        if since is None:
+            return sorted(sample_reviews, key=lambda review: review["date"], reverse=True)[:limit]
+        sample_reviews = [review for review in sample_reviews if review["date"] >= since]
+        return sorted(sample_reviews, key=lambda review: review["date"])[:limit]
     
-    def process_reviews(self, hotel_id: str, reviews_data: List[Dict[str, Any]], db: Session, user_id: int = None) -> List[Review]:
+    def source_key(self, review_data: Any) -> Optional[Tuple[str, datetime]]:
+        """What identifies a fetched review: Google reviews have no id, only their author and time."""
+        if isinstance(review_data, dict) and review_data.get("author") and review_data.get("date"):
+            return review_data["author"], review_data["date"]
+        return None
+    
+    def drop_known(self, db: Session, hotel_id: str, reviews_data: List[Any]) -> List[Any]:
+        """The fetched reviews not stored yet (and not repeated within the batch), in their order."""
+        keys = {self.source_key(review_data) for review_data in reviews_data} - {None}
+        known = set()
+        if keys:
+            known = set(db.query(Review.author, Review.review_date).filter(
+                Review.hotel_id == hotel_id,
+                Review.review_date.in_({date for _, date in keys})
+            ).all())
         
-        processed_reviews = []
+        new = []
+        for review_data in reviews_data:
+            key = self.source_key(review_data)
+            if key is not None:
+                if key in known:
+                    continue
+                known.add(key)
+            new.append(review_data)
+        return new
+    
+    def process_reviews(self, hotel_id: str, reviews_data: List[Dict[str, Any]], db: Session, user_id: int = None,
+                        deadline: Optional[float] = None, cancelled: Optional[threading.Event] = None,
+                        dead_letters: Optional[List[DeadLetterReview]] = None) -> List[Review]:
+        """Analyze and store reviews; past ``deadline`` (``time.monotonic()``) the keyword fallback is used.
         
+        Each review is committed on its own, so one that fails (bad payload,
+        constraint violation, ...) becomes a dead letter instead of failing the
+        whole batch, and reviews already analyzed are never lost with it. Once
+        ``cancelled`` is set the remaining reviews are skipped. Dead letters
+        written are appended to ``dead_letters`` if given.
+        """
+        
+        processed_reviews = []
+        dead_letters = [] if dead_letters is None else dead_letters
+        valid = []
         for review_data in reviews_data:
-            analysis = llm_analyzer.analyze_review(review_data["text"])
-            
-            review = Review(
-                hotel_id=hotel_id,
-                review_text=review_data["text"],
-                author=review_data.get("author"),
-                rating=review_data.get("rating"),
-                review_date=review_data.get("date"),
-                sentiment=analysis.sentiment,
-                topics=",".join(analysis.topics),
-                urgency=analysis.urgency,
-                processed_by=user_id
-            )
-            
-            db.add(review)
-            processed_reviews.append(review)
+            error = self.payload_error(review_data)
+            if error is None:
+                valid.append(review_data)
+            else:
+                dead_letters.append(self._dead_letter(hotel_id, review_data, error, user_id))
+        embeddings = embed_texts([review_data["text"] for review_data in valid])
         
-        db.commit()
+        for review_data, embedding in zip(valid, embeddings):
+            if cancelled is not None and cancelled.is_set():
+                break
+            analysis = None
+            try:
+                review, signature, analysis = self.prepare_review(db, hotel_id, review_data, embedding, user_id, deadline)
+                self.add_review(db, review, signature)
+                db.commit()
+                processed_reviews.append(review)
+            except Exception as e:
+                db.rollback()
+                logger.warning("Could not store review for hotel %s: %s", hotel_id, e)
+                dead_letters.append(self._dead_letter(hotel_id, review_data, str(e), user_id, analysis))
+        
+        if dead_letters:
+            db.add_all(dead_letters)
+            db.commit()
+            metrics.record_dead_letters(len(dead_letters))
         return processed_reviews
+    
+    def payload_error(self, review_data: Any) -> Optional[str]:
+        if not isinstance(review_data, dict):
+            return f"expected a review object, got {type(review_data).__name__}"
+        if not isinstance(review_data.get("text"), str) or not review_data["text"].strip():
+            return "review has no text"
+        return None
+    
+    def prepare_review(self, db: Session, hotel_id: str, review_data: Dict[str, Any], embedding: Optional[bytes],
+                       user_id: Optional[int] = None, deadline: Optional[float] = None,
+                       analysis: Optional[LLMAnalysisResult] = None) -> Tuple[Review, Any, Optional[LLMAnalysisResult]]:
+        """Build and label one review without writing anything.
+        
+        ``analysis`` skips the LLM call (a retried dead letter that already has
+        labels). Returns the review, its MinHash signature and the analysis
+        used, if any.
+        """
+        signature = None
+        canonical = None
+        if settings.NEAR_DUPLICATE_DETECTION_ENABLED:
+            signature = near_duplicate_detector.signature(review_data["text"])
+            canonical = near_duplicate_detector.find_canonical(db, hotel_id, signature)
+        
+        review = Review(
+            hotel_id=hotel_id,
+            review_text=review_data["text"],
+            author=review_data.get("author"),
+            rating=review_data.get("rating"),
+            review_date=review_data.get("date"),
+            minhash=signature.tobytes() if signature is not None else None,
+            embedding=embedding,
+            processed_by=user_id
+        )
+        
+        if canonical is not None:
+            # Reuse the canonical review's labels instead of paying for another LLM call
+            review.canonical_review_id = canonical.id
+            review.sentiment = canonical.sentiment
+            review.topics = canonical.topics
+            review.urgency = canonical.urgency
+            review.analysis_model = canonical.analysis_model
+            review.prompt_version = canonical.prompt_version
+            review.needs_reanalysis = canonical.needs_reanalysis
+            metrics.record_near_duplicate()
+        else:
+            if analysis is None:
+                analysis = llm_analyzer.analyze_review(review_data["text"], deadline=deadline)
+            review.sentiment = analysis.sentiment
+            review.topics = ",".join(analysis.topics)
+            review.urgency = analysis.urgency
+            review.analysis_model = analysis.model
+            review.prompt_version = llm_analyzer.prompt_version
+            review.needs_reanalysis = analysis.model == FALLBACK_MODEL
+            review.prompt_tokens = analysis.prompt_tokens
+            review.completion_tokens = analysis.completion_tokens
+        return review, signature, analysis
+    
+    def add_review(self, db: Session, review: Review, signature: Any):
+        """Write a prepared review, flushing so database errors surface here."""
+        db.add(review)
+        db.flush()
+        if signature is not None:
+            near_duplicate_detector.index(db, review, signature)
+    
+    def _dead_letter(self, hotel_id: str, review_data: Any, error: str, user_id: Optional[int],
+                     analysis: Optional[LLMAnalysisResult] = None) -> DeadLetterReview:
+        # Keep paid LLM labels so a retry does not call the LLM again
+        keep_analysis = analysis is not None and analysis.model != FALLBACK_MODEL
+        return DeadLetterReview(
+            hotel_id=hotel_id,
+            payload=json.dumps(review_data, default=str),
+            analysis=analysis.model_dump_json() if keep_analysis else None,
+            error=error,
+            attempts=1,
+            processed_by=user_id
+        )
 
 
 review_ingestion_service = ReviewIngestionService()
\ No newline at end of file
@@ -0,0 +1,95 @@
+from datetime import datetime
+from typing import Any, List, Optional
+from sqlalchemy import case, column, func, literal_column, or_, table, text
+from sqlalchemy.orm import Query, Session
+from app.models import Review, SentimentType, UrgencyType
+
+# FTS5 shadow table maintained by the triggers declared in app.models
+reviews_fts = table("reviews_fts", column("rowid"))
+
+
+class ReviewSearchService:
+
+    def search(
+        self,
+        db: Session,
+        query: str,
+        fields: List[str],
+        hotel_id: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        sentiment: Optional[SentimentType] = None,
+        urgency: Optional[UrgencyType] = None,
+        limit: int = 20,
+        offset: int = 0
+    ) -> List[Any]:
+        """Ranked full-text search returning one tuple per hit, in ``fields`` order.
+
+        ``fields`` may contain ``"rank"`` (higher is more relevant) alongside
+        any Review column name.
+        """
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            search, rank = self._postgres_query(db, query, fields)
+        elif dialect == "sqlite":
+            search, rank = self._sqlite_query(db, query, fields)
+        else:
+            search, rank = self._like_query(db, query, fields)
+
+        if hotel_id:
+            search = search.filter(Review.hotel_id == hotel_id)
+        if date_from:
+            search = search.filter(Review.review_date >= date_from)
+        if date_to:
+            search = search.filter(Review.review_date <= date_to)
+        if sentiment:
+            search = search.filter(Review.sentiment == sentiment)
+        if urgency:
+            search = search.filter(Review.urgency == urgency)
+
+        return search.order_by(rank.desc(), Review.processed_at.desc()).offset(offset).limit(limit).all()
+
+    def _columns(self, fields: List[str], rank) -> list:
+        return [rank.label("rank") if f == "rank" else getattr(Review, f) for f in fields]
+
+    def _postgres_query(self, db: Session, query: str, fields: List[str]):
+        ts_query = func.websearch_to_tsquery("english", query)
+        vector = literal_column("reviews.search_vector")
+        rank = func.ts_rank_cd(vector, ts_query)
+
+        search = db.query(*self._columns(fields, rank)).select_from(Review).filter(
+            vector.op("@@")(ts_query)
+        )
+        return search, rank
+
+    def _sqlite_query(self, db: Session, query: str, fields: List[str]):
+        # bm25() is lower-is-better; negate it so both backends rank descending
+        rank = -func.bm25(literal_column("reviews_fts"))
+
+        search: Query = db.query(*self._columns(fields, rank)).select_from(Review).join(
+            reviews_fts, reviews_fts.c.rowid == Review.id
+        ).filter(text("reviews_fts MATCH :fts_query")).params(fts_query=self._fts5_query(query))
+        return search, rank
+
+    def _like_query(self, db: Session, query: str, fields: List[str]):
+        # No full-text index on other databases: match any term as a substring,
+        # ranked by how many of the terms a review contains (a full scan)
+        matches = [
+            Review.review_text.ilike(f"%{self._escape_like(term)}%", escape="\\")
+            for term in query.split()
+        ]
+        rank = sum((case((match, 1), else_=0) for match in matches), literal_column("0"))
+
+        search = db.query(*self._columns(fields, rank)).select_from(Review).filter(or_(*matches))
+        return search, rank
+
+    def _escape_like(self, term: str) -> str:
+        return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+    def _fts5_query(self, query: str) -> str:
+        # Quote every term so user input cannot inject FTS5 operators
+        terms = [term.replace('"', '""') for term in query.split()]
+        return " ".join(f'"{term}"' for term in terms)
+
+
+review_search_service = ReviewSearchService()
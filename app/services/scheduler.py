@@ -0,0 +1,198 @@
+import asyncio
+import fcntl
+import logging
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal, engine
+
+logger = logging.getLogger(__name__)
+
+# Apart from the per-job keys ("scheduler:<job>"), so no job name can collide with it
+LEADER_LOCK_KEY = zlib.crc32(b"scheduler-leader")
+
+
+@dataclass
+class ScheduledJob:
+    name: str
+    interval_seconds: float
+    func: Callable[[Session], None]
+    last_run_at: Optional[float] = None
+    last_duration: Optional[float] = None
+    last_error: Optional[str] = None
+    running: bool = False
+    # Taken for the whole run: the loop and on-demand triggers (BackgroundTasks) run jobs on different threads
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+
+class Scheduler:
+    """Runs registered jobs periodically on the event loop, each in a worker thread.
+
+    Of all the workers and replicas started, only the one holding the leader
+    lock runs the periodic loops: a PostgreSQL advisory lock kept on its own
+    connection, or elsewhere an exclusive lock on ``lock_file``. The others
+    retry every ``leader_poll_seconds`` and take over when the leader exits.
+    On PostgreSQL every run also takes an advisory lock named after the job,
+    so an on-demand run from another worker does not overlap a scheduled one.
+    """
+
+    def __init__(self, leader_poll_seconds: float = settings.SCHEDULER_LEADER_POLL_SECONDS,
+                 lock_file: str = settings.SCHEDULER_LOCK_FILE):
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self.leader_poll_seconds = leader_poll_seconds
+        self.lock_file = lock_file
+        self.is_leader = False
+        self._leader_conn = None
+        self._leader_file = None
+        self._tasks: List[asyncio.Task] = []
+
+    def register(self, name: str, interval_seconds: float, func: Callable[[Session], None]):
+        self.jobs[name] = ScheduledJob(name=name, interval_seconds=interval_seconds, func=func)
+
+    def start(self):
+        self._tasks.append(asyncio.create_task(self._lead()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _lead(self):
+        loops: List[asyncio.Task] = []
+        try:
+            while True:
+                if self.is_leader and not await asyncio.to_thread(self._still_leader):
+                    # e.g. the database restarted: another process may hold the lock now
+                    logger.warning("Lost the scheduler leader lock; stopping periodic jobs")
+                    for task in loops:
+                        task.cancel()
+                    loops = []
+                    self._release_leadership()
+                if not self.is_leader and await asyncio.to_thread(self._acquire_leadership):
+                    logger.info("This process now runs the periodic jobs")
+                    loops = [
+                        asyncio.create_task(self._loop(job))
+                        for job in self.jobs.values() if job.interval_seconds > 0
+                    ]
+                await asyncio.sleep(self.leader_poll_seconds)
+        finally:
+            for task in loops:
+                task.cancel()
+            await asyncio.gather(*loops, return_exceptions=True)
+            self._release_leadership()
+
+    def _acquire_leadership(self) -> bool:
+        if engine.dialect.name == "postgresql":
+            try:
+                conn = engine.connect()
+            except Exception:
+                logger.warning("Could not connect to take the scheduler leader lock", exc_info=True)
+                return False
+            try:
+                acquired = conn.scalar(text("SELECT pg_try_advisory_lock(:key)"), {"key": LEADER_LOCK_KEY})
+                # The lock is held by the session; do not sit idle in a transaction
+                conn.commit()
+            except Exception:
+                logger.warning("Could not take the scheduler leader lock", exc_info=True)
+                acquired = False
+            if not acquired:
+                conn.close()
+                return False
+            self._leader_conn = conn
+        else:
+            lock_file = open(self.lock_file, "a")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+            self._leader_file = lock_file
+        self.is_leader = True
+        return True
+
+    def _still_leader(self) -> bool:
+        if self._leader_conn is None:
+            return True
+        try:
+            self._leader_conn.scalar(text("SELECT 1"))
+            self._leader_conn.commit()
+            return True
+        except Exception:
+            return False
+
+    def _release_leadership(self):
+        if self._leader_conn is not None:
+            try:
+                self._leader_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": LEADER_LOCK_KEY})
+                self._leader_conn.commit()
+            except Exception:
+                pass  # a dead connection released the lock already
+            self._leader_conn.close()
+            self._leader_conn = None
+        if self._leader_file is not None:
+            # Closing the file releases the lock
+            self._leader_file.close()
+            self._leader_file = None
+        self.is_leader = False
+
+    async def _loop(self, job: ScheduledJob):
+        while True:
+            await asyncio.sleep(job.interval_seconds)
+            await self.run_now(job.name)
+
+    async def run_now(self, name: str) -> bool:
+        return await asyncio.to_thread(self.run_job, name)
+
+    def run_job(self, name: str) -> bool:
+        """Run a job synchronously; returns False if it was already running elsewhere."""
+        job = self.jobs[name]
+        if not job.lock.acquire(blocking=False):
+            return False
+
+        job.running = True
+        started = time.perf_counter()
+        try:
+            with engine.connect() as lock_conn:
+                if not self._acquire(lock_conn, name):
+                    return False
+                try:
+                    db = SessionLocal()
+                    try:
+                        job.func(db)
+                    finally:
+                        db.close()
+                    job.last_error = None
+                finally:
+                    self._release(lock_conn, name)
+            return True
+        except Exception as e:
+            job.last_error = str(e)
+            logger.exception("Scheduled job %s failed", name)
+            return True
+        finally:
+            job.running = False
+            job.last_run_at = time.time()
+            job.last_duration = time.perf_counter() - started
+            job.lock.release()
+
+    def _lock_key(self, name: str) -> int:
+        return zlib.crc32(f"scheduler:{name}".encode())
+
+    def _acquire(self, conn, name: str) -> bool:
+        if conn.dialect.name != "postgresql":
+            return True
+        return bool(conn.scalar(text("SELECT pg_try_advisory_lock(:key)"), {"key": self._lock_key(name)}))
+
+    def _release(self, conn, name: str):
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self._lock_key(name)})
+
+
+# Singleton instance
+scheduler = Scheduler()
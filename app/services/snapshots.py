@@ -0,0 +1,211 @@
+"""Columnar snapshot of ``reviews`` for analytics, so ad-hoc queries stay off the database.
+
+The snapshot is a Parquet dataset under ``<snapshot_dir>/reviews``, in Hive
+layout by hotel and processing month
+(``hotel_id=<hotel>/month=YYYY-MM/part-*.parquet``), so queries filtering on
+either read only the matching files. Sentiment, urgency, model and topics are
+dictionary-encoded. Query it with :func:`snapshot_dataset` (pyarrow) or
+:func:`query_snapshot` (SQL, needs the optional ``duckdb`` package), or from
+the command line::
+
+    python -m app.services.snapshots "SELECT hotel_id, count(*) FROM reviews GROUP BY 1"
+"""
+import logging
+import os
+import sys
+from datetime import datetime
+from typing import TYPE_CHECKING, Iterable, List, Optional
+import numpy as np
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import Review, SnapshotRelabel
+from app.services.checkpoints import get_checkpoint, settled, settled_before
+from app.services.columnar import PARQUET_COMPRESSION, SNAPSHOT_COLUMNS, reviews_to_snapshot, snapshot_schema
+from app.services.partitions import add_months
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+logger = logging.getLogger(__name__)
+
+PARTITION_COLUMNS = ("hotel_id", "month")
+
+
+def _partitioning() -> "ds.Partitioning":
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    schema = snapshot_schema()
+    # Explicit types: inferred ones would turn hotel ids such as "1042" into integers
+    return ds.partitioning(pa.schema([schema.field(name) for name in PARTITION_COLUMNS]), flavor="hive")
+
+
+def mark_relabelled(db: Session, rows: Iterable):
+    """Record the snapshot hotel/months of ``rows`` (with ``hotel_id`` and ``processed_at``) as relabelled.
+
+    Call it in the transaction that changes the labels, so the snapshot job
+    sees the mark only together with them.
+    """
+    for hotel_id, month in {(row.hotel_id, f"{row.processed_at:%Y-%m}") for row in rows if row.processed_at}:
+        marked = db.execute(
+            update(SnapshotRelabel).where(
+                SnapshotRelabel.hotel_id == hotel_id,
+                SnapshotRelabel.month == month
+            ).values(version=SnapshotRelabel.version + 1)
+        ).rowcount
+        if not marked:
+            db.add(SnapshotRelabel(hotel_id=hotel_id, month=month, version=1))
+    db.flush()
+
+
+class ReviewSnapshotJob:
+    """Keeps the Parquet snapshot in step with ``reviews``.
+
+    New reviews are read in id order from a checkpoint in batches of
+    ``batch_size``; each batch is written as new files (one per hotel and
+    month it touches), then the checkpoint is committed. File names start
+    with the batch's first id, so a batch re-written after a crash replaces
+    its files instead of duplicating rows. As in the other checkpointed
+    jobs, the last CHECKPOINT_SAFETY_LAG_SECONDS of reviews wait for the
+    next run.
+
+    Re-analysis changes labels of reviews already written; it marks their
+    hotel/months in ``snapshot_relabels`` (see :func:`mark_relabelled`). Each
+    marked hotel/month is then rewritten as one file: the rows already in the
+    snapshot, with those still in the database replaced by their current
+    labels (archived ones are kept as they were). The mark is cleared only if
+    its version did not change meanwhile.
+    """
+
+    name = "review_snapshot"
+
+    def __init__(self, snapshot_dir: str, batch_size: int):
+        self.snapshot_dir = snapshot_dir
+        self.batch_size = batch_size
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.snapshot_dir, "reviews")
+
+    def run(self, db: Session, now: Optional[datetime] = None) -> int:
+        """Write new reviews and rewrite relabelled hotel/months; returns how many new reviews were written."""
+        checkpoint = get_checkpoint(db, self.name)
+        columns = [Review.__table__.c[name] for name in SNAPSHOT_COLUMNS]
+        cutoff = settled_before(now)
+        written = 0
+
+        while True:
+            rows = db.execute(
+                select(*columns).where(Review.id > checkpoint.last_review_id).order_by(Review.id).limit(self.batch_size)
+            ).all()
+            ready = settled(rows, cutoff)
+            if ready:
+                self._write(reviews_to_snapshot(ready), f"part-{ready[0].id}")
+                checkpoint.last_review_id = ready[-1].id
+                db.commit()
+                written += len(ready)
+            if not ready or len(ready) < len(rows):
+                break
+
+        db.commit()
+        if written:
+            logger.info("Added %d reviews to the snapshot (up to id %d)", written, checkpoint.last_review_id)
+
+        relabels = db.query(SnapshotRelabel).all()
+        db.commit()
+        for relabel in relabels:
+            self._rewrite(db, relabel, checkpoint.last_review_id)
+        if relabels:
+            logger.info("Rewrote %d relabelled hotel/months of the snapshot", len(relabels))
+        return written
+
+    def _rewrite(self, db: Session, relabel: SnapshotRelabel, last_review_id: int):
+        """Replace one hotel/month's files with its rows carrying the current labels."""
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.dataset as ds
+
+        hotel_id, month, version = relabel.hotel_id, relabel.month, relabel.version
+        start = datetime.strptime(month, "%Y-%m")
+        columns = [Review.__table__.c[name] for name in SNAPSHOT_COLUMNS]
+        rows = db.execute(
+            select(*columns).where(
+                Review.hotel_id == hotel_id,
+                Review.processed_at >= start,
+                Review.processed_at < add_months(start, 1),
+                # Newer rows are not in the snapshot yet; the append pass writes them
+                Review.id <= last_review_id
+            ).order_by(Review.id)
+        ).all()
+
+        dataset = snapshot_dataset(self.snapshot_dir)
+        where = (ds.field("hotel_id") == hotel_id) & (ds.field("month") == month)
+        paths: List[str] = [fragment.path for fragment in dataset.get_fragments(filter=where)]
+        if paths:
+            kept = dataset.to_table(filter=where)
+            # A rewrite interrupted after writing leaves rows twice; keep one of each
+            _, first = np.unique(kept.column("id").to_numpy(), return_index=True)
+            kept = kept.take(np.sort(first))
+            if rows:
+                kept = kept.filter(pc.invert(pc.is_in(kept.column("id"), pa.array([row.id for row in rows]))))
+            table = pa.concat_tables([kept, reviews_to_snapshot(rows)]) if rows else kept
+            basename = f"relabel-{version}"
+            self._write(table, basename)
+            for path in paths:
+                if not os.path.basename(path).startswith(f"{basename}-"):
+                    os.remove(path)
+
+        db.execute(delete(SnapshotRelabel).where(
+            SnapshotRelabel.hotel_id == hotel_id,
+            SnapshotRelabel.month == month,
+            SnapshotRelabel.version == version
+        ))
+        db.commit()
+
+    def _write(self, table: "pa.Table", basename: str):
+        import pyarrow.dataset as ds
+
+        file_format = ds.ParquetFileFormat()
+        ds.write_dataset(
+            table, self.path, format=file_format, partitioning=_partitioning(),
+            basename_template=f"{basename}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+            file_options=file_format.make_write_options(compression=PARQUET_COMPRESSION)
+        )
+
+
+def snapshot_dataset(snapshot_dir: Optional[str] = None) -> "ds.Dataset":
+    """The snapshot as a pyarrow dataset (empty until the first run)."""
+    import pyarrow.dataset as ds
+
+    path = os.path.join(snapshot_dir or settings.SNAPSHOT_DIR, "reviews")
+    if not os.path.isdir(path):
+        return ds.dataset([], schema=snapshot_schema())
+    return ds.dataset(path, schema=snapshot_schema(), format="parquet", partitioning=_partitioning())
+
+
+def query_snapshot(sql: str, snapshot_dir: Optional[str] = None) -> "pa.Table":
+    """Run ``sql`` with DuckDB against the snapshot, visible as the table ``reviews``."""
+    import duckdb
+
+    connection = duckdb.connect()
+    try:
+        connection.register("reviews", snapshot_dataset(snapshot_dir))
+        return connection.execute(sql).arrow()
+    finally:
+        connection.close()
+
+
+review_snapshot_job = ReviewSnapshotJob(snapshot_dir=settings.SNAPSHOT_DIR, batch_size=settings.SNAPSHOT_BATCH_SIZE)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(snapshot_dataset().schema)
+    else:
+        result = query_snapshot(sys.argv[1])
+        print("\t".join(result.column_names))
+        for row in result.to_pylist():
+            print("\t".join(str(value) for value in row.values()))
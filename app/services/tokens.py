@@ -0,0 +1,64 @@
+import logging
+import math
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Rough average for English text with GPT-style BPE vocabularies
+_CHARS_PER_TOKEN = 4
+_ELLIPSIS = " [...] "
+
+
+class TokenCounter:
+    """Counts prompt tokens locally, with tiktoken when it is installed.
+
+    Without tiktoken (or without its encoding files) counts are estimated at
+    ~4 characters per token, which is close enough for budgeting.
+    """
+
+    def __init__(self, model: str):
+        self._encoding = None
+        try:
+            import tiktoken
+            try:
+                self._encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+        except ImportError:
+            pass
+        except Exception as e:
+            # tiktoken downloads encodings on first use
+            logger.warning("tiktoken unavailable, estimating token counts: %s", e)
+
+    @property
+    def exact(self) -> bool:
+        return self._encoding is not None
+
+    def count(self, text: str) -> int:
+        if self._encoding is not None:
+            return len(self._encoding.encode(text))
+        return math.ceil(len(text) / _CHARS_PER_TOKEN)
+
+    def count_messages(self, messages: List[Dict[str, str]]) -> int:
+        # Chat formatting adds a few tokens per message
+        return sum(self.count(message["content"]) + 4 for message in messages) + 2
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Shorten ``text`` to about ``max_tokens``, keeping its beginning and end.
+
+        Reviews tend to open with the verdict and close with the complaint or
+        recommendation, so the middle is what gets dropped.
+        """
+        if max_tokens <= 0 or self.count(text) <= max_tokens:
+            return text
+
+        head_tokens = max_tokens * 2 // 3
+        tail_tokens = max_tokens - head_tokens
+        if self._encoding is not None:
+            tokens = self._encoding.encode(text)
+            head = self._encoding.decode(tokens[:head_tokens])
+            tail = self._encoding.decode(tokens[-tail_tokens:]) if tail_tokens else ""
+        else:
+            head = text[:head_tokens * _CHARS_PER_TOKEN].rsplit(" ", 1)[0]
+            tail = text[-tail_tokens * _CHARS_PER_TOKEN:].split(" ", 1)[-1] if tail_tokens else ""
+        return f"{head.rstrip()}{_ELLIPSIS}{tail.lstrip()}"
@@ -0,0 +1,202 @@
+import json
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+import numpy as np
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import Review, TopicCluster
+from app.services.checkpoints import get_checkpoint, settled, settled_before
+from app.services.embeddings import decode_vector, get_embedder
+
+_TERM_RE = re.compile(r"[a-z][a-z']{2,}")
+
+STOPWORDS = frozenset("""
+a about after again all also am an and any are as at be because been before being but by can
+could did do does doing down during each few for from further had has have having he her here
+hers him his how i if in into is it its just me more most my no nor not now of off on once only
+or other our out over own same she should so some such than that the their them then there these
+they this those through to too under until up very was we were what when where which while who
+why will with would you your hotel room rooms stay stayed staying night nights were really
+""".split())
+
+
+class MiniBatchKMeans:
+    """Spherical mini-batch k-means (Sculley, 2010).
+
+    The whole model is the centroids plus the number of points each has
+    absorbed, so it can be persisted and resumed with only new points.
+    """
+
+    def __init__(self, k: int, centroids: Optional[np.ndarray] = None, counts: Optional[np.ndarray] = None):
+        self.k = k
+        self.centroids = centroids
+        self.counts = counts
+
+    def _normalized(self) -> np.ndarray:
+        norms = np.linalg.norm(self.centroids, axis=1, keepdims=True)
+        return self.centroids / np.maximum(norms, 1e-12)
+
+    def _seed(self, batch: np.ndarray):
+        """Grow towards k centroids with farthest-first picks from the batch."""
+        candidates = batch[np.linalg.norm(batch, axis=1) > 0]
+        if self.centroids is None:
+            if not len(candidates):
+                return
+            self.centroids = candidates[:1].copy()
+            self.counts = np.zeros(1, dtype=np.int64)
+
+        while len(self.centroids) < self.k and len(candidates):
+            closest = (candidates @ self._normalized().T).max(axis=1)
+            pick = int(np.argmin(closest))
+            if closest[pick] > 0.999:
+                break
+            self.centroids = np.vstack([self.centroids, candidates[pick]])
+            self.counts = np.append(self.counts, 0)
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        return np.argmax(batch @ self._normalized().T, axis=1)
+
+    def partial_fit(self, batch: np.ndarray) -> np.ndarray:
+        """Update centroids with one batch and return its cluster labels."""
+        if self.centroids is None or len(self.centroids) < self.k:
+            self._seed(batch)
+        if self.centroids is None:
+            return np.zeros(len(batch), dtype=np.int64)
+
+        labels = self.predict(batch)
+        sums = np.zeros_like(self.centroids)
+        np.add.at(sums, labels, batch)
+        added = np.bincount(labels, minlength=len(self.centroids))
+
+        # Per-centre learning rate 1/count, applied to the whole batch at once
+        total = self.counts + added
+        touched = added > 0
+        self.centroids[touched] = (
+            self.centroids[touched] * self.counts[touched, None] + sums[touched]
+        ) / total[touched, None]
+        self.counts = total
+        return labels
+
+
+def terms(text: str) -> List[str]:
+    return [t for t in _TERM_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def label_clusters(term_counts: List[Counter], top_n: int) -> List[List[str]]:
+    """Pick each cluster's most distinctive terms with class-based TF-IDF."""
+    totals = Counter()
+    for counts in term_counts:
+        totals.update(counts)
+    average_size = sum(totals.values()) / max(1, len(term_counts))
+
+    labels = []
+    for counts in term_counts:
+        size = sum(counts.values()) or 1
+        scored = sorted(
+            counts,
+            key=lambda t: (counts[t] / size) * math.log(1 + average_size / totals[t]),
+            reverse=True
+        )
+        labels.append(scored[:top_n])
+    return labels
+
+
+class TopicClusteringJob:
+    """Incrementally clusters review embeddings per hotel.
+
+    Each run walks only reviews added since the last checkpoint, in id order
+    and fixed-size chunks, and folds them into the persisted per-hotel models.
+    Memory is bounded by the chunk size and the pruned term counters.
+    """
+
+    name = "topic_clustering"
+
+    def __init__(self, clusters_per_hotel: int, batch_size: int, max_terms: int = 200,
+                 label_terms: int = 5, examples: int = 5):
+        self.clusters_per_hotel = clusters_per_hotel
+        self.batch_size = batch_size
+        self.max_terms = max_terms
+        self.label_terms = label_terms
+        self.examples = examples
+
+    def run(self, db: Session) -> int:
+        checkpoint = get_checkpoint(db, self.name)
+        cutoff = settled_before()
+        processed = 0
+
+        while True:
+            rows = db.query(
+                Review.id, Review.hotel_id, Review.review_text, Review.embedding, Review.processed_at
+            ).filter(
+                Review.id > checkpoint.last_review_id,
+                Review.canonical_review_id.is_(None)
+            ).order_by(Review.id).limit(self.batch_size).all()
+            rows = settled(rows, cutoff)
+            if not rows:
+                break
+
+            by_hotel: Dict[str, list] = defaultdict(list)
+            for row in rows:
+                by_hotel[row.hotel_id].append(row)
+            for hotel_id, hotel_rows in by_hotel.items():
+                self._update_hotel(db, hotel_id, hotel_rows)
+
+            checkpoint.last_review_id = rows[-1].id
+            db.commit()
+            processed += len(rows)
+
+        db.commit()
+        return processed
+
+    def _vectors(self, rows: list) -> np.ndarray:
+        missing = [i for i, row in enumerate(rows) if row.embedding is None]
+        computed = get_embedder().embed([rows[i].review_text for i in missing]) if missing else []
+        vectors = dict(zip(missing, computed))
+        return np.stack([
+            vectors[i] if row.embedding is None else decode_vector(row.embedding)
+            for i, row in enumerate(rows)
+        ]).astype(np.float32)
+
+    def _update_hotel(self, db: Session, hotel_id: str, rows: list):
+        clusters = db.query(TopicCluster).filter(
+            TopicCluster.hotel_id == hotel_id
+        ).order_by(TopicCluster.cluster_index).all()
+
+        model = MiniBatchKMeans(self.clusters_per_hotel)
+        if clusters:
+            model.centroids = np.stack([np.frombuffer(c.centroid, dtype=np.float32) for c in clusters]).copy()
+            model.counts = np.array([c.size for c in clusters], dtype=np.int64)
+
+        vectors = self._vectors(rows)
+        labels = model.partial_fit(vectors)
+        if model.centroids is None:
+            return
+
+        while len(clusters) < len(model.centroids):
+            cluster = TopicCluster(hotel_id=hotel_id, cluster_index=len(clusters), term_counts="{}")
+            db.add(cluster)
+            clusters.append(cluster)
+
+        term_counts = [Counter(json.loads(c.term_counts or "{}")) for c in clusters]
+        examples = [[int(i) for i in (c.example_review_ids or "").split(",") if i] for c in clusters]
+        for row, label in zip(rows, labels):
+            term_counts[label].update(terms(row.review_text))
+            examples[label] = ([row.id] + examples[label])[:self.examples]
+
+        term_counts = [Counter(dict(counts.most_common(self.max_terms))) for counts in term_counts]
+        top_terms = label_clusters(term_counts, self.label_terms)
+
+        for index, cluster in enumerate(clusters):
+            cluster.centroid = model.centroids[index].astype(np.float32).tobytes()
+            cluster.size = int(model.counts[index])
+            cluster.term_counts = json.dumps(term_counts[index])
+            cluster.top_terms = ",".join(top_terms[index])
+            cluster.example_review_ids = ",".join(str(i) for i in examples[index])
+
+
+topic_clustering_job = TopicClusteringJob(
+    clusters_per_hotel=settings.TOPIC_CLUSTERS_PER_HOTEL,
+    batch_size=settings.TOPIC_CLUSTERING_BATCH_SIZE
+)
@@ -0,0 +1,245 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+from app import metrics
+from app.config import settings
+from app.models import Review
+from app.services.embeddings import decode_int8, decode_vector, get_embedder
+
+# Rows scored per matmul, bounding the float32 temporaries to a few tens of MB
+_CHUNK = 65536
+
+
+def _scores(vectors: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """Cosine scores of int8 (scaled by 127) unit vectors against a float32 query."""
+    out = np.empty(len(vectors), dtype=np.float32)
+    for start in range(0, len(vectors), _CHUNK):
+        out[start:start + _CHUNK] = vectors[start:start + _CHUNK].astype(np.float32) @ query
+    return out / 127
+
+
+def _top_k(ids: np.ndarray, scores: np.ndarray, k: int) -> List[Tuple[int, float]]:
+    if len(scores) > k:
+        candidates = np.argpartition(-scores, k)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    ordered = candidates[np.argsort(-scores[candidates])]
+    return [(int(ids[i]), float(scores[i])) for i in ordered]
+
+
+def spherical_kmeans(vectors: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Unit-norm centroids maximizing cosine similarity (Lloyd iterations)."""
+    rng = np.random.default_rng(seed)
+    data = vectors.astype(np.float32)
+    centroids = data[rng.choice(len(data), size=k, replace=False)]
+
+    for _ in range(iterations):
+        assignment = np.argmax(data @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, data)
+        empty = ~sums.any(axis=1)
+        sums[empty] = data[rng.choice(len(data), size=int(empty.sum()))]
+        centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+    return centroids
+
+
+class BruteForceIndex:
+    """Exact search with batched matmul; best for small hotels.
+
+    Like :class:`IVFIndex` it is never modified: ``add`` and ``remove``
+    return a new index, so searches running meanwhile see a consistent one.
+    """
+
+    def __init__(self, ids: np.ndarray, vectors: np.ndarray):
+        self.ids = ids
+        self.vectors = vectors
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, ids: np.ndarray, vectors: np.ndarray) -> "BruteForceIndex":
+        return BruteForceIndex(np.concatenate([self.ids, ids]), np.concatenate([self.vectors, vectors]))
+
+    def remove(self, ids: np.ndarray) -> "BruteForceIndex":
+        keep = ~np.isin(self.ids, ids)
+        return BruteForceIndex(self.ids[keep], self.vectors[keep])
+
+    def search(self, query: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        return _top_k(self.ids, _scores(self.vectors, query), k)
+
+
+class IVFIndex:
+    """Inverted-file index: vectors are grouped by nearest k-means centroid and
+    a query only scans the ``nprobe`` closest groups."""
+
+    def __init__(self, ids: np.ndarray, vectors: np.ndarray, nprobe: int = 8, seed: int = 0):
+        self.nprobe = nprobe
+        nlist = max(1, int(np.sqrt(len(ids))))
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(len(vectors), size=min(len(vectors), nlist * 32), replace=False)]
+        self.centroids = spherical_kmeans(sample.astype(np.float32) / 127, nlist, seed=seed)
+        self._build(ids, vectors)
+
+    def __len__(self) -> int:
+        return len(self.ids) + len(self.pending_ids)
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        assignment = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), _CHUNK):
+            chunk = vectors[start:start + _CHUNK].astype(np.float32)
+            assignment[start:start + _CHUNK] = np.argmax(chunk @ self.centroids.T, axis=1)
+        return assignment
+
+    def _build(self, ids: np.ndarray, vectors: np.ndarray):
+        assignment = self._assign(vectors)
+        order = np.argsort(assignment, kind="stable")
+        self.ids = ids[order]
+        self.vectors = vectors[order]
+        self.offsets = np.searchsorted(assignment[order], np.arange(len(self.centroids) + 1))
+        self.pending_ids = np.empty(0, dtype=np.int64)
+        self.pending_vectors = np.empty((0, vectors.shape[1]), dtype=np.int8)
+
+    def add(self, ids: np.ndarray, vectors: np.ndarray) -> "IVFIndex":
+        # New vectors are scanned exhaustively until there are enough to regroup
+        index = copy.copy(self)
+        index.pending_ids = np.concatenate([self.pending_ids, ids])
+        index.pending_vectors = np.concatenate([self.pending_vectors, vectors])
+        if len(index.pending_ids) > max(1000, len(self.ids) // 10):
+            index._build(
+                np.concatenate([self.ids, index.pending_ids]),
+                np.concatenate([self.vectors, index.pending_vectors])
+            )
+        return index
+
+    def remove(self, ids: np.ndarray) -> "IVFIndex":
+        index = copy.copy(self)
+        keep = ~np.isin(self.ids, ids)
+        index.ids, index.vectors = self.ids[keep], self.vectors[keep]
+        # Groups stay contiguous, so each offset moves back by the rows removed before it
+        index.offsets = np.concatenate(([0], np.cumsum(keep)))[self.offsets]
+        pending = ~np.isin(self.pending_ids, ids)
+        index.pending_ids, index.pending_vectors = self.pending_ids[pending], self.pending_vectors[pending]
+        return index
+
+    def search(self, query: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        probes = np.argsort(-(self.centroids @ query))[:self.nprobe]
+        slices = [slice(self.offsets[p], self.offsets[p + 1]) for p in probes]
+        ids = np.concatenate([self.ids[s] for s in slices] + [self.pending_ids])
+        vectors = np.concatenate([self.vectors[s] for s in slices] + [self.pending_vectors])
+        return _top_k(ids, _scores(vectors, query), k)
+
+
+class SimilarityIndexCache:
+    """Per-hotel ANN indexes kept in memory (LRU) and topped up incrementally
+    with reviews ingested since the index was last used.
+
+    Each hotel has its own lock, held while its index is loaded or built, so
+    a cold build only delays queries for that hotel. Indexes older than
+    ``max_age_seconds`` are rebuilt from the table, which drops reviews since
+    deleted (e.g. archived); :func:`find_similar` also discards stale hits
+    it comes across in the meantime.
+    """
+
+    def __init__(self, max_hotels: int, ivf_threshold: int, nprobe: int, max_age_seconds: float = 3600):
+        self.max_hotels = max_hotels
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self.max_age_seconds = max_age_seconds
+        # hotel_id -> (index, highest review id in it, time.monotonic() of the full build)
+        self._indexes: "OrderedDict[str, Tuple[object, int, float]]" = OrderedDict()
+        self._hotel_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, db: Session, hotel_id: str, after_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        rows = db.query(Review.id, Review.embedding).filter(
+            Review.hotel_id == hotel_id,
+            Review.id > after_id,
+            Review.embedding.isnot(None)
+        ).order_by(Review.id).all()
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.int8)
+        ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+        return ids, np.stack([decode_int8(r[1]) for r in rows])
+
+    def _build(self, ids: np.ndarray, vectors: np.ndarray):
+        if len(ids) >= self.ivf_threshold:
+            return IVFIndex(ids, vectors, nprobe=self.nprobe)
+        return BruteForceIndex(ids, vectors)
+
+    def _hotel_lock(self, hotel_id: str) -> threading.Lock:
+        with self._lock:
+            return self._hotel_locks.setdefault(hotel_id, threading.Lock())
+
+    def get(self, db: Session, hotel_id: str):
+        with self._hotel_lock(hotel_id):
+            with self._lock:
+                index, max_id, built_at = self._indexes.get(hotel_id, (None, 0, 0.0))
+            if index is not None and time.monotonic() - built_at > self.max_age_seconds:
+                index, max_id = None, 0
+            # A hit still loads reviews added since, but does not rebuild
+            metrics.record_cache_lookups("similarity_index", index is not None, index is None)
+
+            # Outside the shared lock: other hotels are served while this one loads
+            ids, vectors = self._load(db, hotel_id, max_id)
+            if len(ids):
+                max_id = int(ids[-1])
+                if index is None:
+                    index, built_at = self._build(ids, vectors), time.monotonic()
+                elif isinstance(index, BruteForceIndex) and len(index) + len(ids) >= self.ivf_threshold:
+                    index = self._build(np.concatenate([index.ids, ids]), np.concatenate([index.vectors, vectors]))
+                else:
+                    index = index.add(ids, vectors)
+
+            with self._lock:
+                self._indexes.pop(hotel_id, None)
+                if index is not None:
+                    self._indexes[hotel_id] = (index, max_id, built_at)
+                    while len(self._indexes) > self.max_hotels:
+                        self._indexes.popitem(last=False)
+            return index
+
+    def discard(self, hotel_id: str, review_ids: List[int]):
+        """Drop reviews that no longer exist from the hotel's cached index."""
+        with self._hotel_lock(hotel_id):
+            with self._lock:
+                entry = self._indexes.get(hotel_id)
+                if entry is not None:
+                    index, max_id, built_at = entry
+                    self._indexes[hotel_id] = (index.remove(np.asarray(review_ids, dtype=np.int64)), max_id, built_at)
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+
+
+similarity_index_cache = SimilarityIndexCache(
+    max_hotels=settings.ANN_MAX_CACHED_HOTELS,
+    ivf_threshold=settings.ANN_IVF_THRESHOLD,
+    nprobe=settings.ANN_NPROBE,
+    max_age_seconds=settings.ANN_CACHE_MAX_AGE_SECONDS
+)
+
+
+def find_similar(db: Session, review: Review, k: int) -> List[Tuple[int, float]]:
+    """Ids and cosine similarity of the ``k`` reviews of the same hotel closest to ``review``."""
+    if review.embedding is not None:
+        query = decode_vector(review.embedding)
+    else:
+        query = get_embedder().embed([review.review_text])[0]
+
+    index = similarity_index_cache.get(db, review.hotel_id)
+    if index is None:
+        return []
+    hits = index.search(query.astype(np.float32), k + 1)
+
+    # Reviews deleted since the index was built (a cheap primary key lookup)
+    existing = {row[0] for row in db.query(Review.id).filter(Review.id.in_([review_id for review_id, _ in hits]))}
+    missing = [review_id for review_id, _ in hits if review_id not in existing]
+    if missing:
+        similarity_index_cache.discard(review.hotel_id, missing)
+        return find_similar(db, review, k)
+    return [(review_id, score) for review_id, score in hits if review_id != review.id][:k]
@@ -0,0 +1,187 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.main import app
+from app.config import settings
+from app.database import Base, get_db
+from app import profiling
+from app.models import HotelIngestState, Review
+from datetime import datetime, timedelta
+
+# Test database
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_admin.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+app.dependency_overrides[get_db] = override_get_db
+
+
+@pytest.fixture(scope="function")
+def test_db():
+    """Create test database"""
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def client(test_db):
+    """Test client fixture"""
+    profiling.recent_profiles.clear()
+    profiling.slow_queries.clear()
+    return TestClient(app)
+
+
+def _token(client, username, role):
+    client.post(
+        "/auth/register",
+        json={
+            "username": username,
+            "email": f"{username}@test.com",
+            "password": "password123",
+            "role": role
+        }
+    )
+    response = client.post(
+        "/auth/login",
+        data={"username": username, "password": "password123"}
+    )
+    return response.json()["access_token"]
+
+
+@pytest.fixture
+def manager_token(client):
+    """Create manager user and return auth token"""
+    return _token(client, "manager", "Manager")
+
+
+@pytest.fixture
+def staff_token(client):
+    """Create staff user and return auth token"""
+    return _token(client, "staff", "Staff")
+
+
+class TestProfiling:
+    """Test suite for request profiling"""
+
+    def test_profiling_disabled_by_default(self, client, manager_token):
+        """Test the profiling header is ignored unless profiling is enabled"""
+        response = client.get(
+            "/dashboard-metrics",
+            headers={"Authorization": f"Bearer {manager_token}", "X-Profile": "1"}
+        )
+
+        assert response.status_code == 200
+        assert "x-profile-id" not in response.headers
+        assert len(profiling.recent_profiles) == 0
+
+    def test_profile_requested_by_header(self, client, manager_token, monkeypatch):
+        """Test a request sent with the profiling header is profiled and retrievable"""
+        monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+        headers = {"Authorization": f"Bearer {manager_token}"}
+
+        response = client.get("/dashboard-metrics", headers={**headers, "X-Profile": "1"})
+        assert response.status_code == 200
+        profile_id = response.headers["x-profile-id"]
+
+        listing = client.get("/admin/profiles", headers=headers)
+        assert listing.status_code == 200
+        assert listing.json()[0]["id"] == profile_id
+        assert listing.json()[0]["path"] == "/dashboard-metrics"
+
+        detail = client.get(f"/admin/profiles/{profile_id}", headers=headers)
+        assert detail.status_code == 200
+        # The sync endpoint body runs in the threadpool and must show up in the profile
+        assert "get_dashboard_metrics" in detail.json()["stats"]
+
+    def test_profile_not_found(self, client, manager_token):
+        """Test unknown profile ids return 404"""
+        response = client.get(
+            "/admin/profiles/missing",
+            headers={"Authorization": f"Bearer {manager_token}"}
+        )
+
+        assert response.status_code == 404
+
+    def test_admin_requires_manager(self, client, staff_token):
+        """Test staff cannot read profiles"""
+        response = client.get(
+            "/admin/profiles",
+            headers={"Authorization": f"Bearer {staff_token}"}
+        )
+
+        assert response.status_code == 403
+
+
+class TestSlowQueryLog:
+    """Test suite for the slow query log"""
+
+    def test_slow_queries_record_route(self, client, manager_token, monkeypatch):
+        """Test statements over the threshold are recorded with their route"""
+        monkeypatch.setattr(settings, "SLOW_QUERY_THRESHOLD_MS", 0.000001)
+        headers = {"Authorization": f"Bearer {manager_token}"}
+
+        client.get("/dashboard-metrics", headers=headers)
+        response = client.get("/admin/slow-queries", headers=headers)
+
+        assert response.status_code == 200
+        routes = {record["route"] for record in response.json()}
+        assert "GET /dashboard-metrics" in routes
+        assert all(record["statement"] for record in response.json())
+
+
+class TestIngestState:
+    """Test suite for scheduled ingestion state"""
+
+    def test_lists_most_stale_first(self, client, manager_token):
+        """Test hotels are listed with their lag, most stale first"""
+        db = TestingSessionLocal()
+        now = datetime.utcnow()
+        db.add_all([
+            HotelIngestState(hotel_id="fresh", slot=1, last_success_at=now - timedelta(minutes=5), deferred_reviews=0),
+            HotelIngestState(hotel_id="stale", slot=2, last_success_at=now - timedelta(hours=5), deferred_reviews=3),
+        ])
+        db.commit()
+        db.close()
+
+        response = client.get("/admin/ingest-state", headers={"Authorization": f"Bearer {manager_token}"})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [row["hotel_id"] for row in data] == ["stale", "fresh"]
+        assert data[0]["lag_seconds"] >= 5 * 3600
+        assert data[0]["deferred_reviews"] == 3
+
+
+class TestTokenUsage:
+    """Test suite for LLM token accounting"""
+
+    def test_sums_per_hotel(self, client, manager_token):
+        """Test token usage is summed per hotel and copies without a call are not counted"""
+        db = TestingSessionLocal()
+        db.add_all([
+            Review(hotel_id="big", review_text="a", prompt_tokens=300, completion_tokens=40),
+            Review(hotel_id="big", review_text="b", prompt_tokens=200, completion_tokens=30),
+            Review(hotel_id="big", review_text="b!", prompt_tokens=None, completion_tokens=None),
+            Review(hotel_id="small", review_text="c", prompt_tokens=100, completion_tokens=20),
+        ])
+        db.commit()
+        db.close()
+
+        response = client.get("/admin/token-usage", headers={"Authorization": f"Bearer {manager_token}"})
+
+        assert response.status_code == 200
+        assert response.json() == [
+            {"hotel_id": "big", "reviews_analyzed": 2, "prompt_tokens": 500, "completion_tokens": 70},
+            {"hotel_id": "small", "reviews_analyzed": 1, "prompt_tokens": 100, "completion_tokens": 20},
+        ]
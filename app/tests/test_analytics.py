@@ -0,0 +1,150 @@
+import numpy as np
+import pytest
+from collections import Counter
+from datetime import date, datetime
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.models import Review, SentimentType, UrgencyType
+from app.services import analytics
+from app.services.columnar import SNAPSHOT_COLUMNS, reviews_to_snapshot
+
+# Test database
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_analytics.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+ROWS = [
+    ("hotel1", SentimentType.NEGATIVE, UrgencyType.CRITICAL, "Noise, Staff", datetime(2024, 1, 1, 9)),
+    ("hotel1", SentimentType.POSITIVE, UrgencyType.STANDARD, "Staff,Breakfast", datetime(2024, 1, 1, 18)),
+    ("hotel2", SentimentType.NEGATIVE, UrgencyType.STANDARD, "Noise", datetime(2024, 1, 3, 12)),
+    ("hotel2", SentimentType.NEGATIVE, UrgencyType.STANDARD, "Noise, Staff", datetime(2024, 1, 4, 12)),
+    ("hotel3", None, None, None, datetime(2024, 1, 4, 13)),
+    ("hotel3", SentimentType.NEUTRAL, UrgencyType.STANDARD, "Breakfast", None),
+]
+
+
+@pytest.fixture
+def db():
+    """Create test database and session"""
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+def _columns():
+    return analytics.ReviewColumns.from_rows(ROWS)
+
+
+def _snapshot(rows):
+    fields = ["hotel_id", "sentiment", "urgency", "topics", "processed_at"]
+    snapshot_rows = []
+    for index, row in enumerate(rows, start=1):
+        values = dict(zip(SNAPSHOT_COLUMNS, [None] * len(SNAPSHOT_COLUMNS)), id=index, review_text="",
+                      needs_reanalysis=False, **dict(zip(fields, row)))
+        snapshot_rows.append([values[name] for name in SNAPSHOT_COLUMNS])
+    return reviews_to_snapshot(snapshot_rows)
+
+
+class TestReviewColumns:
+    """Test suite for encoding reviews into column arrays"""
+
+    def test_counts_match_per_row_loop(self):
+        """Test sentiment and topic counts equal a Counter over the rows, ties included"""
+        columns = _columns()
+
+        expected = Counter()
+        for _, _, _, topics_str, _ in ROWS:
+            if topics_str:
+                expected.update([t.strip() for t in topics_str.split(',')])
+
+        assert list(analytics.topic_counts(columns).items()) == expected.most_common()
+        assert analytics.sentiment_counts(columns) == {
+            SentimentType.POSITIVE: 1, SentimentType.NEGATIVE: 3, SentimentType.NEUTRAL: 1
+        }
+
+    def test_count_topics_from_strings(self):
+        """Test counting straight from stored topics strings, as the dashboard does"""
+        values = [row[3] for row in ROWS] + ["", "Noise"]
+
+        assert analytics.count_topics(values) == {"Noise": 4, "Staff": 3, "Breakfast": 2}
+        assert analytics.count_topics([]) == {}
+
+    def test_builder_topic_codes(self):
+        """Test topics strings share one code space, new topics getting the next code"""
+        builder = analytics.ReviewColumnsBuilder()
+
+        assert builder.topic_codes("Noise, Staff") == [0, 1]
+        assert builder.topic_codes("Staff,Breakfast") == [1, 2]
+        assert builder.topic_codes(None) == []
+        assert builder.topics == ["Noise", "Staff", "Breakfast"]
+
+    def test_from_arrow_matches_from_rows(self):
+        """Test the snapshot table encodes to the same statistics as database rows"""
+        from_rows = _columns()
+        from_arrow = analytics.ReviewColumns.from_arrow(_snapshot(ROWS))
+
+        assert from_arrow.hotel_ids == from_rows.hotel_ids
+        np.testing.assert_array_equal(from_arrow.sentiment, from_rows.sentiment)
+        np.testing.assert_array_equal(from_arrow.critical, from_rows.critical)
+        np.testing.assert_array_equal(from_arrow.day, from_rows.day)
+        assert analytics.topic_counts(from_arrow) == analytics.topic_counts(from_rows)
+
+    def test_load_in_batches(self, db):
+        """Test columns read from the database in batches share one code space"""
+        for hotel_id, sentiment, urgency, topics, processed_at in ROWS:
+            db.add(Review(hotel_id=hotel_id, review_text="Stay", sentiment=sentiment, urgency=urgency,
+                          topics=topics, processed_at=processed_at))
+        db.commit()
+
+        columns = analytics.load_review_columns(db, batch_size=4)
+
+        assert len(columns) == len(ROWS)
+        assert columns.hotel_ids == ["hotel1", "hotel2", "hotel3"]
+        assert analytics.topic_counts(columns) == analytics.topic_counts(_columns())
+
+        filtered = analytics.load_review_columns(db, [Review.hotel_id == "hotel2"], batch_size=1)
+        assert analytics.sentiment_counts(filtered)[SentimentType.NEGATIVE] == 2
+
+
+class TestStatistics:
+    """Test suite for the vectorized statistics"""
+
+    def test_topic_sentiment_crosstab(self):
+        """Test topic mentions are split by the review's sentiment"""
+        topics, counts = analytics.topic_sentiment_crosstab(_columns())
+
+        noise = counts[topics.index("Noise")]
+        assert noise[analytics.NEGATIVE] == 3
+        assert counts[topics.index("Breakfast")].sum() == 2
+
+    def test_hotel_stats(self):
+        """Test per-hotel rates and the top topic among negative reviews"""
+        stats = analytics.hotel_stats(_columns())
+
+        assert stats.total.tolist() == [2, 2, 2]
+        assert stats.negative_share.tolist() == [0.5, 1.0, 0.0]
+        assert stats.escalation_rate.tolist() == [0.5, 0.0, 0.0]
+        assert stats.top_topic == ["Noise", "Noise", None]
+
+    def test_rank_ties_and_eligibility(self):
+        """Test ties share the best rank and ineligible hotels are left out"""
+        values = np.array([0.5, 0.9, 0.5, 0.1, 0.95])
+        eligible = np.array([True, True, True, True, False])
+
+        assert analytics.rank_hotels(values, eligible).tolist() == [2, 1, 2, 4, 0]
+        assert analytics.percentile_ranks(values, eligible).tolist() == [75.0, 100.0, 75.0, 25.0, 0.0]
+
+    def test_daily_trend(self):
+        """Test empty days are included and rates cover the trailing window"""
+        trend = analytics.daily_trend(_columns(), window=2)
+
+        assert trend.days == [date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 3), date(2024, 1, 4)]
+        assert trend.total.tolist() == [2, 0, 1, 2]
+        assert trend.rolling_negative_share.tolist() == [0.5, 0.5, 1.0, 2 / 3]
+
+        hotel = analytics.daily_trend(_columns(), window=7, hotel_id="hotel2")
+        assert hotel.negative.tolist() == [1, 1]
+        assert analytics.daily_trend(_columns(), hotel_id="missing").days == []
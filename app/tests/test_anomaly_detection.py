@@ -0,0 +1,209 @@
+import pytest
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.main import app
+from app.database import Base, get_db
+from app.models import (
+    Review, SentimentType, UrgencyType, HotelDailyStats, HotelAnomalyState
+)
+from app.services.anomaly_detection import EscalationAnomalyJob, ewma_update
+
+# Test database
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_anomaly_detection.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+START = datetime(2024, 3, 1, 12, 0)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+app.dependency_overrides[get_db] = override_get_db
+
+
+@pytest.fixture
+def db():
+    """Create test database and session"""
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def client(db):
+    """Test client fixture"""
+    return TestClient(app)
+
+
+@pytest.fixture
+def auth_token(client):
+    """Create user and return auth token"""
+    client.post(
+        "/auth/register",
+        json={"username": "testuser", "email": "test@test.com", "password": "testpass", "role": "Staff"}
+    )
+    response = client.post("/auth/login", data={"username": "testuser", "password": "testpass"})
+    return response.json()["access_token"]
+
+
+@pytest.fixture
+def job():
+    """Detector with a short warm-up"""
+    return EscalationAnomalyJob(alpha=0.2, z_threshold=3.0, min_count=3, warmup_days=5)
+
+
+def _add_day(db, day, critical, standard=2, hotel_id="hotel1", canonical_review_id=None):
+    processed_at = START + timedelta(days=day)
+    db.add_all([
+        Review(hotel_id=hotel_id, review_text="Bed bugs!", processed_at=processed_at,
+               sentiment=SentimentType.NEGATIVE, urgency=UrgencyType.CRITICAL,
+               canonical_review_id=canonical_review_id)
+        for _ in range(critical)
+    ] + [
+        Review(hotel_id=hotel_id, review_text="Fine stay", processed_at=processed_at,
+               sentiment=SentimentType.POSITIVE, urgency=UrgencyType.STANDARD)
+        for _ in range(standard)
+    ])
+    db.commit()
+
+
+def _today(day):
+    return (START + timedelta(days=day)).date()
+
+
+class TestEWMA:
+    """Test suite for the incremental mean/variance update"""
+
+    def test_converges_to_constant(self):
+        """Test a constant series drives the variance to zero"""
+        mean, variance = 0.0, 0.0
+        for _ in range(200):
+            mean, variance = ewma_update(mean, variance, 4.0, 0.1)
+
+        assert mean == pytest.approx(4.0)
+        assert variance == pytest.approx(0.0, abs=1e-6)
+
+
+class TestEscalationAnomalyJob:
+    """Test suite for the escalation anomaly job"""
+
+    def test_spike_raises_alert(self, db, job):
+        """Test a bed bug outbreak day is flagged and normal days are not"""
+        for day in range(10):
+            _add_day(db, day, critical=day % 2)
+        _add_day(db, 10, critical=8)
+
+        alerts = job.run(db, today=_today(11))
+
+        assert [(a.metric, a.day, a.value) for a in alerts] == [
+            ("critical", _today(10), 8),
+            ("negative", _today(10), 8),
+        ]
+        assert alerts[0].z_score >= 3.0
+
+    def test_no_alert_during_warmup(self, db, job):
+        """Test a spike before the baseline has settled is not flagged"""
+        _add_day(db, 0, critical=0)
+        _add_day(db, 1, critical=9)
+
+        assert job.run(db, today=_today(2)) == []
+
+    def test_incomplete_day_waits(self, db, job):
+        """Test today's counts are rolled up but only judged once the day is over"""
+        for day in range(10):
+            _add_day(db, day, critical=0)
+        _add_day(db, 10, critical=8)
+
+        assert job.run(db, today=_today(10)) == []
+        assert len(job.run(db, today=_today(11))) == 2
+
+    def test_incremental_runs(self, db, job):
+        """Test each run only consumes reviews and days it has not seen"""
+        for day in range(6):
+            _add_day(db, day, critical=1)
+        job.run(db, today=_today(6))
+        state = db.get(HotelAnomalyState, ("hotel1", "critical"))
+        assert state.last_day == _today(5)
+        assert state.days_observed == 6
+
+        # Three quiet days without any reviews, then a spike
+        _add_day(db, 9, critical=6)
+        alerts = job.run(db, today=_today(10))
+
+        db.refresh(state)
+        assert state.days_observed == 10
+        assert [a.metric for a in alerts] == ["critical", "negative"]
+        assert db.get(HotelDailyStats, ("hotel1", _today(9))).critical == 6
+        assert db.query(HotelDailyStats).count() == 7
+
+    def test_duplicates_ignored(self, db, job):
+        """Test near-duplicate reposts do not count towards a spike"""
+        for day in range(10):
+            _add_day(db, day, critical=0)
+        _add_day(db, 10, critical=1)
+        canonical_id = db.query(Review.id).filter(Review.urgency == UrgencyType.CRITICAL).scalar()
+        _add_day(db, 10, critical=7, standard=0, canonical_review_id=canonical_id)
+
+        assert job.run(db, today=_today(11)) == []
+        assert db.get(HotelDailyStats, ("hotel1", _today(10))).critical == 1
+
+
+    def test_recent_reviews_wait_for_safety_lag(self, db, job):
+        """Test the checkpoint stops before reviews that may sit behind uncommitted ids"""
+        _add_day(db, 0, critical=1, standard=0)
+        db.add(Review(hotel_id="hotel1", review_text="Just in", processed_at=datetime.utcnow(),
+                      sentiment=SentimentType.NEGATIVE, urgency=UrgencyType.CRITICAL))
+        db.commit()
+        # Committed after the recent review although processed before it
+        _add_day(db, 0, critical=1, standard=0)
+
+        assert job.roll_up(db) == 1
+        assert db.get(HotelDailyStats, ("hotel1", _today(0))).critical == 1
+
+        assert job.roll_up(db, cutoff=datetime.utcnow() + timedelta(minutes=5)) == 2
+        assert db.get(HotelDailyStats, ("hotel1", _today(0))).critical == 2
+
+
+class TestAlertsEndpoint:
+    """Test suite for the alerts endpoint"""
+
+    def test_list_alerts(self, client, auth_token, db, job):
+        """Test alerts can be filtered by hotel"""
+        for hotel_id in ("hotel1", "hotel2"):
+            for day in range(10):
+                _add_day(db, day, critical=0, hotel_id=hotel_id)
+        _add_day(db, 10, critical=8, hotel_id="hotel2")
+        job.run(db, today=_today(11))
+
+        response = client.get(
+            "/alerts",
+            params={"hotel_id": "hotel2"},
+            headers={"Authorization": f"Bearer {auth_token}"}
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data) == 2
+        assert {a["metric"] for a in data} == {"critical", "negative"}
+        assert data[0]["day"] == str(_today(10))
+
+        response = client.get(
+            "/alerts",
+            params={"hotel_id": "hotel1"},
+            headers={"Authorization": f"Bearer {auth_token}"}
+        )
+        assert response.json() == []
+
+    def test_requires_auth(self, client):
+        """Test alerts require authentication"""
+        assert client.get("/alerts").status_code == 401
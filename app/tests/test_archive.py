@@ -0,0 +1,190 @@
+import pytest
+import pyarrow.dataset as ds
+from datetime import datetime
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.main import app
+from app.database import Base, get_db
+from app.models import Review, ReviewLSHBucket, ArchivedReviewStats, SentimentType, SnapshotRelabel, UrgencyType
+from app.services.anomaly_detection import escalation_anomaly_job
+from app.services.archive import ReviewArchiveJob
+from app.services.checkpoints import get_checkpoint
+from app.services.leaderboard import hotel_leaderboard_job
+from app.services.partitions import ReviewPartitionJob, add_months, partition_name
+from app.services.snapshots import review_snapshot_job
+
+# Test database
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_archive.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+NOW = datetime(2024, 6, 15, 12, 0)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+app.dependency_overrides[get_db] = override_get_db
+
+
+@pytest.fixture
+def db():
+    """Create test database and session"""
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def client(db):
+    """Test client fixture"""
+    return TestClient(app)
+
+
+@pytest.fixture
+def auth_token(client):
+    """Create user and return auth token"""
+    client.post(
+        "/auth/register",
+        json={"username": "testuser", "email": "test@test.com", "password": "testpass", "role": "Staff"}
+    )
+    response = client.post("/auth/login", data={"username": "testuser", "password": "testpass"})
+    return response.json()["access_token"]
+
+
+@pytest.fixture
+def job(tmp_path):
+    """Archive job keeping two months, with small batches"""
+    return ReviewArchiveJob(retention_months=2, archive_dir=str(tmp_path), batch_size=2)
+
+
+@pytest.fixture
+def reviews(db):
+    """Reviews spread over January to June, with one near-duplicate and LSH buckets"""
+    rows = [
+        ("hotel1", datetime(2024, 1, 10), SentimentType.NEGATIVE, UrgencyType.CRITICAL, "Cleanliness, Noise"),
+        ("hotel1", datetime(2024, 1, 20), SentimentType.POSITIVE, UrgencyType.STANDARD, "Staff"),
+        ("hotel2", datetime(2024, 2, 5), SentimentType.NEUTRAL, UrgencyType.STANDARD, "Noise"),
+        ("hotel2", datetime(2024, 3, 30), SentimentType.NEGATIVE, UrgencyType.STANDARD, "Noise"),
+        ("hotel1", datetime(2024, 4, 2), SentimentType.POSITIVE, UrgencyType.STANDARD, "Staff, Breakfast"),
+        ("hotel2", datetime(2024, 6, 1), SentimentType.NEGATIVE, UrgencyType.CRITICAL, "Cleanliness"),
+    ]
+    for hotel_id, processed_at, sentiment, urgency, topics in rows:
+        db.add(Review(hotel_id=hotel_id, review_text="Review", processed_at=processed_at,
+                      sentiment=sentiment, urgency=urgency, topics=topics))
+    db.commit()
+    # A repost of the first review, in February
+    db.add(Review(hotel_id="hotel1", review_text="Review", processed_at=datetime(2024, 2, 6),
+                  sentiment=SentimentType.NEGATIVE, urgency=UrgencyType.CRITICAL,
+                  topics="Cleanliness, Noise", canonical_review_id=1))
+    db.add_all([ReviewLSHBucket(review_id=i, band=0, hotel_id="hotel1", bucket=i) for i in range(1, 8)])
+    db.commit()
+
+
+def _consume(db):
+    """Let the default upstream jobs read every review"""
+    escalation_anomaly_job.roll_up(db)
+    hotel_leaderboard_job.count_topics(db)
+
+
+def _metrics(client, auth_token, exclude_duplicates=False):
+    response = client.get(
+        "/dashboard-metrics",
+        params={"exclude_duplicates": exclude_duplicates},
+        headers={"Authorization": f"Bearer {auth_token}"}
+    )
+    assert response.status_code == 200
+    metrics = response.json()
+    metrics["topic_breakdown"] = sorted(metrics["topic_breakdown"], key=lambda topic: topic["topic"])
+    return metrics
+
+
+class TestReviewArchiveJob:
+    """Test suite for the review archive job"""
+
+    def test_moves_old_months_to_parquet(self, db, reviews, job, tmp_path):
+        """Test reviews before the retention window end up in Parquet and leave the database"""
+        _consume(db)
+        db.commit()
+
+        assert job.run(db, now=NOW) == 5
+
+        assert sorted(id for (id,) in db.query(Review.id)) == [5, 6]
+        assert sorted(id for (id,) in db.query(ReviewLSHBucket.review_id)) == [5, 6]
+        archived = ds.dataset(str(tmp_path / "reviews"), format="parquet", partitioning="hive").to_table()
+        assert sorted(archived.column("id").to_pylist()) == [1, 2, 3, 4, 7]
+        assert sorted(set(archived.column("month").to_pylist())) == ["2024-01", "2024-02", "2024-03"]
+        assert sorted(archived.column("sentiment").to_pylist()) == ["Negative", "Negative", "Negative", "Neutral", "Positive"]
+
+        # Nothing is left to archive
+        assert job.run(db, now=NOW) == 0
+
+    def test_dashboard_counts_unchanged(self, db, client, auth_token, reviews, job):
+        """Test the dashboard reports the same numbers after archiving, duplicates included or not"""
+        _consume(db)
+        db.commit()
+        before = [_metrics(client, auth_token), _metrics(client, auth_token, exclude_duplicates=True)]
+
+        job.run(db, now=NOW)
+
+        assert [_metrics(client, auth_token), _metrics(client, auth_token, exclude_duplicates=True)] == before
+        assert before[0]["total_reviews"] == 7
+        assert before[1]["total_reviews"] == 6
+        stats = db.get(ArchivedReviewStats, ("hotel1", datetime(2024, 1, 1).date(), False))
+        assert (stats.total, stats.positive, stats.negative, stats.critical) == (2, 1, 1, 1)
+
+    def test_waits_for_daily_stats(self, db, reviews, job):
+        """Test reviews not yet rolled up into hotel_daily_stats are kept"""
+        assert job.run(db, now=NOW) == 0
+        assert db.query(Review).count() == 7
+
+    def test_waits_for_topic_counts(self, db, reviews, job):
+        """Test reviews the leaderboard has not counted topics of are kept"""
+        escalation_anomaly_job.roll_up(db)
+        db.commit()
+
+        assert job.run(db, now=NOW) == 0
+        assert db.query(Review).count() == 7
+
+    def test_waits_for_snapshot_relabels(self, db, reviews, tmp_path):
+        """Test a month with relabels the snapshot has not rewritten yet is kept"""
+        _consume(db)
+        db.add(SnapshotRelabel(hotel_id="hotel2", month="2024-02", version=1))
+        db.commit()
+        job = ReviewArchiveJob(retention_months=2, archive_dir=str(tmp_path), batch_size=2,
+                               upstream_jobs=(escalation_anomaly_job.name, review_snapshot_job.name))
+        get_checkpoint(db, review_snapshot_job.name).last_review_id = 7
+        db.commit()
+
+        assert job.run(db, now=NOW) == 2
+        assert sorted(id for (id,) in db.query(Review.id)) == [3, 4, 5, 6, 7]
+
+    def test_disabled_without_retention(self, db, reviews, tmp_path):
+        """Test a retention of 0 months keeps everything"""
+        _consume(db)
+        db.commit()
+
+        assert ReviewArchiveJob(retention_months=0, archive_dir=str(tmp_path), batch_size=2).run(db, now=NOW) == 0
+        assert db.query(Review).count() == 7
+
+
+class TestPartitions:
+    """Test suite for the monthly partition helpers"""
+
+    def test_month_arithmetic(self):
+        """Test months roll over year boundaries in both directions"""
+        assert add_months(datetime(2024, 11, 1), 3) == datetime(2025, 2, 1)
+        assert add_months(datetime(2024, 1, 1), -1) == datetime(2023, 12, 1)
+        assert partition_name(datetime(2025, 2, 1)) == "reviews_p202502"
+
+    def test_job_skips_unpartitioned_table(self, db):
+        """Test partition maintenance does nothing on SQLite"""
+        assert ReviewPartitionJob(months_ahead=3).run(db, now=NOW) == []
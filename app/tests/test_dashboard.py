@@ -235,4 +235,29 @@ class TestDashboardEndpoints:
         )
         
         # Allow for minor rounding differences
-        assert abs(total_percent - 100.0) < 0.1
\ No newline at end of file
+        assert abs(total_percent - 100.0) < 0.1
+    
+    def test_dashboard_metrics_exclude_duplicates(self, client, auth_token, sample_reviews):
+        """Test near-duplicates can be excluded from the metrics"""
+        db = TestingSessionLocal()
+        canonical = db.query(Review).filter(Review.urgency == UrgencyType.CRITICAL).first()
+        db.add(Review(
+            hotel_id="hotel1",
+            review_text="Found bed bugs!!",
+            sentiment=SentimentType.NEGATIVE,
+            topics="Cleanliness",
+            urgency=UrgencyType.CRITICAL,
+            canonical_review_id=canonical.id
+        ))
+        db.commit()
+        db.close()
+        headers = {"Authorization": f"Bearer {auth_token}"}
+        
+        with_duplicates = client.get("/dashboard-metrics", headers=headers).json()
+        assert with_duplicates["total_reviews"] == 6
+        assert with_duplicates["critical_reviews_count"] == 2
+        
+        without_duplicates = client.get("/dashboard-metrics?exclude_duplicates=true", headers=headers).json()
+        assert without_duplicates["total_reviews"] == 5
+        assert without_duplicates["critical_reviews_count"] == 1
+        assert without_duplicates["escalation_rate"] == 20.0
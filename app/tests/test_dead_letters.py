@@ -0,0 +1,142 @@
+import json
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.main import app
+from app.database import Base, get_db
+from app.models import DeadLetterReview, Review, SentimentType, UrgencyType
+from app.schemas import LLMAnalysisResult
+from app.services.dead_letters import DeadLetterRetryJob
+from app.services.review_ingestion import review_ingestion_service
+
+# Test database
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_dead_letters.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+ANALYSIS = LLMAnalysisResult(
+    sentiment=SentimentType.NEGATIVE, topics=["Cleanliness"], urgency=UrgencyType.CRITICAL, model="gpt-test"
+)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+app.dependency_overrides[get_db] = override_get_db
+
+
+@pytest.fixture
+def db():
+    """Create test database and session"""
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def analyze():
+    """Patch the LLM so ingestion is deterministic"""
+    with patch("app.services.review_ingestion.llm_analyzer.analyze_review", return_value=ANALYSIS) as analyze:
+        yield analyze
+
+
+@pytest.fixture
+def failing_store():
+    """Make storing any of the yielded texts fail after the flush, like a constraint violation"""
+    failing = {"Boom"}
+    original = review_ingestion_service.add_review
+
+    def add_review(db, review, signature):
+        original(db, review, signature)
+        if review.review_text in failing:
+            raise RuntimeError("violates check constraint")
+
+    with patch.object(review_ingestion_service, "add_review", side_effect=add_review):
+        yield failing
+
+
+class TestIngestIsolation:
+    """Test suite for per-review error isolation during ingestion"""
+
+    def test_failures_become_dead_letters(self, db, analyze, failing_store):
+        """Test bad reviews are set aside while the rest of the batch is committed"""
+        reviews = review_ingestion_service.process_reviews("hotel1", [
+            {"text": "Lovely stay", "date": datetime(2024, 5, 1, 9, 0)},
+            {"author": "No text"},
+            {"text": "Boom", "date": datetime(2024, 5, 2, 9, 0)},
+            {"text": "Dirty bathroom"},
+        ], db)
+
+        assert [review.review_text for review in reviews] == ["Lovely stay", "Dirty bathroom"]
+        assert sorted(text for (text,) in db.query(Review.review_text)) == ["Dirty bathroom", "Lovely stay"]
+
+        letters = db.query(DeadLetterReview).order_by(DeadLetterReview.id).all()
+        assert [letter.error for letter in letters] == ["review has no text", "violates check constraint"]
+        assert letters[0].analysis is None
+        assert json.loads(letters[1].analysis)["urgency"] == "Critical"
+        assert all(letter.attempts == 1 for letter in letters)
+
+
+class TestDeadLetterRetry:
+    """Test suite for the dead-letter retry job"""
+
+    def test_retry_stores_and_reuses_labels(self, db, analyze, failing_store):
+        """Test a retried review is stored with its original labels and date without another LLM call"""
+        review_ingestion_service.process_reviews("hotel1", [{"text": "Boom", "date": datetime(2024, 5, 2, 9, 0)}], db)
+        analyze.reset_mock()
+        failing_store.clear()
+
+        assert DeadLetterRetryJob(batch_size=10, max_attempts=3).run(db) == 1
+
+        assert analyze.call_count == 0
+        assert db.query(DeadLetterReview).count() == 0
+        review = db.query(Review).one()
+        assert review.urgency == UrgencyType.CRITICAL
+        assert review.review_date == datetime(2024, 5, 2, 9, 0)
+
+    def test_failed_retry_counts_attempts(self, db, analyze, failing_store):
+        """Test a retry that fails again is kept with its attempt count until max_attempts"""
+        review_ingestion_service.process_reviews("hotel1", [{"text": "Boom"}, {"text": ""}], db)
+        job = DeadLetterRetryJob(batch_size=1, max_attempts=3)
+
+        assert job.run(db) == 0
+        assert job.run(db) == 0
+        assert job.run(db) == 0
+
+        assert [letter.attempts for letter in db.query(DeadLetterReview).order_by(DeadLetterReview.id)] == [3, 3]
+        assert db.query(Review).count() == 0
+
+
+class TestDeadLetterEndpoints:
+    """Test suite for dead-letter admin endpoints"""
+
+    def test_list_dead_letters(self, db):
+        """Test managers can inspect dead letters with their payload"""
+        db.add(DeadLetterReview(
+            hotel_id="hotel1", payload=json.dumps({"text": "Boom"}), error="violates check constraint", attempts=2
+        ))
+        db.commit()
+        client = TestClient(app)
+        client.post(
+            "/auth/register",
+            json={"username": "manager", "email": "manager@test.com", "password": "password123", "role": "Manager"}
+        )
+        token = client.post("/auth/login", data={"username": "manager", "password": "password123"}).json()["access_token"]
+
+        response = client.get("/admin/dead-letters", headers={"Authorization": f"Bearer {token}"})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data[0]["payload"] == {"text": "Boom"}
+        assert data[0]["attempts"] == 2
+        assert data[0]["has_analysis"] is False
@@ -0,0 +1,235 @@
+import pytest
+from collections import Counter
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.models import HotelIngestState, Review, SentimentType, UrgencyType
+from app.schemas import LLMAnalysisResult
+from app.services.incremental_ingestion import IncrementalIngestionJob, TokenBucket
+from app.services.review_ingestion import review_ingestion_service
+
+# Test database
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_incremental_ingestion.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+NOW = datetime(2024, 6, 1, 12, 0)
+
+
+@pytest.fixture
+def db():
+    """Create test database and session"""
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def job():
+    """Job writing to the test database with a generous LLM budget"""
+    return IncrementalIngestionJob(
+        interval_seconds=3600, slots=60, batch_limit=10, max_concurrency=2,
+        llm_calls_per_hour=1000, session_factory=TestingSessionLocal
+    )
+
+
+@pytest.fixture
+def mock_analysis():
+    """Patch the LLM so ingestion is deterministic"""
+    result = LLMAnalysisResult(sentiment=SentimentType.NEUTRAL, topics=["Service"], urgency=UrgencyType.STANDARD)
+    with patch("app.services.review_ingestion.llm_analyzer.analyze_review", return_value=result):
+        yield
+
+
+def _fetched(*days_ago):
+    return [
+        {"text": f"Review written {days} days ago about the lobby", "author": f"Guest {days}",
+         "date": NOW - timedelta(days=days)}
+        for days in days_ago
+    ]
+
+
+class TestTokenBucket:
+    """Test suite for the LLM budget"""
+
+    def test_grants_up_to_capacity(self):
+        """Test a request larger than the budget is partially granted"""
+        bucket = TokenBucket(rate_per_second=0, capacity=5)
+
+        assert bucket.take(3) == 3
+        assert bucket.take(3) == 2
+        assert bucket.take(1) == 0
+
+
+class TestScheduling:
+    """Test suite for hotel time slots"""
+
+    def test_slots_spread_hotels(self, job):
+        """Test hotels are spread evenly enough across slots"""
+        slots = Counter(job.slot_for(f"hotel-{i}") for i in range(6000))
+
+        assert len(slots) == 60
+        assert max(slots.values()) < 2 * 100
+
+    def test_due_hotels(self, db, job):
+        """Test only never-synced, in-slot or overdue hotels are due"""
+        slot = job.current_slot(NOW)
+        other = (slot + 1) % job.slots
+        db.add_all([
+            HotelIngestState(hotel_id="new", slot=other, deferred_reviews=0),
+            HotelIngestState(hotel_id="in_slot", slot=slot, last_run_at=NOW - timedelta(hours=1), deferred_reviews=0),
+            HotelIngestState(hotel_id="just_ran", slot=slot, last_run_at=NOW - timedelta(minutes=1), deferred_reviews=0),
+            HotelIngestState(hotel_id="other_slot", slot=other, last_run_at=NOW - timedelta(hours=1), deferred_reviews=0),
+            HotelIngestState(hotel_id="overdue", slot=other, last_run_at=NOW - timedelta(hours=3), deferred_reviews=0),
+            HotelIngestState(hotel_id="disabled", slot=slot, enabled=False, deferred_reviews=0),
+        ])
+        db.commit()
+
+        assert set(job.due_hotels(db, NOW)) == {"new", "in_slot", "overdue"}
+
+
+class TestSampleFetch:
+    """Test suite for the stubbed Google fetch"""
+
+    def test_pages_forward_without_gaps(self):
+        """Test paging from each page's newest date walks every sample review"""
+        everything = review_ingestion_service.fetch_google_reviews("hotel1", limit=100)
+        seen, since = [], datetime.min
+        while True:
+            page = review_ingestion_service.fetch_google_reviews("hotel1", limit=3, since=since)
+            page = [review for review in page if review not in seen]
+            if not page:
+                break
+            seen.extend(page)
+            since = max(review["date"] for review in page)
+
+        assert sorted(review["author"] for review in seen) == sorted(review["author"] for review in everything)
+        assert review_ingestion_service.fetch_google_reviews("hotel1", limit=3) == everything[:3]
+
+
+class TestSyncHotel:
+    """Test suite for syncing one hotel"""
+
+    def test_fetches_since_high_water_mark(self, db, job, mock_analysis):
+        """Test the second sync only asks for reviews newer than the first one stored"""
+        job.track(db, "hotel1")
+        db.commit()
+
+        with patch(
+            "app.services.incremental_ingestion.review_ingestion_service.fetch_google_reviews",
+            return_value=_fetched(3, 1, 2)
+        ) as fetch:
+            assert job.sync_hotel("hotel1") == 3
+            assert fetch.call_args.kwargs["since"] is None
+
+            fetch.return_value = []
+            assert job.sync_hotel("hotel1") == 0
+            assert fetch.call_args.kwargs["since"] == NOW - timedelta(days=1)
+
+        db.expire_all()
+        state = db.get(HotelIngestState, "hotel1")
+        assert state.last_error is None
+        assert state.last_success_at is not None
+        assert state.last_review_id == db.query(Review.id).order_by(Review.id.desc()).limit(1).scalar()
+
+    def test_budget_defers_newest_reviews(self, db, job, mock_analysis):
+        """Test reviews over the LLM budget are left above the high-water mark"""
+        job.track(db, "hotel1")
+        db.commit()
+        job.budget = TokenBucket(rate_per_second=0, capacity=2)
+
+        with patch(
+            "app.services.incremental_ingestion.review_ingestion_service.fetch_google_reviews",
+            return_value=_fetched(1, 3, 2)
+        ):
+            assert job.sync_hotel("hotel1") == 2
+
+        db.expire_all()
+        state = db.get(HotelIngestState, "hotel1")
+        assert state.deferred_reviews == 1
+        assert state.last_review_date == NOW - timedelta(days=2)
+
+    def test_refetched_reviews_not_duplicated(self, db, job, mock_analysis):
+        """Test reviews at the high-water mark come back on the next sync but are stored once, ties included"""
+        job.track(db, "hotel1")
+        db.commit()
+
+        with patch(
+            "app.services.incremental_ingestion.review_ingestion_service.fetch_google_reviews",
+            return_value=_fetched(2, 1)
+        ):
+            assert job.sync_hotel("hotel1") == 2
+
+        # A second review posted at the same time as the newest one stored
+        tie = _fetched(1)[0] | {"author": "Another guest"}
+        with patch(
+            "app.services.incremental_ingestion.review_ingestion_service.fetch_google_reviews",
+            return_value=_fetched(1) + [tie]
+        ):
+            assert job.sync_hotel("hotel1") == 1
+
+        db.expire_all()
+        assert db.query(Review).count() == 3
+        assert db.get(HotelIngestState, "hotel1").last_review_date == NOW - timedelta(days=1)
+
+    def test_known_reviews_past_deferred_keep_mark(self, db, job, mock_analysis):
+        """Test already stored reviews newer than a deferred one do not move the mark past it"""
+        job.track(db, "hotel1")
+        db.commit()
+        with patch(
+            "app.services.incremental_ingestion.review_ingestion_service.fetch_google_reviews",
+            return_value=_fetched(1)
+        ):
+            job.sync_hotel("hotel1")
+        db.expire_all()
+        state = db.get(HotelIngestState, "hotel1")
+        state.last_review_date = None
+        db.commit()
+        job.budget = TokenBucket(rate_per_second=0, capacity=1)
+
+        with patch(
+            "app.services.incremental_ingestion.review_ingestion_service.fetch_google_reviews",
+            return_value=_fetched(3, 2, 1)
+        ):
+            assert job.sync_hotel("hotel1") == 1
+
+        db.expire_all()
+        state = db.get(HotelIngestState, "hotel1")
+        assert state.deferred_reviews == 1
+        assert state.last_review_date == NOW - timedelta(days=3)
+
+    def test_failure_recorded(self, db, job, mock_analysis):
+        """Test a failing fetch is recorded without advancing the high-water mark"""
+        job.track(db, "hotel1")
+        db.commit()
+
+        with patch(
+            "app.services.incremental_ingestion.review_ingestion_service.fetch_google_reviews",
+            side_effect=RuntimeError("quota exceeded")
+        ):
+            assert job.sync_hotel("hotel1") == 0
+
+        db.expire_all()
+        state = db.get(HotelIngestState, "hotel1")
+        assert state.last_error == "quota exceeded"
+        assert state.last_success_at is None
+        assert state.last_run_at is not None
+
+    def test_run_syncs_due_hotels(self, db, job, mock_analysis):
+        """Test a tick syncs every due hotel"""
+        for hotel_id in ("hotel1", "hotel2", "hotel3"):
+            job.track(db, hotel_id)
+        db.commit()
+
+        with patch(
+            "app.services.incremental_ingestion.review_ingestion_service.fetch_google_reviews",
+            side_effect=lambda hotel_id, limit, since: _fetched(1)
+        ):
+            assert job.run(db, now=NOW) == 3
+
+        assert db.query(Review).count() == 3
+        assert job.due_hotels(db, NOW) == []
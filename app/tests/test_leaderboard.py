@@ -0,0 +1,205 @@
+import pytest
+from datetime import date, datetime
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.main import app
+from app.database import Base, get_db
+from app.models import (
+    ArchivedReviewStats, HotelDailyStats, HotelLeaderboard, HotelTopicStats, Review, SentimentType, UrgencyType
+)
+from app.services.anomaly_detection import escalation_anomaly_job
+from app.services.leaderboard import HotelLeaderboardJob
+
+# Test database
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_leaderboard.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+app.dependency_overrides[get_db] = override_get_db
+
+
+@pytest.fixture
+def db():
+    """Create test database and session"""
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def client(db):
+    """Test client fixture"""
+    return TestClient(app)
+
+
+@pytest.fixture
+def auth_token(client):
+    """Create user and return auth token"""
+    client.post(
+        "/auth/register",
+        json={"username": "testuser", "email": "test@test.com", "password": "testpass", "role": "Staff"}
+    )
+    response = client.post("/auth/login", data={"username": "testuser", "password": "testpass"})
+    return response.json()["access_token"]
+
+
+@pytest.fixture
+def job():
+    """Leaderboard ranking hotels with at least two reviews"""
+    return HotelLeaderboardJob(min_reviews=2, batch_size=3)
+
+
+def _add(db, hotel_id, negative=0, positive=0, critical=0, topics="Noise", canonical_review_id=None):
+    reviews = [
+        Review(hotel_id=hotel_id, review_text="Awful", sentiment=SentimentType.NEGATIVE,
+               urgency=UrgencyType.CRITICAL if i < critical else UrgencyType.STANDARD, topics=topics,
+               processed_at=datetime(2024, 5, 1), canonical_review_id=canonical_review_id)
+        for i in range(negative)
+    ] + [
+        Review(hotel_id=hotel_id, review_text="Great", sentiment=SentimentType.POSITIVE,
+               urgency=UrgencyType.STANDARD, topics="Staff", processed_at=datetime(2024, 5, 1))
+        for _ in range(positive)
+    ]
+    db.add_all(reviews)
+    db.commit()
+
+
+def _refresh(db, job):
+    """Roll up the daily stats the board is summed from, then rebuild it"""
+    escalation_anomaly_job.roll_up(db)
+    db.commit()
+    return job.run(db)
+
+
+def _portfolio(db, job):
+    """hotel1 50% negative, hotel2 100%, hotel3 50%, hotel4 too few reviews"""
+    _add(db, "hotel1", negative=1, positive=1, critical=1, topics="Noise, Staff")
+    _add(db, "hotel2", negative=2, topics="Wifi")
+    _add(db, "hotel3", negative=2, positive=2)
+    _add(db, "hotel4", negative=1)
+    _refresh(db, job)
+
+
+class TestHotelLeaderboardJob:
+    """Test suite for the precomputed hotel leaderboard"""
+
+    def test_ranks_and_percentiles(self, db, job):
+        """Test hotels are ranked worst first, ties share a rank and small hotels are unranked"""
+        _portfolio(db, job)
+
+        rows = {row.hotel_id: row for row in db.query(HotelLeaderboard)}
+        assert {hotel: row.negative_rank for hotel, row in rows.items()} == {
+            "hotel1": 2, "hotel2": 1, "hotel3": 2, "hotel4": None
+        }
+        assert rows["hotel2"].negative_percentile == 100.0
+        assert rows["hotel1"].negative_percentile == round(200 / 3, 2)
+        assert rows["hotel1"].escalation_rate == 50.0
+        assert rows["hotel1"].escalation_rank == 1
+        assert rows["hotel2"].top_negative_topic == "Wifi"
+        assert rows["hotel4"].negative_percentile is None
+
+    def test_refresh_replaces_board(self, db, job):
+        """Test a refresh reflects new reviews and ignores near-duplicates"""
+        _portfolio(db, job)
+        _add(db, "hotel3", negative=4, canonical_review_id=1)
+        _add(db, "hotel1", positive=6)
+        _refresh(db, job)
+
+        rows = {row.hotel_id: row for row in db.query(HotelLeaderboard)}
+        assert len(rows) == 4
+        assert rows["hotel3"].total_reviews == 4
+        assert rows["hotel1"].negative_percent == 12.5
+        assert rows["hotel1"].negative_rank == 3
+
+    def test_counts_from_daily_stats(self, db, job):
+        """Test counts come from hotel_daily_stats, which keep archived reviews, counted once"""
+        db.add_all([
+            HotelDailyStats(hotel_id="hotel1", day=date(2023, 1, 5), total=2, negative=1, critical=0),
+            HotelDailyStats(hotel_id="hotel1", day=date(2023, 1, 6), total=2, negative=0, critical=0),
+            HotelDailyStats(hotel_id="old", day=date(2023, 1, 5), total=4, negative=4, critical=4),
+            # The archive job's counts of the same reviews
+            ArchivedReviewStats(hotel_id="old", month=date(2023, 1, 1), duplicate=False, total=4,
+                                positive=0, negative=4, neutral=0, critical=4, topic_counts="{}"),
+        ])
+        db.commit()
+
+        assert job.run(db) == 2
+
+        hotel1 = db.get(HotelLeaderboard, "hotel1")
+        assert (hotel1.total_reviews, hotel1.negative_reviews) == (4, 1)
+        old = db.get(HotelLeaderboard, "old")
+        assert (old.total_reviews, old.negative_rank, old.escalation_rank, old.top_negative_topic) == (4, 1, 1, None)
+
+    def test_topic_hotspots_incremental(self, db, job):
+        """Test negative topic mentions are added from a checkpoint, each review counted once"""
+        _portfolio(db, job)
+        assert db.get(HotelTopicStats, ("hotel1", "Noise")).negative == 1
+        assert db.get(HotelTopicStats, ("hotel1", "Staff")).negative == 1
+
+        _add(db, "hotel1", negative=2, topics="Staff")
+        _add(db, "hotel1", negative=1, topics="Staff", canonical_review_id=1)
+        _refresh(db, job)
+        _refresh(db, job)
+
+        assert db.get(HotelTopicStats, ("hotel1", "Staff")).negative == 3
+        assert db.get(HotelLeaderboard, "hotel1").top_negative_topic == "Staff"
+        # Positive reviews add no mentions
+        assert db.get(HotelTopicStats, ("hotel3", "Noise")).negative == 2
+
+
+class TestPortfolioEndpoints:
+    """Test suite for the /portfolio endpoints"""
+
+    def test_top_k(self, client, db, job, auth_token):
+        """Test the leaderboard returns ranked hotels worst first, up to the limit"""
+        _portfolio(db, job)
+
+        response = client.get(
+            "/portfolio/leaderboard",
+            params={"limit": 2},
+            headers={"Authorization": f"Bearer {auth_token}"}
+        )
+
+        assert response.status_code == 200
+        assert [entry["hotel_id"] for entry in response.json()] == ["hotel2", "hotel1"]
+
+    def test_metric_and_percentile_filter(self, client, db, job, auth_token):
+        """Test ranking by escalation rate and keeping hotels at or above a percentile"""
+        _portfolio(db, job)
+        headers = {"Authorization": f"Bearer {auth_token}"}
+
+        response = client.get("/portfolio/leaderboard", params={"min_percentile": 90}, headers=headers)
+        assert [entry["hotel_id"] for entry in response.json()] == ["hotel2"]
+
+        response = client.get("/portfolio/leaderboard", params={"metric": "escalation"}, headers=headers)
+        assert [entry["hotel_id"] for entry in response.json()][0] == "hotel1"
+
+        response = client.get("/portfolio/leaderboard", params={"metric": "rating"}, headers=headers)
+        assert response.status_code == 422
+
+    def test_hotel_standing(self, client, db, job, auth_token):
+        """Test one hotel's standing, and 404 for a hotel not on the board"""
+        _portfolio(db, job)
+        headers = {"Authorization": f"Bearer {auth_token}"}
+
+        response = client.get("/portfolio/hotels/hotel3", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["negative_rank"] == 2
+
+        assert client.get("/portfolio/hotels/missing", headers=headers).status_code == 404
+
+    def test_requires_authentication(self, client):
+        """Test the leaderboard is not public"""
+        assert client.get("/portfolio/leaderboard").status_code == 401
@@ -1,7 +1,14 @@
+import threading
+import time
 import pytest
 from unittest.mock import Mock, patch
+from openai import OpenAI
+from app.config import settings
 from app.services.llm_analyzer import LLMAnalyzer
+from app.services.tokens import TokenCounter
+from app.services.llm_providers import CircuitBreaker, LLMProvider, ProviderPool, build_providers
 from app.models import SentimentType, UrgencyType
+from benchmarks.fake_llm import FakeLLMServer
 
 
 @pytest.fixture
@@ -50,6 +57,7 @@ class TestLLMAnalyzer:
             assert "Service" in result.topics
             assert "Cleanliness" in result.topics
             assert result.urgency == UrgencyType.STANDARD
+            assert result.model == llm_analyzer.model
     
     def test_analyze_review_critical(self, llm_analyzer, mock_critical_response):
         """Test analyzing a critical review"""
@@ -69,6 +77,7 @@ class TestLLMAnalyzer:
             assert result.sentiment in [SentimentType.POSITIVE, SentimentType.NEGATIVE, SentimentType.NEUTRAL]
             assert result.urgency == UrgencyType.CRITICAL  # Should detect bed bugs
             assert len(result.topics) > 0
+            assert result.model == "fallback"
     
     def test_parse_llm_response_valid(self, llm_analyzer):
         """Test parsing valid LLM response"""
@@ -115,6 +124,12 @@ class TestLLMAnalyzer:
         assert "InvalidTopic" not in result.topics
         assert "AnotherInvalid" not in result.topics
     
+    def test_parse_llm_response_topics_as_string(self, llm_analyzer):
+        """Test topics answered as one comma-separated string are kept"""
+        result = llm_analyzer._parse_llm_response({"sentiment": "Negative", "topics": "Service, Location"})
+        
+        assert result.topics == ["Service", "Location"]
+    
     def test_fallback_analysis_positive(self, llm_analyzer):
         """Test fallback analysis for positive review"""
         result = llm_analyzer._fallback_analysis("Amazing hotel! Excellent service and wonderful staff!")
@@ -150,4 +165,339 @@ class TestLLMAnalyzer:
         assert "sentiment" in prompt.lower()
         assert "topics" in prompt.lower()
         assert "urgency" in prompt.lower()
-        assert "JSON" in prompt
\ No newline at end of file
+        assert "JSON" in prompt
+
+def _provider(name, base_url="http://127.0.0.1:1/v1", model="test-model", **kwargs):
+    return LLMProvider(name, OpenAI(api_key="test", base_url=base_url, max_retries=0, timeout=5), model, **kwargs)
+
+
+@pytest.fixture
+def fake_llm():
+    """Local OpenAI-compatible stand-in server"""
+    server = FakeLLMServer(latency_ms=1).start()
+    yield server
+    server.stop()
+
+
+class TestLLMProviders:
+    """Test suite for multi-provider routing and failover"""
+    
+    def test_single_provider_from_settings(self):
+        """Test the OPENAI_* settings make a single primary provider by default"""
+        pool = build_providers()
+        
+        assert [p.name for p in pool.providers] == ["openai"]
+        assert pool.primary.model == settings.OPENAI_MODEL
+    
+    def test_providers_from_json(self, monkeypatch):
+        """Test LLM_PROVIDERS configures several OpenAI-compatible backends"""
+        monkeypatch.setattr(settings, "LLM_PROVIDERS", (
+            '[{"name": "openai", "model": "gpt-4o-mini"},'
+            ' {"name": "local", "base_url": "http://localhost:8000/v1", "api_key": "none", "model": "llama"}]'
+        ))
+        pool = build_providers()
+        
+        assert [(p.name, p.model) for p in pool.providers] == [("openai", "gpt-4o-mini"), ("local", "llama")]
+        assert str(pool.providers[1].client.base_url).startswith("http://localhost:8000/v1")
+        assert pool.providers[0].client.max_retries == 0
+    
+    def test_analyzer_builds_providers_lazily(self):
+        """Test the analyzer creates its clients on first use rather than at import"""
+        with patch("app.services.llm_analyzer.build_providers", wraps=build_providers) as build:
+            analyzer = LLMAnalyzer()
+            assert build.call_count == 0
+            
+            assert analyzer.model == settings.OPENAI_MODEL
+            assert analyzer.client is analyzer.providers.primary.client
+            assert build.call_count == 1
+    
+    def test_routes_to_fastest_healthy_provider(self):
+        """Test the faster provider is tried first and failing providers are demoted"""
+        slow, fast = _provider("slow"), _provider("fast")
+        pool = ProviderPool([slow, fast])
+        slow.record_success(2.0)
+        fast.record_success(0.2)
+        
+        assert [p.name for p in pool.ordered()] == ["fast", "slow"]
+        
+        # Below the circuit breaker threshold: demoted, not excluded
+        for _ in range(4):
+            fast.record_failure(0.01)
+        assert [p.name for p in pool.ordered()] == ["slow", "fast"]
+    
+    def test_failed_provider_recovers(self):
+        """Test failures are forgiven over time"""
+        provider = _provider("flaky", recovery_seconds=0.05)
+        for _ in range(5):
+            provider.record_failure(0.01)
+        assert not provider.healthy
+        
+        with patch("app.services.llm_providers.time.monotonic", return_value=provider._updated + 1):
+            assert provider.healthy
+    
+    def test_failover_to_local_server(self, fake_llm):
+        """Test an unreachable provider fails over to a local OpenAI-compatible server"""
+        down = _provider("down")
+        local = _provider("local", base_url=fake_llm.base_url, model="local-model")
+        analyzer = LLMAnalyzer(ProviderPool([down, local]))
+        
+        result = analyzer.analyze_review("Found bed bugs in the room!")
+        
+        assert result.model == "local-model"
+        assert result.urgency == UrgencyType.CRITICAL
+        assert fake_llm.requests_served == 1
+        assert down.success_rate < 1.0
+        
+        # A connection error can fail faster than the local server answers, so
+        # the failed provider may be tried first again until it is unhealthy;
+        # either way it ends up routed after the working one
+        for _ in range(4):
+            assert analyzer.analyze_review("Lovely stay").model == "local-model"
+        assert [p.name for p in analyzer.providers.ordered()] == ["local", "down"]
+    
+    def test_all_providers_down_uses_fallback(self):
+        """Test the keyword fallback is used only when every provider fails"""
+        analyzer = LLMAnalyzer(ProviderPool([_provider("a"), _provider("b")]))
+        
+        result = analyzer.analyze_review("Found bed bugs in the room!")
+        
+        assert result.model == "fallback"
+        assert result.urgency == UrgencyType.CRITICAL
+
+
+def _mock_provider(name, create, samples=()):
+    client = Mock()
+    client.chat.completions.create.side_effect = create
+    provider = LLMProvider(name, client, f"{name}-model")
+    for latency in samples:
+        provider.record_success(latency)
+    return provider
+
+
+class TestTailLatency:
+    """Test suite for per-call timeouts, hedging and deadlines"""
+    
+    def test_call_timeout_passed_to_client(self, llm_analyzer, mock_openai_response):
+        """Test every attempt carries an explicit timeout"""
+        with patch.object(llm_analyzer.client.chat.completions, 'create', return_value=mock_openai_response) as create:
+            llm_analyzer.analyze_review("Great hotel!")
+        
+        assert 0 < create.call_args.kwargs["timeout"] <= settings.LLM_CALL_TIMEOUT_SECONDS
+    
+    def test_slow_attempt_is_hedged(self, mock_openai_response):
+        """Test a second attempt is fired after the p95 latency and the faster answer wins"""
+        calls = []
+        lock = threading.Lock()
+        
+        def create(**kwargs):
+            with lock:
+                calls.append(kwargs)
+                first = len(calls) == 1
+            if first:
+                time.sleep(2)
+            return mock_openai_response
+        
+        provider = _mock_provider("primary", create, samples=[0.01] * 20)
+        analyzer = LLMAnalyzer(ProviderPool([provider]))
+        
+        started = time.monotonic()
+        result = analyzer.analyze_review("Great hotel!")
+        
+        assert time.monotonic() - started < 1
+        assert len(calls) == 2
+        assert result.model == "primary-model"
+    
+    def test_no_hedge_without_latency_history(self, mock_openai_response):
+        """Test hedging waits until there are enough samples for a p95"""
+        provider = _mock_provider("primary", lambda **kwargs: time.sleep(0.2) or mock_openai_response)
+        analyzer = LLMAnalyzer(ProviderPool([provider]))
+        
+        analyzer.analyze_review("Great hotel!")
+        
+        assert provider.client.chat.completions.create.call_count == 1
+    
+    def test_deadline_bounds_analysis(self, mock_openai_response):
+        """Test a hung provider cannot hold the analysis past its deadline"""
+        provider = _mock_provider("hung", lambda **kwargs: time.sleep(3) or mock_openai_response)
+        analyzer = LLMAnalyzer(ProviderPool([provider]))
+        
+        started = time.monotonic()
+        result = analyzer.analyze_review("Found bed bugs!", deadline=time.monotonic() + 0.2)
+        
+        assert time.monotonic() - started < 1
+        assert result.model == "fallback"
+    
+    def test_expired_deadline_skips_llm(self, mock_openai_response):
+        """Test no call is made once the deadline has passed"""
+        provider = _mock_provider("primary", lambda **kwargs: mock_openai_response)
+        analyzer = LLMAnalyzer(ProviderPool([provider]))
+        
+        result = analyzer.analyze_review("Found bed bugs!", deadline=time.monotonic() - 1)
+        
+        assert result.model == "fallback"
+        assert provider.client.chat.completions.create.call_count == 0
+
+
+class TestCircuitBreaker:
+    """Test suite for the per-provider circuit breaker"""
+    
+    def test_opens_after_consecutive_failures(self):
+        """Test the circuit opens at the failure threshold and a success resets the count"""
+        breaker = CircuitBreaker(failure_threshold=3, reset_seconds=60)
+        
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED
+        
+        assert breaker.record_failure() is True
+        assert breaker.state == CircuitBreaker.OPEN
+        assert not breaker.acquire()
+    
+    def test_half_open_allows_single_probe(self):
+        """Test after the reset timeout exactly one probe is let through"""
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0)
+        breaker.record_failure()
+        
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.acquire()
+        assert not breaker.acquire()
+        assert not breaker.available()
+        
+        assert breaker.record_success() is True
+        assert breaker.state == CircuitBreaker.CLOSED
+    
+    def test_failed_probe_reopens(self):
+        """Test a failing probe opens the circuit again"""
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.2)
+        breaker.record_failure()
+        time.sleep(0.25)
+        
+        assert breaker.acquire()
+        assert breaker.record_failure() is True
+        assert breaker.state == CircuitBreaker.OPEN
+    
+    def test_outage_falls_back_without_calling(self):
+        """Test once the circuit is open reviews get fallback labels without waiting on the LLM"""
+        def create(**kwargs):
+            time.sleep(0.05)
+            raise RuntimeError("503 Service Unavailable")
+        
+        provider = _mock_provider("primary", create)
+        provider.breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60)
+        analyzer = LLMAnalyzer(ProviderPool([provider]))
+        
+        for _ in range(2):
+            analyzer.analyze_review("Found bed bugs!")
+        assert provider.breaker.state == CircuitBreaker.OPEN
+        assert not analyzer.available()
+        
+        started = time.monotonic()
+        result = analyzer.analyze_review("Found bed bugs!")
+        
+        assert time.monotonic() - started < 0.05
+        assert result.model == "fallback"
+        assert result.urgency == UrgencyType.CRITICAL
+        assert provider.client.chat.completions.create.call_count == 2
+        assert provider.health()["circuit"] == "open"
+    
+    def test_open_provider_skipped_for_failover(self, mock_openai_response):
+        """Test a provider with an open circuit is not tried while another is available"""
+        broken = _mock_provider("broken", lambda **kwargs: mock_openai_response)
+        broken.breaker = CircuitBreaker(failure_threshold=1, reset_seconds=60)
+        broken.breaker.record_failure()
+        backup = _mock_provider("backup", lambda **kwargs: mock_openai_response)
+        analyzer = LLMAnalyzer(ProviderPool([broken, backup]))
+        
+        result = analyzer.analyze_review("Great hotel!")
+        
+        assert result.model == "backup-model"
+        assert broken.client.chat.completions.create.call_count == 0
+
+
+class TestPromptBudget:
+    """Test suite for prompt compaction and token accounting"""
+    
+    def test_truncate_keeps_beginning_and_end(self):
+        """Test a long review is cut to the budget from the middle"""
+        counter = TokenCounter("gpt-3.5-turbo")
+        text = "Arrived late. " + "The corridor carpet was fine. " * 500 + "Found bed bugs on the last night."
+        
+        truncated = counter.truncate(text, 100)
+        
+        assert counter.count(truncated) <= 110
+        assert truncated.startswith("Arrived late.")
+        assert truncated.endswith("bed bugs on the last night.")
+        assert counter.truncate("Short review", 100) == "Short review"
+    
+    def test_long_review_truncated_in_prompt(self, llm_analyzer, mock_openai_response):
+        """Test the review text sent to the LLM respects the token budget"""
+        text = "Great stay. " * 5000
+        with patch.object(llm_analyzer.client.chat.completions, 'create', return_value=mock_openai_response) as create:
+            llm_analyzer.analyze_review(text)
+        
+        prompt = create.call_args.kwargs["messages"][1]["content"]
+        assert llm_analyzer.tokens.count(prompt) < settings.LLM_MAX_REVIEW_TOKENS + 200
+        assert create.call_args.kwargs["max_tokens"] == settings.LLM_MAX_COMPLETION_TOKENS
+    
+    def test_compact_prompt_is_smaller(self, llm_analyzer):
+        """Test the compact prompt keeps every field in fewer tokens"""
+        review_text = "Room was dirty and staff were rude."
+        compact = llm_analyzer._create_compact_prompt(review_text)
+        verbose = llm_analyzer._create_analysis_prompt(review_text)
+        
+        assert review_text in compact
+        for field in ("sentiment", "topics", "urgency", "JSON"):
+            assert field in compact
+        assert '"topics": ["topic1", "topic2"]' in compact
+        assert llm_analyzer.tokens.count(compact) < llm_analyzer.tokens.count(verbose) * 0.6
+    
+    def test_usage_reported_by_backend(self, llm_analyzer, mock_openai_response):
+        """Test billed token counts are recorded when the response has them"""
+        mock_openai_response.usage = Mock(prompt_tokens=120, completion_tokens=35)
+        with patch.object(llm_analyzer.client.chat.completions, 'create', return_value=mock_openai_response):
+            result = llm_analyzer.analyze_review("Great hotel!")
+        
+        assert (result.prompt_tokens, result.completion_tokens) == (120, 35)
+    
+    def test_usage_counted_locally(self, llm_analyzer, mock_openai_response):
+        """Test token counts are estimated when the backend does not report usage"""
+        mock_openai_response.usage = None
+        with patch.object(llm_analyzer.client.chat.completions, 'create', return_value=mock_openai_response):
+            result = llm_analyzer.analyze_review("Great hotel!")
+        
+        assert result.prompt_tokens > 0
+        assert result.completion_tokens > 0
+
+
+class TestParseResponse:
+    """Test suite for mapping answers onto labels"""
+    
+    def test_malformed_fields_default(self, llm_analyzer):
+        """Test lists or objects where a label string belongs are defaulted instead of raising"""
+        result = llm_analyzer._parse_llm_response({
+            "sentiment": ["Positive"], "urgency": {"level": "Critical"}, "topics": [{"name": "Value"}, "Location"]
+        })
+        
+        assert result.sentiment == SentimentType.NEUTRAL
+        assert result.urgency == UrgencyType.STANDARD
+        assert result.topics == ["Location"]
+    
+    def test_malformed_answer_is_not_a_provider_failure(self, llm_analyzer, mock_openai_response):
+        """Test an off-shape but valid JSON answer is used rather than counted against the provider"""
+        mock_openai_response.choices[0].message.content = '{"sentiment": ["Negative"], "topics": "Value"}'
+        with patch.object(llm_analyzer.client.chat.completions, 'create', return_value=mock_openai_response):
+            result = llm_analyzer.analyze_review("Overpriced.")
+        
+        assert result.model == llm_analyzer.model
+        assert result.topics == ["Value"]
+    
+    def test_unknown_labels_default(self, llm_analyzer):
+        """Test off-label values fall back to the neutral defaults"""
+        result = llm_analyzer._parse_llm_response({"sentiment": "positive", "urgency": "urgent", "topics": None})
+        
+        assert result.sentiment == SentimentType.NEUTRAL
+        assert result.urgency == UrgencyType.STANDARD
+        assert result.topics == ["Service"]
@@ -0,0 +1,85 @@
+import os
+import subprocess
+import sys
+import pytest
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from app.main import app
+from app.models import SentimentType, UrgencyType
+from app.schemas import LLMAnalysisResult
+from app.services.llm_analyzer import LLMAnalyzer
+from app.services.reanalysis import ReanalysisJob
+
+
+@pytest.fixture
+def client():
+    """Test client fixture"""
+    return TestClient(app)
+
+
+class TestMetricsEndpoint:
+    """Test suite for the Prometheus metrics endpoint"""
+
+    def test_metrics_exposed(self, client):
+        """Test /metrics returns Prometheus text format"""
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "llm_call_duration_seconds" in response.text
+        assert "background_tasks_in_flight" in response.text
+        assert "db_pool_connections" in response.text
+
+    def test_request_latency_uses_route_template(self, client):
+        """Test request latency is labelled by route template, not raw path"""
+        client.get("/task-status/some-task-id")
+        response = client.get("/metrics")
+
+        assert 'route="/task-status/{task_id}"' in response.text
+        assert "some-task-id" not in response.text
+
+    def test_llm_fallback_counted(self, client):
+        """Test LLM failures are recorded as fallback analyses"""
+        analyzer = LLMAnalyzer()
+        with patch.object(analyzer.client.chat.completions, 'create', side_effect=Exception("API Error")):
+            analyzer.analyze_review("Bed bugs everywhere!")
+
+        response = client.get("/metrics")
+        assert 'llm_analyses_total{source="fallback"}' in response.text
+        assert 'outcome="error"' in response.text
+
+    def test_cache_lookups_counted(self, client):
+        """Test re-analysis cache hits and misses are counted"""
+        def lookups(result):
+            return REGISTRY.get_sample_value("cache_lookups_total", {"cache": "reanalysis", "result": result}) or 0
+
+        analyzer = MagicMock()
+        analyzer.analyze_review.return_value = LLMAnalysisResult(
+            sentiment=SentimentType.NEUTRAL, topics=["Service"], urgency=UrgencyType.STANDARD, model="gpt"
+        )
+        job = ReanalysisJob(chunk_size=2, concurrency=1, max_calls_per_second=0, analyzer=analyzer)
+        hits, misses = lookups("hit"), lookups("miss")
+
+        job._analyze(["Great pool", "Great pool"])
+        job._analyze(["Great pool"])
+
+        assert (lookups("hit") - hits, lookups("miss") - misses) == (1, 2)
+        assert 'cache_lookups_total{cache="reanalysis",result="hit"}' in client.get("/metrics").text
+
+    def test_multiprocess_workers_aggregated(self, tmp_path):
+        """Test every worker's samples are reported when PROMETHEUS_MULTIPROC_DIR is set"""
+        # Each run is a separate process, as gunicorn workers are
+        script = (
+            "import sys\n"
+            "from app import metrics\n"
+            "metrics.record_queue_depth(int(sys.argv[1]))\n"
+            "print(metrics.metrics_response().body.decode())\n"
+        )
+        env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+        subprocess.run([sys.executable, "-c", script, "2"], env=env, check=True)
+        output = subprocess.run(
+            [sys.executable, "-c", script, "3"], env=env, check=True, capture_output=True, text=True
+        ).stdout
+
+        assert "background_tasks_in_flight 5.0" in output
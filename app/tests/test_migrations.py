@@ -0,0 +1,125 @@
+import os
+import pytest
+from contextlib import contextmanager
+from alembic import command
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import create_engine, event, inspect, text
+from app.config import settings
+from app.migrations import backfill, create_index_concurrently
+
+# Test database
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_migrations.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def alembic_config(monkeypatch):
+    """Alembic pointed at the test database"""
+    monkeypatch.setattr(settings, "DATABASE_URL", SQLALCHEMY_DATABASE_URL)
+    config = Config(os.path.join(ROOT, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(ROOT, "alembic"))
+    config.attributes["configure_logger"] = False
+    yield config
+    engine.dispose()
+    os.remove("test_migrations.db")
+
+
+@pytest.fixture
+def numbers():
+    """A plain table with 25 rows, for exercising the helpers directly"""
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE numbers (id INTEGER PRIMARY KEY, value INTEGER, doubled INTEGER)"))
+        conn.execute(text("INSERT INTO numbers (id, value) VALUES (:id, :id)"), [{"id": i} for i in range(1, 26)])
+    yield
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE numbers"))
+
+
+@contextmanager
+def _migration(conn):
+    """Run ``op`` calls on ``conn`` the way alembic/env.py does"""
+    context = MigrationContext.configure(conn)
+    with Operations.context(context), context.begin_transaction():
+        yield
+
+
+class TestMigrations:
+    """Test suite for the Alembic revisions"""
+    
+    def test_upgrade_matches_models(self, alembic_config):
+        """Test upgrading an empty database yields exactly the schema the models describe"""
+        command.upgrade(alembic_config, "head")
+        
+        # Raises if autogenerate would find any difference
+        command.check(alembic_config)
+        indexes = {index["name"] for index in inspect(engine).get_indexes("reviews")}
+        assert {"ix_reviews_urgency_processed_at", "ix_reviews_hotel_id_id", "ix_reviews_processed_at"} <= indexes
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT count(*) FROM reviews_fts")).scalar() == 0
+    
+    def test_upgrade_from_original_schema(self, alembic_config):
+        """Test a database created by the old create_all upgrades without a stamp, its reviews intact"""
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR(50) NOT NULL, "
+                "email VARCHAR(100) NOT NULL, hashed_password VARCHAR(255) NOT NULL, "
+                "role VARCHAR(7) NOT NULL, is_active BOOLEAN, created_at DATETIME)"
+            ))
+            conn.execute(text(
+                "CREATE TABLE reviews (id INTEGER PRIMARY KEY, hotel_id VARCHAR(100) NOT NULL, "
+                "review_text TEXT NOT NULL, author VARCHAR(100), rating FLOAT, review_date DATETIME, "
+                "sentiment VARCHAR(8), topics TEXT, urgency VARCHAR(8), processed_at DATETIME, "
+                "processed_by INTEGER REFERENCES users (id))"
+            ))
+            conn.execute(text("INSERT INTO reviews (hotel_id, review_text) VALUES ('hotel1', 'Noisy rooms')"))
+        
+        command.upgrade(alembic_config, "head")
+        
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT needs_reanalysis FROM reviews")).scalar() == 0
+            assert conn.execute(text("SELECT rowid FROM reviews_fts WHERE reviews_fts MATCH 'room'")).scalar() == 1
+    
+    def test_downgrade_to_base(self, alembic_config):
+        """Test every revision can be rolled back"""
+        command.upgrade(alembic_config, "head")
+        command.downgrade(alembic_config, "base")
+        
+        assert inspect(engine).get_table_names() == ["alembic_version"]
+
+
+class TestOnlineMigrationHelpers:
+    """Test suite for the online migration helpers"""
+    
+    def test_create_index_is_idempotent(self, numbers):
+        """Test re-running an index build (e.g. after a failed deploy) is harmless"""
+        with engine.connect() as conn, _migration(conn):
+            create_index_concurrently("ix_numbers_value", "numbers", ["value"])
+            create_index_concurrently("ix_numbers_value", "numbers", ["value"])
+        
+        assert [index["name"] for index in inspect(engine).get_indexes("numbers")] == ["ix_numbers_value"]
+    
+    def test_backfill_in_batches(self, numbers):
+        """Test a backfill updates every matching row in key ranges of batch_size"""
+        updates = []
+        
+        def count_updates(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith("UPDATE"):
+                updates.append(parameters)
+        
+        event.listen(engine, "before_cursor_execute", count_updates)
+        try:
+            with engine.connect() as conn, _migration(conn):
+                updated = backfill("numbers", "doubled = value * 2", "doubled IS NULL", batch_size=10)
+                # Nothing is left to do on a second run
+                assert backfill("numbers", "doubled = value * 2", "doubled IS NULL", batch_size=10) == 0
+        finally:
+            event.remove(engine, "before_cursor_execute", count_updates)
+        
+        assert updated == 25
+        assert len(updates) == 6
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT count(*) FROM numbers WHERE doubled = value * 2")).scalar() == 25
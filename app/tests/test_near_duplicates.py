@@ -0,0 +1,114 @@
+import pytest
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.models import Review, ReviewLSHBucket, SentimentType, UrgencyType
+from app.schemas import LLMAnalysisResult
+from app.services.near_duplicates import MinHasher, near_duplicate_detector
+from app.services.review_ingestion import review_ingestion_service
+
+# Test database
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_near_duplicates.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+ORIGINAL = "The room was dirty and the staff were rude when we asked for clean towels at the front desk"
+EDITED = "The room was dirty and the staff were rude when we asked for clean towels at the front desk. Never again"
+UNRELATED = "Lovely rooftop pool with a great view of the harbour and friendly bartenders"
+
+
+@pytest.fixture
+def db():
+    """Create test database and session"""
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def mock_analysis():
+    """Patch the LLM so ingestion is deterministic and calls can be counted"""
+    result = LLMAnalysisResult(
+        sentiment=SentimentType.NEGATIVE,
+        topics=["Cleanliness", "Service"],
+        urgency=UrgencyType.STANDARD
+    )
+    with patch(
+        "app.services.review_ingestion.llm_analyzer.analyze_review", return_value=result
+    ) as analyze:
+        yield analyze
+
+
+class TestMinHasher:
+    """Test suite for MinHash signatures"""
+
+    def test_identical_texts(self):
+        """Test identical texts have identical signatures"""
+        hasher = MinHasher()
+        assert hasher.similarity(hasher.signature(ORIGINAL), hasher.signature(ORIGINAL)) == 1.0
+
+    def test_similarity_tracks_overlap(self):
+        """Test small edits score high and unrelated texts score low"""
+        hasher = MinHasher()
+        original = hasher.signature(ORIGINAL)
+
+        assert hasher.similarity(original, hasher.signature(EDITED)) > 0.7
+        assert hasher.similarity(original, hasher.signature(UNRELATED)) < 0.2
+
+    def test_short_text(self):
+        """Test texts shorter than a shingle still get a signature"""
+        hasher = MinHasher()
+        assert hasher.signature("Great!").shape == (hasher.num_perm,)
+
+
+class TestNearDuplicateIngestion:
+    """Test suite for near-duplicate linking during ingestion"""
+
+    def test_edited_copy_linked_to_canonical(self, db, mock_analysis):
+        """Test an edited repost reuses the canonical analysis without an LLM call"""
+        reviews = review_ingestion_service.process_reviews(
+            hotel_id="hotel1",
+            reviews_data=[{"text": ORIGINAL}, {"text": EDITED}, {"text": UNRELATED}],
+            db=db
+        )
+
+        original, edited, unrelated = reviews
+        assert mock_analysis.call_count == 2
+        assert original.canonical_review_id is None
+        assert edited.canonical_review_id == original.id
+        assert edited.sentiment == original.sentiment
+        assert edited.topics == original.topics
+        assert unrelated.canonical_review_id is None
+
+    def test_chain_points_at_root(self, db, mock_analysis):
+        """Test duplicates of a duplicate link to the original canonical review"""
+        first, _ = review_ingestion_service.process_reviews(
+            hotel_id="hotel1", reviews_data=[{"text": ORIGINAL}, {"text": EDITED}], db=db
+        )
+        (third,) = review_ingestion_service.process_reviews(
+            hotel_id="hotel1", reviews_data=[{"text": EDITED}], db=db
+        )
+
+        assert third.canonical_review_id == first.id
+
+    def test_duplicates_scoped_per_hotel(self, db, mock_analysis):
+        """Test the same text at another hotel is not treated as a duplicate"""
+        review_ingestion_service.process_reviews(hotel_id="hotel1", reviews_data=[{"text": ORIGINAL}], db=db)
+        (other,) = review_ingestion_service.process_reviews(
+            hotel_id="hotel2", reviews_data=[{"text": ORIGINAL}], db=db
+        )
+
+        assert other.canonical_review_id is None
+        assert mock_analysis.call_count == 2
+
+    def test_bands_indexed(self, db, mock_analysis):
+        """Test every ingested review is added to the LSH index"""
+        (review,) = review_ingestion_service.process_reviews(
+            hotel_id="hotel1", reviews_data=[{"text": ORIGINAL}], db=db
+        )
+
+        buckets = db.query(ReviewLSHBucket).filter(ReviewLSHBucket.review_id == review.id).count()
+        assert buckets == near_duplicate_detector.bands
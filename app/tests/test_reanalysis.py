@@ -0,0 +1,358 @@
+import threading
+import pytest
+from datetime import datetime
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.main import app
+from app.database import Base, get_db
+from app.models import (
+    Review, SentimentType, UrgencyType, HotelDailyStats, HotelTopicStats, JobCheckpoint, ReanalysisRun,
+    SnapshotRelabel
+)
+from app.schemas import LLMAnalysisResult
+from app.services.llm_analyzer import FALLBACK_MODEL
+from app.services.reanalysis import ReanalysisJob
+
+# Test database
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_reanalysis.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+DAY = datetime(2024, 5, 1, 9, 0)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+app.dependency_overrides[get_db] = override_get_db
+
+
+class StubAnalyzer:
+    """Analyzer labelling every review critical and counting calls"""
+
+    def __init__(self, model="gpt-new", prompt_version=2, fail_on=(), secondary_models=()):
+        self.model = model
+        self.models = [model, *secondary_models]
+        self.prompt_version = prompt_version
+        self.fail_on = set(fail_on)
+        self.calls = []
+        self.reachable = True
+        self._lock = threading.Lock()
+
+    def available(self):
+        return self.reachable
+
+    def analyze_review(self, review_text):
+        with self._lock:
+            self.calls.append(review_text)
+        if review_text in self.fail_on:
+            return LLMAnalysisResult(
+                sentiment=SentimentType.NEUTRAL, topics=["Service"], urgency=UrgencyType.STANDARD, model=FALLBACK_MODEL
+            )
+        return LLMAnalysisResult(
+            sentiment=SentimentType.NEGATIVE, topics=["Cleanliness"], urgency=UrgencyType.CRITICAL, model=self.model
+        )
+
+
+@pytest.fixture
+def db():
+    """Create test database and session"""
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+def _review(text, model="gpt-old", prompt_version=1, **kwargs):
+    return Review(
+        hotel_id="hotel1", review_text=text, processed_at=DAY,
+        sentiment=SentimentType.POSITIVE, topics="Service", urgency=UrgencyType.STANDARD,
+        analysis_model=model, prompt_version=prompt_version, **kwargs
+    )
+
+
+def _job(analyzer, chunk_size=2, flagged_only=False):
+    return ReanalysisJob(
+        chunk_size=chunk_size, concurrency=2, max_calls_per_second=0, analyzer=analyzer, flagged_only=flagged_only
+    )
+
+
+class TestReanalysisJob:
+    """Test suite for the re-analysis job"""
+
+    def test_updates_only_stale_rows(self, db):
+        """Test rows from another model or prompt are re-scored and current rows are left alone"""
+        db.add_all([
+            _review("Old model"),
+            _review("Old prompt", model="gpt-new"),
+            _review("Never labelled", model=None, prompt_version=None),
+            _review("Current", model="gpt-new", prompt_version=2),
+        ])
+        db.commit()
+        analyzer = StubAnalyzer()
+
+        assert _job(analyzer).run(db) == 3
+
+        assert sorted(analyzer.calls) == ["Never labelled", "Old model", "Old prompt"]
+        current = db.query(Review).filter(Review.review_text == "Current").one()
+        assert current.urgency == UrgencyType.STANDARD
+        stale = db.query(Review).filter(Review.review_text != "Current").all()
+        assert all(r.urgency == UrgencyType.CRITICAL and r.topics == "Cleanliness" for r in stale)
+        assert all(r.analysis_model == "gpt-new" and r.prompt_version == 2 for r in stale)
+        # Marked for the snapshot once per chunk
+        assert db.get(SnapshotRelabel, ("hotel1", "2024-05")).version == 2
+
+    def test_secondary_provider_labels_current(self, db):
+        """Test labels from a failover provider's model are not re-scored"""
+        db.add_all([
+            _review("From failover", model="local-llama", prompt_version=2),
+            _review("From removed provider", model="gpt-old", prompt_version=2),
+        ])
+        db.commit()
+        analyzer = StubAnalyzer(secondary_models=["local-llama"])
+
+        assert _job(analyzer).run(db) == 1
+
+        assert analyzer.calls == ["From removed provider"]
+
+    def test_identical_texts_and_duplicates_analyzed_once(self, db):
+        """Test repeated texts share one call and near-duplicates copy their canonical review"""
+        canonical = _review("Bed bugs everywhere")
+        db.add(canonical)
+        db.commit()
+        db.add_all([
+            _review("Bed bugs everywhere"),
+            _review("Bed bugs everywhere!!", canonical_review_id=canonical.id),
+        ])
+        db.commit()
+        analyzer = StubAnalyzer()
+
+        assert _job(analyzer, chunk_size=1).run(db) == 3
+
+        assert analyzer.calls == ["Bed bugs everywhere"]
+        assert db.query(Review).filter(Review.urgency == UrgencyType.CRITICAL).count() == 3
+
+    def test_fallback_keeps_old_labels(self, db):
+        """Test a failed LLM call does not overwrite labels with the keyword fallback"""
+        db.add(_review("Timeout"))
+        db.commit()
+
+        job = _job(StubAnalyzer(fail_on=["Timeout"]))
+        assert job.run(db) == 0
+
+        review = db.query(Review).one()
+        db.refresh(review)
+        assert review.analysis_model == "gpt-old"
+        # Behind the cursor now, so left to fallback recovery
+        assert review.needs_reanalysis is True
+        assert job.status(db)["failed"] == 1
+        assert db.query(SnapshotRelabel).count() == 0
+
+    def test_resumes_after_cancel(self, db):
+        """Test a cancelled run continues from its checkpoint"""
+        db.add_all([_review(f"Review {i}") for i in range(6)])
+        db.commit()
+        analyzer = StubAnalyzer()
+        job = _job(analyzer)
+
+        original = job._reanalyze_chunk
+
+        def cancel_after_first_chunk(session, rows):
+            result = original(session, rows)
+            job.cancel(session)
+            return result
+
+        job._reanalyze_chunk = cancel_after_first_chunk
+        job.run(db)
+        assert job.status(db)["state"] == "cancelled"
+        assert job.status(db)["processed"] == 2
+
+        job._reanalyze_chunk = original
+        job.run(db)
+        assert job.status(db)["state"] == "completed"
+        assert job.status(db)["processed"] == 4
+        assert len(analyzer.calls) == 6
+
+    def test_cancel_before_run_starts(self, db):
+        """Test a cancel between start and run stops that run, and only that one"""
+        db.add_all([_review(f"Review {i}") for i in range(2)])
+        db.commit()
+        analyzer = StubAnalyzer()
+        job = _job(analyzer)
+
+        assert job.start(db)
+        assert not job.start(db)
+        job.cancel(db)
+        job.run(db)
+        assert job.status(db)["state"] == "cancelled"
+        assert analyzer.calls == []
+
+        assert job.start(db)
+        job.run(db)
+        assert job.status(db)["state"] == "completed"
+        assert len(analyzer.calls) == 2
+
+    def test_cancel_from_another_worker(self, db):
+        """Test a cancel sent through another worker's job instance stops the run"""
+        db.add_all([_review(f"Review {i}") for i in range(6)])
+        db.commit()
+        job = _job(StubAnalyzer())
+        other_worker = _job(StubAnalyzer())
+
+        original = job._reanalyze_chunk
+
+        def cancel_elsewhere(session, rows):
+            cancelling = TestingSessionLocal()
+            assert other_worker.status(cancelling)["state"] == "running"
+            other_worker.cancel(cancelling)
+            cancelling.close()
+            return original(session, rows)
+
+        job._reanalyze_chunk = cancel_elsewhere
+        assert job.start(db)
+        assert not other_worker.start(db)
+        job.run(db)
+
+        assert other_worker.status(db)["state"] == "cancelled"
+        assert other_worker.status(db)["processed"] == 2
+
+    def test_unschedule_and_stale_claims(self, db):
+        """Test a run that never started, or lost its worker, does not block the next one"""
+        job = _job(StubAnalyzer())
+
+        assert job.start(db)
+        job.unschedule(db)
+        assert job.status(db)["state"] == "idle"
+        assert job.start(db)
+
+        db.query(ReanalysisRun).update({"heartbeat_at": datetime(2020, 1, 1)})
+        db.commit()
+        assert job.start(db)
+
+    def test_pauses_during_outage(self, db):
+        """Test a run stops at the checkpoint while every provider circuit is open"""
+        db.add_all([_review(f"Review {i}") for i in range(4)])
+        db.commit()
+        analyzer = StubAnalyzer()
+        job = _job(analyzer)
+
+        original = job._reanalyze_chunk
+
+        def outage_after_first_chunk(session, rows):
+            result = original(session, rows)
+            analyzer.reachable = False
+            return result
+
+        job._reanalyze_chunk = outage_after_first_chunk
+        job.run(db)
+        assert job.status(db)["state"] == "paused"
+        assert job.status(db)["processed"] == 2
+        assert db.query(Review).filter(Review.needs_reanalysis.is_(True)).count() == 0
+
+        job._reanalyze_chunk = original
+        analyzer.reachable = True
+        job.run(db)
+        assert job.status(db)["state"] == "completed"
+        assert len(analyzer.calls) == 4
+
+    def test_flagged_only_recovers_fallback_labels(self, db):
+        """Test fallback-labelled reviews are re-scored, retried on every run and unflagged"""
+        db.add_all([
+            _review("Fallback", model=FALLBACK_MODEL, needs_reanalysis=True),
+            _review("Still failing", model=FALLBACK_MODEL, needs_reanalysis=True),
+            _review("Old but fine"),
+        ])
+        db.commit()
+        analyzer = StubAnalyzer(fail_on=["Still failing"])
+        job = _job(analyzer, flagged_only=True)
+
+        assert job.name == "fallback_recovery"
+        assert job.run(db) == 1
+        assert sorted(analyzer.calls) == ["Fallback", "Still failing"]
+
+        analyzer.fail_on.clear()
+        assert job.run(db) == 1
+        assert db.query(Review).filter(Review.needs_reanalysis.is_(True)).count() == 0
+        assert db.query(Review).filter(Review.review_text == "Old but fine").one().analysis_model == "gpt-old"
+
+    def test_flagged_only_skipped_during_outage(self, db):
+        """Test no work is attempted while every provider circuit is open"""
+        db.add(_review("Fallback", model=FALLBACK_MODEL, needs_reanalysis=True))
+        db.commit()
+        analyzer = StubAnalyzer()
+        analyzer.reachable = False
+
+        assert _job(analyzer, flagged_only=True).run(db) == 0
+        assert analyzer.calls == []
+
+    def test_adjusts_daily_stats(self, db):
+        """Test escalation roll-ups reflect the new labels"""
+        db.add_all([_review("Counted"), _review("Not yet rolled up")])
+        db.commit()
+        first_id = db.query(Review.id).order_by(Review.id).limit(1).scalar()
+        db.add_all([
+            HotelDailyStats(hotel_id="hotel1", day=DAY.date(), total=1, negative=0, critical=0),
+            JobCheckpoint(job_name="escalation_anomalies", key="", last_review_id=first_id),
+        ])
+        db.commit()
+
+        _job(StubAnalyzer()).run(db)
+
+        stats = db.get(HotelDailyStats, ("hotel1", DAY.date()))
+        db.refresh(stats)
+        assert (stats.total, stats.negative, stats.critical) == (1, 1, 1)
+
+    def test_adjusts_topic_stats(self, db):
+        """Test the leaderboard's topic hotspots move mentions to the new labels"""
+        counted = _review("Counted")
+        counted.sentiment = SentimentType.NEGATIVE
+        db.add_all([counted, _review("Not yet counted")])
+        db.commit()
+        db.add_all([
+            HotelTopicStats(hotel_id="hotel1", topic="Service", negative=1),
+            JobCheckpoint(job_name="hotel_leaderboard", key="", last_review_id=counted.id),
+        ])
+        db.commit()
+
+        _job(StubAnalyzer()).run(db)
+
+        mentions = {(row.topic, row.negative) for row in db.query(HotelTopicStats)}
+        assert mentions == {("Service", 0), ("Cleanliness", 1)}
+
+
+class TestReanalysisEndpoints:
+    """Test suite for re-analysis admin endpoints"""
+
+    def test_status_requires_manager(self, db):
+        """Test staff cannot control re-analysis"""
+        client = TestClient(app)
+        client.post(
+            "/auth/register",
+            json={"username": "staff", "email": "staff@test.com", "password": "password123", "role": "Staff"}
+        )
+        token = client.post("/auth/login", data={"username": "staff", "password": "password123"}).json()["access_token"]
+
+        response = client.get("/admin/reanalysis", headers={"Authorization": f"Bearer {token}"})
+
+        assert response.status_code == 403
+
+    def test_status(self, db):
+        """Test managers can read the job status"""
+        client = TestClient(app)
+        client.post(
+            "/auth/register",
+            json={"username": "manager", "email": "manager@test.com", "password": "password123", "role": "Manager"}
+        )
+        token = client.post("/auth/login", data={"username": "manager", "password": "password123"}).json()["access_token"]
+
+        response = client.get("/admin/reanalysis", headers={"Authorization": f"Bearer {token}"})
+
+        assert response.status_code == 200
+        assert response.json()["state"] == "idle"
@@ -1,11 +1,21 @@
+import asyncio
+import threading
 import pytest
+from unittest.mock import patch
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from datetime import datetime, timedelta
 from app.main import app
 from app.database import Base, get_db
-from app.models import User, UserRole
+from app.models import User, UserRole, Review, SentimentType, UrgencyType, HotelIngestState, IngestTask
 from app.auth import get_password_hash
+from app.schemas import LLMAnalysisResult
+from app.services.background_tasks import BackgroundTaskManager, IngestQueueFull, background_task_manager
+from app.services.review_ingestion import review_ingestion_service
+from app.services.review_search import review_search_service
+from app.services.embeddings import embed_texts
+from app.services.vector_index import similarity_index_cache
 
 # Test database
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test_reviews.db"
@@ -25,9 +35,11 @@ app.dependency_overrides[get_db] = override_get_db
 
 
 @pytest.fixture(scope="function")
-def test_db():
+def test_db(monkeypatch):
     """Create test database"""
     Base.metadata.create_all(bind=engine)
+    # Ingest tasks are kept in the database too
+    monkeypatch.setattr(background_task_manager, "session_factory", TestingSessionLocal)
     yield
     Base.metadata.drop_all(bind=engine)
 
@@ -90,25 +102,77 @@ def staff_token(client):
     return response.json()["access_token"]
 
 
+@pytest.fixture
+def critical_reviews(test_db):
+    """Create a mix of critical and standard reviews"""
+    db = TestingSessionLocal()
+    now = datetime.utcnow()
+    
+    db.add_all([
+        Review(
+            hotel_id="hotel1",
+            review_text="Found bed bugs!",
+            author="User1",
+            rating=1.0,
+            sentiment=SentimentType.NEGATIVE,
+            topics="Cleanliness",
+            urgency=UrgencyType.CRITICAL,
+            processed_at=now - timedelta(hours=2)
+        ),
+        Review(
+            hotel_id="hotel2",
+            review_text="Wallet stolen from the room",
+            author="User2",
+            rating=1.0,
+            sentiment=SentimentType.NEGATIVE,
+            topics="Service",
+            urgency=UrgencyType.CRITICAL,
+            processed_at=now - timedelta(hours=1)
+        ),
+        Review(
+            hotel_id="hotel1",
+            review_text="Lovely stay",
+            author="User3",
+            rating=5.0,
+            sentiment=SentimentType.POSITIVE,
+            topics="Service",
+            urgency=UrgencyType.STANDARD,
+            processed_at=now
+        )
+    ])
+    
+    db.commit()
+    db.close()
+
+
 class TestReviewEndpoints:
     """Test suite for review endpoints"""
     
     def test_ingest_reviews_success(self, client, manager_token):
         """Test successful review ingestion by manager"""
-        response = client.post(
-            "/ingest-reviews",
-            json={
-                "hotel_id": "ChIJtest123",
-                "limit": 5
-            },
-            headers={"Authorization": f"Bearer {manager_token}"}
-        )
+        result = LLMAnalysisResult(sentiment=SentimentType.NEUTRAL, topics=["Service"], urgency=UrgencyType.STANDARD)
+        with patch("app.services.review_ingestion.llm_analyzer.analyze_review", return_value=result):
+            response = client.post(
+                "/ingest-reviews",
+                json={
+                    "hotel_id": "ChIJtest123",
+                    "limit": 5
+                },
+                headers={"Authorization": f"Bearer {manager_token}"}
+            )
         
         assert response.status_code == 200
         data = response.json()
         assert data["status"] == "processing"
         assert "task_id" in data
         assert data["hotel_id"] == "ChIJtest123"
+        
+        # The background ingest ran after the response; any worker reads its outcome
+        status = client.get(
+            f"/task-status/{data['task_id']}", headers={"Authorization": f"Bearer {manager_token}"}
+        ).json()
+        assert status["status"] == "completed"
+        assert status["reviews_count"] == 5
     
     def test_ingest_reviews_staff_forbidden(self, client, staff_token):
         """Test that staff cannot trigger review ingestion"""
@@ -169,6 +233,43 @@ class TestReviewEndpoints:
         assert response.status_code == 200
         assert isinstance(response.json(), list)
     
+    def test_get_critical_reviews_content(self, client, staff_token, critical_reviews):
+        """Test critical reviews are returned newest first with all fields"""
+        response = client.get(
+            "/critical-reviews",
+            headers={"Authorization": f"Bearer {staff_token}"}
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert [r["hotel_id"] for r in data] == ["hotel2", "hotel1"]
+        assert data[0]["urgency"] == "Critical"
+        assert data[0]["sentiment"] == "Negative"
+        assert data[0]["review_text"] == "Wallet stolen from the room"
+        assert "processed_at" in data[0]
+    
+    def test_get_critical_reviews_field_projection(self, client, staff_token, critical_reviews):
+        """Test ?fields= limits the returned columns"""
+        response = client.get(
+            "/critical-reviews?fields=id,hotel_id,urgency",
+            headers={"Authorization": f"Bearer {staff_token}"}
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data) == 2
+        assert set(data[0].keys()) == {"id", "hotel_id", "urgency"}
+    
+    def test_get_critical_reviews_unknown_field(self, client, staff_token):
+        """Test projection rejects unknown fields"""
+        response = client.get(
+            "/critical-reviews?fields=id,hashed_password",
+            headers={"Authorization": f"Bearer {staff_token}"}
+        )
+        
+        assert response.status_code == 400
+        assert "hashed_password" in response.json()["detail"]
+    
     def test_get_critical_reviews_no_auth(self, client):
         """Test critical reviews requires authentication"""
         response = client.get("/critical-reviews")
@@ -178,14 +279,16 @@ class TestReviewEndpoints:
     def test_get_task_status(self, client, manager_token):
         """Test getting task status"""
         # First create a task
-        ingest_response = client.post(
-            "/ingest-reviews",
-            json={
-                "hotel_id": "ChIJtest123",
-                "limit": 5
-            },
-            headers={"Authorization": f"Bearer {manager_token}"}
-        )
+        result = LLMAnalysisResult(sentiment=SentimentType.NEUTRAL, topics=["Service"], urgency=UrgencyType.STANDARD)
+        with patch("app.services.review_ingestion.llm_analyzer.analyze_review", return_value=result):
+            ingest_response = client.post(
+                "/ingest-reviews",
+                json={
+                    "hotel_id": "ChIJtest123",
+                    "limit": 5
+                },
+                headers={"Authorization": f"Bearer {manager_token}"}
+            )
         
         task_id = ingest_response.json()["task_id"]
         
@@ -208,4 +311,362 @@ class TestReviewEndpoints:
         
         assert response.status_code == 200
         data = response.json()
-        assert data["status"] == "not_found"
\ No newline at end of file
+        assert data["status"] == "not_found"
+
+
+def _cancel_and_drain(task_id, hotel_id):
+    background_task_manager.cancel(task_id)
+    asyncio.run(background_task_manager.ingest_reviews_task(task_id, hotel_id, 5, None))
+
+
+class TestIngestControls:
+    """Test suite for ingestion admission, deduplication and cancellation"""
+    
+    def test_queue_full_returns_429(self, client, manager_token):
+        """Test ingests beyond the in-flight limit are rejected with Retry-After"""
+        with patch.object(background_task_manager, "max_in_flight", 0):
+            response = client.post(
+                "/ingest-reviews",
+                json={"hotel_id": "ChIJtest123", "limit": 5},
+                headers={"Authorization": f"Bearer {manager_token}"}
+            )
+        
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) > 0
+    
+    def test_duplicate_ingest_returns_existing_task(self, client, manager_token):
+        """Test a hotel with an ingest in flight gets that task back instead of a new one"""
+        task_id, created = background_task_manager.admit("ChIJbusy")
+        try:
+            response = client.post(
+                "/ingest-reviews",
+                json={"hotel_id": "ChIJbusy", "limit": 5},
+                headers={"Authorization": f"Bearer {manager_token}"}
+            )
+        finally:
+            _cancel_and_drain(task_id, "ChIJbusy")
+        
+        assert created
+        assert response.status_code == 200
+        assert response.json()["task_id"] == task_id
+        assert response.json()["status"] == "queued"
+    
+    def test_cancel_task(self, client, manager_token):
+        """Test a cancelled ingest stops without processing and frees the hotel"""
+        task_id, _ = background_task_manager.admit("ChIJcancel")
+        
+        response = client.delete(f"/task/{task_id}", headers={"Authorization": f"Bearer {manager_token}"})
+        assert response.status_code == 200
+        assert response.json()["status"] == "cancelling"
+        
+        asyncio.run(background_task_manager.ingest_reviews_task(task_id, "ChIJcancel", 5, None))
+        
+        status = background_task_manager.get_task_status(task_id)
+        assert status["status"] == "cancelled"
+        assert status["reviews_count"] == 0
+        assert client.delete(
+            f"/task/{task_id}", headers={"Authorization": f"Bearer {manager_token}"}
+        ).status_code == 404
+        
+        next_task_id, created = background_task_manager.admit("ChIJcancel")
+        _cancel_and_drain(next_task_id, "ChIJcancel")
+        assert created
+    
+    def test_shutdown_drains_running_ingest(self, test_db):
+        """Test a running ingest cancelled by server shutdown stops cooperatively and is drained"""
+        started = threading.Event()
+        
+        def ingest(hotel_id, limit, user_id, deadline, cancelled):
+            started.set()
+            cancelled.wait(5)
+            return {"reviews_count": 1, "failed_reviews": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        
+        async def shutdown():
+            task_id, _ = background_task_manager.admit("ChIJshutdown")
+            running = asyncio.create_task(background_task_manager.ingest_reviews_task(task_id, "ChIJshutdown", 5, None))
+            await asyncio.to_thread(started.wait, 5)
+            # What uvicorn does to request tasks still running after its grace period
+            running.cancel()
+            drained = await background_task_manager.drain(5)
+            await running
+            return task_id, drained
+        
+        with patch.object(background_task_manager, "_ingest", side_effect=ingest):
+            task_id, drained = asyncio.run(shutdown())
+        
+        assert drained
+        status = background_task_manager.get_task_status(task_id)
+        assert status["status"] == "cancelled"
+        assert status["reviews_count"] == 1
+        assert background_task_manager.in_flight_count() == 0
+    
+    def test_cancelled_ingest_keeps_high_water_mark(self, test_db):
+        """Test a cancelled ingest stores what it analyzed but does not advance the hotel's mark"""
+        cancelled = threading.Event()
+        result = LLMAnalysisResult(sentiment=SentimentType.NEUTRAL, topics=["Service"], urgency=UrgencyType.STANDARD)
+        
+        def analyze(text, deadline=None):
+            cancelled.set()
+            return result
+        
+        with patch("app.services.review_ingestion.llm_analyzer.analyze_review", side_effect=analyze):
+            usage = background_task_manager._ingest("ChIJpartial", 10, None, float("inf"), cancelled)
+        
+        db = TestingSessionLocal()
+        try:
+            assert usage["reviews_count"] == 1
+            state = db.get(HotelIngestState, "ChIJpartial")
+            assert state is not None
+            assert state.last_review_date is None
+        finally:
+            db.close()
+    
+    def test_tasks_shared_across_workers(self, test_db):
+        """Test another worker sees the task, gets it back for the same hotel and counts it against the limit"""
+        worker1 = BackgroundTaskManager(max_in_flight=2, session_factory=TestingSessionLocal)
+        worker2 = BackgroundTaskManager(max_in_flight=2, session_factory=TestingSessionLocal)
+        
+        task_id, _ = worker1.admit("ChIJshared")
+        assert worker2.admit("ChIJshared") == (task_id, False)
+        assert worker2.get_task_status(task_id)["status"] == "queued"
+        worker2.admit("ChIJother")
+        with pytest.raises(IngestQueueFull):
+            worker2.admit("ChIJthird")
+    
+    def test_cancel_through_another_worker(self, test_db):
+        """Test a cancel received by one worker stops the ingest running in another"""
+        worker1 = BackgroundTaskManager(session_factory=TestingSessionLocal, poll_seconds=0.01)
+        worker2 = BackgroundTaskManager(session_factory=TestingSessionLocal)
+        started = threading.Event()
+        
+        def ingest(hotel_id, limit, user_id, deadline, cancelled):
+            started.set()
+            assert cancelled.wait(5)
+            return {"reviews_count": 1, "failed_reviews": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        
+        async def run():
+            task_id, _ = worker1.admit("ChIJremote")
+            running = asyncio.create_task(worker1.ingest_reviews_task(task_id, "ChIJremote", 5, None))
+            await asyncio.to_thread(started.wait, 5)
+            assert worker2.cancel(task_id)["status"] == "cancelling"
+            await running
+            return task_id
+        
+        with patch.object(worker1, "_ingest", side_effect=ingest):
+            task_id = asyncio.run(run())
+        
+        status = worker2.get_task_status(task_id)
+        assert (status["status"], status["reviews_count"]) == ("cancelled", 1)
+        assert worker2.admit("ChIJremote")[1]
+    
+    def test_task_of_dead_worker_expires(self, test_db):
+        """Test a task whose worker stopped heartbeating no longer blocks its hotel"""
+        stale_id, _ = BackgroundTaskManager(session_factory=TestingSessionLocal).admit("ChIJorphan")
+        db = TestingSessionLocal()
+        try:
+            db.get(IngestTask, stale_id).heartbeat_at = datetime.utcnow() - timedelta(hours=1)
+            db.commit()
+        finally:
+            db.close()
+        
+        worker = BackgroundTaskManager(session_factory=TestingSessionLocal)
+        task_id, created = worker.admit("ChIJorphan")
+        
+        assert created and task_id != stale_id
+        assert worker.get_task_status(stale_id)["status"] == "failed"
+    
+    def test_cancel_requires_manager(self, client, staff_token):
+        """Test staff cannot cancel ingestions"""
+        response = client.delete("/task/some-task", headers={"Authorization": f"Bearer {staff_token}"})
+        
+        assert response.status_code == 403
+    
+    def test_process_reviews_stops_when_cancelled(self, test_db):
+        """Test reviews stored before the cancellation are kept and the rest skipped"""
+        cancelled = threading.Event()
+        result = LLMAnalysisResult(sentiment=SentimentType.NEUTRAL, topics=["Service"], urgency=UrgencyType.STANDARD)
+        
+        def analyze(text, deadline=None):
+            cancelled.set()
+            return result
+        
+        db = TestingSessionLocal()
+        try:
+            with patch("app.services.review_ingestion.llm_analyzer.analyze_review", side_effect=analyze):
+                reviews = review_ingestion_service.process_reviews(
+                    "hotel1", [{"text": "First review"}, {"text": "Second review"}], db, cancelled=cancelled
+                )
+            
+            assert [review.review_text for review in reviews] == ["First review"]
+            assert db.query(Review).count() == 1
+        finally:
+            db.close()
+
+
+class TestReviewSearch:
+    """Test suite for full-text review search"""
+    
+    def test_search_matches_text(self, client, staff_token, critical_reviews):
+        """Test search returns reviews containing the terms"""
+        response = client.get(
+            "/reviews/search?q=bed bugs",
+            headers={"Authorization": f"Bearer {staff_token}"}
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data) == 1
+        assert data[0]["review_text"] == "Found bed bugs!"
+        assert data[0]["rank"] > 0
+    
+    def test_search_stems_terms(self, client, staff_token, critical_reviews):
+        """Test search matches word variants"""
+        response = client.get(
+            "/reviews/search?q=stay",
+            headers={"Authorization": f"Bearer {staff_token}"}
+        )
+        
+        assert response.status_code == 200
+        assert [r["review_text"] for r in response.json()] == ["Lovely stay"]
+    
+    def test_search_combined_with_filters(self, client, staff_token, critical_reviews):
+        """Test search terms are combined with hotel and urgency filters"""
+        headers = {"Authorization": f"Bearer {staff_token}"}
+        
+        response = client.get("/reviews/search?q=room&hotel_id=hotel2&urgency=Critical", headers=headers)
+        assert response.status_code == 200
+        assert [r["hotel_id"] for r in response.json()] == ["hotel2"]
+        
+        response = client.get("/reviews/search?q=room&hotel_id=hotel1", headers=headers)
+        assert response.json() == []
+    
+    def test_search_field_projection(self, client, staff_token, critical_reviews):
+        """Test search supports ?fields= including the rank"""
+        response = client.get(
+            "/reviews/search?q=bugs&fields=id,rank",
+            headers={"Authorization": f"Bearer {staff_token}"}
+        )
+        
+        assert response.status_code == 200
+        assert set(response.json()[0].keys()) == {"id", "rank"}
+    
+    def test_search_escapes_operators(self, client, staff_token, critical_reviews):
+        """Test FTS syntax in the query is treated as plain text"""
+        response = client.get(
+            '/reviews/search?q=bugs" OR "stay*',
+            headers={"Authorization": f"Bearer {staff_token}"}
+        )
+        
+        assert response.status_code == 200
+        assert response.json() == []
+    
+    def test_search_without_full_text_index(self, client, staff_token, critical_reviews):
+        """Test databases without a full-text index fall back to substring matching"""
+        headers = {"Authorization": f"Bearer {staff_token}"}
+    
+        with patch.object(review_search_service, "_sqlite_query", review_search_service._like_query):
+            response = client.get("/reviews/search?q=BUGS dirty", headers=headers)
+            assert response.status_code == 200
+            assert [r["review_text"] for r in response.json()] == ["Found bed bugs!"]
+            assert response.json()[0]["rank"] == 1
+    
+            response = client.get("/reviews/search?q=bu%", headers=headers)
+            assert response.json() == []
+    
+    def test_search_requires_auth(self, client):
+        """Test search requires authentication"""
+        response = client.get("/reviews/search?q=bugs")
+        
+        assert response.status_code == 401
+
+
+@pytest.fixture
+def embedded_reviews(test_db):
+    """Create reviews with stored embeddings and return their ids"""
+    similarity_index_cache.clear()
+    texts = [
+        "Black mold in the bathroom and the shower smelled of damp",
+        "Mold on the bathroom ceiling, the shower smelled damp and musty",
+        "The rooftop pool bar had excellent cocktails",
+        "Friendly bartender at the pool, great cocktails"
+    ]
+    db = TestingSessionLocal()
+    reviews = [
+        Review(
+            hotel_id="hotel1",
+            review_text=text,
+            sentiment=SentimentType.NEUTRAL,
+            topics="Cleanliness",
+            urgency=UrgencyType.STANDARD,
+            embedding=embedding
+        )
+        for text, embedding in zip(texts, embed_texts(texts))
+    ]
+    reviews.append(Review(
+        hotel_id="hotel2",
+        review_text=texts[0],
+        sentiment=SentimentType.NEUTRAL,
+        topics="Cleanliness",
+        urgency=UrgencyType.STANDARD,
+        embedding=embed_texts(texts[:1])[0]
+    ))
+    db.add_all(reviews)
+    db.commit()
+    ids = [review.id for review in reviews]
+    db.close()
+    yield ids
+    similarity_index_cache.clear()
+
+
+class TestSimilarReviews:
+    """Test suite for the similar reviews endpoint"""
+    
+    def test_similar_reviews_ranked(self, client, staff_token, embedded_reviews):
+        """Test the most similar review of the same hotel comes first"""
+        response = client.get(
+            f"/reviews/{embedded_reviews[0]}/similar?k=2",
+            headers={"Authorization": f"Bearer {staff_token}"}
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data) == 2
+        assert data[0]["id"] == embedded_reviews[1]
+        assert data[0]["similarity"] > data[1]["similarity"]
+        # Same hotel only, and never the query review itself
+        assert all(r["hotel_id"] == "hotel1" for r in data)
+        assert embedded_reviews[0] not in [r["id"] for r in data]
+    
+    def test_similar_reviews_skip_deleted(self, client, staff_token, embedded_reviews):
+        """Test reviews deleted after the index was cached are not returned"""
+        headers = {"Authorization": f"Bearer {staff_token}"}
+        client.get(f"/reviews/{embedded_reviews[0]}/similar?k=3", headers=headers)
+        
+        db = TestingSessionLocal()
+        db.query(Review).filter(Review.id == embedded_reviews[1]).delete()
+        db.commit()
+        db.close()
+        
+        response = client.get(f"/reviews/{embedded_reviews[0]}/similar?k=3", headers=headers)
+        
+        assert response.status_code == 200
+        assert sorted(r["id"] for r in response.json()) == embedded_reviews[2:4]
+    
+    def test_similar_reviews_projection(self, client, staff_token, embedded_reviews):
+        """Test ?fields= applies to similar reviews"""
+        response = client.get(
+            f"/reviews/{embedded_reviews[2]}/similar?k=1&fields=id,similarity",
+            headers={"Authorization": f"Bearer {staff_token}"}
+        )
+        
+        assert response.status_code == 200
+        assert response.json() == [{"id": embedded_reviews[3], "similarity": response.json()[0]["similarity"]}]
+    
+    def test_similar_reviews_not_found(self, client, staff_token, test_db):
+        """Test unknown review ids return 404"""
+        response = client.get(
+            "/reviews/9999/similar",
+            headers={"Authorization": f"Bearer {staff_token}"}
+        )
+        
+        assert response.status_code == 404
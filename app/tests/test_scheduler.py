@@ -0,0 +1,74 @@
+import asyncio
+import threading
+from app.services.scheduler import Scheduler
+
+
+class TestScheduler:
+    """Test suite for the periodic job scheduler"""
+
+    def test_job_runs_once_at_a_time(self):
+        """Test a job already running on another thread is not started again"""
+        scheduler = Scheduler()
+        started, release = threading.Event(), threading.Event()
+        runs = []
+
+        def job(db):
+            runs.append(threading.current_thread().name)
+            started.set()
+            release.wait(5)
+
+        scheduler.register("slow", 0, job)
+        first = threading.Thread(target=scheduler.run_job, args=("slow",))
+        first.start()
+        assert started.wait(5)
+        try:
+            assert scheduler.run_job("slow") is False
+        finally:
+            release.set()
+            first.join()
+
+        assert len(runs) == 1
+        assert scheduler.run_job("slow") is True
+        assert len(runs) == 2
+        assert not scheduler.jobs["slow"].running
+
+    def test_failure_is_recorded(self):
+        """Test a failing job records its error and can run again"""
+        scheduler = Scheduler()
+
+        def job(db):
+            raise ValueError("boom")
+
+        scheduler.register("broken", 0, job)
+
+        assert scheduler.run_job("broken") is True
+        assert scheduler.jobs["broken"].last_error == "boom"
+        assert scheduler.run_job("broken") is True
+
+    def test_only_leader_runs_periodic_jobs(self, tmp_path):
+        """Test one of several processes runs the periodic jobs, and another takes over when it stops"""
+        lock_file = str(tmp_path / "scheduler.lock")
+        schedulers = [Scheduler(leader_poll_seconds=0.01, lock_file=lock_file) for _ in range(3)]
+        runs = []
+        for i, scheduler in enumerate(schedulers):
+            scheduler.register("tick", 0.01, lambda db, i=i: runs.append(i))
+
+        async def run():
+            for scheduler in schedulers:
+                scheduler.start()
+            await asyncio.sleep(0.2)
+            first = set(runs)
+            leader = next(scheduler for scheduler in schedulers if scheduler.is_leader)
+            await leader.stop()
+            await asyncio.sleep(0.05)
+            runs.clear()
+            await asyncio.sleep(0.2)
+            second = set(runs)
+            for scheduler in schedulers:
+                await scheduler.stop()
+            return first, second, schedulers.index(leader)
+
+        first, second, leader = asyncio.run(run())
+
+        assert first == {leader}
+        assert len(second) == 1 and second != first
@@ -0,0 +1,146 @@
+import pytest
+import pyarrow as pa
+import pyarrow.dataset as ds
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.models import Review, SentimentType, SnapshotRelabel, UrgencyType
+from app.services.snapshots import ReviewSnapshotJob, mark_relabelled, query_snapshot, snapshot_dataset
+
+# Test database
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_snapshots.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def db():
+    """Create test database and session"""
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def job(tmp_path):
+    """Snapshot job writing to a temporary directory, in small batches"""
+    return ReviewSnapshotJob(snapshot_dir=str(tmp_path), batch_size=2)
+
+
+def _add(db, hotel_id, processed_at, sentiment=SentimentType.POSITIVE, topics="Staff, Breakfast"):
+    db.add(Review(hotel_id=hotel_id, review_text="Lovely stay", processed_at=processed_at,
+                  sentiment=sentiment, urgency=UrgencyType.STANDARD, topics=topics))
+    db.commit()
+
+
+class TestReviewSnapshotJob:
+    """Test suite for the Parquet snapshot of reviews"""
+
+    def test_partitioned_by_hotel_and_month(self, db, job, tmp_path):
+        """Test files are laid out per hotel and processing month, with typed partition columns"""
+        _add(db, "1042", datetime(2024, 1, 5))
+        _add(db, "1042", datetime(2024, 2, 5))
+        _add(db, "hotel2", datetime(2024, 2, 9), sentiment=SentimentType.NEGATIVE, topics="Noise")
+
+        assert job.run(db) == 3
+
+        directories = sorted(path.parent.relative_to(tmp_path / "reviews").as_posix()
+                             for path in (tmp_path / "reviews").rglob("*.parquet"))
+        assert directories == ["hotel_id=1042/month=2024-01", "hotel_id=1042/month=2024-02",
+                               "hotel_id=hotel2/month=2024-02"]
+        table = snapshot_dataset(str(tmp_path)).to_table(filter=ds.field("hotel_id") == "1042")
+        assert sorted(table.column("id").to_pylist()) == [1, 2]
+
+    def test_dictionary_encoded(self, db, job, tmp_path):
+        """Test enums and topics are stored as dictionary codes and read back as values"""
+        _add(db, "hotel1", datetime(2024, 1, 5))
+        job.run(db)
+
+        table = snapshot_dataset(str(tmp_path)).to_table()
+        assert pa.types.is_dictionary(table.schema.field("sentiment").type)
+        assert pa.types.is_dictionary(table.schema.field("topics").type.value_type)
+        assert table.column("sentiment").to_pylist() == ["Positive"]
+        assert table.column("topics").to_pylist() == [["Staff", "Breakfast"]]
+
+    def test_incremental_runs(self, db, job, tmp_path):
+        """Test each run only appends reviews stored since the previous one"""
+        for day in range(1, 4):
+            _add(db, "hotel1", datetime(2024, 1, day))
+        assert job.run(db) == 3
+        assert job.run(db) == 0
+
+        _add(db, "hotel1", datetime(2024, 1, 9))
+        assert job.run(db) == 1
+
+        ids = snapshot_dataset(str(tmp_path)).to_table(columns=["id"]).column("id").to_pylist()
+        assert sorted(ids) == [1, 2, 3, 4]
+
+    def test_recent_reviews_wait(self, db, job, tmp_path):
+        """Test reviews within the safety lag are left for the next run"""
+        _add(db, "hotel1", datetime(2024, 1, 5))
+        _add(db, "hotel1", datetime.utcnow())
+
+        assert job.run(db) == 1
+        assert job.run(db, now=datetime.utcnow() + timedelta(minutes=5)) == 1
+        assert snapshot_dataset(str(tmp_path)).count_rows() == 2
+
+    def test_relabelled_reviews_rewritten(self, db, job, tmp_path):
+        """Test a relabelled hotel/month is rewritten with the current labels, keeping archived rows"""
+        for day in range(1, 4):
+            _add(db, "hotel1", datetime(2024, 1, day))
+        _add(db, "hotel1", datetime(2024, 2, 1))
+        job.run(db)
+
+        relabelled = db.get(Review, 2)
+        relabelled.sentiment = SentimentType.NEGATIVE
+        mark_relabelled(db, [relabelled])
+        mark_relabelled(db, [relabelled])
+        db.delete(db.get(Review, 1))  # archived since the snapshot took it
+        db.commit()
+        assert db.get(SnapshotRelabel, ("hotel1", "2024-01")).version == 2
+
+        assert job.run(db) == 0
+
+        table = snapshot_dataset(str(tmp_path)).to_table().sort_by("id")
+        assert table.column("id").to_pylist() == [1, 2, 3, 4]
+        assert table.column("sentiment").to_pylist() == ["Positive", "Negative", "Positive", "Positive"]
+        assert len(list((tmp_path / "reviews" / "hotel_id=hotel1" / "month=2024-01").iterdir())) == 1
+        assert db.query(SnapshotRelabel).count() == 0
+
+    def test_relabel_during_rewrite_kept(self, db, job, tmp_path):
+        """Test a mark bumped while its hotel/month was being rewritten survives for the next run"""
+        _add(db, "hotel1", datetime(2024, 1, 5))
+        job.run(db)
+        mark_relabelled(db, [db.get(Review, 1)])
+        db.commit()
+
+        relabel = db.get(SnapshotRelabel, ("hotel1", "2024-01"))
+        db.expunge(relabel)
+        mark_relabelled(db, [db.get(Review, 1)])
+        db.commit()
+        job._rewrite(db, relabel, 1)
+
+        assert db.get(SnapshotRelabel, ("hotel1", "2024-01")).version == 2
+        assert snapshot_dataset(str(tmp_path)).count_rows() == 1
+
+    def test_empty_snapshot(self, tmp_path):
+        """Test the dataset can be opened before the first run"""
+        assert snapshot_dataset(str(tmp_path)).count_rows() == 0
+
+    def test_sql_query(self, db, job, tmp_path):
+        """Test the DuckDB helper runs SQL against the snapshot"""
+        pytest.importorskip("duckdb")
+        _add(db, "hotel1", datetime(2024, 1, 5))
+        _add(db, "hotel1", datetime(2024, 1, 6), sentiment=SentimentType.NEGATIVE)
+        _add(db, "hotel2", datetime(2024, 1, 7))
+        job.run(db)
+
+        result = query_snapshot(
+            "SELECT hotel_id, count(*) AS reviews FROM reviews WHERE sentiment = 'Positive' "
+            "GROUP BY hotel_id ORDER BY hotel_id",
+            str(tmp_path)
+        )
+        assert result.to_pylist() == [{"hotel_id": "hotel1", "reviews": 1}, {"hotel_id": "hotel2", "reviews": 1}]
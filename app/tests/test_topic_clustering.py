@@ -0,0 +1,201 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.main import app
+from app.database import Base, get_db
+from app.models import Review, TopicCluster, JobCheckpoint
+from app.services.topic_clustering import MiniBatchKMeans, TopicClusteringJob, label_clusters, terms
+from collections import Counter
+from datetime import datetime, timedelta
+
+# Test database
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_topic_clustering.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+PARKING = [
+    "Parking garage was full and valet parking cost a fortune",
+    "Valet parking took forever, the parking garage is tiny",
+    "No parking available, had to use an expensive garage nearby",
+]
+BREAKFAST = [
+    "Breakfast buffet was cold, eggs and coffee were terrible",
+    "Coffee at breakfast was cold and the buffet eggs were stale",
+    "Terrible breakfast buffet, stale pastries and cold coffee",
+]
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+app.dependency_overrides[get_db] = override_get_db
+
+
+@pytest.fixture
+def db():
+    """Create test database and session"""
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def client(db):
+    """Test client fixture"""
+    return TestClient(app)
+
+
+@pytest.fixture
+def auth_token(client):
+    """Create user and return auth token"""
+    client.post(
+        "/auth/register",
+        json={"username": "testuser", "email": "test@test.com", "password": "testpass", "role": "Staff"}
+    )
+    response = client.post("/auth/login", data={"username": "testuser", "password": "testpass"})
+    return response.json()["access_token"]
+
+
+def _add_reviews(db, texts, hotel_id="hotel1", processed_at=None):
+    # Past the checkpoint safety lag unless given
+    processed_at = processed_at or datetime.utcnow() - timedelta(hours=1)
+    db.add_all([Review(hotel_id=hotel_id, review_text=text, processed_at=processed_at) for text in texts])
+    db.commit()
+
+
+class TestMiniBatchKMeans:
+    """Test suite for incremental k-means"""
+
+    def test_separates_clusters_across_batches(self):
+        """Test points from two directions end up in two clusters fed one batch at a time"""
+        rng = np.random.default_rng(0)
+        a, b = np.eye(16)[0], np.eye(16)[1]
+        model = MiniBatchKMeans(k=2)
+
+        for _ in range(5):
+            batch = np.vstack([a + 0.05 * rng.normal(size=(10, 16)), b + 0.05 * rng.normal(size=(10, 16))])
+            labels = model.partial_fit(batch.astype(np.float32))
+            assert len(set(labels[:10])) == 1 and len(set(labels[10:])) == 1
+            assert labels[0] != labels[10]
+
+        assert model.counts.sum() == 100
+        assert sorted(model.counts) == [50, 50]
+
+    def test_empty_vectors(self):
+        """Test a batch of zero vectors leaves the model unseeded"""
+        model = MiniBatchKMeans(k=3)
+        labels = model.partial_fit(np.zeros((4, 8), dtype=np.float32))
+
+        assert model.centroids is None
+        assert list(labels) == [0, 0, 0, 0]
+
+
+class TestLabels:
+    """Test suite for cluster labelling"""
+
+    def test_terms_drop_stopwords(self):
+        """Test stopwords and short tokens are ignored"""
+        assert terms("The room had no hot water at all") == ["hot", "water"]
+
+    def test_distinctive_terms_rank_first(self):
+        """Test a term shared by every cluster ranks below cluster-specific ones"""
+        labels = label_clusters([
+            Counter({"staff": 5, "parking": 4}),
+            Counter({"staff": 5, "breakfast": 4}),
+        ], top_n=1)
+
+        assert labels == [["parking"], ["breakfast"]]
+
+
+class TestTopicClusteringJob:
+    """Test suite for the incremental clustering job"""
+
+    def test_clusters_and_labels(self, db):
+        """Test reviews about different things land in labelled clusters"""
+        _add_reviews(db, PARKING + BREAKFAST)
+        job = TopicClusteringJob(clusters_per_hotel=2, batch_size=100)
+
+        assert job.run(db) == 6
+
+        clusters = db.query(TopicCluster).order_by(TopicCluster.cluster_index).all()
+        assert sorted(c.size for c in clusters) == [3, 3]
+        labels = [set(c.top_terms.split(",")) for c in clusters]
+        assert any("parking" in label for label in labels)
+        assert any("breakfast" in label for label in labels)
+
+    def test_resumes_from_checkpoint(self, db):
+        """Test a second run only folds in reviews added since the first"""
+        job = TopicClusteringJob(clusters_per_hotel=2, batch_size=2)
+        _add_reviews(db, PARKING + BREAKFAST)
+        job.run(db)
+
+        assert job.run(db) == 0
+
+        _add_reviews(db, PARKING[:1])
+        assert job.run(db) == 1
+        assert sum(c.size for c in db.query(TopicCluster).all()) == 7
+        checkpoint = db.get(JobCheckpoint, ("topic_clustering", ""))
+        assert checkpoint.last_review_id == 7
+
+    def test_recent_reviews_wait(self, db):
+        """Test reviews stored within the safety lag are left for the next run"""
+        job = TopicClusteringJob(clusters_per_hotel=2, batch_size=100)
+        _add_reviews(db, PARKING)
+        _add_reviews(db, BREAKFAST, processed_at=datetime.utcnow())
+
+        assert job.run(db) == 3
+        assert db.get(JobCheckpoint, ("topic_clustering", "")).last_review_id == 3
+
+    def test_hotels_are_independent(self, db):
+        """Test each hotel gets its own clusters"""
+        _add_reviews(db, PARKING, hotel_id="hotel1")
+        _add_reviews(db, BREAKFAST, hotel_id="hotel2")
+        TopicClusteringJob(clusters_per_hotel=4, batch_size=100).run(db)
+
+        hotel2 = db.query(TopicCluster).filter(TopicCluster.hotel_id == "hotel2").all()
+        assert sum(c.size for c in hotel2) == 3
+        assert all("parking" not in (c.top_terms or "") for c in hotel2)
+
+
+class TestTopicClusterEndpoints:
+    """Test suite for topic cluster endpoints"""
+
+    def test_get_clusters(self, client, auth_token, db):
+        """Test clusters are listed largest first"""
+        _add_reviews(db, PARKING + BREAKFAST[:2])
+        TopicClusteringJob(clusters_per_hotel=2, batch_size=100).run(db)
+
+        response = client.get(
+            "/hotels/hotel1/topic-clusters",
+            headers={"Authorization": f"Bearer {auth_token}"}
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [c["size"] for c in data] == [3, 2]
+        assert "parking" in data[0]["top_terms"]
+        assert len(data[0]["example_review_ids"]) == 3
+
+    def test_refresh_requires_manager(self, client, auth_token):
+        """Test staff cannot trigger a refresh"""
+        response = client.post(
+            "/topic-clusters/refresh",
+            headers={"Authorization": f"Bearer {auth_token}"}
+        )
+
+        assert response.status_code == 403
+
+    def test_requires_auth(self, client):
+        """Test clusters require authentication"""
+        response = client.get("/hotels/hotel1/topic-clusters")
+
+        assert response.status_code == 401
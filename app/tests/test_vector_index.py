@@ -0,0 +1,167 @@
+import threading
+import numpy as np
+import pytest
+from unittest.mock import patch
+from app.services.embeddings import HashingEmbedder, encode_vector, decode_vector, decode_int8
+from app.services.vector_index import BruteForceIndex, IVFIndex, SimilarityIndexCache
+
+
+@pytest.fixture
+def embedder():
+    """Fixture for the hashing embedder"""
+    return HashingEmbedder(dim=256)
+
+
+def _clustered_vectors(count, dim=64, clusters=50, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    points = centers[rng.integers(0, clusters, size=count)] + 0.3 * rng.normal(size=(count, dim))
+    points /= np.linalg.norm(points, axis=1, keepdims=True)
+    return np.clip(np.rint(points * 127), -127, 127).astype(np.int8)
+
+
+class TestEmbeddings:
+    """Test suite for review embeddings"""
+
+    def test_vectors_are_normalized(self, embedder):
+        """Test embeddings are unit vectors"""
+        vectors = embedder.embed(["Dirty bathroom and mold in the shower", "Great view"])
+
+        assert vectors.shape == (2, 256)
+        assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-5)
+
+    def test_related_texts_are_closer(self, embedder):
+        """Test reviews about the same problem are more similar than unrelated ones"""
+        mold, mold_again, pool = embedder.embed([
+            "There was black mold in the bathroom and the shower smelled",
+            "Mold all over the bathroom ceiling, the shower smelled awful",
+            "The rooftop pool bar had excellent cocktails"
+        ])
+
+        assert mold @ mold_again > mold @ pool
+
+    def test_empty_text(self, embedder):
+        """Test text without words embeds to a zero vector instead of failing"""
+        assert not embedder.embed(["!!!"]).any()
+
+    def test_int8_round_trip(self, embedder):
+        """Test int8 storage is compact and close to the original vector"""
+        vector = embedder.embed(["Elevator broken for two days"])[0]
+        blob = encode_vector(vector, "int8")
+
+        assert len(blob) == 1 + 256
+        assert np.abs(decode_vector(blob) - vector).max() < 0.01
+
+    def test_float16_round_trip(self, embedder):
+        """Test float16 vectors decode to the same int8 index format"""
+        vector = embedder.embed(["Elevator broken for two days"])[0]
+        blob = encode_vector(vector, "float16")
+
+        assert len(blob) == 1 + 2 * 256
+        assert np.abs(decode_int8(blob).astype(int) - decode_int8(encode_vector(vector)).astype(int)).max() <= 1
+
+
+class TestVectorIndex:
+    """Test suite for nearest neighbour indexes"""
+
+    def test_brute_force_exact(self):
+        """Test brute force returns the query itself first"""
+        vectors = _clustered_vectors(500)
+        index = BruteForceIndex(np.arange(500), vectors)
+
+        hits = index.search(vectors[42].astype(np.float32) / 127, 5)
+
+        assert hits[0][0] == 42
+        assert len(hits) == 5
+        assert [score for _, score in hits] == sorted((score for _, score in hits), reverse=True)
+
+    def test_ivf_recall(self):
+        """Test IVF finds most of the exact neighbours"""
+        vectors = _clustered_vectors(5000)
+        ids = np.arange(5000)
+        exact = BruteForceIndex(ids, vectors)
+        approximate = IVFIndex(ids, vectors, nprobe=8)
+
+        recall = []
+        for query_id in range(0, 5000, 250):
+            query = vectors[query_id].astype(np.float32) / 127
+            truth = {i for i, _ in exact.search(query, 10)}
+            found = {i for i, _ in approximate.search(query, 10)}
+            recall.append(len(truth & found) / 10)
+
+        assert np.mean(recall) >= 0.9
+
+    def test_ivf_incremental_add(self):
+        """Test vectors added after training are searchable"""
+        vectors = _clustered_vectors(3000)
+        index = IVFIndex(np.arange(2000), vectors[:2000])
+        updated = index.add(np.arange(2000, 2100), vectors[2000:2100])
+
+        assert len(updated) == 2100
+        assert len(index) == 2000
+        assert updated.search(vectors[2050].astype(np.float32) / 127, 1)[0][0] == 2050
+
+    def test_remove(self):
+        """Test removed vectors are no longer returned, by either index"""
+        vectors = _clustered_vectors(3000)
+        ivf = IVFIndex(np.arange(2000), vectors[:2000]).add(np.arange(2000, 2100), vectors[2000:2100])
+        brute = BruteForceIndex(np.arange(2100), vectors[:2100])
+        removed = np.array([42, 2050])
+
+        for index in (ivf, brute):
+            smaller = index.remove(removed)
+            assert len(smaller) == 2098
+            for review_id in removed:
+                hits = smaller.search(vectors[review_id].astype(np.float32) / 127, 5)
+                assert review_id not in [hit_id for hit_id, _ in hits]
+            assert smaller.search(vectors[7].astype(np.float32) / 127, 1)[0][0] == 7
+
+
+class TestSimilarityIndexCache:
+    """Test suite for the per-hotel index cache"""
+
+    def test_cold_build_does_not_block_other_hotels(self):
+        """Test a hotel whose index is loading does not hold up queries for another"""
+        cache = SimilarityIndexCache(max_hotels=4, ivf_threshold=10_000, nprobe=8)
+        vectors = _clustered_vectors(10)
+        loading, release = threading.Event(), threading.Event()
+
+        def load(db, hotel_id, after_id):
+            if hotel_id == "slow" and after_id == 0:
+                loading.set()
+                release.wait(5)
+            if after_id:
+                return np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.int8)
+            return np.arange(10), vectors
+
+        with patch.object(cache, "_load", side_effect=load):
+            slow = threading.Thread(target=cache.get, args=(None, "slow"))
+            slow.start()
+            assert loading.wait(5)
+            try:
+                assert len(cache.get(None, "fast")) == 10
+            finally:
+                release.set()
+                slow.join()
+        assert cache._indexes.keys() == {"fast", "slow"}
+
+    def test_rebuilt_after_max_age(self):
+        """Test an old index is reloaded from the table instead of only topped up"""
+        cache = SimilarityIndexCache(max_hotels=4, ivf_threshold=10_000, nprobe=8, max_age_seconds=60)
+        vectors = _clustered_vectors(10)
+        loads = []
+
+        def load(db, hotel_id, after_id):
+            loads.append(after_id)
+            return np.arange(10), vectors
+
+        with patch.object(cache, "_load", side_effect=load), patch("app.services.vector_index.time") as clock:
+            clock.monotonic.return_value = 1000.0
+            cache.get(None, "hotel1")
+            clock.monotonic.return_value = 1030.0
+            cache.get(None, "hotel1")
+            clock.monotonic.return_value = 1100.0
+            index = cache.get(None, "hotel1")
+
+        assert loads == [0, 9, 0]
+        assert len(index) == 10
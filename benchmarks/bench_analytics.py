@@ -0,0 +1,180 @@
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Tuple
+from benchmarks.common import measure
+from benchmarks.generators import analyzed_rows
+
+
+def _rows(count: int) -> List[Tuple]:
+    return [
+        (row["hotel_id"], row["sentiment"], row["urgency"], row["topics"], row["processed_at"])
+        for row in analyzed_rows(count)
+    ]
+
+
+def _snapshot_table(rows):
+    """The same reviews as the Parquet snapshot holds them (app.services.snapshots)."""
+    from app.services.columnar import SNAPSHOT_COLUMNS, reviews_to_snapshot
+
+    fields = ["hotel_id", "sentiment", "urgency", "topics", "processed_at"]
+    positions = [SNAPSHOT_COLUMNS.index(name) for name in fields]
+    template = [None] * len(SNAPSHOT_COLUMNS)
+    template[SNAPSHOT_COLUMNS.index("review_text")] = ""
+    template[SNAPSHOT_COLUMNS.index("needs_reanalysis")] = False
+
+    snapshot_rows = []
+    for index, row in enumerate(rows):
+        values = list(template)
+        values[0] = index
+        for position, value in zip(positions, row):
+            values[position] = value
+        snapshot_rows.append(values)
+    return reviews_to_snapshot(snapshot_rows)
+
+
+# Row-at-a-time versions, written the way get_dashboard_metrics counts topics
+
+
+def _distribution_per_row(rows) -> Dict[str, Any]:
+    from app.models import SentimentType
+
+    sentiments = Counter()
+    topic_counter = Counter()
+    for _, sentiment, _, topics_str, _ in rows:
+        sentiments[sentiment] += 1
+        if topics_str:
+            topic_counter.update([t.strip() for t in topics_str.split(',')])
+    total = len(rows)
+    return {
+        "sentiment": {s: round(sentiments[s] / total * 100, 2) for s in SentimentType},
+        "topics": [(topic, count, round(count / total * 100, 2)) for topic, count in topic_counter.most_common()]
+    }
+
+
+def _topic_counts_per_row(topic_strings) -> Counter:
+    topic_counter = Counter()
+    for topics_str in topic_strings:
+        if topics_str:
+            topic_counter.update([t.strip() for t in topics_str.split(',')])
+    return topic_counter
+
+
+def _crosstab_per_row(rows) -> Counter:
+    cells = Counter()
+    for _, sentiment, _, topics_str, _ in rows:
+        if topics_str and sentiment:
+            for topic in topics_str.split(','):
+                cells[(topic.strip(), sentiment)] += 1
+    return cells
+
+
+def _rankings_per_row(rows) -> List[Tuple[str, float]]:
+    from app.models import SentimentType, UrgencyType
+
+    hotels = defaultdict(lambda: [0, 0, 0])
+    for hotel_id, sentiment, urgency, _, _ in rows:
+        counts = hotels[hotel_id]
+        counts[0] += 1
+        counts[1] += sentiment == SentimentType.NEGATIVE
+        counts[2] += urgency == UrgencyType.CRITICAL
+    return sorted(((hotel, negative / total) for hotel, (total, negative, _) in hotels.items()),
+                  key=lambda item: -item[1])
+
+
+def _trend_per_row(rows, window: int = 7) -> List[float]:
+    from datetime import timedelta
+    from app.models import SentimentType
+
+    days = defaultdict(lambda: [0, 0])
+    for _, sentiment, _, _, processed_at in rows:
+        counts = days[processed_at.date()]
+        counts[0] += 1
+        counts[1] += sentiment == SentimentType.NEGATIVE
+    first, last = min(days), max(days)
+    series = [days.get(first + timedelta(days=offset), [0, 0]) for offset in range((last - first).days + 1)]
+    shares = []
+    for index in range(len(series)):
+        trailing = series[max(0, index - window + 1):index + 1]
+        shares.append(sum(n for _, n in trailing) / max(sum(t for t, _ in trailing), 1))
+    return shares
+
+
+def run(rows: int = 1_000_000, iterations: int = 5) -> Dict[str, Any]:
+    """Dashboard statistics over ``rows`` in-memory reviews: Python per row vs app.services.analytics.
+
+    The vectorized side first encodes the rows into code arrays (from Python
+    rows as read from the database, or from the Arrow snapshot table). Each
+    statistic reports ``vectorized`` (compute on encoded columns, as when one
+    encoding serves every statistic) and ``end_to_end`` (encoding the rows
+    plus compute, as a single statistic served alone costs), with a speedup
+    for each. ``dashboard`` compares all of them per row against one encoding
+    followed by all of them.
+    """
+    from app.services import analytics
+
+    data = _rows(rows)
+    columns = analytics.ReviewColumns.from_rows(data)
+    table = _snapshot_table(data)
+
+    def distribution(columns):
+        counts = analytics.sentiment_counts(columns)
+        topics = analytics.topic_counts(columns)
+        analytics.percentages(list(counts.values()), len(columns))
+        analytics.percentages(list(topics.values()), len(columns))
+
+    def rankings(columns):
+        stats = analytics.hotel_stats(columns)
+        analytics.rank_hotels(stats.negative_share)
+        analytics.percentile_ranks(stats.negative_share)
+
+    topic_strings = [row[3] for row in data]
+    pairs = {
+        "distribution": (lambda: _distribution_per_row(data), distribution),
+        "topic_sentiment_crosstab": (lambda: _crosstab_per_row(data), analytics.topic_sentiment_crosstab),
+        "hotel_rankings": (lambda: _rankings_per_row(data), rankings),
+        "rolling_trend_7d": (lambda: _trend_per_row(data), lambda columns: analytics.daily_trend(columns, 7)),
+    }
+
+    results: Dict[str, Any] = {
+        "rows": rows,
+        "encode_from_rows": measure(lambda: analytics.ReviewColumns.from_rows(data), 1, warmup=0),
+        "encode_from_arrow": measure(lambda: analytics.ReviewColumns.from_arrow(table), iterations, warmup=1),
+    }
+    slow_iterations = max(1, iterations // 2)
+    for name, (per_row, vectorized) in pairs.items():
+        baseline = measure(per_row, slow_iterations, warmup=0)
+        fast = measure(lambda: vectorized(columns), iterations, warmup=1)
+        end_to_end = measure(lambda: vectorized(analytics.ReviewColumns.from_rows(data)), slow_iterations, warmup=0)
+        results[name] = {
+            "per_row": baseline,
+            "vectorized": fast,
+            "end_to_end": end_to_end,
+            "speedup": round(baseline["p50_ms"] / max(fast["p50_ms"], 1e-6), 1),
+            "speedup_end_to_end": round(baseline["p50_ms"] / max(end_to_end["p50_ms"], 1e-6), 1)
+        }
+
+    # count_topics takes the stored strings, so it always includes its own encoding
+    baseline = measure(lambda: _topic_counts_per_row(topic_strings), slow_iterations, warmup=0)
+    fast = measure(lambda: analytics.count_topics(topic_strings), iterations, warmup=1)
+    results["topic_counts_dashboard"] = {
+        "per_row": baseline,
+        "end_to_end": fast,
+        "speedup_end_to_end": round(baseline["p50_ms"] / max(fast["p50_ms"], 1e-6), 1)
+    }
+
+    def dashboard_per_row():
+        for per_row, _ in pairs.values():
+            per_row()
+
+    def dashboard_vectorized():
+        encoded = analytics.ReviewColumns.from_rows(data)
+        for _, vectorized in pairs.values():
+            vectorized(encoded)
+
+    baseline = measure(dashboard_per_row, slow_iterations, warmup=0)
+    fast = measure(dashboard_vectorized, slow_iterations, warmup=0)
+    results["dashboard"] = {
+        "per_row": baseline,
+        "end_to_end": fast,
+        "speedup_end_to_end": round(baseline["p50_ms"] / max(fast["p50_ms"], 1e-6), 1)
+    }
+    return results
@@ -0,0 +1,34 @@
+from typing import Any, Dict
+from benchmarks.common import measure
+
+
+def run(iterations: int = 200) -> Dict[str, Any]:
+    """Per-request cost of JWT authentication compared with an open endpoint."""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    client = TestClient(app)
+    client.post("/auth/register", json={
+        "username": "authbench",
+        "email": "authbench@example.com",
+        "password": "benchmark",
+        "role": "Staff"
+    })
+    token = client.post(
+        "/auth/login", data={"username": "authbench", "password": "benchmark"}
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    anonymous = measure(lambda: client.get("/health"), iterations)
+    authenticated = measure(lambda: client.get("/task-status/benchmark", headers=headers), iterations)
+    login = measure(
+        lambda: client.post("/auth/login", data={"username": "authbench", "password": "benchmark"}),
+        max(5, iterations // 20)
+    )
+
+    return {
+        "anonymous": anonymous,
+        "authenticated": authenticated,
+        "login": login,
+        "auth_overhead_p50_ms": round(authenticated["p50_ms"] - anonymous["p50_ms"], 3)
+    }
@@ -0,0 +1,68 @@
+from typing import Any, Dict, List
+from benchmarks.common import measure
+from benchmarks.generators import SIZES, populate_reviews
+
+
+def _auth_headers() -> Dict[str, str]:
+    from app.auth import create_access_token, get_password_hash
+    from app.database import SessionLocal
+    from app.models import User, UserRole
+
+    db = SessionLocal()
+    try:
+        if not db.query(User).filter(User.username == "bench").first():
+            db.add(User(
+                username="bench",
+                email="bench@example.com",
+                hashed_password=get_password_hash("benchmark"),
+                role=UserRole.MANAGER
+            ))
+            db.commit()
+    finally:
+        db.close()
+    return {"Authorization": f"Bearer {create_access_token({'sub': 'bench'})}"}
+
+
+def run(sizes: List[str], iterations: int = 20) -> Dict[str, Any]:
+    """Dashboard and critical review latency as the reviews table grows.
+
+    The table is emptied first (benchmarks.run only allows that on a
+    database other than its own throwaway file with ``--destructive``), then
+    grown in place (10k -> 100k -> 1m) so each size only pays for the rows
+    it adds.
+    """
+    from fastapi.testclient import TestClient
+    from app.database import engine
+    from app.main import app
+    from app.models import Review
+
+    with engine.begin() as conn:
+        conn.execute(Review.__table__.delete())
+
+    client = TestClient(app)
+    headers = _auth_headers()
+    results: Dict[str, Any] = {}
+    rows = 0
+
+    for label in sorted(sizes, key=lambda s: SIZES[s]):
+        target = SIZES[label]
+        rows += populate_reviews(engine, target - rows, start=rows)
+
+        def dashboard():
+            assert client.get("/dashboard-metrics", headers=headers).status_code == 200
+
+        def critical_reviews():
+            assert client.get("/critical-reviews", headers=headers).status_code == 200
+
+        def critical_reviews_projected():
+            response = client.get("/critical-reviews?fields=id,hotel_id,urgency", headers=headers)
+            assert response.status_code == 200
+
+        results[label] = {
+            "rows": rows,
+            "dashboard_metrics": measure(dashboard, iterations),
+            "critical_reviews": measure(critical_reviews, max(3, iterations // 4)),
+            "critical_reviews_projected": measure(critical_reviews_projected, max(3, iterations // 4))
+        }
+
+    return results
@@ -0,0 +1,34 @@
+import time
+from typing import Any, Dict
+from benchmarks.fake_llm import FakeLLMServer
+from benchmarks.generators import raw_reviews
+
+
+def run(llm: FakeLLMServer, reviews: int = 200) -> Dict[str, Any]:
+    """Ingest throughput: fetch payloads -> LLM analysis -> insert, end to end."""
+    from app.database import SessionLocal
+    from app.services.review_ingestion import review_ingestion_service
+
+    payloads = raw_reviews(reviews, seed=1)
+    served_before = llm.requests_served
+
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        processed = review_ingestion_service.process_reviews(
+            hotel_id="hotel-bench-ingest",
+            reviews_data=payloads,
+            db=db
+        )
+    finally:
+        db.close()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "reviews": len(processed),
+        "seconds": round(elapsed, 3),
+        "reviews_per_second": round(len(processed) / elapsed, 2),
+        "llm_requests": llm.requests_served - served_before,
+        "llm_configured_latency": llm.latency_ms,
+        "llm_error_rate": llm.error_rate
+    }
@@ -0,0 +1,84 @@
+import json
+import random
+import time
+from typing import Any, Dict, List
+from benchmarks.common import measure
+
+SENTIMENTS = ["Positive", "Negative", "Neutral", "positive", None]
+URGENCIES = ["Critical", "Standard", "urgent"]
+TOPICS = ["Cleanliness", "Service", "Amenities", "Location", "Value", "Food", "Wifi"]
+
+
+def llm_answers(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Decoded LLM answers, including the off-label values models produce."""
+    rng = random.Random(seed)
+    return [
+        {
+            "sentiment": rng.choice(SENTIMENTS),
+            "topics": rng.sample(TOPICS, rng.randint(0, 3)),
+            "urgency": rng.choice(URGENCIES),
+            "reasoning": "Guest mentions the room and the front desk."
+        }
+        for _ in range(count)
+    ]
+
+
+def _parse_with_enum_lookups(result: Dict[str, Any]):
+    """The parser before the lookup tables: enums built in try/except, topic list rebuilt per call."""
+    from app.models import SentimentType, UrgencyType
+    from app.schemas import LLMAnalysisResult
+
+    sentiment = result.get("sentiment", "Neutral")
+    topics = result.get("topics", [])
+    urgency = result.get("urgency", "Standard")
+    reasoning = result.get("reasoning", "")
+
+    try:
+        sentiment_enum = SentimentType(sentiment)
+    except ValueError:
+        sentiment_enum = SentimentType.NEUTRAL
+
+    try:
+        urgency_enum = UrgencyType(urgency)
+    except ValueError:
+        urgency_enum = UrgencyType.STANDARD
+
+    valid_topics = ["Cleanliness", "Service", "Amenities", "Location", "Value"]
+    filtered_topics = [t for t in topics if t in valid_topics]
+
+    return LLMAnalysisResult(
+        sentiment=sentiment_enum,
+        topics=filtered_topics if filtered_topics else ["Service"],
+        urgency=urgency_enum,
+        reasoning=reasoning
+    )
+
+
+def _timed(fn, answers) -> float:
+    started = time.perf_counter()
+    for answer in answers:
+        fn(answer)
+    return time.perf_counter() - started
+
+
+def run(responses: int = 100_000, iterations: int = 5) -> Dict[str, Any]:
+    """CPU cost of turning LLM answers into labels, against the previous parser."""
+    from app.services.llm_analyzer import LLMAnalyzer
+    from app.services.llm_providers import LLMProvider, ProviderPool
+
+    analyzer = LLMAnalyzer(ProviderPool([LLMProvider("bench", client=None, model="bench")]))
+    answers = llm_answers(responses)
+    raw = [json.dumps(answer) for answer in answers]
+
+    results = {"responses": responses}
+    for name, parse in (("baseline", _parse_with_enum_lookups), ("lookup_tables", analyzer._parse_llm_response)):
+        results[name] = {
+            "decoded": measure(lambda: _timed(parse, answers), iterations, warmup=1),
+            # As in production: every answer arrives as a JSON string
+            "from_json": measure(lambda: _timed(lambda text: parse(json.loads(text)), raw), iterations, warmup=1)
+        }
+    for stage in ("decoded", "from_json"):
+        results[f"speedup_{stage}"] = round(
+            results["baseline"][stage]["p50_ms"] / max(results["lookup_tables"][stage]["p50_ms"], 1e-6), 2
+        )
+    return results
@@ -0,0 +1,46 @@
+import time
+from typing import Any, Dict
+import numpy as np
+from benchmarks.common import measure
+
+
+def clustered_vectors(count: int, dim: int = 256, clusters: int = 2000, seed: int = 0) -> np.ndarray:
+    """Unit vectors around random topic centres, quantized like stored embeddings."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    vectors = np.empty((count, dim), dtype=np.int8)
+    for start in range(0, count, 100_000):
+        n = min(100_000, count - start)
+        points = centers[rng.integers(0, clusters, size=n)] + 0.5 * rng.normal(size=(n, dim)).astype(np.float32)
+        points /= np.linalg.norm(points, axis=1, keepdims=True)
+        vectors[start:start + n] = np.clip(np.rint(points * 127), -127, 127)
+    return vectors
+
+
+def run(vectors: int = 1_000_000, queries: int = 50, k: int = 10) -> Dict[str, Any]:
+    """Similar-review query latency and recall: brute force vs IVF."""
+    from app.services.vector_index import BruteForceIndex, IVFIndex
+
+    data = clustered_vectors(vectors)
+    ids = np.arange(vectors)
+    query_ids = np.random.default_rng(1).choice(vectors, size=queries, replace=False)
+    query_vectors = [data[i].astype(np.float32) / 127 for i in query_ids]
+
+    brute = BruteForceIndex(ids, data)
+    started = time.perf_counter()
+    ivf = IVFIndex(ids, data)
+    build_seconds = time.perf_counter() - started
+
+    recall = []
+    for query in query_vectors:
+        truth = {i for i, _ in brute.search(query, k)}
+        recall.append(len(truth & {i for i, _ in ivf.search(query, k)}) / k)
+
+    cycle = iter(range(10 ** 9))
+    return {
+        "vectors": vectors,
+        "ivf_build_seconds": round(build_seconds, 3),
+        "ivf_recall_at_k": round(float(np.mean(recall)), 4),
+        "brute_force": measure(lambda: brute.search(query_vectors[next(cycle) % queries], k), min(queries, 10)),
+        "ivf": measure(lambda: ivf.search(query_vectors[next(cycle) % queries], k), queries)
+    }
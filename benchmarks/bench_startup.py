@@ -0,0 +1,66 @@
+import json
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+from benchmarks.common import ROOT, free_port, summarize, wait_ready
+
+# Runs in a fresh interpreter; prints the seconds spent importing the app and
+# then building the LLM clients it now defers to first use
+_IMPORT_PROBE = """
+import json, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from app.services.llm_analyzer import llm_analyzer
+llm_analyzer.providers
+print(json.dumps([imported - started, time.perf_counter() - imported]))
+"""
+
+
+def _probe_import() -> List[float]:
+    output = subprocess.run(
+        [sys.executable, "-c", _IMPORT_PROBE], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _time_to_ready() -> float:
+    """Seconds from launching a single uvicorn worker until it answers /health."""
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--port", str(port), "--log-level", "warning", "--lifespan", "on"
+        ],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_ready(f"http://127.0.0.1:{port}")
+        return time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def run(runs: int = 5) -> Dict[str, Any]:
+    """Cold-start cost of a worker: importing the app and serving its first request.
+
+    Every sample is a new interpreter, so nothing is cached between runs apart
+    from the operating system's file cache (warmed by one discarded run).
+    """
+    _probe_import()
+
+    imports, clients, ready = [], [], []
+    for _ in range(runs):
+        imported, built = _probe_import()
+        imports.append(imported)
+        clients.append(built)
+        ready.append(_time_to_ready())
+
+    return {
+        "import_app": summarize(imports),
+        "build_llm_clients": summarize(clients),
+        "time_to_ready": summarize(ready)
+    }
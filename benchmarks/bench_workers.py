@@ -0,0 +1,83 @@
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+import httpx
+from benchmarks.common import ROOT, free_port, summarize, wait_ready
+
+
+def _start_server(workers: int, port: int) -> subprocess.Popen:
+    """The production server (gunicorn.conf.py) with ``workers`` workers on the benchmark database."""
+    env = {**os.environ, "WEB_CONCURRENCY": str(workers), "SCHEDULER_ENABLED": "false"}
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+            "--bind", f"127.0.0.1:{port}", "--log-level", "warning", "app.main:app"
+        ],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def _login(base_url: str) -> Dict[str, str]:
+    credentials = {"username": "workerbench", "password": "benchmark"}
+    # Users persist in the benchmark database across server runs
+    httpx.post(f"{base_url}/auth/register", json={
+        **credentials, "email": "workerbench@example.com", "role": "Staff"
+    })
+    token = httpx.post(f"{base_url}/auth/login", data=credentials).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _client(url: str, headers: Dict[str, str], duration: float) -> List[float]:
+    latencies = []
+    with httpx.Client(headers=headers) as client:
+        stop = time.perf_counter() + duration
+        while time.perf_counter() < stop:
+            started = time.perf_counter()
+            client.get(url).raise_for_status()
+            latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def run(worker_counts: List[int], clients: int = 16, duration: float = 5.0) -> Dict[str, Any]:
+    """Requests per second of an authenticated endpoint by number of server workers.
+
+    Load comes from ``clients`` keep-alive connections in separate processes so
+    that the load generator is not itself limited by one core.
+    """
+    results: Dict[str, Any] = {"cores": len(os.sched_getaffinity(0)), "clients": clients}
+    # Spawned rather than forked: the benchmark process already runs the fake LLM's threads
+    context = multiprocessing.get_context("spawn")
+
+    with context.Pool(clients) as pool:
+        for workers in worker_counts:
+            port = free_port()
+            base_url = f"http://127.0.0.1:{port}"
+            server = _start_server(workers, port)
+            try:
+                wait_ready(base_url)
+                headers = _login(base_url)
+                url = f"{base_url}/task-status/benchmark"
+                # Also gives every worker time to boot before measuring
+                pool.starmap(_client, [(url, headers, 1.0)] * clients)
+
+                latencies = [
+                    latency
+                    for client_latencies in pool.starmap(_client, [(url, headers, duration)] * clients)
+                    for latency in client_latencies
+                ]
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+
+            results[str(workers)] = {
+                "requests_per_second": round(len(latencies) / duration, 1),
+                "latency": summarize(latencies)
+            }
+
+    baseline = results[str(worker_counts[0])]["requests_per_second"]
+    for workers in worker_counts:
+        results[str(workers)]["speedup"] = round(results[str(workers)]["requests_per_second"] / baseline, 2)
+    return results
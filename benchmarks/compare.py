@@ -0,0 +1,56 @@
+"""Compare two benchmark result files and flag latency/throughput regressions.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 0.1
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, Iterator, Tuple
+
+# Metrics where a larger number is better; every other numeric leaf is a cost
+HIGHER_IS_BETTER = ("per_second", "speedup", "rows_per_second")
+
+
+def _leaves(node: Any, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    if isinstance(node, dict):
+        for key, value in node.items():
+            yield from _leaves(value, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(node, (int, float)) and not isinstance(node, bool):
+        yield prefix, float(node)
+
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any], threshold: float):
+    base = dict(_leaves(baseline["scenarios"]))
+    regressions = []
+    for path, value in _leaves(candidate["scenarios"]):
+        if path not in base or base[path] == 0 or not path.endswith(("_ms", "seconds") + HIGHER_IS_BETTER):
+            continue
+        change = (value - base[path]) / abs(base[path])
+        if path.endswith(HIGHER_IS_BETTER):
+            change = -change
+        marker = "REGRESSION" if change > threshold else ""
+        print(f"{path:70s} {base[path]:>12.3f} -> {value:>12.3f} ({change:+.1%}) {marker}")
+        if marker:
+            regressions.append(path)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed relative slowdown")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f"{baseline['commit']} -> {candidate['commit']}")
+    regressions = compare(baseline, candidate, args.threshold)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
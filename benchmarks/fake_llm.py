@@ -0,0 +1,138 @@
+"""Deterministic OpenAI-compatible chat completions server for benchmarks.
+
+Every response (labels, latency, and whether the call fails) is derived from a
+hash of the request body, so repeated runs see exactly the same behaviour.
+
+    python -m benchmarks.fake_llm --port 9100 --latency-ms 200 --error-rate 0.05
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+SENTIMENTS = ["Positive", "Negative", "Neutral"]
+TOPICS = ["Cleanliness", "Service", "Amenities", "Location", "Value"]
+CRITICAL_WORDS = ("bed bugs", "food poisoning", "stolen", "theft", "assault", "dangerous")
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 50.0,
+                 jitter_ms: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        super().__init__((host, port), _Handler)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.seed = seed
+        self.requests_served = 0
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def fraction(self, body: bytes, salt: str) -> float:
+        """Deterministic value in [0, 1) for this request body."""
+        digest = hashlib.sha256(f"{self.seed}:{salt}:".encode() + body).digest()
+        return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakeLLMServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        self.server.requests_served += 1
+
+        delay = self.server.latency_ms + self.server.jitter_ms * self.server.fraction(body, "latency")
+        time.sleep(delay / 1000)
+
+        if not self.path.rstrip("/").endswith("chat/completions"):
+            self._send(404, {"error": {"message": "not found"}})
+            return
+        if self.server.fraction(body, "error") < self.server.error_rate:
+            self._send(500, {"error": {"message": "injected failure", "type": "server_error"}})
+            return
+
+        request = json.loads(body or b"{}")
+        self._send(200, self._completion(request, body))
+
+    def _completion(self, request: dict, body: bytes) -> dict:
+        prompt = " ".join(m.get("content", "") for m in request.get("messages", []))
+        text = prompt.lower()
+        pick = self.server.fraction(body, "labels")
+
+        topics = [t for i, t in enumerate(TOPICS) if (int(pick * 1000) >> i) & 1] or ["Service"]
+        content = {
+            "sentiment": SENTIMENTS[int(pick * len(SENTIMENTS))],
+            "topics": topics,
+            "urgency": "Critical" if any(w in text for w in CRITICAL_WORDS) else "Standard",
+            "reasoning": "Deterministic benchmark response"
+        }
+        prompt_tokens = max(1, len(prompt) // 4)
+        completion_tokens = 40
+
+        return {
+            "id": f"chatcmpl-{hashlib.md5(body).hexdigest()[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake-llm"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": json.dumps(content)},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+
+    def _send(self, status: int, payload: dict):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = FakeLLMServer(args.host, args.port, args.latency_ms, args.jitter_ms, args.error_rate, args.seed)
+    print(f"Fake LLM listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+OPENERS = [
+    "Stayed here for a weekend trip.", "We booked this hotel for a conference.",
+    "Our family spent a week here.", "Quick overnight stay before a flight.",
+    "Came for our anniversary.", "Business trip, three nights."
+]
+POSITIVE = [
+    "The room was spotless and the bed was very comfortable.",
+    "Staff at the front desk were friendly and helpful.",
+    "Great location, walking distance to the old town.",
+    "Breakfast buffet had excellent choices.", "The pool and gym were fantastic."
+]
+NEGATIVE = [
+    "The bathroom was dirty and smelled of mold.",
+    "The elevator was broken for two days.",
+    "Staff were rude when we asked for extra towels.",
+    "Very noisy at night, thin walls.", "Overpriced for what you get."
+]
+CRITICAL = [
+    "Found bed bugs on the mattress.", "My laptop was stolen from the room.",
+    "Got food poisoning from the restaurant.", "The balcony railing was loose and dangerous."
+]
+CLOSERS = ["Would come back.", "Not sure I would return.", "Avoid.", "Recommended.", ""]
+
+TOPICS = ["Cleanliness", "Service", "Amenities", "Location", "Value"]
+SENTIMENTS = ["Positive", "Negative", "Neutral"]
+
+
+def hotel_ids(count: int) -> List[str]:
+    return [f"hotel-{i:05d}" for i in range(count)]
+
+
+def review_text(rng: random.Random) -> str:
+    parts = [rng.choice(OPENERS)]
+    roll = rng.random()
+    if roll < 0.5:
+        parts += rng.sample(POSITIVE, 2)
+    elif roll < 0.95:
+        parts += rng.sample(NEGATIVE, 2)
+    else:
+        parts += [rng.choice(NEGATIVE), rng.choice(CRITICAL)]
+    parts.append(rng.choice(CLOSERS))
+    return " ".join(p for p in parts if p)
+
+
+def raw_reviews(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Unanalyzed payloads in the shape returned by fetch_google_reviews."""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    return [
+        {
+            "text": review_text(rng),
+            "author": f"Guest {rng.randint(1, 50_000)}",
+            "rating": float(rng.randint(1, 5)),
+            "date": now - timedelta(days=rng.randint(0, 730))
+        }
+        for _ in range(count)
+    ]
+
+
+def analyzed_rows(count: int, hotels: int = 200, seed: int = 0, start: int = 0) -> Iterator[Dict[str, Any]]:
+    """Already-analyzed rows ready for a bulk insert into ``reviews``."""
+    from app.models import SentimentType, UrgencyType
+
+    rng = random.Random(f"{seed}:{start}")
+    ids = hotel_ids(hotels)
+    now = datetime.utcnow()
+
+    for _ in range(count):
+        text = review_text(rng)
+        critical = any(word in text for word in ("bed bugs", "stolen", "poisoning", "dangerous"))
+        sentiment = "Negative" if critical else rng.choice(SENTIMENTS)
+        processed_at = now - timedelta(seconds=rng.randint(0, 730 * 86400))
+        yield {
+            "hotel_id": rng.choice(ids),
+            "review_text": text,
+            "author": f"Guest {rng.randint(1, 50_000)}",
+            "rating": float(rng.randint(1, 5)),
+            "review_date": processed_at - timedelta(days=rng.randint(0, 14)),
+            "sentiment": SentimentType(sentiment),
+            "topics": ",".join(rng.sample(TOPICS, rng.randint(1, 3))),
+            "urgency": UrgencyType.CRITICAL if critical else UrgencyType.STANDARD,
+            "processed_at": processed_at
+        }
+
+
+def populate_reviews(engine, count: int, hotels: int = 200, seed: int = 0, start: int = 0,
+                     batch_size: int = 10_000) -> int:
+    """Bulk insert ``count`` analyzed reviews with executemany batches."""
+    from app.models import Review
+
+    table = Review.__table__
+    batch: List[Dict[str, Any]] = []
+    inserted = 0
+    with engine.begin() as conn:
+        for row in analyzed_rows(count, hotels, seed, start):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                conn.execute(table.insert(), batch)
+                inserted += len(batch)
+                batch = []
+        if batch:
+            conn.execute(table.insert(), batch)
+            inserted += len(batch)
+    return inserted
@@ -0,0 +1,87 @@
+"""Run API and ingestion benchmarks and write the results to JSON.
+
+    python -m benchmarks.run --scenarios ingest,dashboard,auth --sizes 10k,100k
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json
+"""
+import argparse
+import os
+import tempfile
+from typing import Any, Callable, Dict
+from benchmarks.common import configure_environment, git_commit, write_results
+from benchmarks.fake_llm import FakeLLMServer
+from benchmarks.generators import SIZES
+
+
+def _scenarios(args: argparse.Namespace, llm: FakeLLMServer) -> Dict[str, Callable[[], Any]]:
+    from benchmarks import (
+        bench_analytics, bench_auth, bench_dashboard, bench_ingest, bench_parse, bench_similarity, bench_startup,
+        bench_workers
+    )
+
+    return {
+        "ingest": lambda: bench_ingest.run(llm, args.ingest_reviews),
+        "dashboard": lambda: bench_dashboard.run(args.sizes.split(","), args.iterations),
+        "auth": lambda: bench_auth.run(args.iterations * 10),
+        "similarity": lambda: bench_similarity.run(args.vectors),
+        "parse": lambda: bench_parse.run(args.responses),
+        "workers": lambda: bench_workers.run([int(n) for n in args.workers.split(",")], args.clients, args.duration),
+        "startup": lambda: bench_startup.run(args.startup_runs),
+        "analytics": lambda: bench_analytics.run(args.analytics_rows)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", default="ingest,dashboard,auth")
+    parser.add_argument("--sizes", default="10k", help=f"Table sizes: {', '.join(SIZES)}")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--ingest-reviews", type=int, default=200)
+    parser.add_argument("--vectors", type=int, default=1_000_000, help="Index size for the similarity scenario")
+    parser.add_argument("--responses", type=int, default=100_000, help="LLM answers for the parse scenario")
+    parser.add_argument("--workers", default="1,2,4", help="Server worker counts for the workers scenario")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent connections for the workers scenario")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds of load per worker count")
+    parser.add_argument("--startup-runs", type=int, default=5, help="Cold starts for the startup scenario")
+    parser.add_argument("--analytics-rows", type=int, default=1_000_000, help="Reviews for the analytics scenario")
+    parser.add_argument("--llm-latency-ms", type=float, default=20.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--database-url", help="Defaults to a throwaway SQLite file")
+    parser.add_argument(
+        "--destructive", action="store_true",
+        help="Allow --database-url: the scenarios write to it and the dashboard one deletes every review"
+    )
+    parser.add_argument("--output", help="Defaults to benchmarks/results/<commit>.json")
+    args = parser.parse_args()
+    if args.database_url and not args.destructive:
+        parser.error("--database-url points at a database the benchmarks will overwrite; pass --destructive")
+
+    workdir = tempfile.mkdtemp(prefix="hotel-bench-")
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    llm = FakeLLMServer(
+        latency_ms=args.llm_latency_ms,
+        jitter_ms=args.llm_jitter_ms,
+        error_rate=args.llm_error_rate
+    ).start()
+    configure_environment(database_url, llm.base_url)
+
+    from app import models  # noqa: F401  (registers tables on Base.metadata)
+    from app.database import init_db
+    init_db()
+
+    scenarios = _scenarios(args, llm)
+    results: Dict[str, Any] = {}
+    try:
+        for name in args.scenarios.split(","):
+            print(f"Running {name}...")
+            results[name] = scenarios[name]()
+    finally:
+        llm.stop()
+
+    output = args.output or os.path.join("benchmarks", "results", f"{git_commit()}.json")
+    print(f"Results written to {write_results(results, output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Production server: ``gunicorn -c gunicorn.conf.py app.main:app``.
+
+There is one async worker per core available to the process
+(``os.sched_getaffinity``); WEB_CONCURRENCY overrides that and PORT sets the
+listening port. Ingest tasks live in the database and periodic jobs run in
+whichever worker holds the scheduler leader lock, so every worker serves the
+same API. Workers write Prometheus samples to PROMETHEUS_MULTIPROC_DIR and
+/metrics reports all of them.
+"""
+import glob
+import os
+import tempfile
+
+# Must be set before prometheus_client is first imported (app.metrics)
+os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "prometheus-multiproc")
+)
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+# Samples left by a previous server would be added to this one's
+for path in glob.glob(os.path.join(os.environ["PROMETHEUS_MULTIPROC_DIR"], "*.db")):
+    os.remove(path)
+
+from app.config import settings
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", len(os.sched_getaffinity(0))))
+worker_class = "app.server.AppWorker"
+keepalive = 5
+
+# Import the app once in the master (and build the OpenAI clients and the
+# embedder in when_ready) so that workers share them copy-on-write
+preload_app = True
+
+# Covers the worker's own grace period plus draining in-flight ingests
+graceful_timeout = settings.SHUTDOWN_GRACE_SECONDS + settings.SHUTDOWN_DRAIN_SECONDS + 5
+
+
+def when_ready(server):
+    from app.services.embeddings import get_embedder
+    from app.services.llm_analyzer import llm_analyzer
+
+    # Both are built lazily on first use; build them once here instead of in every worker
+    llm_analyzer.providers
+    if settings.EMBEDDINGS_ENABLED:
+        get_embedder()
+
+
+def post_fork(server, worker):
+    from app.database import engine
+
+    # Connections the master may have opened must not be shared across
+    # processes; close=False leaves them to the master instead of closing them
+    engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    # Drops the worker's samples from the "live" gauges
+    multiprocess.mark_process_dead(worker.pid)